@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Benchmarks executáveis com: python -m benchmarks.<nome>
@@ -0,0 +1,54 @@
+# benchmarks/audio_meter.py
+"""
+Mede o custo da medição de nível (RMS, pico, clipping e piso de ruído espectral) por quadro de 20 ms,
+quadro a quadro (como no on_capture de um PcmStream) e em lote, comparado à duração do áudio.
+Não precisa de modem: os quadros são tom + ruído gerados localmente.
+
+Uso: python -m benchmarks.audio_meter [--seconds N]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.modem.audio_meter import AudioMeter
+from src.modem.voice_pcm import FRAME_MS, SAMPLE_RATES
+
+
+def _signal(sample_rate, seconds):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    noise = np.random.default_rng(0).normal(0, 0.001, len(t))
+    return ((0.1 * np.sin(2 * np.pi * 1000 * t) + noise) * 32767).astype('<i2').tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0, help="Duração do áudio medido por taxa de amostragem.")
+    args = parser.parse_args()
+
+    for sample_rate in SAMPLE_RATES:
+        data = _signal(sample_rate, args.seconds)
+        frame_samples = sample_rate * FRAME_MS // 1000
+        frame_bytes = frame_samples * 2
+        meter = AudioMeter(sample_rate)
+        meter.measure(data[:frame_bytes]) # Aquecimento (janela e FFT)
+
+        start = time.perf_counter()
+        with memoryview(data) as view:
+            for offset in range(0, len(data) - frame_bytes + 1, frame_bytes):
+                meter.measure(view[offset:offset + frame_bytes])
+        per_frame = time.perf_counter() - start
+        frames = len(data) // frame_bytes
+
+        start = time.perf_counter()
+        meter.measure_blocks(data, frame_samples)
+        batch = time.perf_counter() - start
+
+        budget = FRAME_MS / 1000
+        print(f"{sample_rate} Hz: quadro a quadro {per_frame / frames * 1e6:7.1f} us/quadro "
+              f"({per_frame / frames / budget:.2%} do tempo real); "
+              f"em lote {batch / frames * 1e6:6.1f} us/quadro ({batch / frames / budget:.3%})")
+
+
+if __name__ == "__main__":
+    main()
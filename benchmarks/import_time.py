@@ -0,0 +1,64 @@
+# benchmarks/import_time.py
+"""
+Mede o tempo de importação das camadas sem GUI (controller e daemon) com
+`python -X importtime` e verifica que PySimpleGUI/tkinter não são carregados.
+Sai com código 1 se o orçamento for estourado.
+
+Uso: python -m benchmarks.import_time [--budget-ms 300] [--module src.modem.daemon]
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+# Orçamento padrão (ms) para importar o daemon sem GUI
+DEFAULT_BUDGET_MS = 300
+
+# Módulos de GUI que não podem ser carregados pelas camadas modem/utils
+FORBIDDEN_MODULES = ("PySimpleGUI", "tkinter", "_tkinter")
+
+_IMPORTTIME_RE = re.compile(r'import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|(?P<indent>\s*)(?P<module>\S+)')
+
+
+def measure(module):
+    """
+    Importa o módulo num interpretador novo.
+    :return: Tupla (cumulativo em ms, {módulo: cumulativo em ms} dos imports de primeiro nível, módulos proibidos carregados).
+    """
+    code = (
+        f"import {module}, sys; "
+        f"print(','.join(m for m in {FORBIDDEN_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+    top_level = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match and len(match.group("indent")) == 1: # Imports de primeiro nível
+            top_level[match.group("module")] = int(match.group("cumulative")) / 1000
+    forbidden = [name for name in result.stdout.strip().split(",") if name]
+    return sum(top_level.values()), top_level, forbidden
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.modem.daemon")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    total_ms, top_level, forbidden = measure(args.module)
+    for name, cumulative in sorted(top_level.items(), key=lambda item: -item[1])[:10]:
+        print(f"{cumulative:>9.1f} ms  {name}")
+    print(f"Total: {total_ms:.1f} ms (orçamento: {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if forbidden:
+        print(f"ERRO: módulos de GUI carregados: {', '.join(forbidden)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("ERRO: orçamento de tempo de importação estourado.")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
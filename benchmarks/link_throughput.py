@@ -0,0 +1,53 @@
+# benchmarks/link_throughput.py
+"""
+Mede a vazão de payload (upload/download UFS) em cada velocidade da UART que passa no teste de eco,
+subindo com AT+IPR (e RTS/CTS via AT+IFC=2,2, salvo --no-flow-control) até a primeira falha.
+Sem --port, roda contra o modem simulado com o tempo de linha modelado (vazão em escala de tempo reduzida).
+
+Uso: python -m benchmarks.link_throughput [--bytes N] [--no-flow-control]
+     python -m benchmarks.link_throughput --port /dev/ttyS1 [--bytes N] [--save]
+"""
+import argparse
+import time
+
+from src.modem.controller import ModemController
+from src.modem.link_tuning import BAUD_RATES, LinkTuner, default_link_settings, format_table
+from src.modem.simulator import SimulatedModem
+
+
+def _connect(args):
+    if args.port:
+        controller = ModemController(port=args.port, urc_profile=None)
+    else:
+        modem = SimulatedModem(time_scale=0.01, model_line_rate=True)
+        controller = ModemController(port="SIM", serial_factory=modem.open_serial, urc_profile=None)
+    if not controller.connect_modem():
+        raise SystemExit(f"Falha ao conectar na porta {args.port or 'SIM'}.")
+    if not args.port:
+        time.sleep(0.2) # Registro do modem simulado
+    return controller
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", help="Porta serial do modem real (padrão: modem simulado).")
+    parser.add_argument("--bytes", type=int, default=32 * 1024, help="Tamanho do arquivo transferido em cada velocidade.")
+    parser.add_argument("--rates", default=",".join(map(str, BAUD_RATES)), help="Velocidades candidatas.")
+    parser.add_argument("--no-flow-control", action="store_true", help="Não ativa RTS/CTS.")
+    parser.add_argument("--save", action="store_true", help="Grava a melhor configuração (modem real) no arquivo de enlace.")
+    args = parser.parse_args()
+
+    controller = _connect(args)
+    try:
+        store = default_link_settings if args.save and args.port else None
+        tuner = LinkTuner(controller, rates=[int(rate) for rate in args.rates.split(",")],
+                          flow_control=not args.no_flow_control, benchmark_bytes=args.bytes, store=store)
+        result = tuner.tune()
+        print(format_table(result["results"]))
+        print(f"Melhor: {result['baudrate']} baud, RTS/CTS {'ativo' if result['flow_control'] else 'inativo'}")
+    finally:
+        controller.disconnect_modem()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/reader_throughput.py
+"""
+Mede a vazão do trabalho da thread de leitura serial (decodificação, buffer,
+separação de respostas e URCs) com o log desligado e ligado em DEBUG (incluindo
+o trace de bytes brutos), sem modem: os blocos são injetados direto no controller.
+
+Uso: python -m benchmarks.reader_throughput [--chunks N]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from src.logger import logger as logger_module
+from src.modem.controller import ModemController
+
+# Blocos típicos recebidos da serial: respostas de comando e URCs de sinal/registro
+SAMPLE_CHUNKS = [
+    b"AT+CSQ\r\r\n+CSQ: 21,99\r\n\r\nOK\r\n",
+    b"\r\n+CREG: 1,\"1A2B\",\"01C3D4E5\",7\r\n",
+    b"\r\n+QIND: \"csq\",20,99\r\n",
+    b"AT+CREG?\r\r\n+CREG: 2,1,\"1A2B\",\"01C3D4E5\",7\r\n\r\nOK\r\n",
+    b"\r\n+CEREG: 1,\"00FA\",\"0A1B2C3D\",7\r\n",
+]
+
+
+def _run_reader(chunks):
+    controller = ModemController(port="BENCH", urc_profile=None)
+    controller.urc_dispatcher.start()
+    data = [SAMPLE_CHUNKS[i % len(SAMPLE_CHUNKS)] for i in range(chunks)]
+    total_bytes = sum(len(chunk) for chunk in data)
+    start = time.perf_counter()
+    for chunk in data:
+        controller._handle_serial_data(chunk)
+    elapsed = time.perf_counter() - start
+    controller.urc_dispatcher.stop()
+    return elapsed, total_bytes
+
+
+def _scenario(name, chunks, log_file, level):
+    logger_module.configure_logging(log_file, console=False)
+    logger_module.set_subsystem_level("src", level)
+    logger_module.set_subsystem_level(logger_module.RAW_TRACE_LOGGER, level)
+    elapsed, total_bytes = _run_reader(chunks)
+    drain_start = time.perf_counter()
+    logger_module.shutdown_logging() # Espera a thread de escrita esvaziar a fila
+    drain = time.perf_counter() - drain_start
+    print(f"{name:<22} {chunks / elapsed:>12,.0f} blocos/s {total_bytes / elapsed / 1e6:>8.2f} MB/s"
+          f"   (escrita pendente do log: {drain * 1000:.0f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000, help="Número de blocos injetados por cenário.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_file = os.path.join(tmp_dir, "bench.log")
+        _scenario("Log desligado", args.chunks, log_file, logging.WARNING)
+        _scenario("Log DEBUG + trace", args.chunks, log_file, logging.DEBUG)
+        print(f"Tamanho do log gerado: {os.path.getsize(log_file) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
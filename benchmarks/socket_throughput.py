@@ -0,0 +1,66 @@
+# benchmarks/socket_throughput.py
+"""
+Mede a vazão sustentada dos sockets do modem (AT+QISEND/AT+QIRD): envia um volume de
+telemetria por TCP e, com --echo, lê de volta a resposta de um servidor de eco.
+Sem --port, roda contra o modem simulado (eco local), medindo o custo do protocolo AT.
+
+Uso: python -m benchmarks.socket_throughput [--bytes N] [--echo]
+     python -m benchmarks.socket_throughput --port /dev/ttyUSB2 --host servidor --remote-port 7 [--echo]
+"""
+import argparse
+import os
+import time
+
+from src.modem.controller import ModemController
+from src.modem.simulator import SimulatedModem
+
+
+def _connect(args):
+    if args.port:
+        controller = ModemController(port=args.port, urc_profile=None)
+    else:
+        modem = SimulatedModem(time_scale=0.01)
+        controller = ModemController(port="SIM", serial_factory=modem.open_serial, urc_profile=None)
+    if not controller.connect_modem():
+        raise SystemExit(f"Falha ao conectar na porta {args.port or 'SIM'}.")
+    if not args.port:
+        time.sleep(0.2) # Registro do modem simulado
+    return controller
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", help="Porta serial do modem real (padrão: modem simulado).")
+    parser.add_argument("--host", default="127.0.0.1", help="Servidor remoto (modem real).")
+    parser.add_argument("--remote-port", type=int, default=7, help="Porta TCP do servidor remoto.")
+    parser.add_argument("--bytes", type=int, default=256 * 1024, help="Volume enviado.")
+    parser.add_argument("--echo", action="store_true", help="Lê de volta o mesmo volume (servidor de eco).")
+    args = parser.parse_args()
+
+    controller = _connect(args)
+    try:
+        payload = os.urandom(args.bytes)
+        with controller.sockets.open(args.host, args.remote_port) as sock:
+            start = time.perf_counter()
+            sock.sendall(memoryview(payload))
+            sent = time.perf_counter() - start
+            print(f"Envio:    {args.bytes / sent / 1024:>8.1f} KiB/s ({args.bytes} bytes em {sent:.2f}s)")
+            if args.echo:
+                received = bytearray()
+                start = time.perf_counter()
+                while len(received) < len(payload):
+                    chunk = sock.recv(64 * 1024, timeout=30)
+                    if not chunk:
+                        break
+                    received += chunk
+                elapsed = time.perf_counter() - start
+                status = "ok" if received == payload else f"DIVERGENTE ({len(received)} bytes)"
+                print(f"Recepção: {len(received) / elapsed / 1024:>8.1f} KiB/s (eco {status})")
+            stats = sock.get_stats()
+            print(f"Vazão nos comandos: QISEND {stats['send_throughput'] or 0:,.0f} B/s, QIRD {stats['recv_throughput'] or 0:,.0f} B/s")
+    finally:
+        controller.disconnect_modem()
+
+
+if __name__ == "__main__":
+    main()
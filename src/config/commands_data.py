@@ -2,6 +2,7 @@
 import json
 import os
 import sys
+import threading
 
 # Ajusta o caminho para ser absoluto a partir da raiz do projeto.
 # 'os.path.abspath(__file__)' dá o caminho absoluto para este arquivo (src/config/commands_data.py).
@@ -10,6 +11,10 @@ import sys
 # E então desce para 'resources/at_commands.json'.
 COMMANDS_JSON_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'at_commands.json'))
 
+# Tamanho máximo dos n-gramas indexados. Buscas até esse tamanho são respondidas direto pelo índice;
+# as mais longas intersectam os trigramas e confirmam com uma busca de substring.
+_MAX_GRAM = 3
+
 def load_manual_commands():
     """
     Carrega os comandos AT do arquivo JSON.
@@ -28,5 +33,112 @@ def load_manual_commands():
         print("Por favor, verifique a sintaxe do arquivo 'at_commands.json'.")
         return []
 
-# Carregar os comandos na inicialização do script
-ALL_MANUAL_COMMANDS = load_manual_commands()
+
+def format_command_line(cmd_data):
+    """Linha exibida na lista de comandos da GUI."""
+    return f"{cmd_data['cmd']}: {cmd_data['desc']} (Seção {cmd_data['section']})"
+
+
+class CommandCatalog:
+    """
+    Catálogo de comandos AT do manual, carregado no primeiro uso.
+    As linhas de exibição e suas versões em minúsculas são calculadas uma única vez,
+    e a filtragem (substring, sem diferenciar maiúsculas) usa um índice de n-gramas:
+    cada tecla digitada custa algumas interseções de conjuntos em vez de reformatar o catálogo.
+    """
+
+    def __init__(self, loader=load_manual_commands):
+        """
+        :param loader: Função que retorna a lista de dicionários de comandos.
+        """
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._commands = []
+        self._lines = []
+        self._lowered = []
+        self._index = {} # n-grama -> frozenset de índices
+        self._last_term = None
+        self._last_ids = None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            commands = self._loader()
+            lines = [format_command_line(cmd_data) for cmd_data in commands]
+            lowered = [line.lower() for line in lines]
+            index = {}
+            for position, text in enumerate(lowered):
+                grams = set()
+                for size in range(1, _MAX_GRAM + 1):
+                    grams.update(text[i:i + size] for i in range(len(text) - size + 1))
+                for gram in grams:
+                    index.setdefault(gram, []).append(position)
+            self._commands, self._lines, self._lowered = commands, lines, lowered
+            self._index = {gram: frozenset(positions) for gram, positions in index.items()}
+            self._last_term, self._last_ids = None, None
+            self._loaded = True
+
+    def reload(self):
+        """Descarta o catálogo carregado; o próximo acesso relê o arquivo."""
+        with self._lock:
+            self._loaded = False
+
+    @property
+    def commands(self):
+        """Lista de dicionários de comandos (cmd, type, desc, params, response_format, section)."""
+        self._ensure_loaded()
+        return self._commands
+
+    @property
+    def display_lines(self):
+        """Todas as linhas de exibição, na ordem do arquivo."""
+        self._ensure_loaded()
+        return self._lines
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __iter__(self):
+        return iter(self.commands)
+
+    def filter(self, search_term):
+        """
+        Retorna as linhas de exibição que contêm search_term (sem diferenciar maiúsculas),
+        na ordem original do catálogo.
+        """
+        self._ensure_loaded()
+        term = search_term.lower()
+        if not term:
+            return list(self._lines)
+
+        if len(term) <= _MAX_GRAM:
+            ids = self._index.get(term, frozenset())
+        else:
+            # Refinamento incremental: digitar mais letras só restringe o resultado anterior
+            if self._last_term and self._last_ids is not None and self._last_term in term:
+                candidates = self._last_ids
+            else:
+                grams = sorted((self._index.get(term[i:i + _MAX_GRAM], frozenset())
+                                for i in range(len(term) - _MAX_GRAM + 1)), key=len)
+                candidates = grams[0].intersection(*grams[1:])
+            lowered = self._lowered
+            ids = frozenset(i for i in candidates if term in lowered[i])
+
+        self._last_term, self._last_ids = term, ids
+        lines = self._lines
+        return [lines[i] for i in sorted(ids)]
+
+
+# Catálogo compartilhado da aplicação (carregado no primeiro uso)
+command_catalog = CommandCatalog()
+
+
+def __getattr__(name):
+    # Compatibilidade: ALL_MANUAL_COMMANDS continua disponível, mas só carrega quando acessado
+    if name == "ALL_MANUAL_COMMANDS":
+        return command_catalog.commands
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,8 +5,8 @@ import datetime
 import time
 import re
 import serial.tools.list_ports # Importar explicitamente aqui para get_available_ports
-import json # Importar explicitamente aqui para ALL_MANUAL_COMMANDS
-import os # Importar explicitamente aqui para ALL_MANUAL_COMMANDS
+import os
+from collections import deque
 
 # O sys.path já é manipulado em src/main.py. Não precisa de manipulação aqui.
 
@@ -15,10 +15,11 @@ import os # Importar explicitamente aqui para ALL_MANUAL_COMMANDS
 
 from src.gui.layout import create_gui_layout
 from src.gui.update_gui_elements import update_button_states
-from src.gui.urc_monitor import UrcMonitor
+from src.gui.urc_monitor import UrcMonitor, URC_POPUP_EVENT_PREFIX
+from src.gui.gui_update_bus import GuiUpdateBus, GUI_BUS_FLUSH_EVENT
 
 from src.modem.controller import ModemController 
-from src.config.commands_data import ALL_MANUAL_COMMANDS # Onde ALL_MANUAL_COMMANDS é definido
+from src.modem.command_metrics import start_metrics_server
 
 # Importa todos os handlers específicos de cada aba.
 import src.gui.handlers.common_handlers as common_handlers
@@ -35,7 +36,7 @@ import src.gui.handlers.custom_commands_handlers as custom_commands_handlers
 # Funções _execute_command, _execute_command_print_result e gui_update_event são do threading_utils.
 # get_available_ports é do serial_ports.
 # Como elas são usadas no main loop (que é o app_main), precisamos importá-las aqui também.
-from src.utils.threading_utils import _execute_command, _execute_command_print_result, gui_update_event
+from src.utils.threading_utils import _execute_command, _execute_command_print_result, gui_update_event, set_gui_update_bus
 from src.utils.serial_ports import get_available_ports 
 
 
@@ -49,16 +50,45 @@ def main():
 
     available_ports = get_available_ports()
     window = create_gui_layout(available_ports)
+
+    # Barramento que agrupa as atualizações vindas de threads (inclusive print) em lotes por quadro.
+    # Instalado depois da criação da janela, pois o sg.Output redireciona o sys.stdout.
+    gui_update_bus = GuiUpdateBus(window)
+    gui_update_bus.install_stdout_redirect()
+    set_gui_update_bus(gui_update_bus)
+    gui_update_bus.start()
+
+    # Endpoint opcional de métricas (Prometheus) em localhost, habilitado por MODEM_METRICS_PORT
+    metrics_server = None
+    if os.environ.get("MODEM_METRICS_PORT"):
+        try:
+            metrics_server = start_metrics_server(int(os.environ["MODEM_METRICS_PORT"]))
+        except (OSError, ValueError) as e:
+            print(f"Não foi possível iniciar o endpoint de métricas: {e}")
+
     update_button_states(window) 
 
+    # Eventos extraídos de um lote do barramento, processados antes de voltar ao window.read()
+    pending_events = deque()
+
     # Loop de eventos da GUI
     while True:
-        event, values = window.read()
+        if pending_events:
+            event, values = pending_events.popleft()
+        else:
+            event, values = window.read()
 
         # Lida com o fechamento da janela
         if event == sg.WIN_CLOSED:
             break
 
+        # Lote do GuiUpdateBus: anexos de log já são aplicados; as demais atualizações
+        # voltam ao loop como eventos individuais, sem passar de novo pela fila do Tk.
+        if event == GUI_BUS_FLUSH_EVENT:
+            for key, value in gui_update_bus.apply(window, values[event]):
+                pending_events.append((key, {**values, key: value}))
+            continue
+
         # Captura da tecla Enter globalmente na janela
         if event == '\r' and common_handlers.connected:
             if window.find_element_with_focus() == window['-CUSTOM_AT_COMMAND-']:
@@ -82,6 +112,12 @@ def main():
         elif event == '-PORT_SELECTION_UPDATE-': 
             window['-PORT-'].update(value=values[event])
             
+        # --- Pop-ups pedidos pelo UrcMonitor (abertos aqui, na thread da GUI, sem bloquear o loop) ---
+        elif event.startswith(URC_POPUP_EVENT_PREFIX):
+            kind, message, popup_kwargs = values[event]
+            popup = sg.popup_scrolled if kind == "scrolled" else sg.popup_timed
+            popup(message, non_blocking=True, **popup_kwargs)
+
         # --- Eventos de URC (Unsolicited Result Code) ---
         elif event.startswith('-URC_'): # Verifica se o evento é um URC (prefixo definido em urc_monitor)
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") # Formato completo para log
@@ -203,6 +239,16 @@ def main():
                 network_apn_handlers.handle_set_bands_event(values) # Usando handler específico
             elif event == '-GET_BANDS-':
                 network_apn_handlers.handle_get_bands_event() # Usando handler específico
+            elif event == '-SCAN_OPERATORS-':
+                network_apn_handlers.handle_scan_operators_event(window, values) # Usando handler específico
+            elif event == '-OPERATOR_SCAN_DONE-':
+                network_apn_handlers.update_operator_list(window, values[event]) # Usando handler específico
+            elif event == '-GET_OPERATOR-':
+                network_apn_handlers.handle_get_operator_event() # Usando handler específico
+            elif event == '-REGISTER_OPERATOR-':
+                network_apn_handlers.handle_register_operator_event(values) # Usando handler específico
+            elif event == '-REGISTER_AUTOMATIC-':
+                network_apn_handlers.handle_register_automatic_event() # Usando handler específico
 
             elif event == '-SEND_SMS-':
                 sms_handlers.handle_send_sms_event(values) # Usando handler específico
@@ -288,6 +334,8 @@ def main():
 
             elif event == '-SEND_CUSTOM_CMD-': 
                 custom_commands_handlers.handle_send_custom_cmd_event(values, window) # Usando handler específico
+            elif event == '-CANCEL_COMMAND-':
+                custom_commands_handlers.handle_cancel_command_event() # Usando handler específico
             elif event == '-COMMAND_LIST-': 
                 custom_commands_handlers.handle_command_list_selection_event(window, values) # Usando handler específico
             elif event == '-COPY_SELECTED_CMD-':
@@ -319,6 +367,11 @@ def main():
                 print("Console vazio. Nada para salvar.")
 
 
+    gui_update_bus.stop()
+    set_gui_update_bus(None)
+    if metrics_server:
+        metrics_server.shutdown()
+
     # Garante que a porta serial seja fechada ao sair da aplicação
     if common_handlers.modem_controller:
         common_handlers.modem_controller.disconnect_modem()
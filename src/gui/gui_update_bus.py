@@ -0,0 +1,197 @@
+# src/gui/gui_update_bus.py
+import sys
+import threading
+import time
+
+from src.utils.tracing import tracer
+
+# Evento único usado para entregar um lote de atualizações à thread principal da GUI
+GUI_BUS_FLUSH_EVENT = '-GUI_BUS_FLUSH-'
+
+# Chave virtual para texto impresso (print) por threads de trabalho no log principal
+MAIN_LOG_APPEND_KEY = '-OUTPUT_APPEND-'
+
+# Chaves cujo valor é texto a ser ANEXADO (não substituído) -> elemento de destino
+APPEND_TARGETS = {
+    '-URC_LOG_OUTPUT_APPEND-': '-URC_LOG_OUTPUT-',
+    MAIN_LOG_APPEND_KEY: '-OUTPUT-',
+}
+
+
+class _ThreadAwareStdout:
+    """
+    Substituto de sys.stdout: na thread principal escreve direto no destino original
+    (o elemento sg.Output); nas demais threads, acumula o texto no barramento.
+    """
+
+    def __init__(self, bus, original):
+        self._bus = bus
+        self._original = original
+
+    def write(self, text):
+        if threading.current_thread() is threading.main_thread():
+            return self._original.write(text)
+        if text:
+            self._bus.post(MAIN_LOG_APPEND_KEY, text)
+        return len(text)
+
+    def flush(self):
+        if threading.current_thread() is threading.main_thread():
+            self._original.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._original, name)
+
+
+class GuiUpdateBus:
+    """
+    Barramento de atualizações da GUI vindas de threads de trabalho.
+    Coleta as atualizações pendentes por chave de elemento (a última vence),
+    junta os textos anexados ao log de URCs e ao log principal, e entrega tudo
+    num único evento a uma taxa máxima de quadros.
+    """
+
+    def __init__(self, window, max_fps=20):
+        """
+        :param window: A janela PySimpleGUI que recebe os lotes.
+        :param max_fps: Número máximo de lotes entregues por segundo.
+        """
+        self.window = window
+        self.min_interval = 1.0 / max_fps
+        self._lock = threading.Lock()
+        self._pending = {} # chave -> último valor
+        self._appends = {} # chave -> lista de textos
+        self._first_pending_at = None
+        self._flush_in_flight = False
+        self._last_flush_at = 0.0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._original_stdout = None
+
+        # Estatísticas expostas via get_stats()
+        self._posted = 0
+        self._coalesced = 0
+        self._flushes = 0
+        self._last_flush_latency = 0.0
+        self._max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Inicia a thread que entrega os lotes à janela."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="GuiUpdateBus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Para a entrega de lotes e restaura o sys.stdout original."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self.uninstall_stdout_redirect()
+
+    def install_stdout_redirect(self):
+        """
+        Redireciona os print() de threads de trabalho para o barramento.
+        Deve ser chamado depois que a janela (e seu sg.Output) foi criada.
+        """
+        if self._original_stdout is None:
+            self._original_stdout = sys.stdout
+            sys.stdout = _ThreadAwareStdout(self, self._original_stdout)
+
+    def uninstall_stdout_redirect(self):
+        if self._original_stdout is not None:
+            sys.stdout = self._original_stdout
+            self._original_stdout = None
+
+    # --- Produtores (qualquer thread) ---
+
+    def post(self, key, value):
+        """Enfileira uma atualização. Textos de chaves de anexo são concatenados; as demais são substituídas."""
+        with self._lock:
+            self._posted += 1
+            if key in APPEND_TARGETS:
+                self._appends.setdefault(key, []).append(value)
+            else:
+                if key in self._pending:
+                    self._coalesced += 1
+                self._pending[key] = value
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+        self._wakeup.set()
+
+    # --- Thread de entrega ---
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait()
+            if self._stop.is_set():
+                break
+            # Limita a taxa de entrega: aguarda o intervalo mínimo desde o último lote
+            delay = self.min_interval - (time.monotonic() - self._last_flush_at)
+            if delay > 0 and self._stop.wait(delay):
+                break
+            with self._lock:
+                self._wakeup.clear()
+                if self._flush_in_flight or (not self._pending and not self._appends):
+                    continue # O lote atual ainda não foi aplicado; apply() acorda a thread de novo
+                batch = {
+                    "updates": list(self._pending.items()),
+                    "appends": {key: "".join(parts) for key, parts in self._appends.items()},
+                    "enqueued_at": self._first_pending_at,
+                }
+                self._pending = {}
+                self._appends = {}
+                self._first_pending_at = None
+                self._flush_in_flight = True
+                self._last_flush_at = time.monotonic()
+            try:
+                self.window.write_event_value(GUI_BUS_FLUSH_EVENT, batch)
+            except Exception as e:
+                # Janela fechada ou em encerramento: descarta o lote
+                with self._lock:
+                    self._flush_in_flight = False
+                sys.__stderr__.write(f"GuiUpdateBus: Falha ao entregar lote: {e}\n")
+
+    # --- Consumidor (thread principal da GUI) ---
+
+    def apply(self, window, batch):
+        """
+        Aplica um lote na thread principal: anexa os textos acumulados e
+        devolve as demais atualizações como lista de (chave, valor) para o loop de eventos.
+        """
+        with tracer.span("gui_apply_batch", "gui", updates=len(batch["updates"]), appends=len(batch["appends"])):
+            for key, text in batch["appends"].items():
+                target = APPEND_TARGETS[key]
+                if key == MAIN_LOG_APPEND_KEY and self._original_stdout is not None:
+                    self._original_stdout.write(text)
+                else:
+                    window[target].print(text, end='')
+
+        latency = time.monotonic() - batch["enqueued_at"]
+        with self._lock:
+            self._flushes += 1
+            self._last_flush_latency = latency
+            self._max_flush_latency = max(self._max_flush_latency, latency)
+            self._total_flush_latency += latency
+            self._flush_in_flight = False
+            if self._pending or self._appends:
+                self._wakeup.set()
+        return batch["updates"]
+
+    def get_stats(self):
+        """Retorna profundidade da fila, contadores e latências de entrega (em segundos)."""
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending) + sum(len(parts) for parts in self._appends.values()),
+                "posted": self._posted,
+                "coalesced": self._coalesced,
+                "flushes": self._flushes,
+                "last_flush_latency": self._last_flush_latency,
+                "max_flush_latency": self._max_flush_latency,
+                "avg_flush_latency": self._total_flush_latency / self._flushes if self._flushes else 0.0,
+            }
@@ -6,7 +6,10 @@ import re
 
 # Importações de módulos do projeto. TODAS AGORA ABSOLUTAS a partir de 'src'.
 from src.modem.controller import ModemController
+from src.modem.command_timeouts import default_command_timeouts
 from src.utils.threading_utils import run_in_thread, _execute_command, _execute_command_print_result, gui_update_event
+from src.modem.command_scheduler import priority_for
+from src.utils.tracing import tracer
 from src.utils.serial_ports import get_available_ports
 from src.gui.urc_monitor import UrcMonitor
 
@@ -15,7 +18,7 @@ from src.gui.urc_monitor import UrcMonitor
 modem_controller: ModemController = None
 connected: bool = False
 urc_monitor_instance: UrcMonitor = None
-serial_port_lock = threading.Lock() # Lock para sincronizar acesso à porta serial
+serial_port_lock = threading.Lock() # Lock para sincronizar a criação/conexão do ModemController
 
 
 def _set_connection_state(new_state: bool, new_modem_controller=None, window=None):
@@ -78,8 +81,8 @@ def handle_connect_event(window, values):
         temp_modem_ctrl_instance = None
         try:
             with serial_port_lock:
-                # Cria a instância do ModemController
-                temp_modem_ctrl_instance = ModemController(port, baudrate)
+                # Cria a instância do ModemController (deadlines adaptativos, persistidos entre sessões)
+                temp_modem_ctrl_instance = ModemController(port, baudrate, command_timeouts=default_command_timeouts)
                 # AGORA CHAMA explicitamente connect_modem()
                 if temp_modem_ctrl_instance.connect_modem(): # AQUI ESTÁ A MUDANÇA PRINCIPAL!
                     temp_connected_state = True
@@ -184,14 +187,14 @@ def handle_auto_discover_event(window):
 # onde modem_controller e connected são de fato globais e atualizadas por _set_connection_state.
 def execute_modem_command(func, *args, **kwargs):
     """
-    Executa uma função (comando do modem) dentro de uma thread, adquirindo o lock.
+    Executa uma função (comando do modem) dentro de uma thread, com a prioridade do comando.
     Verifica o estado de conexão ANTES de tentar executar.
     """
     # CORRIGIDO: Remover 'common_handlers.' ao acessar as variáveis globais 'modem_controller' e 'connected'
     # dentro deste próprio módulo.
     global modem_controller, connected # Declarar global para acessar as variáveis deste módulo
     if modem_controller and connected: 
-        run_in_thread(lambda: _safe_execute_command(modem_controller, serial_port_lock, func, *args, **kwargs))
+        run_in_thread(lambda: _safe_execute_command(modem_controller, func, *args, **kwargs))
     else:
         print("Modem não conectado. Por favor, conecte-se primeiro.")
 
@@ -199,28 +202,32 @@ def execute_modem_command(func, *args, **kwargs):
 def execute_modem_command_and_print_result(func, *args, **kwargs):
     """
     Executa uma função (comando do modem que retorna um resultado para ser impresso)
-    dentro de uma thread, adquirindo o lock.
+    dentro de uma thread, com a prioridade do comando.
     Verifica o estado de conexão ANTES de tentar executar.
     """
     # CORRIGIDO: Remover 'common_handlers.' ao acessar as variáveis globais 'modem_controller' e 'connected'
     # dentro deste próprio módulo.
     global modem_controller, connected # Declarar global para acessar as variáveis deste módulo
     if modem_controller and connected: 
-        run_in_thread(lambda: _safe_execute_command_print_result(modem_controller, serial_port_lock, func, *args, **kwargs))
+        run_in_thread(lambda: _safe_execute_command_print_result(modem_controller, func, *args, **kwargs))
     else:
         print("Modem não conectado. Por favor, conecte-se primeiro.")
 
 
-def _safe_execute_command(modem_ctrl, lock, func, *args, **kwargs):
-    """Função interna para executar um comando do modem de forma segura com lock."""
-    with lock:
-        _execute_command(func, *args, **kwargs)
+# A exclusão na serial é feita por comando pelo CommandScheduler do controller (slot com prioridade):
+# um clique do usuário entra no próximo slot livre mesmo com o sumário ou a leitura de SMS em andamento.
+def _safe_execute_command(modem_ctrl, func, *args, **kwargs):
+    """Função interna para executar um comando do modem na classe de prioridade do comando."""
+    with tracer.span("execute_modem_command", "gui", func=getattr(func, "__name__", repr(func))):
+        with modem_ctrl.scheduler.priority(priority_for(func)):
+            _execute_command(func, *args, **kwargs)
 
 
-def _safe_execute_command_print_result(modem_ctrl, lock, func, *args, **kwargs):
-    """Função interna para executar um comando do modem que imprime resultado de forma segura com lock."""
-    with lock:
-        _execute_command_print_result(func, *args, **kwargs)
+def _safe_execute_command_print_result(modem_ctrl, func, *args, **kwargs):
+    """Função interna para executar um comando do modem que imprime resultado, na classe de prioridade do comando."""
+    with tracer.span("execute_modem_command", "gui", func=getattr(func, "__name__", repr(func))):
+        with modem_ctrl.scheduler.priority(priority_for(func)):
+            _execute_command_print_result(func, *args, **kwargs)
 
 
 def handle_clear_urc_log_event(window):
@@ -4,7 +4,7 @@ import PySimpleGUI as sg
 from src.gui.handlers.common_handlers import execute_modem_command, execute_modem_command_and_print_result
 import src.gui.handlers.common_handlers as common_handlers # Importa o módulo para acessar as globais
 from src.utils.threading_utils import gui_update_event
-from src.config.commands_data import ALL_MANUAL_COMMANDS
+from src.config.commands_data import command_catalog
 
 def handle_send_custom_cmd_event(values, window):
     """Handler para o botão 'Enviar Comando Personalizado'."""
@@ -22,6 +22,18 @@ def handle_send_custom_cmd_event(values, window):
     else:
         print("Por favor, digite um comando AT para enviar.")
 
+def handle_cancel_command_event():
+    """Handler para o botão 'Cancelar Comando em Andamento'. Só sinaliza o cancelamento; não bloqueia a GUI."""
+    modem_ctrl = common_handlers.modem_controller
+    if not modem_ctrl:
+        print("Modem não conectado. Por favor, conecte-se primeiro.")
+        return
+    active = modem_ctrl.active_command
+    if active is not None and active.cancel():
+        print(f"Cancelando comando em andamento: {active.command}")
+    else:
+        print("Nenhum comando em andamento para cancelar.")
+
 def handle_command_list_selection_event(window, values):
     """Handler quando um comando é selecionado na lista."""
     if values['-COMMAND_LIST-']:
@@ -38,12 +50,7 @@ def handle_copy_selected_cmd_event(window, values):
 
 def handle_command_filter_event(window, values):
     """Handler para o campo de filtro de comandos."""
-    search_term = values['-COMMAND_FILTER-'].lower()
-    filtered_display_list = []
-    for cmd_data in ALL_MANUAL_COMMANDS:
-        cmd_line = f"{cmd_data['cmd']}: {cmd_data['desc']} (Seção {cmd_data['section']})"
-        if search_term in cmd_line.lower():
-            filtered_display_list.append(cmd_line)
+    filtered_display_list = command_catalog.filter(values['-COMMAND_FILTER-'])
     window['-COMMAND_LIST-'].update(filtered_display_list)
 
 # Função auxiliar para limpar o campo de comando personalizado (chamada por evento da thread principal)
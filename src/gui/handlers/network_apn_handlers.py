@@ -1,7 +1,10 @@
 # src/gui/handlers/network_apn_handlers.py
+import queue
+import re
 # Importações agora absolutas, assumindo que src está no sys.path
 from src.gui.handlers.common_handlers import execute_modem_command, execute_modem_command_and_print_result
 import src.gui.handlers.common_handlers as common_handlers # Importa o módulo para acessar as globais
+from src.utils.threading_utils import gui_update_event
 
 def handle_get_signal_quality_event():
     """Handler para o botão 'Qualidade Sinal' (AT+CSQ)."""
@@ -84,14 +87,68 @@ def handle_get_roaming_event():
 def handle_set_bands_event(values):
     """Handler para o botão 'Definir Bandas' (AT+QCFG="band")."""
     try:
-        gsm_wcdma_band = values['-BAND_GSM_WCDMA-'].strip()
-        lte_band = values['-BAND_LTE-'].strip()
-        tdscdma_band = values['-BAND_TDSCDMA-'].strip()
+        gsm_wcdma_band = values['-BAND_GSM_WCDMA-'].strip() or None # Vazio mantém a máscara atual
+        lte_band = values['-BAND_LTE-'].strip() or None
+        tdscdma_band = values['-BAND_TDSCDMA-'].strip() or None
         effect = int(values['-FREQ_EFFECT-']) # Reutiliza o campo 'Efeito' da seção de frequência
-        execute_modem_command(common_handlers.modem_controller.set_band_configuration, gsm_wcdma_band, lte_band, tdscdma_band, effect)
+        execute_modem_command(common_handlers.modem_controller.set_bands, gsm_wcdma_band, lte_band, tdscdma_band, effect)
     except ValueError:
         print("Erro: Verifique os valores hexadecimais das bandas e o efeito (deve ser 0 ou 1).")
 
 def handle_get_bands_event():
     """Handler para o botão 'Ler Bandas' (AT+QCFG="band"?)."""
-    execute_modem_command_and_print_result(common_handlers.modem_controller.get_band_configuration)
+    execute_modem_command_and_print_result(common_handlers.modem_controller.get_bands)
+
+def _format_operator(op):
+    return f"{op['numeric']} | AcT {op['act']} ({op['technology']}) | {op['long_name'] or op['short_name']} [{op['status']}]"
+
+def handle_scan_operators_event(window, values):
+    """Handler para o botão 'Buscar Operadoras' (AT+COPS=?). A busca roda em segundo plano; o resultado chega por evento."""
+    modem_ctrl = common_handlers.modem_controller
+    if not modem_ctrl:
+        print("Modem não conectado. Por favor, conecte-se primeiro.")
+        return
+    try:
+        job = modem_ctrl.start_operator_scan(force=values['-OPERATOR_FORCE_SCAN-'])
+    except queue.Full:
+        print("Fila de comandos cheia; tente novamente em instantes.")
+        return
+    if job.from_cache:
+        print(f"Operadoras da última busca nesta célula ({job.location}); marque 'Ignorar cache' para buscar de novo.")
+    elif not job.done():
+        print("Buscando operadoras em segundo plano (pode levar alguns minutos; 'Cancelar Comando em Andamento' aborta a busca)...")
+
+    def on_done(future):
+        try:
+            result = [_format_operator(op) for op in future.result()]
+        except Exception as e:
+            result = f"Busca de operadoras não concluída: {e or type(e).__name__}"
+        gui_update_event(window, '-OPERATOR_SCAN_DONE-', result)
+
+    job.future.add_done_callback(on_done)
+
+def update_operator_list(window, result):
+    """Preenche a lista de operadoras com o resultado da busca (ou imprime o erro)."""
+    if isinstance(result, str):
+        print(result)
+        return
+    window['-OPERATOR_LIST-'].update(result)
+    print(f"{len(result)} operadora(s) encontrada(s)." if result else "Nenhuma operadora encontrada.")
+
+def handle_get_operator_event():
+    """Handler para o botão 'Operadora Atual' (AT+COPS?)."""
+    execute_modem_command_and_print_result(common_handlers.modem_controller.get_operator)
+
+def handle_register_operator_event(values):
+    """Handler para o botão 'Registrar na Selecionada' (AT+COPS=1,2,<oper>,<AcT>)."""
+    if not values['-OPERATOR_LIST-']:
+        print("Selecione uma operadora na lista (use 'Buscar Operadoras' primeiro).")
+        return
+    selected = values['-OPERATOR_LIST-'][0]
+    numeric = selected.split('|')[0].strip()
+    act_match = re.search(r'AcT (\d+)', selected)
+    execute_modem_command(common_handlers.modem_controller.register_operator, numeric, int(act_match.group(1)) if act_match else None)
+
+def handle_register_automatic_event():
+    """Handler para o botão 'Seleção Automática' (AT+COPS=0)."""
+    execute_modem_command(common_handlers.modem_controller.register_automatic)
@@ -2,6 +2,7 @@
 import PySimpleGUI as sg
 from src.gui.handlers.common_handlers import execute_modem_command, execute_modem_command_and_print_result
 import src.gui.handlers.common_handlers as common_handlers # Importa o módulo para acessar as globais
+from src.utils.threading_utils import gui_update_event
 import threading # Necessário para rodar em thread
 import datetime # Para timestamps
 import re # Para parsing de mensagens
@@ -76,7 +77,7 @@ def handle_refresh_sms_inbox_event(window):
             inbox_display_text = f"Falha ao ler caixa de entrada: {messages}" # messages aqui conteria a mensagem de erro
 
         # Atualiza a GUI na thread principal
-        window.write_event_value('-UPDATE_SMS_INBOX_OUTPUT-', inbox_display_text)
+        gui_update_event(window, '-UPDATE_SMS_INBOX_OUTPUT-', inbox_display_text)
 
     # Executa a leitura em uma thread separada para não travar a GUI
     threading.Thread(target=read_inbox_thread, daemon=True).start()
@@ -116,7 +117,7 @@ def handle_refresh_sms_outbox_event(window):
             outbox_display_text = f"Falha ao leer caixa de saída: {messages}" # messages aqui conteria a mensagem de erro
 
         # Atualiza a GUI na thread principal
-        window.write_event_value('-UPDATE_SMS_OUTBOX_OUTPUT-', outbox_display_text)
+        gui_update_event(window, '-UPDATE_SMS_OUTBOX_OUTPUT-', outbox_display_text)
 
     # Executa a leitura em uma thread separada para não travar a GUI
     threading.Thread(target=read_outbox_thread, daemon=True).start()
@@ -137,8 +138,8 @@ def handle_delete_all_sms_advanced_event(window):
         if success:
             sg.popup_timed("Todas as mensagens SMS foram apagadas!", title="Sucesso")
             # Atualiza ambas as caixas após a exclusão
-            window.write_event_value('-UPDATE_SMS_INBOX_OUTPUT-', '') # Limpa visualmente
-            window.write_event_value('-UPDATE_SMS_OUTBOX_OUTPUT-', '') # Limpa visualmente
+            gui_update_event(window, '-UPDATE_SMS_INBOX_OUTPUT-', '') # Limpa visualmente
+            gui_update_event(window, '-UPDATE_SMS_OUTBOX_OUTPUT-', '') # Limpa visualmente
         else:
             sg.popup_error(f"Falha ao apagar mensagens SMS: {response}", title="Erro")
     else:
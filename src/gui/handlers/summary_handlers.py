@@ -13,8 +13,10 @@ def handle_generate_summary_event(window):
         
         def generate_summary_thread_internal():
             try:
-                # O método get_modem_summary no ModemController já envia os comandos com lock
-                summary_text = common_handlers.modem_controller.get_modem_summary() # Usa a global correta
+                # O sumário roda em segundo plano: cada um dos seus comandos cede o slot serial aos cliques do usuário
+                modem_ctrl = common_handlers.modem_controller # Usa a global correta
+                with modem_ctrl.scheduler.priority("background"):
+                    summary_text = modem_ctrl.get_modem_summary()
                 gui_update_event(window, '-UPDATE_SUMMARY_OUTPUT-', summary_text) # Envia o resultado de volta para a GUI
             except Exception as e:
                 error_msg = f"Erro ao gerar sumário: {e}"
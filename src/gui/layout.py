@@ -1,6 +1,6 @@
 # src/gui/layout.py
 import PySimpleGUI as sg
-from src.config.commands_data import ALL_MANUAL_COMMANDS # Importa a lista de comandos do manual
+from src.config.commands_data import command_catalog # Catálogo de comandos do manual (carregado no primeiro uso)
 
 def create_gui_layout(modem_ports):
     """
@@ -79,6 +79,14 @@ def create_gui_layout(modem_ports):
             [sg.Text('TD-SCDMA (Hex):'), sg.Input(default_text='0x40000000', size=(10,1), key='-BAND_TDSCDMA-', tooltip='Valor hexadecimal para bandas TD-SCDMA. Use "0x40000000" para não alterar.')],
             [sg.Button('Definir Bandas', key='-SET_BANDS-', disabled=True, tooltip='Configura as bandas de frequência preferenciais (AT+QCFG="band").'),
              sg.Button('Ler Bandas', key='-GET_BANDS-', disabled=True, tooltip='Lê as configurações de banda atuais (AT+QCFG="band"?).')]
+        ])],
+        [sg.Frame('Seleção de Operadora', [
+            [sg.Button('Buscar Operadoras', key='-SCAN_OPERATORS-', disabled=True, tooltip='Busca as operadoras disponíveis em segundo plano (AT+COPS=?). Pode levar alguns minutos.'),
+             sg.Checkbox('Ignorar cache', key='-OPERATOR_FORCE_SCAN-', default=False, tooltip='Busca de novo mesmo com resultado recente para a célula atual.'),
+             sg.Button('Operadora Atual', key='-GET_OPERATOR-', disabled=True, tooltip='Lê o modo de seleção e a operadora atual (AT+COPS?).')],
+            [sg.Listbox(values=[], size=(60, 5), key='-OPERATOR_LIST-', tooltip='Operadoras encontradas na última busca.')],
+            [sg.Button('Registrar na Selecionada', key='-REGISTER_OPERATOR-', disabled=True, tooltip='Registra manualmente na operadora selecionada, sem nova busca (AT+COPS=1).'),
+             sg.Button('Seleção Automática', key='-REGISTER_AUTOMATIC-', disabled=True, tooltip='Volta para a seleção automática de operadora (AT+COPS=0).')]
         ])]
     ]
 
@@ -168,7 +176,7 @@ def create_gui_layout(modem_ports):
     # --- Aba: Comandos Personalizados ---
     commands_list_column = [
         [sg.Text('Buscar Comando:', font='_ 11'), sg.Input(size=(40, 1), enable_events=True, key='-COMMAND_FILTER-', tooltip='Digite para filtrar a lista de comandos.')],
-        [sg.Listbox(values=[f"{cmd['cmd']}: {cmd['desc']} (Seção {cmd['section']})" for cmd in ALL_MANUAL_COMMANDS],
+        [sg.Listbox(values=command_catalog.display_lines,
                     size=(60, 20), enable_events=True, key='-COMMAND_LIST-',
                     tooltip='Lista de comandos AT do manual. Clique para copiar para a entrada.')],
         [sg.Button('Copiar Comando Selecionado', key='-COPY_SELECTED_CMD-', disabled=True, tooltip='Copia o comando selecionado da lista para a área de entrada.')]
@@ -179,7 +187,8 @@ def create_gui_layout(modem_ports):
         [sg.Input(key='-CUSTOM_AT_COMMAND-', size=(50,1), enable_events=True, tooltip='Digite seu comando AT aqui (ex: AT+CSQ, AT+QCFG="band",...).')],
         [sg.Text('Resposta Esperada (opcional, padrão "OK"):'), sg.Input(default_text='OK', key='-EXPECTED_RESPONSE-', size=(15,1), tooltip='Texto que a resposta do modem deve conter para ser considerada sucesso.')],
         [sg.Text('Timeout (segundos, padrão 5):'), sg.Input(default_text='5', size=(8,1), key='-CUSTOM_TIMEOUT-', tooltip='Tempo máximo para esperar a resposta do modem.')],
-        [sg.Button('Enviar Comando Personalizado', key='-SEND_CUSTOM_CMD-', disabled=True, tooltip='Envia o comando AT digitado para o modem.')]
+        [sg.Button('Enviar Comando Personalizado', key='-SEND_CUSTOM_CMD-', disabled=True, tooltip='Envia o comando AT digitado para o modem.'),
+         sg.Button('Cancelar Comando em Andamento', key='-CANCEL_COMMAND-', disabled=True, tooltip='Aborta o comando que está ocupando a serial (ex: AT+COPS=?, ATD) sem esperar o timeout.')]
     ]
 
     tab_custom_commands_layout = [
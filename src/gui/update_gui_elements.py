@@ -36,6 +36,7 @@ def update_button_states(window, connected_status_from_thread=None):
         '-SET_BANDS-', '-GET_BANDS-',
         '-SET_SCAN_MODE-', '-GET_SCAN_MODE-',
         '-SET_ROAMING-', '-GET_ROAMING-',
+        '-SCAN_OPERATORS-', '-GET_OPERATOR-', '-REGISTER_OPERATOR-', '-REGISTER_AUTOMATIC-',
         # SMS
         '-SEND_SMS-', '-READ_SMS_BY_INDEX-', '-DELETE_SMS_BY_INDEX-',
         '-READ_ALL_SMS-', '-DELETE_ALL_SMS-',
@@ -54,7 +55,7 @@ def update_button_states(window, connected_status_from_thread=None):
         # Sumário do Modem
         '-GENERATE_SUMMARY-',
         # Comandos Personalizados
-        '-SEND_CUSTOM_CMD-',
+        '-SEND_CUSTOM_CMD-', '-CANCEL_COMMAND-',
     ]
     for button_key in control_buttons:
         window[button_key].update(disabled=not connected)
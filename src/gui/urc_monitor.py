@@ -2,10 +2,16 @@
 import threading
 import time
 import re
+import datetime
 import serial # Manter import para serial.SerialException
 
+from src.modem.http_client import HTTP_ERRORS
 from src.utils.threading_utils import gui_update_event # Importação AGORA absoluta, garantida.
 
+# Prefixo dos eventos de pop-up: o loop principal da GUI abre a janela (uma chave por URC, a última vence no lote)
+URC_POPUP_EVENT_PREFIX = '-URC_POPUP_'
+
+
 class UrcMonitor:
     """
     Monitora e despacha Unsolicited Result Codes (URCs) recebidos do ModemController.
@@ -58,6 +64,14 @@ class UrcMonitor:
             self.modem_controller = None
             self.is_monitoring = False
 
+    def _popup(self, urc_name, kind, message, **kwargs):
+        """
+        Pede ao loop principal da GUI que abra um pop-up (o callback roda numa thread do UrcDispatcher,
+        onde o Tk não pode ser usado).
+        :param kind: "timed" (sg.popup_timed) ou "scrolled" (sg.popup_scrolled).
+        """
+        gui_update_event(self.window, f"{URC_POPUP_EVENT_PREFIX}{urc_name}-", (kind, message, kwargs))
+
     def process_urc_data_from_controller(self, urc_name: str, payload: tuple):
         """
         Recebe e processa dados de URCs que são encaminhados pelo ModemController.
@@ -69,28 +83,28 @@ class UrcMonitor:
         # --- Lógica de Pop-ups e Formatação de Log de URCs ---
         if urc_name == "RING":
             urc_log_message = f"[{timestamp}] Chamada Recebida: RING"
-            sg.popup_timed(f"Chamada Recebida!", title="CHAMADA", keep_on_top=True, background_color='yellow', text_color='black')
+            self._popup(urc_name, "timed", "Chamada Recebida!", title="CHAMADA", keep_on_top=True, background_color='yellow', text_color='black')
         elif urc_name == "CMTI":
             mem, idx = payload
             urc_log_message = f"[{timestamp}] Novo SMS na Memória: '{mem}', Índice {idx}"
-            sg.popup_timed(f"Novo SMS recebido!", title="NOVO SMS", keep_on_top=True, background_color='lightblue', text_color='black')
+            self._popup(urc_name, "timed", "Novo SMS recebido!", title="NOVO SMS", keep_on_top=True, background_color='lightblue', text_color='black')
         elif urc_name == "CMT":
             # payload: (number, alpha, timestamp_str, message_content)
             number = payload[0] if len(payload) > 0 else 'N/A'
             timestamp_str = payload[2] if len(payload) > 2 else 'N/A'
             content = payload[3] if len(payload) > 3 else 'N/A'
             urc_log_message = f"[{timestamp}] SMS Direto de {number} ({timestamp_str}):\n{content.strip()}"
-            sg.popup_scrolled(f"SMS de: {number}\nData/Hora: {timestamp_str}\n\n{content.strip()}", 
-                              title=f"SMS de {number}", size=(50, 15), keep_on_top=True, background_color='lightgreen', text_color='black')
+            self._popup(urc_name, "scrolled", f"SMS de: {number}\nData/Hora: {timestamp_str}\n\n{content.strip()}",
+                        title=f"SMS de {number}", size=(50, 15), keep_on_top=True, background_color='lightgreen', text_color='black')
         elif urc_name == "QSIMSTAT":
             enable_stat, inserted_stat = payload
             sim_status_desc = {0: "Removido", 1: "Inserido", 2: "Desconhecido"}.get(int(inserted_stat), "Desconhecido")
             urc_log_message = f"[{timestamp}] Status do SIM: {sim_status_desc} (Relatório: {'Habilitado' if enable_stat == '1' else 'Desabilitado'})"
-            sg.popup_timed(f"Status do SIM: {sim_status_desc}", title="STATUS SIM", keep_on_top=True, background_color='lightgray', text_color='black')
+            self._popup(urc_name, "timed", f"Status do SIM: {sim_status_desc}", title="STATUS SIM", keep_on_top=True, background_color='lightgray', text_color='black')
         elif urc_name == "CSQ":
             rssi, ber = payload
+            # Mudanças de estado frequentes (sinal, registro) vão só para o log de URCs, sem pop-up
             urc_log_message = f"[{timestamp}] Qualidade do Sinal Alterada: RSSI={rssi}, BER={ber}"
-            sg.popup_timed(f"Sinal Alterado: RSSI {rssi}, BER {ber}", title="QUALIDADE SINAL", keep_on_top=True, background_color='lightyellow', text_color='black')
         elif urc_name == "CREG" or urc_name == "CGREG" or urc_name == "CEREG":
             stat_code = int(payload[1]) # O status é sempre o segundo elemento
             stat_desc = {
@@ -100,8 +114,8 @@ class UrcMonitor:
             }.get(stat_code, "Desconhecido")
             
             detail_msg = f"Rede {urc_name}: {stat_desc}"
-            # Lógica para CREG/CGREG/CEREG estendido, se houver campos adicionais
-            if len(payload) > 2: 
+            # Lógica para CREG/CGREG/CEREG estendido, se houver campos adicionais (ausentes chegam como None)
+            if len(payload) > 2 and payload[2]: 
                 lac_tac = payload[2] if len(payload) > 2 else 'N/A'
                 ci = payload[3] if len(payload) > 3 else 'N/A'
                 act_code = payload[4] if len(payload) > 4 else 'N/A'
@@ -112,7 +126,31 @@ class UrcMonitor:
                 detail_msg += f" (LAC/TAC: {lac_tac}, CI: {ci}, Tech: {act_desc})"
             
             urc_log_message = f"[{timestamp}] Registro Rede: {detail_msg}"
-            sg.popup_timed(f"Registro de Rede: {detail_msg}", title="REGISTRO REDE", keep_on_top=True, background_color='lightcoral', text_color='white')
+        elif urc_name == "QIURC":
+            event, connect_id, args = payload
+            if event == "recv":
+                urc_log_message = f"[{timestamp}] Socket {connect_id}: dados recebidos" + (f" ({args} bytes)" if args else "")
+            elif event == "closed":
+                urc_log_message = f"[{timestamp}] Socket {connect_id}: conexão fechada pelo servidor"
+            elif event == "pdpdeact":
+                urc_log_message = f"[{timestamp}] Contexto PDP {connect_id} desativado pela rede: sockets fechados"
+            else: # incoming, incoming full, dnsgip...
+                details = ", ".join(str(item) for item in (connect_id, args) if item is not None)
+                urc_log_message = f"[{timestamp}] Socket: evento '{event}'" + (f" ({details})" if details else "")
+        elif urc_name == "QIOPEN":
+            connect_id, err = payload
+            urc_log_message = f"[{timestamp}] Socket {connect_id}: " + ("conexão aberta" if err == "0" else f"falha ao abrir (erro {err})")
+        elif urc_name in ("QHTTPGET", "QHTTPPOST"):
+            err, status, content_length = payload
+            method = urc_name[len("QHTTP"):]
+            if err == "0":
+                urc_log_message = f"[{timestamp}] HTTP {method}: status {status}" + (f", {content_length} bytes" if content_length else "")
+            else:
+                urc_log_message = f"[{timestamp}] HTTP {method}: {HTTP_ERRORS.get(int(err), 'erro')} ({err})"
+        elif urc_name in ("QHTTPREAD", "QHTTPREADFILE"):
+            err, = payload
+            target = "arquivo" if urc_name == "QHTTPREADFILE" else "host"
+            urc_log_message = f"[{timestamp}] HTTP: leitura do corpo para o {target} " + ("concluída" if err == "0" else f"falhou: {HTTP_ERRORS.get(int(err), 'erro')} ({err})")
         else:
             urc_log_message = f"[{timestamp}] URC Desconhecido: {urc_name}, Payload: {payload}"
 
@@ -1,35 +1,166 @@
 # src/logger/logger.py
+import atexit
 import logging
+import logging.handlers
 import os
-import datetime
+import queue
+import threading
 
-def setup_logger(name, log_file=None, level=logging.DEBUG):
+from src.logger.rotating_sink import CompressingRotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Destino único do processo e seus limites (rotação por tamanho/idade, orçamento total de disco)
+DEFAULT_LOG_FILE = os.path.join("logs", "modem_controller.log")
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_MAX_AGE = 24 * 3600
+DEFAULT_MAX_TOTAL_BYTES = 200 * 1024 * 1024
+
+# Logger do trace de bytes brutos da serial. Desligado por padrão: com o portão fechado,
+# o custo no hot path da thread de leitura é um isEnabledFor().
+RAW_TRACE_LOGGER = "src.modem.controller.raw"
+
+# Portões de nível por subsistema: prefixo do nome do logger -> nível.
+# O prefixo mais longo vence. Pode ser sobrescrito pela variável de ambiente
+# MODEM_LOG_LEVELS (ex: "src.gui=INFO,src.modem.controller.raw=DEBUG").
+SUBSYSTEM_LEVELS = {
+    RAW_TRACE_LOGGER: logging.INFO,
+}
+
+# Fila única entre os loggers (qualquer thread) e a thread de escrita (QueueListener)
+_log_queue = queue.SimpleQueue()
+_listener = None
+_sink_handlers = []
+_state_lock = threading.RLock()
+_configured_loggers = {} # nome -> nível pedido em setup_logger
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
     """
-    Configura um logger para o módulo especificado.
-    Se log_file não for fornecido, ele loga apenas no console.
+    QueueHandler que NÃO formata a mensagem na thread de quem loga:
+    o registro vai para a fila com msg/args intactos e a formatação (incluindo
+    tracebacks) acontece na thread do QueueListener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_queue_handler = _DeferredQueueHandler(_log_queue)
+
+
+def _parse_level(level):
+    if isinstance(level, int):
+        return level
+    level_value = logging.getLevelName(str(level).strip().upper())
+    if not isinstance(level_value, int):
+        raise ValueError(f"Nível de log inválido: {level!r}")
+    return level_value
+
+
+def _load_env_levels():
+    spec = os.environ.get("MODEM_LOG_LEVELS", "")
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        prefix, level = item.split("=", 1)
+        try:
+            SUBSYSTEM_LEVELS[prefix.strip()] = _parse_level(level)
+        except ValueError as e:
+            print(f"MODEM_LOG_LEVELS: {e}")
+
+
+_load_env_levels()
+
+
+def _gate_for(name, default):
+    """Retorna o nível do portão de subsistema mais específico para o logger (ou default)."""
+    best_prefix = None
+    for prefix in SUBSYSTEM_LEVELS:
+        if name == prefix or name.startswith(prefix + "."):
+            if best_prefix is None or len(prefix) > len(best_prefix):
+                best_prefix = prefix
+    return SUBSYSTEM_LEVELS[best_prefix] if best_prefix is not None else default
+
+
+def configure_logging(log_file=None, console=True, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE,
+                      max_total_bytes=DEFAULT_MAX_TOTAL_BYTES, compress=True):
+    """
+    (Re)configura os destinos do log: um arquivo rotativo e, opcionalmente, o console.
+    Ambos são escritos por uma única thread em segundo plano (QueueListener), com um
+    único handle de arquivo compartilhado por todos os módulos.
+    Chamado automaticamente com os padrões no primeiro setup_logger().
+    :param max_bytes: Tamanho (bytes) que dispara a rotação do arquivo ativo.
+    :param max_age: Idade (s) que dispara a rotação do arquivo ativo.
+    :param max_total_bytes: Orçamento de disco para o arquivo ativo + segmentos rotacionados.
+    :param compress: Comprime os segmentos rotacionados com gzip (em segundo plano).
     """
-    if log_file is None:
-        # Define um nome de arquivo de log padrão com timestamp
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_file = os.path.join(log_dir, f"modem_controller_{timestamp}.log")
+    global _listener
+    with _state_lock:
+        shutdown_logging()
+        if log_file is None:
+            log_file = DEFAULT_LOG_FILE
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        handler = CompressingRotatingFileHandler(
+            log_file, max_bytes=max_bytes, max_age=max_age, max_total_bytes=max_total_bytes, compress=compress
+        )
+        handler.setFormatter(formatter)
+        _sink_handlers.append(handler)
+
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(formatter)
+            _sink_handlers.append(console_handler)
+
+        _listener = logging.handlers.QueueListener(_log_queue, *_sink_handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging():
+    """Esvazia a fila, para a thread de escrita e fecha os destinos do log."""
+    global _listener
+    with _state_lock:
+        if _listener is not None:
+            _listener.stop() # Processa o que ainda está na fila antes de retornar
+            _listener = None
+        for handler in _sink_handlers:
+            handler.close()
+        _sink_handlers.clear()
 
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-    handler = logging.FileHandler(log_file, encoding='utf-8')
-    handler.setFormatter(formatter)
+atexit.register(shutdown_logging)
 
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
 
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
+def set_subsystem_level(prefix, level):
+    """
+    Define o portão de nível de um subsistema (prefixo de nome de logger) e
+    o aplica imediatamente aos loggers já configurados.
+    """
+    with _state_lock:
+        SUBSYSTEM_LEVELS[prefix] = _parse_level(level)
+        for name, requested in _configured_loggers.items():
+            logging.getLogger(name).setLevel(_gate_for(name, requested))
+
+
+def setup_logger(name, log_file=None, level=logging.DEBUG):
+    """
+    Configura um logger para o módulo especificado.
+    As mensagens vão para uma fila e são formatadas e gravadas em segundo plano;
+    o nível efetivo respeita os portões de SUBSYSTEM_LEVELS.
+    :param log_file: Se informado (e o log ainda não estiver configurado), define o arquivo de destino.
+    """
+    with _state_lock:
+        if _listener is None:
+            configure_logging(log_file)
+
+        logger = logging.getLogger(name)
+        _configured_loggers[name] = level
+        logger.setLevel(_gate_for(name, level))
 
-    # Evita adicionar múltiplos handlers se o logger já tiver um
-    if not logger.handlers:
-        logger.addHandler(handler)
-        logger.addHandler(console_handler) # Adiciona também para saída no console
+        # Evita adicionar múltiplos handlers se o logger já tiver um
+        if _queue_handler not in logger.handlers:
+            logger.addHandler(_queue_handler)
+        logger.propagate = False # Cada logger configurado entrega direto na fila (sem duplicar via pais)
 
     return logger
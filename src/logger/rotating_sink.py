@@ -0,0 +1,135 @@
+# src/logger/rotating_sink.py
+import datetime
+import glob
+import gzip
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+
+class CompressingRotatingFileHandler(logging.FileHandler):
+    """
+    Destino de log único do processo: rotaciona o arquivo ativo por tamanho e por idade,
+    comprime os segmentos rotacionados com gzip numa thread em segundo plano e
+    apaga os segmentos mais antigos para respeitar um orçamento total de disco.
+    Deve ser escrito por uma única thread (o QueueListener do src/logger/logger.py).
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, max_age=24 * 3600,
+                 max_total_bytes=200 * 1024 * 1024, compress=True, encoding='utf-8'):
+        """
+        :param filename: Arquivo ativo (ex: logs/modem_controller.log).
+        :param max_bytes: Tamanho que dispara a rotação (0 = sem limite).
+        :param max_age: Idade do segmento, em segundos, que dispara a rotação (0 = sem limite).
+        :param max_total_bytes: Orçamento de disco para o arquivo ativo + segmentos (0 = sem limite).
+        :param compress: Se True, os segmentos rotacionados são comprimidos com gzip.
+        """
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_total_bytes = max_total_bytes
+        self.compress = compress
+        self._active = os.path.abspath(filename)
+        self._base, self._ext = os.path.splitext(self._active)
+        self._jobs = queue.Queue()
+        self._worker = None
+
+        os.makedirs(os.path.dirname(self._active), exist_ok=True)
+        # Um arquivo ativo deixado por uma execução anterior vira segmento antes de começar
+        if os.path.exists(self._active) and os.path.getsize(self._active) > 0:
+            self._schedule(self._rotate_file(self._active))
+
+        super().__init__(filename, mode='a', encoding=encoding)
+        self._segment_started = time.time()
+
+    # --- Rotação ---
+
+    def should_rollover(self):
+        if self.stream is None:
+            return False
+        if self.max_age and time.time() - self._segment_started >= self.max_age:
+            return True
+        return bool(self.max_bytes) and self.stream.tell() >= self.max_bytes
+
+    def emit(self, record):
+        try:
+            if self.should_rollover():
+                self.do_rollover()
+        except Exception:
+            self.handleError(record)
+        super().emit(record)
+
+    def do_rollover(self):
+        """Fecha o segmento atual, renomeia-o e agenda compressão/limpeza em segundo plano."""
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self._schedule(self._rotate_file(self.baseFilename))
+        self.stream = self._open()
+        self._segment_started = time.time()
+
+    def _rotate_file(self, path):
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        target = f"{self._base}_{timestamp}{self._ext}"
+        counter = 1
+        while os.path.exists(target) or os.path.exists(target + ".gz"):
+            target = f"{self._base}_{timestamp}_{counter}{self._ext}"
+            counter += 1
+        os.replace(path, target)
+        return target
+
+    # --- Trabalho em segundo plano (compressão e orçamento de disco) ---
+
+    def _schedule(self, segment):
+        self._jobs.put(segment)
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run_jobs, name="LogCompressor", daemon=True)
+            self._worker.start()
+
+    def _run_jobs(self):
+        while True:
+            segment = self._jobs.get()
+            if segment is None:
+                break
+            try:
+                if self.compress and os.path.exists(segment): # Pode ter sido apagado pelo orçamento de disco
+                    self._compress(segment)
+                self._enforce_budget()
+            except Exception as e:
+                # Sem logger aqui: o próprio log é o destino com problema
+                print(f"Log: Falha ao processar segmento '{segment}': {e}")
+
+    @staticmethod
+    def _compress(segment):
+        with open(segment, 'rb') as source, gzip.open(segment + ".gz.tmp", 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.replace(segment + ".gz.tmp", segment + ".gz")
+        os.remove(segment)
+
+    def segments(self):
+        """Lista os segmentos rotacionados (comprimidos ou não), do mais antigo ao mais novo."""
+        pattern = f"{glob.escape(self._base)}_*{self._ext}"
+        paths = glob.glob(pattern) + glob.glob(pattern + ".gz")
+        return sorted(paths, key=os.path.getmtime)
+
+    def _enforce_budget(self):
+        if not self.max_total_bytes:
+            return
+        segments = self.segments()
+        active_size = os.path.getsize(self._active) if os.path.exists(self._active) else 0
+        total = active_size + sum(os.path.getsize(path) for path in segments)
+        for path in segments: # Apaga do mais antigo para o mais novo
+            if total <= self.max_total_bytes:
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def close(self):
+        """Fecha o arquivo ativo e espera a compressão dos segmentos pendentes."""
+        super().close()
+        if self._worker is not None and self._worker.is_alive():
+            self._jobs.put(None)
+            self._worker.join(timeout=30)
+        self._worker = None
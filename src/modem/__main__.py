@@ -0,0 +1,177 @@
+# src/modem/__main__.py
+# Ponto de entrada sem GUI: python -m src.modem --port /dev/ttyUSB2 [--socket 7557] [--poll signal=30]
+# Varredura de bandas sem supervisão: python -m src.modem [--simulate] --sweep 1,3,7,28 [--sweep-apply restore]
+# Ajuste da UART (AT+IPR/AT+IFC): python -m src.modem --port /dev/ttyS1 --tune-link; depois --link-settings
+
+import argparse
+import json
+import sys
+import threading
+
+from src.modem.band_sweep import (
+    APPLY_BEST, APPLY_RESTORE, DEFAULT_SAMPLE_WINDOW, DEFAULT_SETTLE_TIMEOUT, BandSweep, format_table, parse_candidates,
+)
+from src.modem.command_timeouts import default_command_timeouts
+from src.modem.controller import ModemController
+from src.modem.daemon import POLLERS, ModemDaemon, discover_port
+from src.modem.link_tuning import LinkTuner
+from src.modem.link_tuning import connect as connect_link
+from src.modem.link_tuning import format_table as format_link_table
+from src.modem.urc_profiles import DEFAULT_URC_PROFILE, URC_PROFILES
+
+
+def _parse_poll(spec):
+    name, _, interval = spec.partition("=")
+    if name not in POLLERS or not interval:
+        raise argparse.ArgumentTypeError(f"Use <nome>=<segundos> com nome em: {', '.join(POLLERS)}")
+    return name, float(interval)
+
+
+def _run_sweep(controller, candidates, args):
+    def on_progress(sweep, event, detail):
+        if event == "candidate":
+            print(f"Testando {detail}...", file=sys.stderr)
+
+    sweep = BandSweep(controller, candidates, settle_timeout=args.sweep_settle, sample_window=args.sweep_window,
+                      apply=args.sweep_apply, on_progress=on_progress)
+    try:
+        results = sweep.run()
+    except KeyboardInterrupt: # A configuração final já foi aplicada pelo BandSweep
+        results = sweep.results
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(format_table(results))
+    print(f"Configuração aplicada: {sweep.applied or 'nenhuma'}")
+    if args.sweep_output:
+        with open(args.sweep_output, "w", encoding="utf-8") as f:
+            json.dump({"original": sweep.original, "applied": sweep.applied, "results": results}, f, indent=2, ensure_ascii=False)
+    return 0 if any(r["registered"] for r in results) else 2
+
+
+def _run_link_tuning(controller, args):
+    def on_progress(result):
+        print(f"{result['baudrate']} baud: {'ok' if result['ok'] else 'falhou'}", file=sys.stderr)
+
+    try:
+        result = LinkTuner(controller, flow_control=not args.no_flow_control, benchmark_bytes=args.link_benchmark,
+                           on_progress=on_progress).tune()
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return
+    print(format_link_table(result["results"]), file=sys.stderr)
+    print(f"Enlace: {result['baudrate']} baud, RTS/CTS {'ativo' if result['flow_control'] else 'inativo'}.", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.modem", description="Controle do modem Quectel sem interface gráfica.")
+    parser.add_argument("--port", default="auto", help="Porta serial (padrão: auto-discover).")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--urc-profile", default=DEFAULT_URC_PROFILE, choices=list(URC_PROFILES),
+                        help="Perfil de assinatura de URCs aplicado ao conectar.")
+    parser.add_argument("--poll", type=_parse_poll, action="append", default=[], metavar="NOME=SEGUNDOS",
+                        help=f"Poller periódico (repetível). Nomes: {', '.join(POLLERS)}.")
+    parser.add_argument("--socket", type=int, metavar="PORTA", help="Aceita comandos por TCP em 127.0.0.1:PORTA.")
+    parser.add_argument("--no-stdin", action="store_true", help="Não lê comandos do stdin (use com --socket).")
+    parser.add_argument("--metrics-port", type=int, help="Publica métricas Prometheus em 127.0.0.1:PORTA/metrics.")
+    parser.add_argument("--metrics-dir", help="Diretório para persistir o histórico de sinal/bateria (MetricsStore).")
+    parser.add_argument("--adaptive-timeouts", action="store_true",
+                        help="Deadlines adaptativos por comando (p99 × 3); timeouts explícitos só são alongados.")
+    parser.add_argument("--simulate", action="store_true", help="Usa o modem simulado (src/modem/simulator.py) em vez da serial.")
+    parser.add_argument("--sim-time-scale", type=float, default=1.0, help="Acelera os tempos de registro do simulador (ex: 0.1).")
+    parser.add_argument("--sweep", metavar="BANDAS",
+                        help="Varre travas de banda LTE e sai (ex: 1,3,7+28; '+' combina bandas numa configuração).")
+    parser.add_argument("--sweep-window", type=float, default=DEFAULT_SAMPLE_WINDOW, help="Segundos de amostragem por configuração.")
+    parser.add_argument("--sweep-settle", type=float, default=DEFAULT_SETTLE_TIMEOUT, help="Segundos máximos para registrar.")
+    parser.add_argument("--sweep-apply", choices=(APPLY_BEST, APPLY_RESTORE), default=APPLY_BEST,
+                        help="Aplica a melhor configuração (padrão) ou restaura a original ao terminar.")
+    parser.add_argument("--sweep-output", metavar="ARQUIVO", help="Grava os resultados da varredura em JSON.")
+    parser.add_argument("--tune-link", action="store_true",
+                        help="Sobe a velocidade da UART (AT+IPR) com eco de verificação e salva a melhor por porta.")
+    parser.add_argument("--no-flow-control", action="store_true", help="Não ativa RTS/CTS (AT+IFC=2,2) no --tune-link.")
+    parser.add_argument("--link-benchmark", type=int, default=0, metavar="BYTES",
+                        help="Mede a vazão UFS de BYTES em cada velocidade do --tune-link.")
+    parser.add_argument("--link-settings", action="store_true",
+                        help="Conecta com a velocidade/RTS-CTS salvas para a porta pelo --tune-link.")
+    args = parser.parse_args(argv)
+
+    if args.no_stdin and args.socket is None:
+        parser.error("--no-stdin exige --socket.")
+
+    candidates = None
+    if args.sweep:
+        try:
+            candidates = parse_candidates(args.sweep)
+        except ValueError as e:
+            parser.error(str(e))
+
+    port = args.port
+    serial_factory = None
+    if args.simulate:
+        from src.modem.simulator import SimulatedModem
+        serial_factory = SimulatedModem(time_scale=args.sim_time_scale).open_serial
+        port = "SIM" if port == "auto" else port
+    elif port == "auto":
+        port = discover_port(args.baudrate)
+        if port is None:
+            print("Nenhum modem Quectel encontrado.", file=sys.stderr)
+            return 1
+
+    metrics_store = None
+    if args.metrics_dir:
+        from src.modem.metrics_store import MetricsStore
+        metrics_store = MetricsStore(persist_dir=args.metrics_dir)
+
+    controller_kwargs = {"serial_factory": serial_factory} if serial_factory else {}
+    if args.adaptive_timeouts:
+        controller_kwargs["command_timeouts"] = default_command_timeouts
+    controller = ModemController(port=port, baudrate=args.baudrate, metrics_store=metrics_store, urc_profile=args.urc_profile,
+                                 **controller_kwargs)
+    # Conecta (e ajusta o enlace) antes do daemon: os pollers só começam na velocidade final
+    if args.link_settings:
+        connected = connect_link(controller) is not None # Salva, configurada e as demais velocidades
+    else:
+        connected = controller.connect_modem()
+    if not connected:
+        print(f"Falha ao conectar na porta {port}.", file=sys.stderr)
+        return 1
+    if args.tune_link:
+        _run_link_tuning(controller, args)
+    daemon = ModemDaemon(controller, pollers=dict(args.poll))
+    if not daemon.start():
+        return 1
+
+    if candidates is not None:
+        try:
+            return _run_sweep(controller, candidates, args)
+        finally:
+            daemon.stop()
+            if metrics_store:
+                metrics_store.close()
+
+    metrics_server = None
+    if args.metrics_port is not None:
+        from src.modem.command_metrics import start_metrics_server
+        metrics_server = start_metrics_server(args.metrics_port, command_metrics=controller.command_metrics)
+
+    try:
+        if args.socket is not None:
+            daemon.serve_socket(port=args.socket)
+        if not args.no_stdin:
+            threading.Thread(target=daemon.serve_stdin, name="DaemonStdin", daemon=True).start()
+        # Espera em fatias curtas para que Ctrl+C funcione em todas as plataformas
+        while not daemon.stop_event.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        if metrics_server:
+            metrics_server.shutdown()
+        if metrics_store:
+            metrics_store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
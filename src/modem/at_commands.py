@@ -1,6 +1,8 @@
 # src/modem/at_commands.py
 import re # Certifique-se que 're' está importado aqui
 
+from src.modem.modem_commands import parse_qeng_neighbor_response, parse_qeng_response
+
 # --- Funções de Parsing para Respostas de Comandos AT ---
 
 # Função auxiliar para extrair a linha de dados relevante
@@ -116,6 +118,48 @@ def parse_network_info_response(response: str) -> str:
         return f"Tecnologia: {act}, Operador (MCCMNC): {oper}, Banda: {band}, Canal: {channel}"
     return "N/A"
 
+# Tecnologias de acesso (<AcT>) e status (<stat>) do +COPS
+COPS_ACT_NAMES = {
+    0: "GSM", 2: "UTRAN", 3: "GSM EGPRS", 4: "UTRAN HSDPA", 5: "UTRAN HSUPA",
+    6: "UTRAN HSDPA+HSUPA", 7: "E-UTRAN", 8: "EC-GSM-IoT", 9: "E-UTRAN NB-S1",
+}
+COPS_STAT_NAMES = {0: "desconhecida", 1: "disponível", 2: "atual", 3: "proibida"}
+COPS_MODE_NAMES = {0: "Automático", 1: "Manual", 2: "Desregistrado", 3: "Só formato", 4: "Manual/Automático"}
+_COPS_SCAN_ENTRY_RE = re.compile(r'\((\d),"([^"]*)","([^"]*)","([^"]*)"(?:,(\d+))?\)')
+
+def parse_operator_scan_response(response: str) -> list:
+    """
+    Parses AT+COPS=? response into a list of operators, one dict per operator/technology:
+    stat, status, long_name, short_name, numeric, act, technology.
+    """
+    data_line = _extract_data_line(response, "+COPS:")
+    operators = []
+    for stat, long_name, short_name, numeric, act in _COPS_SCAN_ENTRY_RE.findall(data_line):
+        act = int(act) if act else None
+        operators.append({
+            "stat": int(stat),
+            "status": COPS_STAT_NAMES.get(int(stat), stat),
+            "long_name": long_name,
+            "short_name": short_name,
+            "numeric": numeric,
+            "act": act,
+            "technology": COPS_ACT_NAMES.get(act, "N/A") if act is not None else "N/A",
+        })
+    return operators
+
+def parse_operator_response(response: str) -> str:
+    """Parses AT+COPS? response for the current operator selection."""
+    data_line = _extract_data_line(response, "+COPS:")
+    match = re.search(r'\+COPS:\s*(\d)(?:,(\d),"([^"]*)"(?:,(\d+))?)?', data_line)
+    if match:
+        mode, _, oper, act = match.groups()
+        mode_desc = COPS_MODE_NAMES.get(int(mode), mode)
+        if not oper:
+            return f"Modo: {mode_desc}, Operador: nenhum"
+        technology = COPS_ACT_NAMES.get(int(act), act) if act else "N/A"
+        return f"Modo: {mode_desc}, Operador: {oper}, Tecnologia: {technology}"
+    return "N/A"
+
 def parse_network_reg_status_response(response: str) -> str:
     """Parses AT+CREG? response for network registration status."""
     data_line = _extract_data_line(response, "+CREG:")
@@ -191,6 +235,32 @@ def parse_band_config_response(response: str) -> str:
         return f"GSM/WCDMA: {gsm_wcdma_band}, LTE: {lte_band}, TD-SCDMA: {tds_scdma_band}"
     return "N/A"
 
+def parse_band_config_values(response: str):
+    """Parses AT+QCFG="band" response into the raw masks (bandval, ltebandval, tdsbandval), or None."""
+    match = re.search(r'\+QCFG:\s*"band",\s*"?([0-9A-Fa-fx]+)"?,\s*"?([0-9A-Fa-fx]+)"?,\s*"?([0-9A-Fa-fx]+)"?', response or "")
+    return match.groups() if match else None
+
+def parse_file_list_values(response: str) -> dict:
+    """Parses AT+QFLST response into {nome do arquivo (sem "UFS:"): tamanho em bytes}."""
+    return {name: int(size) for name, size in re.findall(r'\+QFLST:\s*"(?:UFS:)?([^"]+)",(\d+)', response or "")}
+
+def parse_network_scan_mode_value(response: str):
+    """Parses AT+QCFG="nwscanmode" response into the raw mode (int), or None."""
+    match = re.search(r'\+QCFG:\s*"nwscanmode",(\d+)', response or "")
+    return int(match.group(1)) if match else None
+
+def lte_band_mask(bands) -> str:
+    """Máscara hexadecimal de <ltebandval> (bit n-1 = banda LTE n) para AT+QCFG="band"."""
+    mask = 0
+    for band in bands:
+        mask |= 1 << (int(band) - 1)
+    return f"0x{mask:x}"
+
+def lte_bands_from_mask(mask) -> list:
+    """Bandas LTE habilitadas numa máscara <ltebandval> (string hexadecimal ou int)."""
+    value = int(mask, 16) if isinstance(mask, str) else int(mask)
+    return [bit + 1 for bit in range(value.bit_length()) if value >> bit & 1]
+
 def parse_calls_status_response(response: str) -> str:
     """Parses AT+CLCC response for call status."""
     calls = []
@@ -342,6 +412,37 @@ AT_COMMANDS = {
     "GET_SIGNAL_QUALITY": {"command": "AT+CSQ", "expected_response": "+CSQ", "parser": parse_signal_quality_response},
     "GET_NETWORK_INFO": {"command": "AT+QNWINFO", "expected_response": "+QNWINFO", "parser": parse_network_info_response},
     "GET_NETWORK_REGISTRATION_STATUS": {"command": "AT+CREG?", "expected_response": "+CREG", "parser": parse_network_reg_status_response},
+    "SCAN_OPERATORS": {"command": "AT+COPS=?", "expected_response": "+COPS", "parser": parse_operator_scan_response},
+    "GET_OPERATOR": {"command": "AT+COPS?", "expected_response": "+COPS", "parser": parse_operator_response},
+    "SELECT_OPERATOR": {"command": 'AT+COPS=1,2,"{}",{}', "expected_response": "OK"}, # MCCMNC, AcT
+    "SELECT_OPERATOR_ANY_ACT": {"command": 'AT+COPS=1,2,"{}"', "expected_response": "OK"}, # MCCMNC
+    "SELECT_OPERATOR_AUTO": {"command": "AT+COPS=0", "expected_response": "OK"},
+    "GET_SERVING_CELL": {"command": 'AT+QENG="servingcell"', "expected_response": "+QENG", "parser": parse_qeng_response},
+    "GET_NEIGHBOUR_CELLS": {"command": 'AT+QENG="neighbourcell"', "expected_response": "OK", "parser": parse_qeng_neighbor_response},
+    "OPEN_SOCKET": {"command": 'AT+QIOPEN={},{},"{}","{}",{},0,0', "expected_response": "OK"}, # contextID, connectID, TCP/UDP, host, porta (modo buffer)
+    "SEND_SOCKET": {"command": "AT+QISEND={},{}", "expected_response": "SEND OK"}, # connectID, bytes (payload após o prompt '>')
+    "READ_SOCKET": {"command": "AT+QIRD={},{}", "expected_response": "+QIRD"}, # connectID, bytes máximos
+    "CLOSE_SOCKET": {"command": "AT+QICLOSE={},{}", "expected_response": "OK"}, # connectID, timeout (s)
+    "HTTP_CONFIG": {"command": 'AT+QHTTPCFG="{}",{}', "expected_response": "OK"}, # parâmetro, valor
+    "HTTP_SET_URL": {"command": "AT+QHTTPURL={},{}", "expected_response": "OK"}, # tamanho da URL, timeout de entrada (URL após CONNECT)
+    "HTTP_GET": {"command": "AT+QHTTPGET={}", "expected_response": "OK"}, # timeout da resposta (resultado em +QHTTPGET)
+    "HTTP_GET_WITH_HEADER": {"command": "AT+QHTTPGET={},{},{}", "expected_response": "OK"}, # timeout, tamanho do cabeçalho, timeout de entrada
+    "HTTP_POST": {"command": "AT+QHTTPPOST={},{},{}", "expected_response": "OK"}, # tamanho do corpo, timeout de entrada, timeout da resposta
+    "HTTP_READ": {"command": "AT+QHTTPREAD={}", "expected_response": "OK"}, # timeout (corpo entre CONNECT e OK)
+    "HTTP_READ_FILE": {"command": 'AT+QHTTPREADFILE="{}",{}', "expected_response": "OK"}, # arquivo UFS, timeout
+    "SET_FLOW_CONTROL": {"command": "AT+IFC={},{}", "expected_response": "OK"}, # controle do modem (DCE), do host (DTE): 0 = nenhum, 2 = RTS/CTS
+    "SET_BAUD_RATE": {"command": "AT+IPR={}", "expected_response": "OK"}, # velocidade (o OK sai na velocidade antiga; AT&W grava)
+    "GET_BAUD_RATE": {"command": "AT+IPR?", "expected_response": "+IPR"},
+    "FILE_LIST": {"command": 'AT+QFLST="{}"', "expected_response": "OK", "parser": parse_file_list_values}, # padrão (ex: "*")
+    "FILE_DELETE": {"command": 'AT+QFDEL="{}"', "expected_response": "OK"}, # arquivo
+    "FILE_UPLOAD": {"command": 'AT+QFUPL="{}",{},{}', "expected_response": "+QFUPL"}, # arquivo, tamanho, timeout de entrada (dados após CONNECT)
+    "FILE_DOWNLOAD": {"command": 'AT+QFDWL="{}"', "expected_response": "+QFDWL"}, # arquivo (dados entre CONNECT e +QFDWL)
+    "FILE_OPEN": {"command": 'AT+QFOPEN="{}",{}', "expected_response": "+QFOPEN"}, # arquivo, modo (0 = abre/cria, 1 = cria/limpa, 2 = só leitura)
+    "FILE_SEEK": {"command": "AT+QFSEEK={},{},0", "expected_response": "OK"}, # handle, posição a partir do início
+    "FILE_TRUNCATE": {"command": "AT+QFTUCAT={}", "expected_response": "OK"}, # handle (corta na posição atual)
+    "FILE_WRITE": {"command": "AT+QFWRITE={},{},{}", "expected_response": "+QFWRITE"}, # handle, tamanho, timeout de entrada
+    "FILE_READ": {"command": "AT+QFREAD={},{}", "expected_response": "OK"}, # handle, tamanho (dados após CONNECT <n>)
+    "FILE_CLOSE": {"command": "AT+QFCLOSE={}", "expected_response": "OK"}, # handle
     "DEFINE_APN": {"command": 'AT+CGDCONT={},"{}","{}"', "expected_response": "OK"}, # CID, PDP_Type, APN
     "ACTIVATE_PDP_CONTEXT": {"command": "AT+CGACT=1,{}", "expected_response": "OK"}, # CID
     "DEACTIVATE_PDP_CONTEXT": {"command": "AT+CGACT=0,{}", "expected_response": "OK"}, # CID
@@ -0,0 +1,274 @@
+# src/modem/audio_meter.py
+import math
+import re
+import time
+
+# NumPy é opcional no projeto, mas a medição de áudio depende dele (FFT e operações vetorizadas por bloco).
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+from src.modem.at_commands import AT_COMMANDS
+from src.modem.voice_pcm import FRAME_MS
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Níveis em dBFS: RMS (ou pico) relativo ao fundo de escala (1.0 = 32768); um seno no fundo de escala tem -3 dBFS RMS
+SILENCE_DBFS = -120.0
+# Amostra considerada clipada a partir desta fração do fundo de escala
+CLIP_THRESHOLD = 0.999
+# Calibração: tom de teste, nível alvo na volta do loop e tolerância (dB)
+TEST_TONE_HZ = 1000
+TEST_TONE_DBFS = -24.0
+TARGET_LEVEL_DBFS = -18.0
+TARGET_TOLERANCE_DB = 1.0
+MAX_CLIPPING = 0.001
+# Quadros descartados após cada troca de ganho (atraso do loop) e quadros medidos
+SETTLE_FRAMES = 10
+MEASURE_FRAMES = 25
+# Ganhos candidatos (AT+QMIC <txgain> e AT+QRXGAIN <rxgain>, 0-65535), em ordem crescente
+GAIN_STEPS = (2048, 4096, 8192, 12288, 16384, 24576, 32768, 49152, 65535)
+MAX_GAIN = 65535
+
+_QMIC_RE = re.compile(r'\+QMIC:\s*(\d+),(\d+)')
+_QRXGAIN_RE = re.compile(r'\+QRXGAIN:\s*(\d+)')
+
+
+def _dbfs(value):
+    """Amplitude linear (fração do fundo de escala) -> dBFS, com piso SILENCE_DBFS."""
+    with np.errstate(divide="ignore"):
+        return np.maximum(20 * np.log10(value), SILENCE_DBFS)
+
+
+class AudioMeter:
+    """
+    Medidor de nível de blocos PCM de 16 bits: RMS, pico, fração clipada e piso de ruído espectral (mediana do
+    espectro de amplitude com janela de Hann, em dBFS por bin). Vários blocos do mesmo tamanho são medidos
+    de uma vez (uma FFT em lote). Também serve como on_capture de um PcmStream, guardando os últimos níveis.
+    """
+
+    def __init__(self, sample_rate=8000, clip_threshold=CLIP_THRESHOLD):
+        if np is None:
+            raise RuntimeError("AudioMeter requer NumPy (pip install -r requirements-audio.txt).")
+        self.sample_rate = sample_rate
+        self.clip_threshold = clip_threshold
+        self.last = None # Níveis do último bloco recebido por __call__
+        self.blocks = 0
+        self.process_seconds = 0.0
+        self.audio_seconds = 0.0
+        self._windows = {} # Tamanho do bloco -> (janela de Hann, fator de normalização)
+
+    def _window(self, size):
+        window = self._windows.get(size)
+        if window is None:
+            hann = np.hanning(size).astype(np.float32)
+            window = self._windows[size] = (hann, 2.0 / hann.sum()) # Seno de amplitude A -> pico A no espectro
+        return window
+
+    def measure_blocks(self, data, block_samples):
+        """
+        Mede blocos consecutivos de block_samples amostras (o resto incompleto é ignorado).
+        :param data: PCM 16 bits little-endian (bytes/bytearray/memoryview) ou array de int16.
+        :return: Dicionário de arrays (um valor por bloco): rms_dbfs, peak_dbfs, clipping, noise_floor_dbfs.
+        """
+        started = time.perf_counter()
+        samples = np.frombuffer(data, dtype='<i2') if not isinstance(data, np.ndarray) else data
+        count = len(samples) // block_samples
+        blocks = samples[:count * block_samples].reshape(count, block_samples).astype(np.float32) / 32768.0
+        magnitude = np.abs(blocks)
+        hann, scale = self._window(block_samples)
+        spectrum = np.abs(np.fft.rfft(blocks * hann, axis=1)) * scale
+        levels = {
+            "rms_dbfs": _dbfs(np.sqrt(np.mean(blocks * blocks, axis=1))),
+            "peak_dbfs": _dbfs(magnitude.max(axis=1)),
+            "clipping": np.mean(magnitude >= self.clip_threshold, axis=1),
+            "noise_floor_dbfs": _dbfs(np.median(spectrum[:, 1:], axis=1)), # Sem o bin DC
+        }
+        self.blocks += count
+        self.process_seconds += time.perf_counter() - started
+        self.audio_seconds += count * block_samples / self.sample_rate
+        return levels
+
+    def measure(self, block):
+        """Níveis de um bloco: {"rms_dbfs", "peak_dbfs", "clipping", "noise_floor_dbfs"} (floats)."""
+        samples = np.frombuffer(block, dtype='<i2')
+        levels = self.measure_blocks(samples, len(samples))
+        return {name: float(values[0]) for name, values in levels.items()}
+
+    def __call__(self, frame):
+        self.last = self.measure(frame)
+
+    def get_stats(self):
+        return {
+            "blocks": self.blocks,
+            "mean_process_us": round(self.process_seconds / self.blocks * 1e6, 1) if self.blocks else None,
+            # Tempo de processamento / duração do áudio medido (< 1 = mais rápido que o tempo real)
+            "realtime_factor": round(self.process_seconds / self.audio_seconds, 5) if self.audio_seconds else None,
+        }
+
+
+def summarize(levels):
+    """Combina os níveis de vários blocos: RMS pela potência média, pico máximo, clipping médio, piso mediano."""
+    power = np.mean(10 ** (np.asarray(levels["rms_dbfs"]) / 10))
+    return {
+        "rms_dbfs": round(float(max(10 * math.log10(power), SILENCE_DBFS) if power > 0 else SILENCE_DBFS), 2),
+        "peak_dbfs": round(float(np.max(levels["peak_dbfs"])), 2),
+        "clipping": round(float(np.mean(levels["clipping"])), 5),
+        "noise_floor_dbfs": round(float(np.median(levels["noise_floor_dbfs"])), 2),
+    }
+
+
+class GainCalibrator:
+    """
+    Ajusta os ganhos de voz pelo loop de áudio do modem (AT+QAUDLOOP=1): reproduz um tom de teste num PcmStream,
+    mede o nível que volta pela captura e varre o ganho do microfone (AT+QMIC <txgain>) até o candidato mais
+    próximo de target_dbfs sem clipping; uma medição extra interpola entre os degraus. Se o alvo ainda estiver
+    fora da tolerância (ganho de TX no limite), varre o ganho de RX (AT+QRXGAIN). O loop é desligado ao final;
+    os ganhos escolhidos ficam aplicados (ou os originais voltam, se a calibração falhar).
+    """
+
+    def __init__(self, controller, stream, target_dbfs=TARGET_LEVEL_DBFS, tolerance_db=TARGET_TOLERANCE_DB,
+                 tone_hz=TEST_TONE_HZ, tone_dbfs=TEST_TONE_DBFS, gain_steps=GAIN_STEPS, settle_frames=SETTLE_FRAMES,
+                 measure_frames=MEASURE_FRAMES, max_clipping=MAX_CLIPPING, on_progress=None):
+        """
+        :param stream: PcmStream aberto sem on_capture (a captura é lida por read_frame()).
+        :param target_dbfs: Nível RMS desejado do tom na volta do loop.
+        :param tone_dbfs: Nível RMS do tom reproduzido.
+        :param on_progress: Callable(resultado) chamado a cada ganho medido.
+        """
+        if stream.on_capture is not None:
+            raise ValueError("GainCalibrator lê a captura do fluxo; abra o PcmStream sem on_capture.")
+        self.controller = controller
+        self.stream = stream
+        self.meter = AudioMeter(stream.sample_rate)
+        self.target_dbfs = target_dbfs
+        self.tolerance_db = tolerance_db
+        self.gain_steps = tuple(sorted(gain_steps))
+        self.settle_frames = settle_frames
+        self.measure_frames = measure_frames
+        self.max_clipping = max_clipping
+        self.on_progress = on_progress
+        self.results = []
+        # Um segundo de tom (número inteiro de ciclos para tom em Hz inteiro), reproduzido em ciclo
+        amplitude = 10 ** (tone_dbfs / 20) * math.sqrt(2) * 32767
+        t = np.arange(stream.sample_rate) / stream.sample_rate
+        self._tone = (amplitude * np.sin(2 * np.pi * tone_hz * t)).astype('<i2').tobytes()
+        self._tone_offset = 0
+
+    def _next_tone(self, size):
+        end = self._tone_offset + size
+        data = self._tone[self._tone_offset:end]
+        if len(data) < size:
+            end = size - len(data)
+            data += self._tone[:end]
+        self._tone_offset = end % len(self._tone)
+        return data
+
+    def run(self):
+        """
+        :return: {"txgain", "rxgain", "level_dbfs", "within_tolerance", "results"}; results tem um item por medição
+                 ({"stage", "gain", "rms_dbfs", "peak_dbfs", "clipping", "noise_floor_dbfs"}).
+        :raises RuntimeError: O modem recusou o loop de áudio ou nenhum quadro voltou pela captura.
+        """
+        original_mic, original_rx = self._read_gains()
+        txdgain = original_mic[1] if original_mic else None
+        success, response = self.controller.set_audio_loop_test(True)
+        if not success:
+            raise RuntimeError(f"Modem recusou AT+QAUDLOOP=1. Resposta: {response!r}")
+        previous_source = self.stream.on_playback
+        self.stream.on_playback = self._next_tone
+        completed = False
+        try:
+            txgain, level = self._sweep("mic", lambda gain: self.controller.set_mic_gains(gain, txdgain))
+            rxgain = original_rx
+            if abs(level["rms_dbfs"] - self.target_dbfs) > self.tolerance_db:
+                rxgain, level = self._sweep("rx", self.controller.set_rx_gains)
+            completed = True
+        finally:
+            self.stream.on_playback = previous_source
+            self.controller.set_audio_loop_test(False)
+            if not completed:
+                self._restore(original_mic, original_rx)
+        within = abs(level["rms_dbfs"] - self.target_dbfs) <= self.tolerance_db
+        logger.info(f"GainCalibrator: txgain {txgain}, rxgain {rxgain}: {level['rms_dbfs']} dBFS "
+                    f"(alvo {self.target_dbfs} dBFS, {'dentro' if within else 'fora'} da tolerância).")
+        return {"txgain": txgain, "rxgain": rxgain, "level_dbfs": level["rms_dbfs"], "within_tolerance": within,
+                "results": self.results}
+
+    # --- Etapas ---
+
+    def _sweep(self, stage, apply):
+        """Mede os degraus em ordem crescente até passar do alvo (ou clipar) e refina por interpolação."""
+        measured = []
+        for gain in self.gain_steps:
+            level = self._measure(stage, gain, apply)
+            measured.append((gain, level))
+            if level["clipping"] > self.max_clipping or level["rms_dbfs"] > self.target_dbfs + self.tolerance_db:
+                break
+        gain, level = self._best(measured)
+        if abs(level["rms_dbfs"] - self.target_dbfs) > self.tolerance_db and level["rms_dbfs"] > SILENCE_DBFS:
+            # Ganho linear: cada dB de diferença é um fator 10^(dB/20) no ganho
+            estimate = int(round(gain * 10 ** ((self.target_dbfs - level["rms_dbfs"]) / 20)))
+            estimate = max(1, min(MAX_GAIN, estimate))
+            if estimate not in (g for g, _ in measured):
+                measured.append((estimate, self._measure(stage, estimate, apply)))
+                gain, level = self._best(measured)
+        success, response = apply(gain)
+        if not success:
+            raise RuntimeError(f"Modem recusou o ganho {gain} ({stage}). Resposta: {response!r}")
+        return gain, level
+
+    def _best(self, measured):
+        usable = [item for item in measured if item[1]["clipping"] <= self.max_clipping] or measured
+        return min(usable, key=lambda item: abs(item[1]["rms_dbfs"] - self.target_dbfs))
+
+    def _measure(self, stage, gain, apply):
+        success, response = apply(gain)
+        if not success:
+            raise RuntimeError(f"Modem recusou o ganho {gain} ({stage}). Resposta: {response!r}")
+        self.stream.capture.clear()
+        frames = bytearray()
+        timeout = 5 * FRAME_MS / 1000
+        for index in range(self.settle_frames + self.measure_frames):
+            frame = self.stream.read_frame(timeout)
+            if frame is None:
+                raise RuntimeError(f"Nenhum quadro capturado em {timeout}s; o Voice over USB está ativo?")
+            if index >= self.settle_frames:
+                frames += frame
+        level = summarize(self.meter.measure_blocks(frames, self.stream.frame_samples))
+        result = {"stage": stage, "gain": gain, **level}
+        self.results.append(result)
+        logger.info(f"GainCalibrator: {result}")
+        if self.on_progress:
+            self.on_progress(result)
+        return level
+
+    def _read_gains(self):
+        """:return: ((txgain, txdgain) ou None, rxgain ou None) lidos do modem."""
+        mic = rx = None
+        response = self.controller.send_at_command(AT_COMMANDS["GET_MIC_GAINS"]["command"], expected_response="+QMIC")
+        match = _QMIC_RE.search(response or "")
+        if match:
+            mic = (int(match.group(1)), int(match.group(2)))
+        response = self.controller.send_at_command(AT_COMMANDS["GET_RX_GAINS"]["command"], expected_response="+QRXGAIN")
+        match = _QRXGAIN_RE.search(response or "")
+        if match:
+            rx = int(match.group(1))
+        return mic, rx
+
+    def _restore(self, mic, rx):
+        if mic:
+            self.controller.set_mic_gains(*mic)
+        if rx is not None:
+            self.controller.set_rx_gains(rx)
+
+
+def format_table(results):
+    """Tabela de texto com cada ganho medido na calibração."""
+    lines = ["etapa  ganho   RMS dBFS  pico dBFS  clipping  piso dBFS"]
+    for r in results:
+        lines.append(f"{r['stage']:<5} {r['gain']:>6}  {r['rms_dbfs']:>8.1f}  {r['peak_dbfs']:>9.1f}  "
+                     f"{r['clipping']:>8.2%}  {r['noise_floor_dbfs']:>9.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,323 @@
+# src/modem/band_sweep.py
+import statistics
+import threading
+import time
+from concurrent.futures import Future
+
+from src.modem.at_commands import AT_COMMANDS, lte_band_mask
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Tempo máximo (s) para registrar depois de aplicar uma configuração
+DEFAULT_SETTLE_TIMEOUT = 60.0
+# Janela (s) de amostragem por configuração e intervalo (s) entre amostras
+DEFAULT_SAMPLE_WINDOW = 30.0
+DEFAULT_SAMPLE_INTERVAL = 3.0
+# Intervalo (s) de confirmação do registro pela célula servidora; URCs de registro acordam a espera antes
+REGISTRATION_POLL_INTERVAL = 1.0
+
+# Estados da célula servidora (AT+QENG="servingcell") que indicam serviço normal
+SERVING_STATES = ("NOCONN", "CONNECT")
+
+# Peso de cada métrica no score e a faixa (pior, melhor) usada para normalizá-la em 0..1.
+# Métricas ausentes (ex: CSQ 99) saem do cálculo e os pesos restantes são renormalizados.
+SCORE_WEIGHTS = {"rsrp": 0.35, "sinr": 0.30, "rsrq": 0.15, "csq": 0.10, "registration_time": 0.10}
+SCORE_RANGES = {"rsrp": (-120.0, -75.0), "sinr": (-5.0, 25.0), "rsrq": (-20.0, -5.0), "csq": (0.0, 31.0)}
+
+# O que fazer ao fim da varredura
+APPLY_BEST, APPLY_RESTORE = "best", "restore"
+
+# Modo de varredura (AT+QCFG="nwscanmode") usado pelas candidatas: só LTE
+SCAN_MODE_LTE = 3
+
+
+def make_candidate(lte_bands, scan_mode=SCAN_MODE_LTE, label=None):
+    """
+    Uma configuração a testar.
+    :param lte_bands: Bandas LTE habilitadas (ex: (3,) ou (3, 7)).
+    :param scan_mode: Modo de varredura aplicado junto (None mantém o atual).
+    """
+    lte_bands = tuple(sorted(int(band) for band in lte_bands))
+    return {
+        "label": label or "+".join(f"B{band}" for band in lte_bands),
+        "lte_bands": lte_bands,
+        "scan_mode": scan_mode,
+        "lte_mask": lte_band_mask(lte_bands),
+    }
+
+
+def parse_candidates(spec, scan_mode=SCAN_MODE_LTE):
+    """Converte "1,3,7+28" em candidatas: vírgula separa configurações, '+' combina bandas numa mesma."""
+    candidates = []
+    for item in spec.split(","):
+        item = item.strip()
+        if item:
+            candidates.append(make_candidate((band.strip().lstrip("Bb") for band in item.split("+")), scan_mode))
+    if not candidates:
+        raise ValueError(f"Nenhuma banda em '{spec}'. Use, por exemplo, 1,3,7+28.")
+    return candidates
+
+
+def candidates_from_cell_db(cell_db, scan_mode=SCAN_MODE_LTE):
+    """Uma candidata por banda LTE já vista na CellDatabase (servidoras e vizinhas)."""
+    return [make_candidate((band,), scan_mode) for band in cell_db.bands()]
+
+
+def _normalize(value, worst, best):
+    return max(0.0, min(1.0, (value - worst) / (best - worst)))
+
+
+def score_result(result, settle_timeout=DEFAULT_SETTLE_TIMEOUT):
+    """
+    Score 0..100 de um resultado: média ponderada das métricas normalizadas (SCORE_WEIGHTS/SCORE_RANGES),
+    multiplicada pela disponibilidade (fração das amostras com serviço). Sem registro, o score é 0.
+    """
+    if not result["registered"]:
+        return 0.0
+    ranges = dict(SCORE_RANGES, registration_time=(settle_timeout, 0.0))
+    total = weights = 0.0
+    for metric, weight in SCORE_WEIGHTS.items():
+        value = result.get(metric)
+        if value is None:
+            continue
+        total += weight * _normalize(value, *ranges[metric])
+        weights += weight
+    if not weights:
+        return 0.0
+    return round(100.0 * total / weights * result["availability"], 1)
+
+
+def _median(values):
+    return statistics.median(values) if values else None
+
+
+def format_table(results):
+    """Tabela de comparação em texto, da melhor para a pior configuração (a melhor marcada com '*')."""
+    header = f"  {'Configuração':<14} {'Registro':>8} {'Banda':>5} {'RSRP':>6} {'RSRQ':>5} {'SINR':>5} {'CSQ':>4} {'Disp.':>6} {'Score':>6}"
+    lines = [header, "  " + "-" * (len(header) - 2)]
+
+    def cell(value, fmt):
+        return format(value, fmt) if value is not None else "-"
+
+    ranked = sorted(results, key=lambda r: r["score"], reverse=True)
+    for position, r in enumerate(ranked):
+        marker = "*" if position == 0 and r["score"] > 0 else " "
+        registration = f"{r['registration_time']:.1f}s" if r["registered"] else "falhou"
+        lines.append(
+            f"{marker} {r['label']:<14} {registration:>8} {cell(r['band'], 'd'):>5} {cell(r['rsrp'], '.0f'):>6} "
+            f"{cell(r['rsrq'], '.0f'):>5} {cell(r['sinr'], '.0f'):>5} {cell(r['csq'], '.0f'):>4} "
+            f"{r['availability']:>6.0%} {r['score']:>6.1f}"
+        )
+    return "\n".join(lines)
+
+
+class BandSweep:
+    """
+    Varredura de travas de banda: para cada candidata, aplica o modo de varredura e a máscara LTE
+    (AT+QCFG="nwscanmode"/"band" com efeito imediato), espera o registro (acordada por URCs de registro e
+    confirmada pela célula servidora na banda esperada), amostra AT+QENG="servingcell" e AT+CSQ durante a janela
+    e calcula o score. No fim, aplica a melhor configuração ou restaura a original (também em erro/parada).
+    Roda com prioridade background, intercalando com os comandos interativos.
+    """
+
+    def __init__(self, controller, candidates, settle_timeout=DEFAULT_SETTLE_TIMEOUT, sample_window=DEFAULT_SAMPLE_WINDOW,
+                 sample_interval=DEFAULT_SAMPLE_INTERVAL, apply=APPLY_BEST, on_progress=None):
+        """
+        :param controller: ModemController conectado.
+        :param candidates: Lista de make_candidate/parse_candidates.
+        :param apply: APPLY_BEST, APPLY_RESTORE ou None (deixa a última candidata aplicada).
+        :param on_progress: Callback opcional on_progress(sweep, evento, detalhe), com evento em
+                            "candidate" (rótulo), "result" (dicionário do resultado) e "applied" (rótulo ou "original").
+        """
+        if apply not in (APPLY_BEST, APPLY_RESTORE, None):
+            raise ValueError(f"apply deve ser '{APPLY_BEST}', '{APPLY_RESTORE}' ou None, não {apply!r}.")
+        self.controller = controller
+        self.candidates = list(candidates)
+        self.settle_timeout = settle_timeout
+        self.sample_window = sample_window
+        self.sample_interval = sample_interval
+        self.apply = apply
+        self.on_progress = on_progress
+        self.results = []
+        self.original = None # {"scan_mode": int, "masks": (bandval, ltebandval, tdsbandval)}
+        self.applied = None
+        self.future = Future()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # --- Execução ---
+
+    def start(self):
+        """Roda a varredura numa thread própria; o resultado (lista ordenada) chega em self.future."""
+        self._thread = threading.Thread(target=self._run_into_future, name="BandSweep", daemon=True)
+        self._thread.start()
+        return self.future
+
+    def stop(self):
+        """Interrompe a varredura; a configuração final (melhor até agora ou original) ainda é aplicada."""
+        self._stop_event.set()
+
+    def _run_into_future(self):
+        try:
+            self.future.set_result(self.run())
+        except Exception as e:
+            logger.error(f"BandSweep: Varredura falhou: {e}", exc_info=True)
+            self.future.set_exception(e)
+
+    def run(self):
+        """
+        Executa a varredura (bloqueante).
+        :return: Resultados ordenados pelo score (melhor primeiro).
+        :raises RuntimeError: Se a configuração atual não puder ser lida (não haveria como restaurá-la).
+        """
+        with self.controller.scheduler.priority("background"):
+            self.original = self._read_configuration()
+            if self.original is None:
+                raise RuntimeError("Não foi possível ler a configuração de bandas atual; varredura não iniciada.")
+            logger.info(f"BandSweep: Configuração original {self.original}; {len(self.candidates)} candidata(s).")
+            try:
+                for candidate in self.candidates:
+                    if self._stop_event.is_set():
+                        logger.info("BandSweep: Varredura interrompida.")
+                        break
+                    self._emit("candidate", candidate["label"])
+                    result = self._evaluate(candidate)
+                    self.results.append(result)
+                    logger.info(f"BandSweep: {candidate['label']}: score {result['score']} ({result})")
+                    self._emit("result", result)
+            finally:
+                self._finish()
+        return sorted(self.results, key=lambda r: r["score"], reverse=True)
+
+    def _finish(self):
+        best = max(self.results, key=lambda r: r["score"], default=None)
+        if self.apply == APPLY_BEST and best is not None and best["score"] > 0:
+            candidate = next(c for c in self.candidates if c["label"] == best["label"])
+            ok = self._apply(candidate["scan_mode"], self._masks_for(candidate))
+            self.applied = best["label"] if ok else None
+        elif self.apply is not None:
+            ok = self._apply(self.original["scan_mode"], self.original["masks"])
+            self.applied = "original" if ok else None
+        if self.apply is not None:
+            if self.applied is None:
+                logger.error("BandSweep: Falha ao aplicar a configuração final; verifique AT+QCFG=\"band\" manualmente.")
+            else:
+                logger.info(f"BandSweep: Configuração final aplicada: {self.applied}.")
+                self._emit("applied", self.applied)
+
+    # --- Etapas ---
+
+    def _read_configuration(self):
+        masks = self.controller.get_band_masks()
+        scan_mode = self.controller.get_network_scan_mode_value()
+        if masks is None or scan_mode is None:
+            return None
+        return {"scan_mode": scan_mode, "masks": masks}
+
+    def _masks_for(self, candidate):
+        gsm_wcdma, _, tds = self.original["masks"] # Só a máscara LTE varia; as demais ficam como estavam
+        return gsm_wcdma, candidate["lte_mask"], tds
+
+    def _apply(self, scan_mode, masks):
+        if scan_mode is not None:
+            success, _ = self.controller.set_network_scan_mode(scan_mode, 1)
+            if not success:
+                return False
+        success, _ = self.controller.set_bands(*masks, effect=1)
+        return success
+
+    def _evaluate(self, candidate):
+        result = {
+            "label": candidate["label"], "lte_bands": candidate["lte_bands"], "scan_mode": candidate["scan_mode"],
+            "registered": False, "registration_time": None, "samples": 0, "availability": 0.0,
+            "band": None, "earfcn": None, "pci": None, "rsrp": None, "rsrq": None, "sinr": None, "csq": None,
+            "rsrp_stdev": None, "score": 0.0,
+        }
+        started = time.monotonic()
+        if not self._apply(candidate["scan_mode"], self._masks_for(candidate)):
+            result["error"] = "modem recusou a configuração"
+            return result
+        serving = self._wait_registered(candidate, started + self.settle_timeout)
+        if serving is None:
+            return result
+        result["registered"] = True
+        result["registration_time"] = round(time.monotonic() - started, 2)
+        result.update(self._sample_window(candidate, serving))
+        result["score"] = score_result(result, self.settle_timeout)
+        return result
+
+    def _serving_in_candidate(self, candidate):
+        """Amostra a servidora (alimentando a CellDatabase) e a devolve se houver serviço numa banda da candidata."""
+        serving = self.controller.sample_cells()["serving"]
+        if serving is None or serving["band"] not in candidate["lte_bands"]:
+            return None
+        info_state = serving.get("state")
+        if info_state is not None and info_state not in SERVING_STATES:
+            return None
+        return serving
+
+    def _wait_registered(self, candidate, deadline):
+        state = self.controller.state
+        while not self._stop_event.is_set():
+            version = state.version
+            serving = self._serving_in_candidate(candidate)
+            if serving is not None:
+                return serving
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"BandSweep: {candidate['label']}: sem registro em {self.settle_timeout}s.")
+                return None
+            state.wait_for_change(version, min(REGISTRATION_POLL_INTERVAL, remaining))
+        return None
+
+    def _sample_window(self, candidate, first_serving):
+        rsrp, rsrq, sinr, csq = [], [], [], []
+        bands = {}
+        samples = in_service = 0
+        serving = first_serving
+        window_end = time.monotonic() + self.sample_window
+        while True:
+            samples += 1
+            if serving is not None:
+                in_service += 1
+                bands[serving["band"]] = bands.get(serving["band"], 0) + 1
+                for values, key in ((rsrp, "rsrp"), (rsrq, "rsrq"), (sinr, "sinr")):
+                    if serving[key] is not None:
+                        values.append(serving[key])
+                signal = self._read_csq()
+                if signal is not None:
+                    csq.append(signal)
+            if self._stop_event.wait(self.sample_interval) or time.monotonic() >= window_end:
+                break
+            serving = self._serving_in_candidate(candidate)
+
+        band = max(bands, key=bands.get) if bands else None
+        cell = self.controller.cell_db.serving() or {}
+        return {
+            "samples": samples,
+            "availability": in_service / samples,
+            "band": band,
+            "earfcn": cell.get("earfcn"),
+            "pci": cell.get("pci"),
+            "rsrp": _median(rsrp),
+            "rsrq": _median(rsrq),
+            "sinr": _median(sinr),
+            "csq": _median(csq),
+            "rsrp_stdev": round(statistics.pstdev(rsrp), 2) if len(rsrp) > 1 else None,
+        }
+
+    def _read_csq(self):
+        response = self.controller.send_at_command(AT_COMMANDS["GET_SIGNAL_QUALITY"]["command"], expected_response="+CSQ")
+        if not response:
+            return None
+        signal = self.controller.state.get("signal") # Atualizado pela própria resposta (ModemState.apply_response)
+        return signal["rssi"] if signal and signal["rssi"] != 99 else None
+
+    def _emit(self, event, detail):
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(self, event, detail)
+        except Exception as e:
+            logger.error(f"BandSweep: Erro no callback de progresso: {e}", exc_info=True)
@@ -0,0 +1,241 @@
+# src/modem/cell_sampler.py
+import threading
+import time
+
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Faixas de EARFCN de downlink por banda LTE (3GPP TS 36.101), para vizinhas que não informam a banda
+LTE_EARFCN_BANDS = (
+    (0, 599, 1), (600, 1199, 2), (1200, 1949, 3), (1950, 2399, 4), (2400, 2649, 5),
+    (2750, 3449, 7), (3450, 3799, 8), (5010, 5179, 12), (5180, 5279, 13), (5280, 5379, 14),
+    (5730, 5849, 17), (5850, 5999, 18), (6000, 6149, 19), (6150, 6449, 20), (8040, 8689, 25),
+    (8690, 9039, 26), (9210, 9659, 28), (37750, 38249, 38), (38250, 38649, 39), (38650, 39649, 40),
+    (39650, 41589, 41), (66436, 67335, 66), (68586, 68935, 71),
+)
+
+
+def band_from_earfcn(earfcn):
+    """Banda LTE de um EARFCN de downlink (None se fora das faixas conhecidas)."""
+    for low, high, band in LTE_EARFCN_BANDS:
+        if low <= earfcn <= high:
+            return band
+    return None
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CellRecord:
+    """Uma célula vista pelo modem (servidora ou vizinha), com primeira/última observação e melhor RSRP."""
+
+    __slots__ = ("key", "rat", "mcc", "mnc", "tac", "cell_id", "earfcn", "pci", "band",
+                 "first_seen", "last_seen", "samples", "best_rsrp", "last_rsrp", "last_rsrq", "last_sinr", "serving")
+
+    def __init__(self, key, rat, band):
+        self.key = key
+        self.mcc, self.mnc, self.tac, self.cell_id, self.earfcn, self.pci = key
+        self.rat = rat
+        self.band = band
+        self.first_seen = None
+        self.last_seen = None
+        self.samples = 0
+        self.best_rsrp = None
+        self.last_rsrp = None
+        self.last_rsrq = None
+        self.last_sinr = None
+        self.serving = False
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != "key"}
+
+
+class CellDatabase:
+    """
+    Base de células indexada pela chave (MCC, MNC, TAC, cell ID, EARFCN, PCI), com índices
+    por banda e por (EARFCN, PCI). Vizinhas LTE não informam TAC nem cell ID: herdam MCC/MNC da servidora
+    e, se a célula já foi vista como servidora no mesmo PLMN e (EARFCN, PCI), são somadas ao registro dela;
+    senão ficam com None nesses campos até virarem servidoras. As consultas não tocam no modem.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells = {} # chave -> CellRecord
+        self._by_band = {} # banda -> set(chaves)
+        self._by_channel = {} # (earfcn, pci) -> set(chaves)
+        self._serving_key = None
+        self._neighbour_keys = () # Vizinhas da última amostra ("agora")
+        self.last_sample_at = None
+
+    def observe(self, serving, neighbours, ts=None):
+        """
+        Registra uma amostra.
+        :param serving: Dicionário de parse_qeng_response (ou None).
+        :param neighbours: Dicionário de parse_qeng_neighbor_response (ou None).
+        :param ts: Timestamp (time.time()) da amostra.
+        """
+        ts = time.time() if ts is None else ts
+        serving_cell = self._normalize_serving(serving) if serving else None
+        plmn = (serving_cell["mcc"], serving_cell["mnc"]) if serving_cell else (None, None)
+        neighbour_cells = self._normalize_neighbours(neighbours, plmn) if neighbours else []
+        with self._lock:
+            if serving_cell:
+                previous = self._cells.get(self._serving_key)
+                if previous is not None:
+                    previous.serving = False
+                self._serving_key = self._upsert(serving_cell, ts, serving=True)
+            self._neighbour_keys = tuple(self._upsert(cell, ts, serving=False) for cell in neighbour_cells)
+            self.last_sample_at = ts
+        return serving_cell, neighbour_cells
+
+    @staticmethod
+    def _lte_band(rat, band, earfcn):
+        if rat != "LTE":
+            return None
+        band = _int(band)
+        if band is None and earfcn is not None:
+            band = band_from_earfcn(earfcn)
+        return band
+
+    @staticmethod
+    def _normalize_serving(info):
+        rat = info.get("Network Type")
+        if rat is None:
+            return None
+        earfcn = _int(info.get("EARFCN") or info.get("Channel"))
+        band = CellDatabase._lte_band(rat, info.get("Band"), earfcn)
+        return {
+            "rat": rat,
+            "state": info.get("State"), # Só no formato EC25 (ex: NOCONN, CONNECT, LIMSRV)
+            "mcc": _int(info.get("MCC")),
+            "mnc": _int(info.get("MNC")),
+            "tac": (info.get("TAC") or info.get("LAC") or "").upper() or None,
+            "cell_id": (info.get("Cell ID") or "").upper() or None,
+            "earfcn": earfcn,
+            "pci": _int(info.get("Physical Cell ID") or info.get("BSIC")),
+            "band": band,
+            "rsrp": _int(info.get("RSRP")),
+            "rsrq": _int(info.get("RSRQ")),
+            "sinr": _int(info.get("SNR")),
+        }
+
+    @staticmethod
+    def _normalize_neighbours(info, plmn):
+        cells = info.get("Neighbor Cells")
+        if not isinstance(cells, list):
+            return []
+        result = []
+        for cell in cells:
+            rat = cell.get("Network Type")
+            earfcn = _int(cell.get("EARFCN") or cell.get("Channel"))
+            band = CellDatabase._lte_band(rat, cell.get("Band"), earfcn)
+            result.append({
+                "rat": rat,
+                "mcc": _int(cell.get("MCC")) if cell.get("MCC") else plmn[0],
+                "mnc": _int(cell.get("MNC")) if cell.get("MNC") else plmn[1],
+                "tac": (cell.get("LAC") or "").upper() or None,
+                "cell_id": (cell.get("Cell ID") or "").upper() or None,
+                "earfcn": earfcn,
+                "pci": _int(cell.get("Physical Cell ID") or cell.get("BSIC")),
+                "band": band,
+                "rsrp": _int(cell.get("RSRP")),
+                "rsrq": _int(cell.get("RSRQ")),
+                "sinr": _int(cell.get("SNR")),
+            })
+        return result
+
+    def _resolve_key(self, cell):
+        """Chave da célula; uma vizinha sem TAC/cell ID usa a da servidora já vista no mesmo PLMN e canal."""
+        key = (cell["mcc"], cell["mnc"], cell["tac"], cell["cell_id"], cell["earfcn"], cell["pci"])
+        if key[2:4] != (None, None) or None in key[4:]:
+            return key
+        known = [self._cells[k] for k in self._by_channel.get(key[4:], ()) if k[:2] == key[:2] and k[2:4] != (None, None)]
+        if not known:
+            return key
+        return max(known, key=lambda r: r.last_seen).key # PCI reutilizado: a vista mais recentemente
+
+    def _absorb(self, record, partial_key):
+        """Soma ao registro completo o das observações anteriores como vizinha (sem TAC/cell ID)."""
+        partial = self._cells.pop(partial_key)
+        self._by_band.get(partial.band, set()).discard(partial_key)
+        self._by_channel.get((partial.earfcn, partial.pci), set()).discard(partial_key)
+        record.first_seen = min(record.first_seen, partial.first_seen)
+        record.samples += partial.samples
+        if partial.best_rsrp is not None and (record.best_rsrp is None or partial.best_rsrp > record.best_rsrp):
+            record.best_rsrp = partial.best_rsrp
+        self._neighbour_keys = tuple(record.key if k == partial_key else k for k in self._neighbour_keys)
+
+    def _upsert(self, cell, ts, serving):
+        key = self._resolve_key(cell)
+        record = self._cells.get(key)
+        if record is None:
+            record = self._cells[key] = CellRecord(key, cell["rat"], cell["band"])
+            record.first_seen = ts
+            if record.band is not None:
+                self._by_band.setdefault(record.band, set()).add(key)
+            self._by_channel.setdefault((record.earfcn, record.pci), set()).add(key)
+            partial_key = key[:2] + (None, None) + key[4:]
+            if partial_key != key and partial_key in self._cells:
+                self._absorb(record, partial_key)
+        record.last_seen = ts
+        record.samples += 1
+        record.serving = serving or key == self._serving_key # Servidora também listada como vizinha
+        rsrp = cell["rsrp"]
+        record.last_rsrp, record.last_rsrq, record.last_sinr = rsrp, cell["rsrq"], cell["sinr"]
+        if rsrp is not None and (record.best_rsrp is None or rsrp > record.best_rsrp):
+            record.best_rsrp = rsrp
+        return key
+
+    # --- Consultas (sem tocar no modem) ---
+
+    def get(self, key):
+        with self._lock:
+            record = self._cells.get(key)
+            return record.as_dict() if record else None
+
+    def serving(self):
+        """Célula servidora da última amostra (ou None)."""
+        with self._lock:
+            record = self._cells.get(self._serving_key)
+            return record.as_dict() if record else None
+
+    def strongest_neighbours(self, count=5):
+        """As vizinhas da última amostra, ordenadas pelo RSRP atual (mais forte primeiro)."""
+        with self._lock:
+            records = [self._cells[key] for key in self._neighbour_keys]
+            records.sort(key=lambda r: r.last_rsrp if r.last_rsrp is not None else -999, reverse=True)
+            return [r.as_dict() for r in records[:count]]
+
+    def cells_in_band(self, band):
+        """Todas as células já vistas na banda, ordenadas pelo melhor RSRP."""
+        with self._lock:
+            records = [self._cells[key] for key in self._by_band.get(int(band), ())]
+            records.sort(key=lambda r: r.best_rsrp if r.best_rsrp is not None else -999, reverse=True)
+            return [r.as_dict() for r in records]
+
+    def cells_on_channel(self, earfcn, pci=None):
+        """Células vistas num EARFCN (e PCI, se informado)."""
+        with self._lock:
+            if pci is not None:
+                keys = self._by_channel.get((int(earfcn), int(pci)), ())
+            else:
+                keys = [k for (ch, _), ks in self._by_channel.items() if ch == int(earfcn) for k in ks]
+            return [self._cells[key].as_dict() for key in keys]
+
+    def bands(self):
+        """Bandas já vistas -> número de células."""
+        with self._lock:
+            return {band: len(keys) for band, keys in sorted(self._by_band.items())}
+
+    def __len__(self):
+        return len(self._cells)
+
+    def snapshot(self):
+        with self._lock:
+            return [record.as_dict() for record in self._cells.values()]
+
@@ -0,0 +1,136 @@
+# src/modem/command_handle.py
+import threading
+import time
+from concurrent.futures import Future
+
+from src.modem.command_metrics import command_name_of
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Caractere de aborto: nos modems Quectel qualquer caractere interrompe um comando abortável;
+# ESC também cancela o prompt '>' (ex: AT+CMGS) sem enviar nada.
+ABORT_CHARACTER = b'\x1b'
+
+# Comandos que o modem aceita interromper (nome normalizado por command_name_of)
+ABORTABLE_COMMANDS = frozenset({
+    "ATD", "ATA",
+    "AT+COPS=?", "AT+COPS=",
+    "AT+CGATT=", "AT+CGACT=",
+    "AT+QIACT=", "AT+QIDEACT=",
+    "AT+CMGS=", "AT+CMGW=", "AT+QISEND=", # Prompt '>': cancelado pelo ESC
+})
+
+# Tempo (s) para o modem confirmar o aborto antes da resposta ser abandonada
+ABORT_GRACE = 2.0
+
+# Estados de um handle
+QUEUED, RUNNING, COMPLETED, TIMEOUT, CANCELLED = "queued", "running", "completed", "timeout", "cancelled"
+
+
+def is_abortable(command):
+    return command_name_of(command) in ABORTABLE_COMMANDS
+
+
+class CommandCancelled(Exception):
+    """Levantada por CommandHandle.result() quando o comando foi cancelado."""
+
+
+class CommandHandle:
+    """
+    Um comando AT em andamento (ou na fila): permite cancelar, acompanhar o progresso e esperar o resultado.
+    Callbacks de progresso recebem (handle, evento, detalhe), com evento em
+    "queued", "started" (deadline em s), "data" (bytes recebidos até agora) e "done" (estado final),
+    e rodam na thread que executa a transação.
+    """
+
+    def __init__(self, command, timeout, priority=None):
+        self.command = command
+        self.timeout = timeout # Timeout pedido; o deadline efetivo vem no evento "started"
+        self.priority = priority
+        self.state = QUEUED
+        self.future = Future()
+        self.bytes_received = 0
+        self.created_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<CommandHandle {self.command!r} {self.state}>"
+
+    # --- API pública ---
+
+    def add_progress_callback(self, callback):
+        """Registra callback(handle, evento, detalhe). Se o comando já terminou, recebe "done" na hora."""
+        with self._lock:
+            finished = self.future.done()
+            if not finished:
+                self._callbacks.append(callback)
+        if finished:
+            self._call(callback, "done", self.state)
+
+    def cancel(self):
+        """
+        Pede o cancelamento. Na fila: o comando não chega a ser enviado.
+        Em andamento: envia o caractere de aborto (comandos abortáveis) ou abandona a resposta.
+        :return: False se o comando já tinha terminado.
+        """
+        if self.future.done():
+            return False
+        self._cancel_event.set()
+        logger.info(f"CommandHandle: Cancelamento pedido para '{self.command}' ({self.state}).")
+        return True
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """
+        Espera o resultado: a resposta do modem, ou None em timeout.
+        :raises CommandCancelled: Se o comando foi cancelado.
+        """
+        return self.future.result(timeout)
+
+    # --- Usado pelo ModemController ---
+
+    def _start(self, deadline):
+        self.state = RUNNING
+        self.started_at = time.perf_counter()
+        self._emit("started", deadline)
+
+    def _progress(self, bytes_received):
+        if bytes_received != self.bytes_received:
+            self.bytes_received = bytes_received
+            self._emit("data", bytes_received)
+
+    def _finish(self, response):
+        """Define o estado final e completa o future (idempotente)."""
+        if self.future.done():
+            return
+        self.finished_at = time.perf_counter()
+        if self.cancel_requested:
+            self.state = CANCELLED
+            self.future.set_exception(CommandCancelled(f"Comando '{self.command}' cancelado."))
+        else:
+            self.state = COMPLETED if response is not None else TIMEOUT
+            self.future.set_result(response)
+        self._emit("done", self.state)
+
+    def _emit(self, event, detail=None):
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            self._call(callback, event, detail)
+
+    def _call(self, callback, event, detail):
+        try:
+            callback(self, event, detail)
+        except Exception as e:
+            logger.error(f"CommandHandle: Erro no callback de progresso de '{self.command}': {e}", exc_info=True)
@@ -0,0 +1,282 @@
+# src/modem/command_metrics.py
+import re
+import threading
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Limites (em segundos) dos buckets exportados no formato Prometheus
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0)
+
+# Quantis exportados a partir dos histogramas
+PROMETHEUS_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+# Nome do comando para agrupamento: prefixo AT + sufixo de tipo ("?", "=?", "="), sem argumentos.
+# Ex: 'AT+CMGR=3' -> 'AT+CMGR=', 'AT+CREG?' -> 'AT+CREG?', 'ATD123;' -> 'ATD'
+_COMMAND_NAME_RE = re.compile(r'^(AT(?:[+$&%^][A-Z0-9]+|[A-Z&]))(=\?|\?|=)?', re.IGNORECASE)
+_CME_ERROR_RE = re.compile(r'\+(CME|CMS) ERROR:\s*(?P<code>[^\r\n]+)')
+
+
+def command_name_of(command):
+    """Normaliza um comando AT completo no nome usado nas métricas."""
+    command = command.strip()
+    match = _COMMAND_NAME_RE.match(command)
+    if not match:
+        return command.split('=')[0].upper()[:32] or "?"
+    return (match.group(1) + (match.group(2) or "")).upper()
+
+
+def classify_outcome(response):
+    """
+    Classifica o resultado de um comando.
+    :return: Tupla (outcome, code): outcome é "ok", "error", "timeout", "cme_error" ou "cms_error";
+             code é o código do +CME/+CMS ERROR (ou "").
+    """
+    if response is None:
+        return "timeout", ""
+    match = _CME_ERROR_RE.search(response)
+    if match:
+        return f"{match.group(1).lower()}_error", match.group("code").strip()
+    if "ERROR" in response:
+        return "error", ""
+    return "ok", ""
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências no estilo HDR: buckets log-lineares em microssegundos com
+    2 dígitos significativos de precisão (erro relativo < 1%) e memória fixa.
+    """
+
+    SUB_BUCKET_BITS = 8 # 256 sub-buckets: 2 dígitos significativos
+    SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+    SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+    def __init__(self, highest_seconds=3600):
+        self.highest = int(highest_seconds * 1e6)
+        self.counts = array('Q', bytes(8 * (self._index_of(self.highest) + 1)))
+        self.count = 0
+        self.total = 0.0 # Soma em segundos
+        self.min = None
+        self.max = None
+
+    def _index_of(self, value_us):
+        if value_us < self.SUB_BUCKET_COUNT:
+            return value_us
+        shift = value_us.bit_length() - self.SUB_BUCKET_BITS
+        return self.SUB_BUCKET_COUNT + (shift - 1) * self.SUB_BUCKET_HALF + ((value_us >> shift) - self.SUB_BUCKET_HALF)
+
+    def _value_range(self, index):
+        """Retorna (menor, maior) valor em microssegundos representado pelo bucket."""
+        if index < self.SUB_BUCKET_COUNT:
+            return index, index
+        shift = (index - self.SUB_BUCKET_COUNT) // self.SUB_BUCKET_HALF + 1
+        sub = (index - self.SUB_BUCKET_COUNT) % self.SUB_BUCKET_HALF + self.SUB_BUCKET_HALF
+        low = sub << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, seconds):
+        value_us = min(max(int(seconds * 1e6), 0), self.highest)
+        self.counts[self._index_of(value_us)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, quantile):
+        """Retorna o valor (s) no quantil pedido (0..1), ou None se vazio."""
+        if not self.count:
+            return None
+        target = max(1, int(round(quantile * self.count)))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count:
+                seen += bucket_count
+                if seen >= target:
+                    return min(self._value_range(index)[1] / 1e6, self.max)
+        return self.max
+
+    def count_at_or_below(self, seconds):
+        """Quantidade de amostras <= seconds (resolução do bucket)."""
+        limit = self._index_of(min(int(seconds * 1e6), self.highest))
+        return sum(self.counts[:limit + 1])
+
+    def halve(self):
+        """Divide as contagens por dois (decaimento): amostras antigas perdem peso para as novas."""
+        if not self.count:
+            return
+        previous = self.count
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count:
+                self.counts[index] = bucket_count - bucket_count // 2
+        self.count = sum(self.counts)
+        self.total *= self.count / previous
+
+    def to_dict(self):
+        """Forma esparsa serializável em JSON (buckets não vazios)."""
+        return {
+            "buckets": {str(i): c for i, c in enumerate(self.counts) if c},
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data, highest_seconds=3600):
+        hist = cls(highest_seconds)
+        for index, bucket_count in data.get("buckets", {}).items():
+            index = int(index)
+            if 0 <= index < len(hist.counts):
+                hist.counts[index] = int(bucket_count)
+        hist.count = sum(hist.counts)
+        hist.total = float(data.get("total", 0.0))
+        hist.min = data.get("min")
+        hist.max = data.get("max")
+        return hist
+
+
+class _CommandStats:
+    def __init__(self):
+        self.ttfb = LatencyHistogram()
+        self.total = LatencyHistogram()
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.outcomes = {} # (outcome, code) -> contagem
+
+
+class CommandMetrics:
+    """
+    Registro thread-safe de métricas por nome de comando AT: tempo até o primeiro byte,
+    tempo até o resultado final, bytes enviados/recebidos e resultado (OK, ERROR, timeout, +CME/+CMS).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands = {}
+
+    def record(self, command, total, ttfb=None, bytes_out=0, bytes_in=0, response=None):
+        """
+        Registra uma transação.
+        :param command: Comando AT enviado (normalizado por command_name_of).
+        :param total: Segundos até o resultado final (ou até o timeout).
+        :param ttfb: Segundos até o primeiro byte da resposta (None se nada chegou).
+        :param response: Resposta final (None = timeout), usada para classificar o resultado.
+        """
+        name = command_name_of(command)
+        outcome = classify_outcome(response)
+        with self._lock:
+            stats = self._commands.get(name)
+            if stats is None:
+                stats = self._commands[name] = _CommandStats()
+            stats.total.record(total)
+            if ttfb is not None:
+                stats.ttfb.record(ttfb)
+            stats.bytes_out += bytes_out
+            stats.bytes_in += bytes_in
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+
+    def summary(self):
+        """Resumo por comando: contagem, p50/p99 do total e do TTFB, bytes e resultados."""
+        with self._lock:
+            return {
+                name: {
+                    "count": stats.total.count,
+                    "total_p50": stats.total.percentile(0.5),
+                    "total_p99": stats.total.percentile(0.99),
+                    "ttfb_p50": stats.ttfb.percentile(0.5),
+                    "ttfb_p99": stats.ttfb.percentile(0.99),
+                    "time_spent": stats.total.total,
+                    "bytes_out": stats.bytes_out,
+                    "bytes_in": stats.bytes_in,
+                    "outcomes": {f"{o}:{c}" if c else o: n for (o, c), n in stats.outcomes.items()},
+                }
+                for name, stats in self._commands.items()
+            }
+
+    def render_prometheus(self):
+        """Exporta todas as métricas no formato de texto do Prometheus."""
+        lines = []
+        with self._lock:
+            commands = sorted(self._commands.items())
+            for metric, attr, help_text in (
+                ("modem_at_command_duration_seconds", "total", "Tempo do envio ao resultado final do comando AT."),
+                ("modem_at_command_ttfb_seconds", "ttfb", "Tempo do envio ao primeiro byte da resposta."),
+            ):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for name, stats in commands:
+                    hist = getattr(stats, attr)
+                    label = f'command="{_escape_label(name)}"'
+                    for bound in PROMETHEUS_BUCKETS:
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {hist.count_at_or_below(bound)}')
+                    lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {hist.count}')
+                    lines.append(f"{metric}_sum{{{label}}} {hist.total:.6f}")
+                    lines.append(f"{metric}_count{{{label}}} {hist.count}")
+
+            lines.append("# HELP modem_at_command_duration_quantile_seconds Quantis (HDR) do tempo até o resultado final.")
+            lines.append("# TYPE modem_at_command_duration_quantile_seconds gauge")
+            for name, stats in commands:
+                for quantile in PROMETHEUS_QUANTILES:
+                    value = stats.total.percentile(quantile)
+                    if value is not None:
+                        lines.append(f'modem_at_command_duration_quantile_seconds{{command="{_escape_label(name)}",quantile="{quantile}"}} {value:.6f}')
+
+            for metric, attr, help_text in (
+                ("modem_at_command_bytes_out_total", "bytes_out", "Bytes enviados ao modem."),
+                ("modem_at_command_bytes_in_total", "bytes_in", "Bytes recebidos do modem em respostas."),
+            ):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for name, stats in commands:
+                    lines.append(f'{metric}{{command="{_escape_label(name)}"}} {getattr(stats, attr)}')
+
+            lines.append("# HELP modem_at_command_results_total Resultados dos comandos AT.")
+            lines.append("# TYPE modem_at_command_results_total counter")
+            for name, stats in commands:
+                for (outcome, code), count in sorted(stats.outcomes.items()):
+                    lines.append(
+                        f'modem_at_command_results_total{{command="{_escape_label(name)}",outcome="{outcome}",code="{_escape_label(code)}"}} {count}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Registro compartilhado por todos os ModemController do processo
+default_command_metrics = CommandMetrics()
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.command_metrics.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("MetricsServer: " + format, *args)
+
+
+def start_metrics_server(port=9464, host="127.0.0.1", command_metrics=None):
+    """
+    Publica as métricas em http://<host>:<port>/metrics numa thread em segundo plano.
+    Por padrão escuta apenas em localhost.
+    :return: O servidor (use server.shutdown() para parar).
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    server.daemon_threads = True
+    server.command_metrics = command_metrics or default_command_metrics
+    thread = threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True)
+    thread.start()
+    logger.info(f"MetricsServer: Métricas disponíveis em http://{host}:{server.server_port}/metrics")
+    return server
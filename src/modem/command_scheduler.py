@@ -0,0 +1,157 @@
+# src/modem/command_scheduler.py
+import contextlib
+import itertools
+import threading
+import time
+
+from src.modem.command_metrics import LatencyHistogram
+from src.utils.tracing import tracer
+
+# Classes de prioridade (menor = mais urgente)
+PRIORITY_CLASSES = {
+    "interactive": 0, # Cliques do usuário, comandos digitados
+    "normal": 1,      # Padrão para chamadas sem contexto
+    "background": 2,  # Pollers, sumário, leituras longas
+}
+DEFAULT_PRIORITY = "normal"
+
+# Classe de prioridade dos métodos do ModemController quando disparados pela GUI (o resto é "interactive")
+COMMAND_PRIORITIES = {
+    "get_modem_summary": "background",
+    "read_all_sms": "background",
+    "read_all_sms_messages": "background",
+    "delete_all_sms": "background",
+    "activate_pdp_context": "background",
+    "deactivate_pdp_context": "background",
+    "get_gps_location": "background",
+    "scan_operators": "background",
+    "register_operator": "normal",
+    "register_automatic": "normal",
+}
+
+
+def priority_for(func):
+    """Classe de prioridade de um método do ModemController (pelo nome)."""
+    return COMMAND_PRIORITIES.get(getattr(func, "__name__", ""), "interactive")
+
+
+class _Ticket:
+    __slots__ = ("seq", "rank", "priority", "enqueued_at", "thread")
+
+    def __init__(self, seq, priority):
+        self.seq = seq
+        self.priority = priority
+        self.rank = PRIORITY_CLASSES[priority]
+        self.enqueued_at = time.perf_counter()
+        self.thread = threading.get_ident()
+
+
+class _ClassStats:
+    def __init__(self):
+        self.wait = LatencyHistogram()
+        self.waiting = 0
+
+
+class CommandScheduler:
+    """
+    Lock do canal serial com prioridade: cada transação pede um slot, e quando o slot
+    é liberado ele vai para o pedido de melhor classe (interactive > normal > background).
+    Pedidos que esperam ganham uma classe a cada aging_interval segundos (envelhecimento),
+    o que evita inanição sem nunca passar à frente de um pedido interativo.
+    O slot é reentrante para a thread que o possui (transações de vários comandos).
+    """
+
+    def __init__(self, aging_interval=2.0):
+        """
+        :param aging_interval: Segundos de espera para um pedido subir uma classe.
+        """
+        self.aging_interval = aging_interval
+        self._cond = threading.Condition(threading.Lock())
+        self._waiting = []
+        self._owner = None
+        self._depth = 0
+        self._seq = itertools.count()
+        self._local = threading.local()
+        self._stats = {name: _ClassStats() for name in PRIORITY_CLASSES}
+
+    # --- Contexto de prioridade da thread ---
+
+    def current_priority(self):
+        return getattr(self._local, "priority", DEFAULT_PRIORITY)
+
+    @contextlib.contextmanager
+    def priority(self, priority):
+        """Define a classe de prioridade dos slots pedidos por esta thread dentro do bloco."""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Classe de prioridade desconhecida: '{priority}'. Use: {', '.join(PRIORITY_CLASSES)}")
+        previous = self.current_priority()
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    # --- Slot ---
+
+    def _effective_rank(self, ticket, now):
+        aged = int((now - ticket.enqueued_at) / self.aging_interval) if self.aging_interval else 0
+        return max(0, ticket.rank - aged)
+
+    def _next_ticket(self):
+        now = time.perf_counter()
+        return min(self._waiting, key=lambda t: (self._effective_rank(t, now), t.rank, t.seq))
+
+    def acquire(self, priority=None):
+        """Espera pelo slot. Reentrante para a thread que já o possui."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                return
+            ticket = _Ticket(next(self._seq), priority or self.current_priority())
+            stats = self._stats[ticket.priority]
+            self._waiting.append(ticket)
+            stats.waiting += 1
+            while self._owner is not None or self._next_ticket() is not ticket:
+                self._cond.wait()
+            self._waiting.remove(ticket)
+            stats.waiting -= 1
+            self._owner = me
+            self._depth = 1
+            granted_at = time.perf_counter()
+            stats.wait.record(granted_at - ticket.enqueued_at)
+        tracer.complete("slot_wait", ticket.enqueued_at, granted_at, "scheduler", priority=ticket.priority)
+
+    def release(self):
+        with self._cond:
+            if self._owner != threading.get_ident():
+                raise RuntimeError("CommandScheduler: release() por uma thread que não possui o slot.")
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, priority=None):
+        """Segura o slot serial durante o bloco (use em transações de vários comandos)."""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    # --- Métricas ---
+
+    def get_stats(self):
+        """Por classe: pedidos esperando, slots concedidos e espera pelo slot (s): média/p99/máxima."""
+        with self._cond:
+            return {
+                name: {
+                    "waiting": stats.waiting,
+                    "granted": stats.wait.count,
+                    "avg_wait": stats.wait.total / stats.wait.count if stats.wait.count else 0.0,
+                    "p99_wait": stats.wait.percentile(0.99) or 0.0,
+                    "max_wait": stats.wait.max or 0.0,
+                }
+                for name, stats in self._stats.items()
+            }
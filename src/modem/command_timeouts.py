@@ -0,0 +1,225 @@
+# src/modem/command_timeouts.py
+import atexit
+import json
+import os
+import threading
+
+from src.modem.command_metrics import LatencyHistogram
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Arquivo de persistência dos histogramas. MODEM_TIMEOUTS_FILE="" desativa a persistência.
+DEFAULT_TIMEOUTS_FILE = os.path.join(os.path.expanduser("~"), ".modem_controller", "command_timeouts.json")
+# Versão do formato do arquivo (v1 agrupava comandos pelo nome, sem argumentos: descartado ao carregar)
+FILE_VERSION = 2
+
+# Timeouts consecutivos (em qualquer comando) para considerar o modem sem resposta
+UNRESPONSIVE_AFTER = 3
+# Transferências cuja duração depende do volume de dados: ficam sempre com o timeout de quem chamou
+VOLUME_BOUND_COMMANDS = ("AT+QFUPL", "AT+QFDWL", "AT+QFREAD", "AT+QFWRITE", "AT+QHTTPREAD", "AT+QHTTPPOST")
+# Histogramas por modem: comandos com argumentos variáveis além deste limite ficam com o timeout fixo
+MAX_COMMAND_BUCKETS = 256
+
+
+class _TimeoutStats:
+    def __init__(self, hist=None):
+        self.latency = hist or LatencyHistogram() # Só respostas recebidas (timeouts não entram)
+        self.timeouts = 0
+        self.streak = 0 # Timeouts seguidos deste comando
+        self.last_deadline = None
+
+
+class CommandTimeouts:
+    """
+    Deadlines adaptativos por modem e por comando AT (com os argumentos: AT+CGACT=1,1 e AT+CGACT=0,1 têm
+    histogramas separados): p99 da latência observada × factor, limitado a [min_timeout, max_timeout].
+    Enquanto um comando tem menos de min_samples amostras, vale o timeout fixo de quem chamou. Depois de
+    um timeout, a próxima tentativa usa pelo menos o timeout fixo (e o dobro do deadline anterior), para
+    não cortar de novo um comando lento legítimo. O timeout padrão do controller é trocado pelo deadline
+    adaptativo (encurta ou alonga); um timeout explícito só é alongado: vale max(explícito, p99 × factor),
+    e dobra a cada timeout seguido (ex: uma busca de operadoras mais lenta que os 180 s pedidos).
+    Os histogramas podem ser persistidos em JSON e decaem (contagens divididas por dois) a cada max_samples.
+    """
+
+    def __init__(self, path=None, factor=3.0, min_timeout=1.0, max_timeout=300.0, min_samples=20, max_samples=2000):
+        """
+        :param path: Arquivo JSON de persistência (None = só em memória).
+        :param factor: Multiplicador aplicado ao p99 observado.
+        :param min_timeout: Menor deadline adaptativo (s).
+        :param max_timeout: Maior deadline adaptativo (s).
+        :param min_samples: Amostras necessárias antes de adaptar o deadline de um comando.
+        :param max_samples: Ao atingir esse número de amostras, o histograma decai pela metade.
+        """
+        self.path = path
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._stats = {} # (modem_id, comando com argumentos) -> _TimeoutStats
+        self._consecutive_timeouts = {} # modem_id -> timeouts seguidos
+        self._loaded = False
+        self._dirty = False
+
+    @staticmethod
+    def _adaptable(command):
+        # Só comandos AT; dados enviados após um prompt (ex: texto do SMS) ficam com o timeout fixo
+        command = command.strip().upper()
+        return command[:2] == "AT" and not command.startswith(VOLUME_BOUND_COMMANDS)
+
+    @staticmethod
+    def _key(command):
+        return command.strip()
+
+    def _get(self, modem_id, key):
+        """:return: _TimeoutStats do comando, ou None se o modem já atingiu MAX_COMMAND_BUCKETS."""
+        stats = self._stats.get((modem_id, key))
+        if stats is None:
+            if sum(1 for stats_modem, _ in self._stats if stats_modem == modem_id) >= MAX_COMMAND_BUCKETS:
+                return None
+            stats = self._stats[(modem_id, key)] = _TimeoutStats()
+        return stats
+
+    def _adaptive(self, stats):
+        if stats.latency.count < self.min_samples:
+            return None
+        p99 = stats.latency.percentile(0.99)
+        return min(max(p99 * self.factor, self.min_timeout), self.max_timeout)
+
+    def deadline(self, modem_id, command, fallback, explicit=False):
+        """
+        Retorna o deadline (s) para o comando.
+        :param modem_id: Identificação do modem (modelo/revisão ou porta).
+        :param fallback: Timeout fixo de quem chamou, usado até haver amostras suficientes.
+        :param explicit: True se fallback foi pedido explicitamente: o deadline nunca fica abaixo dele.
+        """
+        if not self._adaptable(command):
+            return fallback
+        self._ensure_loaded()
+        with self._lock:
+            stats = self._get(modem_id, self._key(command))
+            if stats is None:
+                return fallback
+            adaptive = self._adaptive(stats)
+            if adaptive is None and not (explicit and stats.streak):
+                deadline = fallback
+            elif stats.streak:
+                # Depois de um timeout: recua para o fixo e dobra a cada timeout seguido
+                base = fallback if adaptive is None else adaptive
+                deadline = min(max(fallback, base * (2 ** stats.streak)), max(fallback, self.max_timeout))
+            elif explicit:
+                deadline = max(fallback, adaptive) # Timeout explícito: só alonga
+            else:
+                deadline = adaptive
+            stats.last_deadline = deadline
+            return deadline
+
+    def observe(self, modem_id, command, elapsed, response):
+        """
+        Registra o resultado de uma transação.
+        :param elapsed: Segundos do envio ao resultado final (ou ao timeout).
+        :param response: Resposta final (None = timeout).
+        """
+        if not self._adaptable(command):
+            return
+        self._ensure_loaded()
+        with self._lock:
+            stats = self._get(modem_id, self._key(command))
+            if stats is None:
+                return
+            if response is None:
+                stats.timeouts += 1
+                stats.streak += 1
+                streak = self._consecutive_timeouts.get(modem_id, 0) + 1
+                self._consecutive_timeouts[modem_id] = streak
+                if streak == UNRESPONSIVE_AFTER:
+                    logger.warning(f"CommandTimeouts: {streak} timeouts seguidos; modem '{modem_id}' parece travado.")
+                return
+            stats.streak = 0
+            self._consecutive_timeouts[modem_id] = 0
+            stats.latency.record(elapsed)
+            if stats.latency.count >= self.max_samples:
+                stats.latency.halve()
+            self._dirty = True
+
+    def is_unresponsive(self, modem_id):
+        """True se os últimos UNRESPONSIVE_AFTER comandos do modem terminaram em timeout."""
+        with self._lock:
+            return self._consecutive_timeouts.get(modem_id, 0) >= UNRESPONSIVE_AFTER
+
+    # --- Persistência ---
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.path or not os.path.exists(self.path):
+                return
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") != FILE_VERSION:
+                    logger.info(f"CommandTimeouts: '{self.path}' está num formato antigo; começando do zero.")
+                    return
+                for modem_id, commands in data.get("modems", {}).items():
+                    for name, hist_data in commands.items():
+                        self._stats[(modem_id, name)] = _TimeoutStats(LatencyHistogram.from_dict(hist_data))
+                logger.info(f"CommandTimeouts: {len(self._stats)} histograma(s) carregado(s) de '{self.path}'.")
+            except (OSError, ValueError, AttributeError) as e:
+                logger.warning(f"CommandTimeouts: Falha ao carregar '{self.path}': {e}. Começando do zero.")
+
+    def save(self):
+        """Grava os histogramas (escrita atômica). Sem efeito se não houver path ou nada mudou."""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            modems = {}
+            for (modem_id, name), stats in self._stats.items():
+                if stats.latency.count:
+                    modems.setdefault(modem_id, {})[name] = stats.latency.to_dict()
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": FILE_VERSION, "modems": modems}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"CommandTimeouts: Falha ao gravar '{self.path}': {e}")
+
+    # --- Estatísticas ---
+
+    def get_stats(self, modem_id=None):
+        """Por comando: amostras, p99 observado, deadline adaptativo, último deadline usado e timeouts."""
+        self._ensure_loaded()
+        with self._lock:
+            result = {}
+            for (stats_modem, name), stats in self._stats.items():
+                if modem_id is not None and stats_modem != modem_id:
+                    continue
+                result.setdefault(stats_modem, {})[name] = {
+                    "samples": stats.latency.count,
+                    "p99": stats.latency.percentile(0.99),
+                    "adaptive_deadline": self._adaptive(stats),
+                    "last_deadline": stats.last_deadline,
+                    "timeouts": stats.timeouts,
+                }
+            return result
+
+
+def _default_path():
+    path = os.environ.get("MODEM_TIMEOUTS_FILE")
+    if path is None:
+        return DEFAULT_TIMEOUTS_FILE
+    return path or None
+
+
+# Deadlines compartilhados pelos ModemController que optarem por eles (a GUI e --adaptive-timeouts),
+# gravados ao sair em MODEM_TIMEOUTS_FILE (padrão: DEFAULT_TIMEOUTS_FILE)
+default_command_timeouts = CommandTimeouts(path=_default_path())
+atexit.register(default_command_timeouts.save)
@@ -1,36 +1,110 @@
 # src/modem/controller.py
+import codecs
+import contextlib
 import serial
 import time
 import threading
 import re
 import datetime
-import PySimpleGUI as sg 
+import logging
 
 # Importações de módulos internos do projeto
-from src.modem.at_commands import AT_COMMANDS # AGORA IMPORTA DE at_commands.py
-from src.utils.threading_utils import gui_update_event 
-from src.logger.logger import setup_logger
+from src.modem.at_commands import (
+    AT_COMMANDS, parse_band_config_values, parse_network_reg_status_response, parse_network_scan_mode_value,
+    parse_operator_scan_response, parse_signal_quality_response,
+)
+from src.modem.modem_state import ModemState
+from src.modem.urc_dispatcher import UrcDispatcher
+from src.modem.command_metrics import default_command_metrics
+from src.modem.command_scheduler import CommandScheduler
+from src.modem.command_handle import ABORT_CHARACTER, ABORT_GRACE, CommandHandle, is_abortable
+from src.modem.cell_sampler import CellDatabase
+from src.modem.operator_scan import (
+    OPERATOR_REGISTER_TIMEOUT, OPERATOR_SCAN_TIMEOUT, OperatorScanCache, OperatorScanJob, location_key,
+)
+from src.modem.sockets import ModemSocketManager
+from src.modem.http_client import HttpClient
+from src.modem.file_transfer import FileTransfer
+from src.modem.voice_pcm import VoiceOverUsb
+from src.modem.data_mode import DataModeSession
+from src.modem.urc_profiles import DEFAULT_URC_PROFILE, resolve_urc_profile, verify_subscription
+from src.logger.logger import RAW_TRACE_LOGGER, setup_logger
+from src.utils.threading_utils import default_executor
+from src.utils.tracing import tracer
+
+# Códigos de resultado final que encerram a resposta de um comando (SEND OK/FAIL: AT+QISEND)
+_FINAL_RESULT_RE = re.compile(r'\r\n(?:OK|ERROR|SEND OK|SEND FAIL|\+CM[ES] ERROR:[^\r\n]*)\r\n')
+# URCs que nunca fazem parte da resposta de um comando: extraídos mesmo quando chegam no meio de uma
+_ASYNC_ONLY_URCS = ("QIURC", "QIOPEN", "QHTTPGET", "QHTTPPOST", "QHTTPREAD", "QHTTPREADFILE")
+_ASYNC_ONLY_PREFIXES = ("+QI", "+QHTTP")
+# Tamanho das fatias (memoryview) em que o payload de um comando com prompt ('>' ou CONNECT) é escrito
+PAYLOAD_WRITE_CHUNK = 1024
+# Tempo máximo (s) para o modem voltar a responder AT ao ressincronizar depois do modo de dados
+RESYNC_TIMEOUT = 5
+# Timeout (s) de comandos enviados sem timeout explícito; só ele pode ser encurtado pelo deadline adaptativo
+DEFAULT_COMMAND_TIMEOUT = 5
+# Sondas de sincronização após um comando abandonado: (comando, prefixo que identifica a resposta dele).
+# Usa-se a primeira que não seja o próprio comando abandonado.
+SYNC_PROBES = (("AT+CSQ", "+CSQ:"), ("AT+IPR?", "+IPR:"))
 
 # Configura o logger para este módulo
 logger = setup_logger(__name__)
+# Trace dos bytes brutos lidos da serial (portão desligado por padrão, ver src/logger/logger.py)
+raw_logger = setup_logger(RAW_TRACE_LOGGER)
 
 class ModemController:
     """
     Gerencia a comunicação serial com o modem Quectel, enviando comandos AT
     e processando as respostas.
     """
-    def __init__(self, port=None, baudrate=115200, timeout=1):
+    def __init__(self, port=None, baudrate=115200, timeout=1, metrics_store=None, urc_profile=DEFAULT_URC_PROFILE,
+                 command_metrics=default_command_metrics, command_timeouts=None, serial_factory=serial.Serial, rtscts=False):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.serial_port = None
+        self.serial_factory = serial_factory # Construtor da porta (serial.Serial ou SimulatedModem.open_serial)
+        self.rtscts = rtscts # Controle de fluxo RTS/CTS na porta (o modem precisa de AT+IFC=2,2)
         self.response_buffer = "" # Buffer para armazenar respostas parciais
         self.urc_callback = None # Callback para URCs
+        self._urc_callback_token = None # Assinatura do urc_callback no dispatcher
+        self.urc_dispatcher = UrcDispatcher() # Entrega URCs fora da thread de leitura
         self.response_event = threading.Event() # Evento para sinalizar nova resposta
         self.current_response = "" # Armazena a resposta completa do último comando
         self.response_lock = threading.Lock() # Lock para proteger o acesso a current_response
+        self.scheduler = CommandScheduler() # Slot serial com prioridade: uma transação por vez
         self._read_thread = None
         self._stop_read_thread = threading.Event()
+        self.metrics_store = metrics_store # MetricsStore opcional para histórico de sinal/bateria
+        self.command_metrics = command_metrics # CommandMetrics para latência por comando (None desativa)
+        self.command_timeouts = command_timeouts # CommandTimeouts: deadlines adaptativos, opcional (None = timeouts fixos)
+        self.modem_identity = None # Modelo/revisão lidos do ATI (chave dos deadlines adaptativos)
+        self._command_sent_at = None # perf_counter() da escrita do comando em andamento
+        self._first_byte_at = None # perf_counter() do primeiro byte recebido após a escrita
+        self._bytes_since_send = 0 # Bytes recebidos desde a escrita do comando em andamento
+        self._active_handle = None # CommandHandle da transação em andamento
+        self._sync_pending = None # Comando abandonado sem confirmação: o próximo comando sincroniza antes (_sync_after_abandon)
+        self._sync_marker = None # Prefixo da resposta da sonda: resultados finais sem ele são descartados
+        self._raw_consumer = None # Consumidor de bytes brutos instalado por raw_consumer() (ex: dados do AT+QIRD)
+        self._input_lock = threading.Lock() # Serializa a leitura da porta entre a thread de leitura e _drain_input()
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace') # Mantém caracteres divididos entre leituras
+        self.bytes_received = 0 # Todos os bytes lidos da porta
+        self.bytes_text = 0 # Bytes que chegaram ao enquadramento de linhas (o resto foi dado binário ou prompt)
+        self._prompt_event = None # Armado por comandos com payload: sinaliza o prompt ('>' ou CONNECT)
+        self._prompt_token = b'>'
+        self._prompt_tail = b'' # Fim do bloco anterior, para achar um prompt dividido entre leituras
+        self.state = ModemState(notify=self.urc_dispatcher.submit) # Estado vivo do modem, mantido por URCs e respostas
+        self.state_max_age = 0 # Idade máxima (s) para getters responderem do estado; chaves mantidas por URC são sempre válidas
+        self.urc_profile = urc_profile # Perfil de assinatura de URCs aplicado após o ATI (None = não configura)
+        self.urc_subscription_result = {} # Resultado da última aplicação de perfil: {assinatura: verificada}
+        self.operator_cache = OperatorScanCache() # Buscas de operadoras (AT+COPS=?) por célula
+        self.cell_db = CellDatabase() # Células servidoras/vizinhas vistas (AT+QENG), indexadas
+        self._operator_scan_job = None # Busca em andamento (buscas simultâneas reaproveitam a mesma)
+        self._operator_scan_lock = threading.Lock()
+        self.sockets = ModemSocketManager(self) # Sockets TCP/UDP na pilha IP do modem (AT+QIOPEN...)
+        self.http = HttpClient(self) # Cliente HTTP(S) com corpos em streaming (AT+QHTTP*)
+        self.files = FileTransfer(self) # Upload/download de arquivos UFS (AT+QFUPL/QFDWL...)
+        self.voice = VoiceOverUsb(self) # Fluxos PCM na porta de voz (AT+QPCMV)
         logger.debug(f"ModemController: __init__ para porta {port}, baudrate {baudrate}, timeout {timeout}")
 
         # Regex para URCs conhecidos (agora como atributo da instância)
@@ -39,12 +113,19 @@ class ModemController:
             "CMTI": r'\+CMTI:\s*"(?P<mem>[^"]*)",(?P<index>\d+)',
             "RING": r'RING',
             "QIND": r'\+QIND:\s*"(?P<indication>[^"]*)"(?:,\s*(?P<value>[^"]*))?',
-            "CPIN": r'\+CPIN:\s*"(?P<status>[^"]*)"',
+            "CPIN": r'\+CPIN:\s*"?(?P<status>[^"]*?)"?',
             "QSIMSTAT": r'\+QSIMSTAT:\s*(?P<enable_stat>\d),(?P<inserted_stat>\d)',
             "CSQ": r'\+CSQ:\s*(?P<rssi>\d+),(?P<ber>\d+)',
-            "CREG": r'\+CREG:\s*(\d+),(\d+)(?:,"([0-9A-F]*)","([0-9A-F]*)",(\d*))?',
-            "CGREG": r'\+CGREG:\s*(\d+),(\d+)(?:,"([0-9A-F]*)","([0-9A-F]*)",(\d*))?',
-            "CEREG": r'\+CEREG:\s*(\d+),(\d+)(?:,"([0-9A-F]*)","([0-9A-F]*)",(\d*)(?:,(\d*),(\d*))?)?',
+            # <n> só aparece em respostas de consulta; os URCs começam direto pelo <stat>
+            "CREG": r'\+CREG:\s*(?:(?P<n>\d),)?(?P<stat>\d+)(?:,"(?P<lac>[0-9A-Fa-f]*)","(?P<ci>[0-9A-Fa-f]*)"(?:,(?P<act>\d*))?)?',
+            "CGREG": r'\+CGREG:\s*(?:(?P<n>\d),)?(?P<stat>\d+)(?:,"(?P<lac>[0-9A-Fa-f]*)","(?P<ci>[0-9A-Fa-f]*)"(?:,(?P<act>\d*))?)?',
+            "QIURC": r'\+QIURC:\s*"(?P<event>[^"]+)"(?:,(?P<connect_id>\d+))?(?:,(?P<args>.*))?',
+            "QIOPEN": r'\+QIOPEN:\s*(?P<connect_id>\d+),(?P<err>\d+)',
+            "QHTTPGET": r'\+QHTTPGET:\s*(?P<err>\d+)(?:,(?P<status>\d+))?(?:,(?P<content_length>\d+))?',
+            "QHTTPPOST": r'\+QHTTPPOST:\s*(?P<err>\d+)(?:,(?P<status>\d+))?(?:,(?P<content_length>\d+))?',
+            "QHTTPREAD": r'\+QHTTPREAD:\s*(?P<err>\d+)',
+            "QHTTPREADFILE": r'\+QHTTPREADFILE:\s*(?P<err>\d+)',
+            "CEREG": r'\+CEREG:\s*(?:(?P<n>\d),)?(?P<stat>\d+)(?:,"(?P<tac>[0-9A-Fa-f]*)","(?P<ci>[0-9A-Fa-f]*)"(?:,(?P<act>\d*))?(?:,(?P<cause_type>\d*),(?P<reject_cause>\d*))?)?',
         }
 
 
@@ -68,13 +149,13 @@ class ModemController:
 
             time.sleep(0.1) # Pequena pausa para garantir que a porta esteja livre após a limpeza
 
-            logger.debug(f"ConnectModem: Chamando serial.Serial() com port={self.port}, baudrate={self.baudrate}, timeout={self.timeout}, rtscts=False, dsrdtr=False, xonxoff=False.")
-            self.serial_port = serial.Serial(
+            logger.debug(f"ConnectModem: Chamando {getattr(self.serial_factory, '__qualname__', self.serial_factory)}() com port={self.port}, baudrate={self.baudrate}, timeout={self.timeout}, rtscts={self.rtscts}, dsrdtr=False, xonxoff=False.")
+            self.serial_port = self.serial_factory(
                 self.port,
                 self.baudrate,
                 timeout=self.timeout,
                 write_timeout=self.timeout,
-                rtscts=False, # Desabilita Request To Send / Clear To Send hardware flow control
+                rtscts=self.rtscts, # Request To Send / Clear To Send hardware flow control (desabilitado por padrão)
                 dsrdtr=False, # Desabilita Data Set Ready / Data Terminal Ready hardware flow control
                 xonxoff=False # Desabilita software flow control
             )
@@ -103,7 +184,12 @@ class ModemController:
                 
                 if test_ati_response and "Quectel" in test_ati_response and "OK" in test_ati_response:
                     logger.info(f"ConnectModem: Modem Quectel identificado na porta {self.port}. Conexão bem-sucedida.")
+                    self.modem_identity = " ".join(
+                        line for line in test_ati_response.splitlines() if line not in ("ATI", "OK")
+                    )
                     self._start_read_thread() # Inicia a thread de leitura APENAS se o ATI for bem-sucedido.
+                    if self.urc_profile:
+                        self.apply_urc_profile(self.urc_profile)
                     return True
                 else:
                     logger.warning(f"ConnectModem: Porta {self.port} aberta, mas modem Quectel NÃO RESPONDEU ATI adequadamente. Resposta: {repr(test_ati_response)}. Fechando porta.")
@@ -171,7 +257,11 @@ class ModemController:
                 self._read_thread.join(timeout=2) # Espera a thread terminar
                 if self._read_thread.is_alive():
                     logger.warning("DisconnectModem: Thread de leitura não terminou a tempo durante a desconexão.")
+            self.urc_dispatcher.stop()
+            if self.command_timeouts is not None:
+                self.command_timeouts.save() # Deadlines aprendidos valem para a próxima sessão
             
+            self.state.clear() # Estado deixa de ser confiável sem a conexão
             try:
                 self.serial_port.close()
                 logger.info(f"DisconnectModem: Desconectado da porta {self.port}.")
@@ -189,6 +279,7 @@ class ModemController:
         """Inicia a thread para leitura contínua da porta serial."""
         logger.debug("_start_read_thread: Limpando stop_event e iniciando thread.")
         self._stop_read_thread.clear()
+        self.urc_dispatcher.start()
         self._read_thread = threading.Thread(target=self._read_serial_data, daemon=True)
         self._read_thread.start()
         logger.debug("Thread de leitura serial iniciada.")
@@ -201,13 +292,10 @@ class ModemController:
         while not self._stop_read_thread.is_set():
             try:
                 if self.serial_port and self.serial_port.is_open:
-                    if self.serial_port.in_waiting > 0:
-                        data = self.serial_port.read(self.serial_port.in_waiting).decode('utf-8', errors='ignore')
-                        self.response_buffer += data
-                        logger.debug(f"_read_serial_data: Dados brutos recebidos: {repr(data)}")
-                        
-                        # Processa o buffer para URCs e respostas de comandos
-                        self._process_buffer()
+                    with self._input_lock:
+                        waiting = self.serial_port.in_waiting
+                        if waiting > 0:
+                            self._handle_serial_data(self.serial_port.read(waiting))
                 time.sleep(0.01) # Pequena pausa para evitar busy-waiting
             except serial.SerialException as e:
                 logger.error(f"_read_serial_data: Erro de leitura serial na thread: {e}", exc_info=True)
@@ -217,6 +305,28 @@ class ModemController:
                 break
         logger.debug("Thread de leitura serial encerrada.")
 
+    def _handle_serial_data(self, raw_data):
+        """Trabalho da thread de leitura para cada bloco lido: decodifica, acumula e processa o buffer."""
+        if self._command_sent_at is not None and self._first_byte_at is None:
+            self._first_byte_at = time.perf_counter()
+        self._bytes_since_send += len(raw_data)
+        self.bytes_received += len(raw_data)
+        consumer = self._raw_consumer
+        if consumer is not None:
+            raw_data = consumer(raw_data) # Devolve o que não consumiu (texto AT) para o processamento normal
+        if self._prompt_event is not None and not self._prompt_event.is_set():
+            raw_data = self._strip_prompt(raw_data)
+        if not raw_data:
+            return
+        self.bytes_text += len(raw_data)
+        data = self._decoder.decode(raw_data)
+        self.response_buffer += data
+        if raw_logger.isEnabledFor(logging.DEBUG):
+            raw_logger.debug("_read_serial_data: Dados brutos recebidos: %r", data)
+
+        # Processa o buffer para URCs e respostas de comandos
+        with tracer.span("serial_read", "modem", bytes=len(raw_data)):
+            self._process_buffer()
 
     def _process_buffer(self):
         """
@@ -228,23 +338,24 @@ class ModemController:
         command_response_processed = True
         while command_response_processed:
             command_response_processed = False
-            if "\r\nOK\r\n" in self.response_buffer or "\r\nERROR\r\n" in self.response_buffer:
-                ok_index = self.response_buffer.find("\r\nOK\r\n")
-                error_index = self.response_buffer.find("\r\nERROR\r\n")
-
-                if ok_index != -1 and (error_index == -1 or ok_index < error_index):
-                    end_index = ok_index + len("\r\nOK\r\n")
-                elif error_index != -1 and (ok_index == -1 or error_index < ok_index):
-                    end_index = error_index + len("\r\nERROR\r\n")
-                else:
-                    # Should not happen if OK/ERROR is found but not at proper end
-                    break 
-
+            # Resultado final: OK, ERROR ou +CME/+CMS ERROR: <código> (o primeiro que aparecer)
+            final_result = _FINAL_RESULT_RE.search(self.response_buffer)
+            if final_result:
+                end_index = final_result.end()
+
+                response_text = self._extract_async_urcs(self.response_buffer[:end_index])
+                if self._sync_marker is not None:
+                    if self._sync_marker not in response_text: # Resposta atrasada de um comando abandonado
+                        logger.info("_process_buffer: Descartando resposta de comando abandonado: %r", response_text.strip())
+                        self.response_buffer = self.response_buffer[end_index:]
+                        command_response_processed = True
+                        continue
+                    self._sync_marker = None # Resposta da sonda: o canal voltou a ficar em ordem
                 with self.response_lock:
-                    self.current_response = self.response_buffer[:end_index].strip()
+                    self.current_response = response_text.strip()
                     self.response_buffer = self.response_buffer[end_index:] # Remove processed part
                     self.response_event.set() # Signal that a response is available
-                logger.debug(f"_process_buffer: Resposta completa de comando processada: {repr(self.current_response)}")
+                logger.debug("_process_buffer: Resposta completa de comando processada: %r", self.current_response)
                 command_response_processed = True # Continue checking for more full command responses
             else:
                 break # No full command response found, proceed to URCs
@@ -265,18 +376,7 @@ class ModemController:
             for urc_name, pattern in self.urc_patterns.items(): # Use self.urc_patterns
                 match = re.fullmatch(pattern, stripped_line) # Use fullmatch for whole line URCs
                 if match:
-                    logger.info(f"_process_buffer: URC '{urc_name}' detectado na linha: {stripped_line}")
-                    payload = tuple(match.group(name) for name in match.groupdict() if match.group(name) is not None)
-                    
-                    # Special handling for CMT multi-line URCs: The pattern already captures the message content.
-                    if urc_name == "CMT" and len(payload) == 4:
-                        # Payload already contains (number, alpha, timestamp, message). No extra readline needed here.
-                        pass
-                    
-                    if self.urc_callback: # Call the URC monitor's handler (if set)
-                        logger.debug(f"_process_buffer: Enviando URC '{urc_name}' para callback com payload: {payload}")
-                        self.urc_callback(urc_name, payload) # Pass URC name and payload
-
+                    self._deliver_urc(urc_name, match, stripped_line)
                     found_urc_match = True
                     urc_processed_in_this_pass = True
                     break # Break from inner for loop, found a URC for this line
@@ -288,42 +388,292 @@ class ModemController:
         # Add back the trailing \r\n if it was present and not all lines were consumed.
         if urc_processed_in_this_pass or len(new_response_buffer_lines) < len(lines): # Only update if something was processed/removed
              self.response_buffer = "\r\n".join(new_response_buffer_lines) + ("\r\n" if self.response_buffer.endswith('\r\n') and new_response_buffer_lines else "")
-             logger.debug(f"_process_buffer: Buffer após processar URCs: {repr(self.response_buffer)}")
+             logger.debug("_process_buffer: Buffer após processar URCs: %r", self.response_buffer)
         
         # If no OK/ERROR was found, and no URC was processed, buffer might be incomplete.
         # This function will be called again when more data arrives.
 
 
-    def send_at_command(self, command, expected_response="OK", timeout=5):
+    def _deliver_urc(self, urc_name, match, line):
+        """Aplica um URC reconhecido ao estado/métricas e o enfileira para os assinantes."""
+        logger.info("_process_buffer: URC '%s' detectado na linha: %s", urc_name, line)
+        flow_id = tracer.new_flow_id()
+        tracer.instant("urc_receive", "urc", urc=urc_name)
+        tracer.flow("s", flow_id, "urc")
+        # Payload posicional estável: grupos opcionais ausentes ficam como None
+        payload = tuple(match.groupdict().values())
+        self.state.apply_urc(urc_name, match.groupdict())
+        self._record_response_metrics(line) # URCs de sinal/registro também alimentam o histórico
+
+        # Special handling for CMT multi-line URCs: The pattern already captures the message content.
+        if urc_name == "CMT" and len(payload) == 4:
+            # Payload already contains (number, alpha, timestamp, message). No extra readline needed here.
+            pass
+
+        # Entrega assíncrona: a thread de leitura nunca executa código dos assinantes
+        logger.debug("_process_buffer: Enfileirando URC '%s' com payload: %s", urc_name, payload)
+        self.urc_dispatcher.dispatch(urc_name, payload, flow_id)
+
+    def _extract_async_urcs(self, text):
+        """Remove da resposta de um comando as linhas de URCs assíncronos (_ASYNC_ONLY_URCS), entregando-as."""
+        if not any(prefix in text for prefix in _ASYNC_ONLY_PREFIXES):
+            return text
+        kept = []
+        for line in text.split('\r\n'):
+            stripped_line = line.strip()
+            for urc_name in _ASYNC_ONLY_URCS:
+                match = re.fullmatch(self.urc_patterns[urc_name], stripped_line)
+                if match:
+                    self._deliver_urc(urc_name, match, stripped_line)
+                    break
+            else:
+                kept.append(line)
+        return '\r\n'.join(kept)
+
+    @contextlib.contextmanager
+    def raw_consumer(self, consumer):
+        """
+        Instala um consumidor de bytes brutos na thread de leitura durante o bloco (ex: dados binários do AT+QIRD).
+        consumer(bytes) é chamado com cada bloco lido e devolve os bytes que não consumiu, que seguem
+        o processamento de texto normal (respostas e URCs). Use com o slot do scheduler mantido.
+        """
+        previous = self._raw_consumer
+        self._raw_consumer = consumer
+        try:
+            yield consumer
+        finally:
+            self._raw_consumer = previous
+
+    @contextlib.contextmanager
+    def data_mode(self, session=None, resync=True, **options):
+        """
+        Entrega a porta a um consumidor binário durante o bloco, com o slot do scheduler mantido: os bytes
+        lidos passam pela DataModeSession antes do enquadramento de linhas e só o texto AT segue adiante.
+        Uso: with controller.data_mode(start=CONNECT_START_RE, length=n) as session: controller.send_at_command(...)
+        :param session: DataModeSession pronta; sem ela, uma é criada com options (sink, length, start, terminator...).
+        :param resync: Se os dados não terminaram na fronteira (tamanho/terminador) nem num erro do comando
+                       (ex: timeout, close() ao sair do modo transparente), ressincroniza com resync() ao sair.
+        """
+        session = session if session is not None else DataModeSession(**options)
+        with self.scheduler.slot():
+            try:
+                with self.raw_consumer(session):
+                    yield session
+            finally:
+                session.close()
+                if not (session.completed or session.error):
+                    if resync:
+                        logger.warning(f"DataMode: Sessão encerrada sem fronteira ({session.get_stats()}); ressincronizando.")
+                        self.resync()
+
+    def resync(self, timeout=RESYNC_TIMEOUT):
+        """
+        Volta ao modo de comandos com o enquadramento de linhas limpo: descarta texto parcial e bytes
+        pendentes do decodificador e repete AT até o modem responder OK.
+        :return: True se o modem respondeu dentro de timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self.scheduler.slot():
+            while True:
+                with self.response_lock:
+                    self.response_buffer = ""
+                    self.current_response = ""
+                self._decoder.reset()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.error(f"Resync: Modem não respondeu AT em {timeout}s.")
+                    return False
+                response = self.send_at_command("AT", expected_response="OK", timeout=min(1.0, remaining))
+                if response is not None and response.endswith("OK"):
+                    logger.info("Resync: Enquadramento de linhas ressincronizado.")
+                    return True
+
+    def get_serial_stats(self):
+        """Contabilidade de bytes da porta: lidos, texto AT e o restante (dados binários e prompts)."""
+        return {"received": self.bytes_received, "text": self.bytes_text, "binary": self.bytes_received - self.bytes_text}
+
+    def _strip_prompt(self, raw_data):
+        """Sinaliza o prompt do comando em andamento e o remove dos bytes lidos (o resto segue como texto)."""
+        token, tail = self._prompt_token, self._prompt_tail
+        window = tail + raw_data
+        found_at = window.find(token)
+        if found_at < 0:
+            self._prompt_tail = window[-(len(token) - 1):] if len(token) > 1 else b''
+            return raw_data
+        self._prompt_event.set()
+        start = max(0, found_at - len(tail))
+        end = found_at + len(token) - len(tail)
+        return raw_data[:start] + raw_data[end:].lstrip(b' \r\n')
+
+    def send_at_command(self, command, expected_response="OK", timeout=None, handle=None, payload=None, prompt=b'>'):
         """
         Envia um comando AT para o modem e espera por uma resposta específica.
         :param command: O comando AT a ser enviado (ex: "AT+CSQ").
         :param expected_response: A string esperada na resposta para considerar sucesso.
-        :param timeout: Tempo limite em segundos para esperar pela resposta.
-        :return: A resposta completa do modem ou None se houver timeout/erro.
+        :param timeout: Tempo limite em segundos para esperar pela resposta (None = DEFAULT_COMMAND_TIMEOUT).
+                        Com command_timeouts configurado, o timeout padrão é trocado pelo deadline adaptativo
+                        do comando; um timeout explícito só é alongado (nunca encurtado) por ele.
+        :param handle: CommandHandle que acompanha o comando (criado internamente se omitido).
+        :param payload: Dados (bytes-like) escritos após o prompt (ex: AT+QISEND), em fatias de memoryview.
+        :param prompt: Prompt que libera o payload: b'>' (AT+QISEND, AT+CMGS) ou b'CONNECT' (AT+QHTTP*, AT+QFUPL).
+        :return: A resposta completa do modem ou None se houver timeout/erro/cancelamento.
+        """
+        explicit = timeout is not None
+        timeout = fixed_timeout = DEFAULT_COMMAND_TIMEOUT if timeout is None else timeout
+        handle = handle or CommandHandle(command, timeout)
+        response = None
+        try:
+            with self.scheduler.slot(), tracer.span("send_at_command", "modem", command=command):
+                if handle.cancel_requested: # Cancelado enquanto esperava o slot
+                    return None
+                if self._sync_pending is not None:
+                    self._sync_after_abandon()
+                modem_id = self.modem_identity or self.port
+                if self.command_timeouts is not None:
+                    timeout = self.command_timeouts.deadline(modem_id, command, timeout, explicit=explicit)
+                self._command_sent_at = None
+                self._active_handle = handle
+                handle._start(timeout)
+                try:
+                    response = self._transact_at_command(command, expected_response, timeout, handle, payload, prompt)
+                finally:
+                    self._active_handle = None
+                if response is None and handle.cancel_requested:
+                    self._command_sent_at = None # Cancelado: fica fora das métricas e dos deadlines
+                elif response is None and timeout < fixed_timeout and self._command_sent_at is not None:
+                    # Deadline adaptativo venceu antes do padrão: o OK atrasado é deste comando, não do próximo
+                    self._sync_pending = command
+                    logger.warning(f"SendAtCommand: '{command}' abandonado no deadline adaptativo; a resposta atrasada será descartada.")
+                elapsed = self._record_command_latency(command, response)
+                if self.command_timeouts is not None and elapsed is not None:
+                    self.command_timeouts.observe(modem_id, command, elapsed, response)
+            return response
+        finally:
+            handle._finish(response)
+
+    def submit_at_command(self, command, expected_response="OK", timeout=None, priority=None, on_progress=None):
         """
-        logger.debug(f"SendAtCommand: Preparando para enviar comando: {command}")
+        Envia um comando AT em segundo plano.
+        :param priority: Classe de prioridade no CommandScheduler (padrão: a da thread que chama).
+        :param on_progress: Callback de progresso opcional (ver CommandHandle).
+        :return: CommandHandle para cancelar, acompanhar e esperar o resultado (handle.result()).
+        :raises queue.Full: Se a fila do executor estiver cheia.
+        """
+        priority = priority or self.scheduler.current_priority()
+        handle = CommandHandle(command, DEFAULT_COMMAND_TIMEOUT if timeout is None else timeout, priority)
+        if on_progress:
+            handle.add_progress_callback(on_progress)
+
+        def run():
+            with self.scheduler.priority(priority):
+                self.send_at_command(command, expected_response, timeout, handle)
+
+        handle._emit("queued")
+        default_executor.submit(run, block=False)
+        return handle
+
+    @property
+    def active_command(self):
+        """CommandHandle da transação em andamento na serial (ou None)."""
+        return self._active_handle
+
+    def cancel_current_command(self):
+        """
+        Cancela o comando em andamento na serial, liberando o canal sem esperar o deadline.
+        :return: True se havia um comando para cancelar.
+        """
+        handle = self._active_handle
+        return handle.cancel() if handle is not None else False
+
+    def _abort_transaction(self, command):
+        """
+        Interrompe a transação cancelada: envia o caractere de aborto se o comando for abortável
+        e espera a confirmação; sem confirmação, a resposta final atrasada será descartada.
+        """
+        if is_abortable(command):
+            logger.info(f"SendAtCommand: Abortando '{command}' no modem.")
+            try:
+                self.serial_port.write(ABORT_CHARACTER)
+            except serial.SerialException as e:
+                logger.warning(f"SendAtCommand: Falha ao enviar o caractere de aborto: {e}")
+            if self.response_event.wait(ABORT_GRACE):
+                with self.response_lock:
+                    response = self.current_response
+                    self.current_response = ""
+                logger.info(f"SendAtCommand: '{command}' abortado. Resposta: {response!r}")
+                return None
+        # Sem confirmação do modem: o próximo comando sincroniza o canal antes de ser enviado
+        self._sync_pending = command
+        logger.warning(f"SendAtCommand: '{command}' abandonado; a resposta atrasada será descartada.")
+        return None
+
+    def _sync_after_abandon(self):
+        """
+        Antes do primeiro comando depois de um abandonado sem confirmação: envia uma sonda de resposta
+        reconhecível (SYNC_PROBES) e descarta todo resultado final que chegar antes dela. O modem responde
+        em ordem, então a resposta atrasada (se vier) chega antes da sonda; se não vier, nada se perde.
+        Chamado com o slot do scheduler mantido.
+        """
+        abandoned, self._sync_pending = self._sync_pending, None
+        probe, marker = next(((probe, marker) for probe, marker in SYNC_PROBES
+                              if not abandoned.strip().upper().startswith(probe)), SYNC_PROBES[-1])
+        self._sync_marker = marker
+        if self.send_at_command(probe) is None:
+            self._sync_marker = None
+            logger.warning(f"SendAtCommand: Sonda '{probe}' sem resposta após '{abandoned}' abandonado.")
+
+    def _write_payload(self, payload, deadline, handle=None):
+        """
+        Espera o prompt e escreve o payload em fatias de memoryview (sem cópias).
+        :return: False se o modem respondeu sem prompt (ex: ERROR), o deadline passou ou houve cancelamento.
+        """
+        try:
+            while not self._prompt_event.wait(0.05):
+                if self.response_event.is_set() or time.time() >= deadline:
+                    return False
+                if handle is not None and handle.cancel_requested:
+                    return False
+        finally:
+            self._prompt_event = None
+        view = memoryview(payload).cast('B')
+        for offset in range(0, len(view), PAYLOAD_WRITE_CHUNK):
+            self.serial_port.write(view[offset:offset + PAYLOAD_WRITE_CHUNK])
+        return True
+
+    def _transact_at_command(self, command, expected_response, timeout, handle=None, payload=None, prompt=b'>'):
+        """Escreve o comando e espera a resposta final (corpo de send_at_command)."""
+        logger.debug("SendAtCommand: Preparando para enviar comando: %s", command)
         if not self.serial_port or not self.serial_port.is_open:
             logger.error("SendAtCommand: Porta serial não está aberta. Não é possível enviar comando.")
             return None
 
         full_command = command + '\r\n'
-        logger.debug(f"SendAtCommand: Enviando: {repr(full_command)}")
+        logger.debug("SendAtCommand: Enviando: %r", full_command)
         try:
-            # Garante que o buffer de resposta está limpo antes de enviar um novo comando
-            # E que o evento de resposta esteja limpo
+            # Processa o que já chegou (URCs pendentes, como um +QIOPEN de outro socket, seguem para os assinantes)
+            # e só então limpa o buffer de resposta e o evento para o novo comando
+            self._drain_input()
             with self.response_lock:
                 self.response_buffer = "" 
                 self.current_response = ""
             self.response_event.clear() 
 
-            self.serial_port.flushInput() # AJUSTADO: Mover esta linha para AQUI (antes de enviar o comando)
+            self._first_byte_at = None
+            self._bytes_since_send = 0
+            self._command_sent_at = time.perf_counter()
+            self._prompt_token, self._prompt_tail = prompt, b''
+            self._prompt_event = threading.Event() if payload is not None else None
+            start_time = time.time()
             self.serial_port.write(full_command.encode('utf-8'))
             logger.debug("SendAtCommand: Comando gravado na porta serial. Esperando resposta.")
-            # self.serial_port.flushInput() # REMOVER esta linha daqui (chamada duplicada)
-            
-            start_time = time.time()
+            if payload is not None and self._write_payload(payload, start_time + timeout, handle):
+                logger.debug("SendAtCommand: Payload de %d bytes escrito após o prompt.", memoryview(payload).nbytes)
+
             while (time.time() - start_time) < timeout:
+                if handle is not None:
+                    if handle.cancel_requested:
+                        return self._abort_transaction(command)
+                    handle._progress(self._bytes_since_send)
                 # O processamento do buffer para URCs e para o OK/ERROR do comando ocorre na thread de leitura.
                 # A função _process_buffer, que é chamada pela thread de leitura, é responsável por chamar
                 # self.response_event.set() quando uma resposta completa (terminada em OK/ERROR) for encontrada.
@@ -332,12 +682,14 @@ class ModemController:
                         response = self.current_response
                         self.current_response = "" # Limpa a resposta para o próximo comando
                     
-                    logger.debug(f"SendAtCommand: Resposta final recebida: {repr(response)}")
+                    logger.debug("SendAtCommand: Resposta final recebida: %r", response)
+                    self._record_response_metrics(response)
+                    self.state.apply_response(response)
                     if expected_response in response:
-                        logger.info(f"SendAtCommand: Comando '{command}' bem-sucedido. Resposta: {response.strip()}")
+                        logger.info("SendAtCommand: Comando '%s' bem-sucedido. Resposta: %s", command, response.strip())
                         return response.strip()
-                    elif "ERROR" in response:
-                        logger.warning(f"SendAtCommand: Comando '{command}' resultou em ERRO. Resposta: {response.strip()}")
+                    elif "ERROR" in response or "SEND FAIL" in response: # SEND FAIL: buffer de envio cheio (AT+QISEND)
+                        logger.warning("SendAtCommand: Comando '%s' resultou em ERRO. Resposta: %s", command, response.strip())
                         return response.strip()
                     
                     # Se não for a resposta esperada nem ERROR, e não houver mais dados no buffer,
@@ -355,14 +707,91 @@ class ModemController:
             logger.error(f"SendAtCommand: Erro inesperado ao enviar comando '{command}': {e}", exc_info=True)
             return None
 
+    def _drain_input(self):
+        """Passa os bytes já recebidos pelo processamento normal, em vez de descartá-los com flushInput()."""
+        with self._input_lock:
+            waiting = self.serial_port.in_waiting
+            if waiting > 0:
+                self._handle_serial_data(self.serial_port.read(waiting))
+
+    def _record_command_latency(self, command, response):
+        """
+        Registra TTFB, tempo total, bytes e resultado do comando no CommandMetrics (se configurado).
+        :return: Segundos da escrita ao resultado final (ou ao timeout), ou None se o comando não foi escrito.
+        """
+        sent_at, first_byte_at = self._command_sent_at, self._first_byte_at
+        self._command_sent_at = None
+        if sent_at is None: # Comando nem chegou a ser escrito
+            return None
+        now = time.perf_counter()
+        tracer.complete("serial_wait", sent_at, now, "modem", first_byte_ms=(first_byte_at - sent_at) * 1000 if first_byte_at else None)
+        if self.command_metrics is None:
+            return now - sent_at
+        self.command_metrics.record(
+            command,
+            total=now - sent_at,
+            ttfb=first_byte_at - sent_at if first_byte_at is not None else None,
+            bytes_out=len(command) + 2,
+            bytes_in=len(response.encode('utf-8')) if response else 0,
+            response=response,
+        )
+        return now - sent_at
+
+    def _record_response_metrics(self, response):
+        """Alimenta o MetricsStore (se configurado) com métricas contidas na resposta."""
+        if self.metrics_store is None:
+            return
+        try:
+            self.metrics_store.ingest_response(self.port, response)
+        except Exception as e:
+            logger.warning(f"_record_response_metrics: Falha ao registrar métricas: {e}")
+
+    def apply_urc_profile(self, profile):
+        """
+        Habilita e verifica um perfil de assinatura de URCs (ver src/modem/urc_profiles.py).
+        As chaves do ModemState cobertas por assinaturas verificadas passam a ser mantidas por push.
+        :param profile: Nome do perfil ("minimal", "standard", "full_telemetry"...) ou lista de assinaturas.
+        :return: Dicionário {assinatura: True/False} indicando se cada uma foi verificada.
+        """
+        logger.info(f"ApplyUrcProfile: Aplicando perfil de URCs {profile!r} na porta {self.port}.")
+        results = {}
+        for name, spec in resolve_urc_profile(profile):
+            if spec["command"]:
+                response = self.send_at_command(spec["command"], expected_response="OK")
+                if not response or "ERROR" in response:
+                    logger.warning(f"ApplyUrcProfile: Modem recusou '{spec['command']}'. Resposta: {response!r}")
+                    results[name] = False
+                    continue
+            verify_response = self.send_at_command(spec["verify"], expected_response="OK")
+            verified = verify_subscription(spec, verify_response)
+            if verified and spec.get("seed"):
+                self.send_at_command(spec["seed"], expected_response="OK")
+            if verified:
+                self.state.mark_pushed(spec["state_keys"])
+            else:
+                logger.warning(f"ApplyUrcProfile: Assinatura '{name}' não confirmada. Resposta: {verify_response!r}")
+            results[name] = verified
+
+        self.urc_subscription_result = results
+        logger.info(f"ApplyUrcProfile: Resultado: {results}")
+        return results
+
     def set_urc_callback(self, callback):
-        """Define a função de callback para URCs."""
+        """
+        Define a função de callback para URCs (None remove).
+        O callback roda numa thread própria do UrcDispatcher, nunca na thread de leitura.
+        """
+        if self._urc_callback_token is not None:
+            self.urc_dispatcher.unsubscribe(self._urc_callback_token)
+            self._urc_callback_token = None
         self.urc_callback = callback
+        if callback:
+            self._urc_callback_token = self.urc_dispatcher.subscribe(callback, name="urc_callback")
         logger.debug("URC callback definido.")
 
     # --- Comandos AT Abstratos ---
 
-    def _send_at_command_and_parse(self, command_name, *args, expected_response="OK", timeout=5):
+    def _send_at_command_and_parse(self, command_name, *args, expected_response="OK", timeout=None):
         """
         Envia um comando AT pré-definido e tenta parsear a resposta.
         :param command_name: Nome do comando no dicionário AT_COMMANDS.
@@ -387,7 +816,8 @@ class ModemController:
         if response and expected_response in response:
             # Se houver um parser definido no AT_COMMANDS, use-o
             if "parser" in cmd_template and callable(cmd_template["parser"]):
-                parsed_data = cmd_template["parser"](response)
+                with tracer.span("parse", "modem", command_name=command_name):
+                    parsed_data = cmd_template["parser"](response)
                 logger.debug(f"_send_at_command_and_parse: Comando '{command_name}' parseado com sucesso. Dados: {parsed_data}")
                 return True, parsed_data
             logger.debug(f"_send_at_command_and_parse: Comando '{command_name}' bem-sucedido (sem parser).")
@@ -490,8 +920,16 @@ class ModemController:
 
     # --- Métodos de Rede e APN ---
 
-    def get_signal_quality(self):
-        """Obtém a qualidade do sinal (RSSI e BER)."""
+    def get_signal_quality(self, max_age=None):
+        """
+        Obtém a qualidade do sinal (RSSI e BER).
+        Responde do ModemState, sem round trip serial, se o valor estiver fresco.
+        :param max_age: Idade máxima aceita do estado (padrão: self.state_max_age).
+        """
+        cached_line = self.state.signal_line(self.state_max_age if max_age is None else max_age)
+        if cached_line:
+            logger.debug("GetSignalQuality: Respondendo a partir do ModemState.")
+            return parse_signal_quality_response(cached_line)
         logger.info("GetSignalQuality: Obtendo qualidade do sinal.")
         success, parsed_data = self._send_at_command_and_parse("GET_SIGNAL_QUALITY", expected_response="+CSQ")
         return parsed_data if success else "N/A"
@@ -502,8 +940,16 @@ class ModemController:
         success, parsed_data = self._send_at_command_and_parse("GET_NETWORK_INFO", expected_response="+QNWINFO")
         return parsed_data if success else "N/A"
 
-    def get_network_registration_status(self):
-        """Obtém o status de registro na rede."""
+    def get_network_registration_status(self, max_age=None):
+        """
+        Obtém o status de registro na rede.
+        Responde do ModemState, sem round trip serial, se o valor estiver fresco.
+        :param max_age: Idade máxima aceita do estado (padrão: self.state_max_age).
+        """
+        cached_line = self.state.registration_line("creg", self.state_max_age if max_age is None else max_age)
+        if cached_line:
+            logger.debug("GetNetworkRegistrationStatus: Respondendo a partir do ModemState.")
+            return parse_network_reg_status_response(cached_line)
         logger.info("GetNetworkRegistrationStatus: Obtendo status de registro na rede.")
         success, parsed_data = self._send_at_command_and_parse("GET_NETWORK_REGISTRATION_STATUS", expected_response="+CREG")
         return parsed_data if success else "N/A"
@@ -529,6 +975,116 @@ class ModemController:
         success, parsed_data = self._send_at_command_and_parse("GET_PDP_ADDRESS", cid, expected_response="+CGPADDR")
         return parsed_data if success else "N/A"
 
+    # --- Células (AT+QENG) ---
+
+    def get_serving_cell(self):
+        """Lê a célula servidora (AT+QENG="servingcell"). Retorna o dicionário de parse_qeng_response ou None."""
+        success, parsed_data = self._send_at_command_and_parse("GET_SERVING_CELL", expected_response="+QENG")
+        return parsed_data if success else None
+
+    def get_neighbour_cells(self):
+        """Lê as células vizinhas (AT+QENG="neighbourcell"). Retorna o dicionário de parse_qeng_neighbor_response ou None."""
+        success, parsed_data = self._send_at_command_and_parse("GET_NEIGHBOUR_CELLS", expected_response="OK")
+        return parsed_data if success else None
+
+    def sample_cells(self):
+        """
+        Amostra a servidora e as vizinhas (slot mantido entre os dois comandos) e alimenta self.cell_db.
+        :return: Dicionário com a servidora normalizada e o número de vizinhas.
+        """
+        with self.scheduler.slot():
+            serving = self.get_serving_cell()
+            neighbours = self.get_neighbour_cells()
+        serving_cell, neighbour_cells = self.cell_db.observe(serving, neighbours)
+        return {"serving": serving_cell, "neighbours": len(neighbour_cells), "cells_known": len(self.cell_db)}
+
+    # --- Seleção de Operadora ---
+
+    def start_operator_scan(self, force=False, on_progress=None):
+        """
+        Inicia a busca de operadoras (AT+COPS=?) em segundo plano, com prioridade background.
+        Se houver uma busca válida em cache para a célula atual, responde dela sem ocupar a serial.
+        :param force: Ignora o cache e busca de novo.
+        :param on_progress: Callback de progresso do CommandHandle (ver command_handle.py).
+        :return: OperatorScanJob (job.result() devolve a lista de operadoras; job.cancel() aborta).
+        """
+        location = location_key(self.state)
+        if not force:
+            cached = self.operator_cache.get(location)
+            if cached is not None:
+                logger.info(f"StartOperatorScan: {len(cached)} operadora(s) do cache para a célula {location}.")
+                return OperatorScanJob(location, operators=cached)
+        with self._operator_scan_lock:
+            job = self._operator_scan_job
+            if job is not None and not job.done():
+                logger.info("StartOperatorScan: Busca já em andamento; reaproveitando.")
+                return job
+            logger.info(f"StartOperatorScan: Buscando operadoras (célula {location}).")
+            handle = self.submit_at_command(
+                AT_COMMANDS["SCAN_OPERATORS"]["command"], expected_response="+COPS",
+                timeout=OPERATOR_SCAN_TIMEOUT, priority="background", on_progress=on_progress,
+            )
+            job = self._operator_scan_job = OperatorScanJob(location, handle)
+        handle.future.add_done_callback(lambda future: self._finish_operator_scan(job, future))
+        return job
+
+    def _finish_operator_scan(self, job, future):
+        """Converte a resposta do AT+COPS=? no resultado do job e alimenta o cache."""
+        try:
+            response = future.result()
+        except Exception as e: # CommandCancelled
+            job.future.set_exception(e)
+            return
+        if response is None:
+            job.future.set_exception(TimeoutError("Busca de operadoras sem resposta do modem."))
+            return
+        if "+COPS:" not in response:
+            job.future.set_exception(RuntimeError(f"Busca de operadoras falhou: {response}"))
+            return
+        operators = parse_operator_scan_response(response)
+        self.operator_cache.put(job.location, operators)
+        logger.info(f"StartOperatorScan: {len(operators)} operadora(s) encontradas na célula {job.location}.")
+        job.future.set_result(operators)
+
+    def scan_operators(self, force=False):
+        """Busca de operadoras bloqueante (ver start_operator_scan). Retorna a lista ou [] em falha."""
+        job = self.start_operator_scan(force=force)
+        try:
+            return job.result()
+        except Exception as e:
+            logger.warning(f"ScanOperators: {e}")
+            return []
+
+    def get_operator(self):
+        """Lê o modo de seleção e a operadora atual (AT+COPS?)."""
+        logger.info("GetOperator: Lendo operadora atual.")
+        success, parsed_data = self._send_at_command_and_parse("GET_OPERATOR", expected_response="+COPS")
+        return parsed_data if success else "N/A"
+
+    def register_operator(self, numeric, act=None):
+        """
+        Registra manualmente numa operadora (AT+COPS=1,2,...), sem nova busca.
+        Sem act, usa a melhor tecnologia da operadora na última busca em cache para a célula atual.
+        :param numeric: MCC+MNC da operadora (ex: "72406").
+        :param act: Tecnologia de acesso (<AcT>, ex: 7 = E-UTRAN), opcional.
+        """
+        if act is None:
+            cached = self.operator_cache.get(location_key(self.state)) or []
+            entries = [op for op in cached if op["numeric"] == str(numeric)]
+            if entries and all(op["stat"] == 3 for op in entries):
+                logger.warning(f"RegisterOperator: Operadora {numeric} aparece como proibida na última busca.")
+            usable = [op["act"] for op in entries if op["stat"] != 3 and op["act"] is not None]
+            act = max(usable) if usable else None
+        logger.info(f"RegisterOperator: Registrando na operadora {numeric} (AcT {act if act is not None else 'qualquer'}).")
+        if act is None:
+            return self._send_at_command_and_parse("SELECT_OPERATOR_ANY_ACT", numeric, expected_response="OK", timeout=OPERATOR_REGISTER_TIMEOUT)
+        return self._send_at_command_and_parse("SELECT_OPERATOR", numeric, act, expected_response="OK", timeout=OPERATOR_REGISTER_TIMEOUT)
+
+    def register_automatic(self):
+        """Volta para a seleção automática de operadora (AT+COPS=0)."""
+        logger.info("RegisterAutomatic: Seleção automática de operadora.")
+        return self._send_at_command_and_parse("SELECT_OPERATOR_AUTO", expected_response="OK", timeout=OPERATOR_REGISTER_TIMEOUT)
+
     def set_network_scan_mode(self, mode, effect=1):
         """Define a preferência de tecnologia de rede (2G/3G/4G)."""
         logger.info(f"SetNetworkScanMode: Definindo modo de varredura para {mode}.")
@@ -551,10 +1107,22 @@ class ModemController:
         success, parsed_data = self._send_at_command_and_parse("GET_ROAMING_SERVICE", expected_response="+QCFG")
         return parsed_data if success else "N/A"
 
-    def set_bands(self, gsm_wcdma_band=None, lte_band=None, td_scdma_band=None):
-        """Configura as bandas de frequência preferenciais."""
+    def set_bands(self, gsm_wcdma_band=None, lte_band=None, td_scdma_band=None, effect=1):
+        """
+        Configura as bandas de frequência preferenciais.
+        Máscaras omitidas mantêm o valor atual do modem (lido com AT+QCFG="band").
+        """
+        if None in (gsm_wcdma_band, lte_band, td_scdma_band):
+            current = self.get_band_masks()
+            if current is None:
+                logger.error("SetBands: Não foi possível ler as máscaras atuais para completar a configuração.")
+                return False, None
+            gsm_wcdma_band, lte_band, td_scdma_band = (
+                value if value is not None else current_value
+                for value, current_value in zip((gsm_wcdma_band, lte_band, td_scdma_band), current)
+            )
         logger.info(f"SetBands: Definindo bandas GSM/WCDMA:{gsm_wcdma_band}, LTE:{lte_band}, TDS:{td_scdma_band}.")
-        return self._send_at_command_and_parse("SET_BANDS", gsm_wcdma_band, lte_band, td_scdma_band, expected_response="OK")
+        return self._send_at_command_and_parse("SET_BANDS", gsm_wcdma_band, lte_band, td_scdma_band, effect, expected_response="OK")
 
     def get_bands(self):
         """Lê as configurações de banda atuais."""
@@ -562,30 +1130,42 @@ class ModemController:
         success, parsed_data = self._send_at_command_and_parse("GET_BANDS", expected_response="+QCFG")
         return parsed_data if success else "N/A"
 
+    def get_band_masks(self):
+        """Lê as máscaras de banda brutas: tupla (bandval, ltebandval, tdsbandval) ou None."""
+        response = self.send_at_command(AT_COMMANDS["GET_BANDS"]["command"], expected_response="+QCFG")
+        return parse_band_config_values(response)
+
+    def get_network_scan_mode_value(self):
+        """Lê o modo de varredura bruto (0=auto, 1=GSM, 2=WCDMA, 3=LTE) ou None."""
+        response = self.send_at_command(AT_COMMANDS["GET_NETWORK_SCAN_MODE"]["command"], expected_response="+QCFG")
+        return parse_network_scan_mode_value(response)
+
     # --- Métodos de Serviço de Mensagens (SMS) ---
 
     def send_sms(self, number, message):
         """Envia um SMS para o número especificado."""
         logger.info(f"SendSMS: Enviando SMS para {number}.")
         # Para SMS, precisamos de um tratamento especial para o prompt '>'
-        success, response = self._send_at_command_and_parse("SEND_SMS_INIT", number, expected_response=">", timeout=10) # Espera pelo prompt
-        if success and ">" in response:
-            sms_data = message + '\x1A' # Adiciona CTRL+Z
-            sms_success, sms_response = self._send_at_command_and_parse("SEND_SMS_CONTENT", sms_data, expected_response="OK", timeout=30)
-            if sms_success:
-                match = re.search(r'\+CMGS:\s*(\d+)', sms_response)
-                if match:
-                    logger.info(f"SendSMS: SMS enviado com sucesso. ID da mensagem: {match.group(1)}")
-                    return True, f"SMS enviado. ID: {match.group(1)}"
+        # O slot é mantido entre o prompt e o conteúdo para nenhum outro comando entrar no meio
+        with self.scheduler.slot():
+            success, response = self._send_at_command_and_parse("SEND_SMS_INIT", number, expected_response=">", timeout=10) # Espera pelo prompt
+            if success and ">" in response:
+                sms_data = message + '\x1A' # Adiciona CTRL+Z
+                sms_success, sms_response = self._send_at_command_and_parse("SEND_SMS_CONTENT", sms_data, expected_response="OK", timeout=30)
+                if sms_success:
+                    match = re.search(r'\+CMGS:\s*(\d+)', sms_response)
+                    if match:
+                        logger.info(f"SendSMS: SMS enviado com sucesso. ID da mensagem: {match.group(1)}")
+                        return True, f"SMS enviado. ID: {match.group(1)}"
+                    else:
+                        logger.info(f"SendSMS: SMS enviado, mas ID não encontrado. Resposta: {sms_response}")
+                        return True, f"SMS enviado. Resposta: {sms_response}"
                 else:
-                    logger.info(f"SendSMS: SMS enviado, mas ID não encontrado. Resposta: {sms_response}")
-                    return True, f"SMS enviado. Resposta: {sms_response}"
+                    logger.error(f"SendSMS: Falha ao enviar o conteúdo do SMS ou timeout. Resposta: {sms_response}")
+                    return False, "Falha ao enviar o conteúdo do SMS."
             else:
-                logger.error(f"SendSMS: Falha ao enviar o conteúdo do SMS ou timeout. Resposta: {sms_response}")
-                return False, "Falha ao enviar o conteúdo do SMS."
-        else:
-            logger.error(f"SendSMS: Falha ao obter prompt '>' para enviar SMS. Resposta: {response}")
-            return False, "Falha ao iniciar envio de SMS."
+                logger.error(f"SendSMS: Falha ao obter prompt '>' para enviar SMS. Resposta: {response}")
+                return False, "Falha ao iniciar envio de SMS."
 
     def read_sms_by_index(self, index):
         """Lê uma mensagem SMS específica pelo índice."""
@@ -0,0 +1,248 @@
+# src/modem/daemon.py
+import json
+import socketserver
+import sys
+import threading
+
+from src.modem.controller import ModemController
+from src.utils.serial_ports import get_available_ports
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Pollers disponíveis: nome -> método do ModemController chamado periodicamente
+POLLERS = {
+    "signal": "get_signal_quality",
+    "registration": "get_network_registration_status",
+    "battery": "get_battery_status",
+    "network": "get_network_info",
+    "cells": "sample_cells",
+}
+
+HELP_TEXT = (
+    "Comandos (um por linha; cada resposta é uma linha JSON):\n"
+    "  AT...                      envia o comando AT e devolve a resposta bruta\n"
+    "  call <metodo> [args...]    chama um método público do ModemController (ex: call get_imei)\n"
+    "  state                      snapshot do estado do modem (ModemState)\n"
+    "  cells [strongest [N] | band <N>]  células vistas (sem consultar o modem; alimente com --poll cells=S)\n"
+    "  cancel                     cancela o comando em andamento na serial (ex: de outra sessão)\n"
+    "  stats                      estatísticas de URCs, latência, deadlines e espera por prioridade\n"
+    "  subscribe / unsubscribe    liga/desliga o envio de URCs para esta sessão\n"
+    "  help                       esta ajuda\n"
+    "  quit                       encerra a sessão (no stdin, encerra o daemon)\n"
+    "  shutdown                   encerra o daemon"
+)
+
+
+def _parse_arg(text):
+    """Converte argumentos da linha de comando: inteiros, true/false e o resto como string."""
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+class _Session:
+    """Uma origem de comandos (stdin ou um cliente do socket) e para onde vão as respostas."""
+
+    def __init__(self, write_line, receive_urcs=False):
+        self.write_line = write_line
+        self.receive_urcs = receive_urcs
+
+    def send(self, payload):
+        try:
+            self.write_line(json.dumps(payload, ensure_ascii=False, default=str))
+        except (OSError, ValueError):
+            pass # Cliente desconectado
+
+
+class ModemDaemon:
+    """
+    Execução sem GUI: conecta ao modem, roda pollers periódicos, repassa URCs às sessões
+    inscritas e aceita comandos pelo stdin e/ou por um socket TCP em localhost.
+    """
+
+    def __init__(self, controller, pollers=None):
+        """
+        :param controller: ModemController (ainda não conectado).
+        :param pollers: Dicionário {nome em POLLERS: intervalo em segundos}.
+        """
+        self.controller = controller
+        self.pollers = pollers or {}
+        self.stop_event = threading.Event()
+        self._sessions = set()
+        self._sessions_lock = threading.Lock()
+        self._server = None
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Conecta ao modem (se ainda não estiver conectado) e inicia URCs e pollers. Retorna False se a conexão falhar."""
+        if not self.controller.connect_modem():
+            logger.error(f"ModemDaemon: Falha ao conectar na porta {self.controller.port}.")
+            return False
+        self.controller.set_urc_callback(self._on_urc)
+        for name, interval in self.pollers.items():
+            threading.Thread(target=self._poll_loop, args=(name, interval), name=f"Poller-{name}", daemon=True).start()
+        logger.info(f"ModemDaemon: Conectado na porta {self.controller.port}. Pollers: {self.pollers or 'nenhum'}.")
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.controller.set_urc_callback(None)
+        self.controller.disconnect_modem()
+        logger.info("ModemDaemon: Encerrado.")
+
+    def serve_socket(self, host="127.0.0.1", port=7557):
+        """Aceita sessões de comando em host:port numa thread em segundo plano."""
+        daemon = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                session = _Session(lambda line: self.wfile.write((line + "\n").encode("utf-8")))
+                daemon._add_session(session)
+                try:
+                    for raw_line in self.rfile:
+                        if not daemon.handle_line(raw_line.decode("utf-8", errors="replace"), session):
+                            break
+                finally:
+                    daemon._remove_session(session)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="DaemonSocket", daemon=True).start()
+        logger.info(f"ModemDaemon: Aceitando comandos em {host}:{self._server.server_address[1]}.")
+
+    def serve_stdin(self):
+        """Lê comandos do stdin até 'quit', 'shutdown' ou EOF (bloqueante)."""
+        session = _Session(lambda line: (sys.stdout.write(line + "\n"), sys.stdout.flush()), receive_urcs=True)
+        self._add_session(session)
+        try:
+            for line in sys.stdin:
+                if not self.handle_line(line, session) or self.stop_event.is_set():
+                    break
+        finally:
+            self._remove_session(session)
+        self.stop_event.set()
+
+    def _add_session(self, session):
+        with self._sessions_lock:
+            self._sessions.add(session)
+
+    def _remove_session(self, session):
+        with self._sessions_lock:
+            self._sessions.discard(session)
+
+    # --- Comandos ---
+
+    def handle_line(self, line, session):
+        """
+        Executa uma linha de comando e envia a resposta à sessão.
+        :return: False se a sessão deve ser encerrada.
+        """
+        line = line.strip()
+        if not line:
+            return True
+        verb, _, rest = line.partition(" ")
+        verb_lower = verb.lower()
+        try:
+            if verb_lower in ("quit", "exit"):
+                return False
+            if verb_lower == "shutdown":
+                session.send({"ok": True, "result": "encerrando"})
+                self.stop_event.set()
+                return False
+            if verb_lower == "help":
+                result = HELP_TEXT
+            elif verb_lower in ("subscribe", "unsubscribe"):
+                session.receive_urcs = verb_lower == "subscribe"
+                result = session.receive_urcs
+            elif verb_lower == "state":
+                result = self.controller.state.snapshot()
+            elif verb_lower == "stats":
+                result = {
+                    "urc_dispatcher": self.controller.urc_dispatcher.get_stats(),
+                    "commands": self.controller.command_metrics.summary() if self.controller.command_metrics else {},
+                    "scheduler": self.controller.scheduler.get_stats(),
+                    "timeouts": self.controller.command_timeouts.get_stats() if self.controller.command_timeouts else {},
+                    "sockets": self.controller.sockets.get_stats(),
+                    "http": self.controller.http.get_stats(),
+                    "files": self.controller.files.get_stats(),
+                    "voice": self.controller.voice.get_stats(),
+                    "serial": self.controller.get_serial_stats(),
+                }
+            elif verb_lower == "cells":
+                result = self._cells(rest.split())
+            elif verb_lower == "cancel":
+                active = self.controller.active_command
+                result = active.command if active is not None and active.cancel() else None
+            elif verb_lower == "call":
+                result = self._call(rest.split())
+            elif verb_lower.startswith("at"):
+                with self.controller.scheduler.priority("interactive"):
+                    result = self.controller.send_at_command(line, timeout=10)
+                if result is None:
+                    raise TimeoutError(f"Sem resposta para '{line}'.")
+            else:
+                raise ValueError(f"Comando desconhecido: '{verb}'. Use 'help'.")
+            session.send({"ok": True, "result": result})
+        except Exception as e:
+            session.send({"ok": False, "error": str(e)})
+        return True
+
+    def _cells(self, parts):
+        db = self.controller.cell_db
+        if not parts:
+            return {"serving": db.serving(), "bands": db.bands(), "cells_known": len(db)}
+        if parts[0] == "strongest":
+            return db.strongest_neighbours(int(parts[1]) if len(parts) > 1 else 5)
+        if parts[0] == "band" and len(parts) > 1:
+            return db.cells_in_band(int(parts[1]))
+        raise ValueError("Uso: cells [strongest [N] | band <N>]")
+
+    def _call(self, parts):
+        if not parts:
+            raise ValueError("Uso: call <metodo> [args...]")
+        name = parts[0]
+        method = getattr(self.controller, name, None)
+        if name.startswith("_") or not callable(method):
+            raise ValueError(f"Método desconhecido: '{name}'.")
+        with self.controller.scheduler.priority("interactive"):
+            return method(*[_parse_arg(arg) for arg in parts[1:]])
+
+    # --- Pollers e URCs ---
+
+    def _poll_loop(self, name, interval):
+        method = getattr(self.controller, POLLERS[name])
+        while not self.stop_event.wait(interval):
+            try:
+                with self.controller.scheduler.priority("background"):
+                    result = method()
+                logger.info(f"Poller '{name}': {result}")
+            except Exception as e:
+                logger.warning(f"Poller '{name}': Erro: {e}")
+
+    def _on_urc(self, urc_name, payload):
+        logger.info(f"ModemDaemon: URC {urc_name} {payload}")
+        with self._sessions_lock:
+            sessions = [s for s in self._sessions if s.receive_urcs]
+        for session in sessions:
+            session.send({"event": "urc", "urc": urc_name, "payload": payload})
+
+
+def discover_port(baudrate):
+    """Retorna a primeira porta em que um modem Quectel responde ao ATI (ou None)."""
+    for port in get_available_ports():
+        probe = ModemController(port=port, baudrate=baudrate, urc_profile=None)
+        if probe.connect_modem():
+            probe.disconnect_modem()
+            return port
+    return None
@@ -0,0 +1,220 @@
+# src/modem/data_mode.py
+import re
+import threading
+import time
+
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Tamanho máximo de cada bloco entregue ao sink
+DEFAULT_CHUNK_SIZE = 4096
+# Sem sink: bytes mantidos na sessão até read()/readinto(); cheio, a thread de leitura espera o consumidor
+DEFAULT_BUFFER_SIZE = 256 * 1024
+OVERFLOW_TIMEOUT = 5.0
+
+# Aberturas comuns de dados binários: CONNECT[ <n>] (AT+QHTTPREAD, AT+QFDWL, AT+QFREAD, modo transparente)
+CONNECT_START_RE = re.compile(rb'CONNECT(?: (?P<length>\d+))?\r\n')
+# Resultado de erro antes da abertura: o comando terminou sem dados
+_ERROR_RE = re.compile(rb'\r\n(?:ERROR|NO CARRIER|\+CM[ES] ERROR:[^\r\n]*)\r\n')
+
+
+class DataModeSession:
+    """
+    Consumidor binário para ModemController.data_mode()/raw_consumer(): recebe os bytes brutos da porta
+    antes do enquadramento de linhas e devolve ao texto AT só o que não é dado.
+    Os dados começam após start (ou no primeiro byte) e terminam por tamanho (length, ou o grupo "length"
+    de start) ou antes de terminator, que volta ao texto AT junto com o resto (ex: OK, NO CARRIER).
+    Com sink, os dados são entregues em memoryviews de até chunk_size bytes, válidos só durante a chamada
+    (sink roda na thread de leitura e deve ser rápido); sem sink, ficam na sessão para read()/readinto().
+    """
+
+    def __init__(self, sink=None, length=None, start=None, terminator=None, keep_start=False,
+                 chunk_size=DEFAULT_CHUNK_SIZE, buffer_size=DEFAULT_BUFFER_SIZE):
+        """
+        :param sink: Callable(memoryview) (ex: file.write, bytearray.extend). None = buffer interno.
+        :param length: Bytes de dados esperados (None = até terminator ou close()).
+        :param start: Regex (bytes) que abre os dados; None = dados desde o primeiro byte.
+        :param terminator: Sequência que encerra os dados quando o tamanho não é conhecido.
+        :param keep_start: Mantém o texto de start na resposta do comando (ex: +QIRD: <n>).
+        """
+        self.sink = sink
+        self.length = length
+        self.remaining = length
+        self.start = start
+        self.terminator = terminator
+        self.keep_start = keep_start
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.started = start is None
+        self.finished = False # Não consome mais bytes (fronteira, erro ou close())
+        self.completed = False # Dados terminaram na fronteira (tamanho/terminador)
+        self.error = False # Comando terminou com erro antes dos dados
+        # Contabilidade exata: vistos = dados + texto AT devolvido + abertura consumida + pendentes
+        self.bytes_seen = 0
+        self.bytes_data = 0
+        self.bytes_text = 0
+        self.bytes_framing = 0
+        self.bytes_dropped = 0 # Dados descartados com o buffer interno cheio
+        self.started_at = None
+        self.finished_at = None
+        self._head = bytearray() # Antes de start
+        self._hold = b"" # Fim do bloco anterior que pode ser o início do terminador
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+
+    # --- Thread de leitura ---
+
+    def __call__(self, data):
+        self.bytes_seen += len(data)
+        if self.finished:
+            return self._text(data)
+        text = b""
+        if not self.started:
+            self._head += data
+            match = self.start.search(self._head)
+            if match is None:
+                if _ERROR_RE.search(self._head):
+                    self.error = True
+                    self._finish()
+                    text = bytes(self._head)
+                    self._head.clear()
+                    return self._text(text)
+                return b""
+            if "length" in self.start.groupindex and match.group("length") is not None:
+                self.length = self.remaining = int(match.group("length"))
+            text = bytes(self._head[:match.end() if self.keep_start else match.start()])
+            if not self.keep_start:
+                self.bytes_framing += match.end() - match.start()
+            data = bytes(self._head[match.end():])
+            self._head.clear()
+            self.started = True
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+        if self.remaining is not None:
+            take = min(self.remaining, len(data))
+            self._deliver(memoryview(data)[:take])
+            self.remaining -= take
+            if self.remaining == 0:
+                self._finish(completed=True)
+                return self._text(text + data[take:])
+            return self._text(text)
+        if self.terminator is None:
+            self._deliver(memoryview(data))
+            return self._text(text)
+
+        window = self._hold + data
+        found_at = window.find(self.terminator)
+        if found_at >= 0:
+            self._hold = b""
+            self._deliver(memoryview(window)[:found_at])
+            self._finish(completed=True)
+            return self._text(text + window[found_at:])
+        keep = min(len(window), len(self.terminator) - 1)
+        self._deliver(memoryview(window)[:len(window) - keep])
+        self._hold = window[len(window) - keep:]
+        return self._text(text)
+
+    def _text(self, data):
+        self.bytes_text += len(data)
+        return data
+
+    def _deliver(self, view):
+        if not view:
+            return
+        self.bytes_data += len(view)
+        if self.sink is not None:
+            for offset in range(0, len(view), self.chunk_size):
+                self.sink(view[offset:offset + self.chunk_size])
+            return
+        with self._cond:
+            # Blocos maiores que o buffer entram aos pedaços; o prazo conta desde o último progresso do consumidor
+            deadline = time.monotonic() + OVERFLOW_TIMEOUT
+            while view:
+                room = self.buffer_size - len(self._buffer)
+                if room > 0:
+                    self._buffer += view[:room]
+                    view = view[room:]
+                    deadline = time.monotonic() + OVERFLOW_TIMEOUT
+                    self._cond.notify_all()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.finished:
+                    self.bytes_dropped += len(view)
+                    logger.warning(f"DataModeSession: Buffer cheio; {len(view)} bytes descartados.")
+                    break
+                self._cond.wait(remaining)
+
+    def _finish(self, completed=False):
+        with self._cond:
+            self.finished = True
+            self.completed = completed
+            self.finished_at = time.perf_counter()
+            self._cond.notify_all()
+
+    # --- Consumidor ---
+
+    def readinto(self, buffer, timeout=None):
+        """
+        Copia dados pendentes para buffer (bytearray/memoryview/array), esperando até timeout por algum.
+        :return: Bytes copiados; 0 quando a sessão terminou e não há mais dados.
+        :raises TimeoutError: Nenhum dado em timeout segundos.
+        """
+        target = memoryview(buffer).cast('B')
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._buffer or self.finished, timeout):
+                raise TimeoutError(f"DataModeSession: nenhum dado em {timeout}s.")
+            count = min(len(target), len(self._buffer))
+            with memoryview(self._buffer) as pending:
+                target[:count] = pending[:count]
+            del self._buffer[:count]
+            self._cond.notify_all()
+            return count
+
+    def read(self, size=-1, timeout=None):
+        """Até size bytes pendentes (size < 0: tudo o que já chegou); b"" no fim da sessão."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._buffer or self.finished, timeout):
+                raise TimeoutError(f"DataModeSession: nenhum dado em {timeout}s.")
+            count = len(self._buffer) if size < 0 else min(size, len(self._buffer))
+            data = bytes(self._buffer[:count])
+            del self._buffer[:count]
+            self._cond.notify_all()
+            return data
+
+    def wait(self, timeout=None):
+        """Espera a fronteira dos dados (tamanho/terminador/erro). :return: True se a sessão terminou."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def close(self):
+        """Encerra a sessão sem fronteira (ex: saída do modo transparente): bytes seguintes voltam ao texto AT."""
+        if not self.finished:
+            self._finish()
+
+    # --- Estatísticas ---
+
+    @property
+    def bytes_pending(self):
+        """Bytes vistos ainda não classificados (abertura incompleta ou possível início do terminador)."""
+        return len(self._head) + len(self._hold)
+
+    @property
+    def throughput(self):
+        if self.started_at is None:
+            return None
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return self.bytes_data / elapsed if elapsed > 0 else None
+
+    def get_stats(self):
+        return {
+            "seen": self.bytes_seen,
+            "data": self.bytes_data,
+            "text": self.bytes_text,
+            "framing": self.bytes_framing,
+            "pending": self.bytes_pending,
+            "dropped": self.bytes_dropped,
+            "completed": self.completed,
+            "throughput": self.throughput, # bytes/s desde o início dos dados
+        }
@@ -0,0 +1,372 @@
+# src/modem/file_transfer.py
+import errno
+import io
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from src.modem.at_commands import AT_COMMANDS, parse_file_list_values
+from src.modem.data_mode import CONNECT_START_RE, DataModeSession
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Blocos do AT+QFWRITE/AT+QFREAD (retomada)
+DEFAULT_BLOCK_SIZE = 16 * 1024
+# Timeout de entrada (s) do AT+QFUPL/QFWRITE: o modem desiste se os dados pararem por esse tempo
+INPUT_TIMEOUT = 5
+# Margem (s) somada ao tempo de linha estimado para o volume transferido
+TRANSFER_TIMEOUT_MARGIN = 10
+# Novas tentativas de upload/download (retomando do tamanho já transferido)
+TRANSFER_RETRIES = 3
+# Bytes descartados do fim de um upload interrompido: podem ser comandos AT lidos como dados do arquivo
+RESUME_SAFETY_MARGIN = 64
+# Espera (s) pelo modem voltar a responder AT depois de uma transferência interrompida
+RESYNC_TIMEOUT = 10
+
+# Modos do AT+QFOPEN
+OPEN_OR_CREATE, CREATE_OR_CLEAR, READ_ONLY = 0, 1, 2
+
+_RESULT_RE = re.compile(r'\+QF(?:UPL|DWL):\s*(\d+),([0-9A-Fa-f]+)')
+
+
+class ModemFileError(OSError):
+    """Falha de uma operação no sistema de arquivos do modem (UFS)."""
+
+
+class ChecksumMismatch(ModemFileError):
+    """Conteúdo divergente do arquivo inteiro: não dá para retomar, a transferência recomeça do zero."""
+
+
+class UfsChecksum:
+    """
+    Checksum do AT+QFUPL/AT+QFDWL: XOR de todas as palavras de 16 bits (big-endian; um byte final
+    ímpar é completado com zero). Incremental: blocos de qualquer tamanho, na ordem do arquivo.
+    """
+
+    def __init__(self, data=b""):
+        self.value = 0
+        self._odd = b""
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        data = self._odd + bytes(data)
+        self._odd = data[-1:] if len(data) % 2 else b""
+        words = len(data) // 2
+        folded = int.from_bytes(data[:words * 2], "big")
+        while words > 1: # Dobra o inteiro ao meio (alinhado em palavras) até sobrar uma palavra
+            half = words // 2
+            folded = (folded >> (16 * half)) ^ (folded & ((1 << (16 * half)) - 1))
+            words -= half
+        self.value ^= folded
+
+    def digest(self):
+        return self.value ^ (self._odd[0] << 8 if self._odd else 0)
+
+    def hexdigest(self):
+        return f"{self.digest():x}"
+
+
+class TransferResult:
+    """Resultado de um upload/download: bytes transferidos nesta chamada, tempo, vazão e retomadas."""
+
+    def __init__(self, name, direction, size):
+        self.name = name
+        self.direction = direction # "upload" ou "download"
+        self.size = size
+        self.bytes_transferred = 0
+        self.elapsed = 0.0
+        self.resumes = 0
+        self.checksum = None # Checksum do arquivo inteiro, conferido com o do modem (relido com AT+QFDWL após retomadas)
+        self.data = None # Conteúdo, em downloads sem destino
+
+    def __repr__(self):
+        return (f"<TransferResult {self.direction} {self.name} {self.bytes_transferred}/{self.size} bytes "
+                f"{self.throughput or 0:,.0f} B/s, {self.resumes} retomada(s)>")
+
+    @property
+    def throughput(self):
+        return self.bytes_transferred / self.elapsed if self.elapsed else None
+
+
+def _checksummed(sink, checksum):
+    """Sink que alimenta o checksum com cada bloco antes de repassá-lo."""
+    def deliver(view):
+        checksum.update(view)
+        sink(view)
+    return deliver
+
+
+class FileTransfer:
+    """
+    Upload/download de arquivos do sistema de arquivos do modem (UFS: áudios, certificados, scripts).
+    O caminho normal é um fluxo único (AT+QFUPL/AT+QFDWL) conferido pelo checksum do modem; após uma
+    interrupção, a transferência continua do tamanho já transferido em blocos (AT+QFOPEN/QFSEEK/QFWRITE/QFREAD).
+    Os dados recebidos não passam pelo buffer de texto do controller (raw_consumer).
+    """
+
+    def __init__(self, controller, block_size=DEFAULT_BLOCK_SIZE, flow_control=False):
+        """
+        :param controller: ModemController.
+        :param block_size: Tamanho dos blocos AT+QFWRITE/AT+QFREAD usados na retomada.
+        :param flow_control: Ativa RTS/CTS (AT+IFC=2,2 e rtscts na porta) durante as transferências.
+                             Necessário em UARTs físicas em baud rates altos; indiferente nas portas USB.
+        """
+        self.controller = controller
+        self.block_size = block_size
+        self.flow_control = flow_control
+        self.transfers = 0
+        self.bytes_transferred = 0
+        self.seconds = 0.0
+        self.last_result = None
+
+    # --- Arquivos ---
+
+    def list_files(self, pattern="*"):
+        """:return: {nome: tamanho} dos arquivos UFS que casam com pattern."""
+        response = self._command(AT_COMMANDS["FILE_LIST"]["command"].format(pattern), "OK", allow_error=True)
+        return parse_file_list_values(response)
+
+    def delete_file(self, name):
+        self._command(AT_COMMANDS["FILE_DELETE"]["command"].format(name), "OK")
+
+    def _remote_size(self, name):
+        return self.list_files(name).get(name[4:] if name.upper().startswith("UFS:") else name)
+
+    # --- Upload ---
+
+    def upload(self, source, name, resume=True, retries=TRANSFER_RETRIES):
+        """
+        Envia source (caminho local ou bytes-like) para o arquivo UFS name.
+        :param resume: Após uma interrupção, continua do tamanho já gravado no modem (senão recomeça).
+        :raises ModemFileError: Modem recusou, checksum divergente ou tentativas esgotadas.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                source = f.read()
+        data = memoryview(source).cast('B')
+        result = TransferResult(name, "upload", len(data))
+        checksum = UfsChecksum(data).digest()
+        started = time.perf_counter()
+        offset = 0
+        with self._hardware_flow_control():
+            for attempt in range(retries + 1):
+                try:
+                    if offset == 0:
+                        result.checksum = self._upload_stream(name, data, checksum)
+                    else:
+                        result.resumes += 1
+                        self._write_blocks(name, data, offset)
+                        result.checksum = self._verify(name, len(data), checksum) # Retomada: confere o arquivo inteiro
+                    break
+                except (ModemFileError, TimeoutError) as e:
+                    if attempt == retries:
+                        raise
+                    self._resync()
+                    if isinstance(e, ChecksumMismatch): # Prefixo gravado não é confiável: apaga e reenvia tudo
+                        self.controller.send_at_command(AT_COMMANDS["FILE_DELETE"]["command"].format(name), expected_response="OK")
+                        offset = 0
+                    else:
+                        offset = max(0, (self._remote_size(name) or 0) - RESUME_SAFETY_MARGIN) if resume else 0
+                    logger.warning(f"FileTransfer: Upload de '{name}' interrompido ({e}); retomando do byte {offset} "
+                                   f"(tentativa {attempt + 1}/{retries}).")
+            remote_size = self._remote_size(name)
+        if remote_size != len(data):
+            raise ModemFileError(errno.EIO, f"Upload de '{name}' terminou com {remote_size} bytes no modem (esperado {len(data)}).")
+        result.bytes_transferred = len(data)
+        result.elapsed = time.perf_counter() - started
+        return self._account(result)
+
+    def _upload_stream(self, name, data, checksum):
+        command = AT_COMMANDS["FILE_UPLOAD"]["command"].format(name, len(data), INPUT_TIMEOUT)
+        response = self.controller.send_at_command(command, expected_response="+QFUPL", timeout=self._line_timeout(len(data)),
+                                                   payload=data, prompt=b"CONNECT")
+        match = _RESULT_RE.search(response or "")
+        if not match:
+            raise ModemFileError(errno.EIO, f"AT+QFUPL de '{name}' falhou. Resposta: {response!r}")
+        size, remote = int(match.group(1)), int(match.group(2), 16)
+        if size != len(data):
+            raise ModemFileError(errno.EIO, f"AT+QFUPL gravou {size} de {len(data)} bytes em '{name}'.")
+        if remote != checksum:
+            raise ChecksumMismatch(errno.EIO, f"Checksum divergente no upload de '{name}': modem {remote:x}, local {checksum:x}.")
+        return remote
+
+    def _write_blocks(self, name, data, offset):
+        with self._open(name, OPEN_OR_CREATE) as handle:
+            self._command(AT_COMMANDS["FILE_SEEK"]["command"].format(handle, offset), "OK")
+            self._command(AT_COMMANDS["FILE_TRUNCATE"]["command"].format(handle), "OK")
+            for start in range(offset, len(data), self.block_size):
+                block = data[start:start + self.block_size]
+                command = AT_COMMANDS["FILE_WRITE"]["command"].format(handle, len(block), INPUT_TIMEOUT)
+                response = self.controller.send_at_command(command, expected_response="+QFWRITE",
+                                                           timeout=self._line_timeout(len(block)), payload=block, prompt=b"CONNECT")
+                match = re.search(r'\+QFWRITE:\s*(\d+),(\d+)', response or "")
+                if not match or int(match.group(1)) != len(block):
+                    raise ModemFileError(errno.EIO, f"AT+QFWRITE em '{name}' (byte {start}) falhou. Resposta: {response!r}")
+
+    # --- Download ---
+
+    def download(self, name, destination=None, resume=True, retries=TRANSFER_RETRIES):
+        """
+        Lê o arquivo UFS name para destination (caminho local, via destination + ".part") ou, sem
+        destination, para bytes em result.data.
+        :param resume: Continua um .part deixado por uma execução anterior.
+        :raises ModemFileError: Arquivo inexistente, checksum divergente ou tentativas esgotadas.
+        """
+        size = self._remote_size(name)
+        if size is None:
+            raise ModemFileError(errno.ENOENT, f"Arquivo '{name}' não existe no modem.")
+        result = TransferResult(name, "download", size)
+        part = destination + ".part" if destination else None
+        offset = os.path.getsize(part) if part and resume and os.path.exists(part) else 0
+        if offset > size: # .part de outra versão do arquivo: não é prefixo deste, recomeça do zero
+            logger.warning(f"FileTransfer: '{part}' tem {offset} bytes, mais que os {size} de '{name}'; baixando de novo.")
+            offset = 0
+        initial_offset = offset
+        started = time.perf_counter()
+        with self._hardware_flow_control(), (open(part, "ab" if offset else "wb") if part else io.BytesIO()) as f:
+            for attempt in range(retries + 1):
+                try:
+                    if offset == 0:
+                        result.checksum = self._download_stream(name, size, f.write)
+                    else:
+                        if offset < size:
+                            result.resumes += 1
+                            self._read_blocks(name, offset, size, f.write)
+                        f.flush() # Retomada (ou .part já completo): confere o arquivo inteiro
+                        result.checksum = self._verify(name, size, self._local_checksum(f, part))
+                    break
+                except (ModemFileError, TimeoutError) as e:
+                    if attempt == retries:
+                        raise
+                    f.flush()
+                    if isinstance(e, ChecksumMismatch): # Algum byte já gravado está errado: recomeça do zero
+                        f.seek(0)
+                        f.truncate()
+                    offset = f.tell() # Leituras delimitadas por tamanho: o que chegou ao arquivo é dado do arquivo
+                    self._resync()
+                    logger.warning(f"FileTransfer: Download de '{name}' interrompido ({e}); retomando do byte {offset} "
+                                   f"(tentativa {attempt + 1}/{retries}).")
+            result.bytes_transferred = f.tell() - initial_offset
+            if not part:
+                result.data = f.getvalue()
+        if part:
+            os.replace(part, destination)
+        result.elapsed = time.perf_counter() - started
+        return self._account(result)
+
+    def _download_stream(self, name, size, sink):
+        checksum = UfsChecksum()
+        # CONNECT\r\n<dados>\r\n+QFDWL: <tamanho>,<checksum>\r\n\r\nOK; após uma queda, quem ressincroniza é _resync()
+        session = DataModeSession(sink=_checksummed(sink, checksum), length=size, start=CONNECT_START_RE)
+        command = AT_COMMANDS["FILE_DOWNLOAD"]["command"].format(name)
+        with self.controller.data_mode(session, resync=False):
+            response = self.controller.send_at_command(command, expected_response="+QFDWL", timeout=self._line_timeout(size))
+        match = _RESULT_RE.search(response or "")
+        if not session.completed or not match:
+            raise ModemFileError(errno.EIO, f"AT+QFDWL de '{name}' interrompido após {session.bytes_data} bytes. Resposta: {response!r}")
+        remote = int(match.group(2), 16)
+        if remote != checksum.digest():
+            raise ChecksumMismatch(errno.EIO, f"Checksum divergente no download de '{name}': modem {remote:x}, local {checksum.hexdigest()}.")
+        return remote
+
+    def _verify(self, name, size, checksum):
+        """
+        Confere o arquivo inteiro depois de uma retomada em blocos (que não tem checksum do modem):
+        relê name com AT+QFDWL, sem guardar os dados, e compara o checksum do modem com checksum.
+        :raises ChecksumMismatch: O arquivo do modem não é o esperado.
+        """
+        remote = self._download_stream(name, size, lambda view: None)
+        if remote != checksum:
+            raise ChecksumMismatch(errno.EIO, f"Checksum divergente em '{name}' após a retomada: modem {remote:x}, local {checksum:x}.")
+        return remote
+
+    @staticmethod
+    def _local_checksum(f, part):
+        """Checksum do que já foi gravado: o .part relido do disco, ou o BytesIO em memória."""
+        if part is None:
+            return UfsChecksum(f.getbuffer()).digest()
+        checksum = UfsChecksum()
+        with open(part, "rb") as local:
+            for block in iter(lambda: local.read(DEFAULT_BLOCK_SIZE), b""):
+                checksum.update(block)
+        return checksum.digest()
+
+    def _read_blocks(self, name, offset, size, sink):
+        with self._open(name, READ_ONLY) as handle:
+            self._command(AT_COMMANDS["FILE_SEEK"]["command"].format(handle, offset), "OK")
+            while offset < size:
+                # CONNECT <n>\r\n<n bytes>\r\nOK: o tamanho do bloco vem do próprio modem
+                session = DataModeSession(sink=sink, start=CONNECT_START_RE)
+                command = AT_COMMANDS["FILE_READ"]["command"].format(handle, min(self.block_size, size - offset))
+                with self.controller.data_mode(session, resync=False):
+                    response = self.controller.send_at_command(command, expected_response="OK",
+                                                               timeout=self._line_timeout(self.block_size))
+                if not session.completed or not response or "OK" not in response or not session.bytes_data:
+                    raise ModemFileError(errno.EIO, f"AT+QFREAD de '{name}' (byte {offset}) falhou. Resposta: {response!r}")
+                offset += session.bytes_data
+
+    # --- Apoio ---
+
+    @contextmanager
+    def _open(self, name, mode):
+        response = self._command(AT_COMMANDS["FILE_OPEN"]["command"].format(name, mode), "+QFOPEN")
+        match = re.search(r'\+QFOPEN:\s*(\d+)', response)
+        if not match:
+            raise ModemFileError(errno.EIO, f"AT+QFOPEN de '{name}' sem handle. Resposta: {response!r}")
+        handle = int(match.group(1))
+        try:
+            yield handle
+        finally:
+            self.controller.send_at_command(AT_COMMANDS["FILE_CLOSE"]["command"].format(handle), expected_response="OK")
+
+    def _command(self, command, expected_response, allow_error=False):
+        response = self.controller.send_at_command(command, expected_response=expected_response)
+        if response is None or (not allow_error and "ERROR" in response):
+            raise ModemFileError(errno.EIO, f"Modem recusou '{command}'. Resposta: {response!r}")
+        return response
+
+    def _line_timeout(self, size):
+        """Timeout de uma transferência de size bytes: o dobro do tempo de linha (10 bits/byte) mais a margem."""
+        return 2 * size * 10 / (self.controller.baudrate or 115200) + TRANSFER_TIMEOUT_MARGIN
+
+    def _resync(self):
+        """
+        Depois de uma interrupção, o modem pode continuar em modo de dados até esgotar INPUT_TIMEOUT
+        (upload) ou terminar de despejar o arquivo (download): espera e só volta quando responder AT.
+        """
+        time.sleep(INPUT_TIMEOUT)
+        if not self.controller.resync(RESYNC_TIMEOUT):
+            raise ModemFileError(errno.EIO, "Modem não voltou ao modo de comandos após a transferência interrompida.")
+
+    @contextmanager
+    def _hardware_flow_control(self):
+        port = self.controller.serial_port
+        if not self.flow_control or port is None or getattr(port, "rtscts", False):
+            yield
+            return
+        self._command(AT_COMMANDS["SET_FLOW_CONTROL"]["command"].format(2, 2), "OK")
+        port.rtscts = True
+        try:
+            yield
+        finally:
+            self.controller.send_at_command(AT_COMMANDS["SET_FLOW_CONTROL"]["command"].format(0, 0), expected_response="OK")
+            port.rtscts = False
+
+    def _account(self, result):
+        self.transfers += 1
+        self.bytes_transferred += result.bytes_transferred
+        self.seconds += result.elapsed
+        self.last_result = result
+        logger.info(f"FileTransfer: {result}")
+        return result
+
+    def get_stats(self):
+        return {
+            "transfers": self.transfers,
+            "bytes_transferred": self.bytes_transferred,
+            "throughput": self.bytes_transferred / self.seconds if self.seconds else None, # bytes/s
+            "last": repr(self.last_result) if self.last_result else None,
+        }
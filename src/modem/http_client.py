@@ -0,0 +1,324 @@
+# src/modem/http_client.py
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from urllib.parse import urlsplit
+
+from src.modem.at_commands import AT_COMMANDS
+from src.modem.data_mode import CONNECT_START_RE, DataModeSession
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Timeouts (s): resposta do servidor (<rsptime>/<wait_time>) e entrada de URL/cabeçalho/corpo após o CONNECT
+HTTP_TIMEOUT = 60
+HTTP_INPUT_TIMEOUT = 30
+# Corpo do POST: <input_time> cobre o dobro do tempo de linha (10 bits/byte) mais a margem; o modem aceita até 65535 s
+HTTP_INPUT_MARGIN = 10
+HTTP_INPUT_MAX = 65535
+# Espera (s) pelo URC final (+QHTTPREAD/+QHTTPREADFILE) depois do OK
+HTTP_RESULT_GRACE = 5
+# Tamanho máximo de cada bloco entregue ao sink
+DEFAULT_CHUNK_SIZE = 4096
+# Downloads: novas tentativas (retomando com Range) e bytes descartados do fim após uma falha,
+# que podem ser o trailer do modem (\r\nOK\r\n\r\n+QHTTPREAD: <err>) lido como corpo
+DOWNLOAD_RETRIES = 3
+RESUME_SAFETY_MARGIN = 64
+
+# <contenttype> do AT+QHTTPCFG
+CONTENT_TYPES = {
+    "application/x-www-form-urlencoded": 0,
+    "text/plain": 1,
+    "application/octet-stream": 2,
+    "multipart/form-data": 3,
+}
+
+# Códigos <err> dos URCs +QHTTP* (0 = sucesso)
+HTTP_ERRORS = {
+    701: "erro HTTP(S) desconhecido", 702: "timeout", 703: "HTTP(S) ocupado", 704: "UART ocupada",
+    705: "sem requisição GET/POST", 706: "rede ocupada", 707: "falha ao abrir a rede", 708: "rede sem configuração",
+    709: "rede desativada", 710: "erro de rede", 711: "erro de URL", 712: "URL vazia", 713: "erro de endereço IP",
+    714: "erro de DNS", 715: "erro ao criar o socket", 716: "erro ao conectar o socket", 717: "erro ao ler o socket",
+    718: "erro ao escrever no socket", 719: "socket fechado", 720: "erro de codificação", 721: "erro de decodificação",
+    722: "timeout de leitura", 723: "falha na resposta", 724: "chamada recebida ocupada", 725: "chamada de voz ocupada",
+    726: "timeout de entrada", 727: "timeout esperando dados", 728: "timeout esperando a resposta HTTP(S)",
+    729: "falha de alocação de memória", 730: "parâmetro inválido",
+}
+
+# Fim do corpo sem Content-Length: resultado do AT+QHTTPREAD seguido do URC
+_BODY_TRAILER = b"\r\nOK\r\n\r\n+QHTTPREAD:"
+
+
+class ModemHttpError(OSError):
+    """Falha de uma operação HTTP(S) do modem (código <err> do modem ou status HTTP de erro)."""
+
+    def __init__(self, message, err=None, status=None):
+        super().__init__(message)
+        self.err = err
+        self.status = status
+
+
+def _raise_for_err(operation, err):
+    if err:
+        raise ModemHttpError(f"{operation}: {HTTP_ERRORS.get(err, 'erro')} ({err}).", err=err)
+
+
+class HttpResponse:
+    """Resultado de uma requisição: status, tamanho, bytes entregues e vazão da leitura do corpo."""
+
+    def __init__(self, status, content_length, offset=0):
+        self.status = status
+        self.content_length = content_length # Do cabeçalho (None se o servidor não informou)
+        self.offset = offset # Primeiro byte pedido (Range)
+        self.bytes_received = 0
+        self.elapsed = 0.0 # Segundos lendo o corpo (AT+QHTTPREAD)
+        self.body = None # Só quando get()/post() são chamados sem sink
+
+    def __repr__(self):
+        return f"<HttpResponse {self.status} {self.bytes_received} bytes {self.throughput or 0:,.0f} B/s>"
+
+    @property
+    def throughput(self):
+        return self.bytes_received / self.elapsed if self.elapsed else None
+
+
+def _skipping(sink, count):
+    """Sink que descarta os primeiros count bytes (servidor ignorou o Range e mandou desde o início)."""
+    pending = [count]
+
+    def deliver(view):
+        dropped = min(pending[0], len(view))
+        pending[0] -= dropped
+        if dropped < len(view):
+            sink(view[dropped:])
+    return deliver
+
+
+class HttpClient:
+    """
+    Cliente HTTP(S) sobre AT+QHTTPURL/QHTTPGET/QHTTPPOST/QHTTPREAD/QHTTPREADFILE.
+    Os corpos são entregues em blocos a um sink (ex: file.write) direto da thread de leitura, sem acumular
+    na resposta do comando; downloads retomam com Range após falhas. Uma operação por vez (o modem tem um
+    único contexto HTTP). O sink recebe memoryviews válidos apenas durante a chamada e deve ser rápido.
+    """
+
+    def __init__(self, controller, context_id=1, ssl_context_id=1, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param controller: ModemController.
+        :param context_id: Contexto PDP (AT+QIACT) usado nas requisições.
+        :param ssl_context_id: Contexto SSL (AT+QSSLCFG) usado em URLs https.
+        :param chunk_size: Tamanho máximo dos blocos entregues ao sink.
+        """
+        self.controller = controller
+        self.context_id = context_id
+        self.ssl_context_id = ssl_context_id
+        self.chunk_size = chunk_size
+        self.transfers = 0
+        self.bytes_received = 0
+        self.seconds = 0.0
+        self.last_response = None
+        self._lock = threading.Lock()
+        self._results = {} # Nome do URC esperado -> Future com o payload
+        controller.urc_dispatcher.subscribe(self._on_urc, urc_names=("QHTTPGET", "QHTTPPOST", "QHTTPREAD", "QHTTPREADFILE"),
+                                            name="http")
+
+    # --- API pública ---
+
+    def get(self, url, sink=None, offset=0, timeout=HTTP_TIMEOUT):
+        """
+        GET com o corpo entregue ao sink em blocos.
+        :param sink: Callable(memoryview) (ex: file.write). Sem sink, o corpo fica em response.body.
+        :param offset: Primeiro byte pedido (cabeçalho Range); se o servidor ignorar o Range, os bytes
+                       anteriores são descartados na leitura.
+        :raises ModemHttpError: Erro do modem ou status HTTP >= 400.
+        """
+        with self._lock:
+            self._prepare(url)
+            status, length = self._send_get(url, offset, timeout)
+            response = HttpResponse(status, length, offset)
+            skip = offset if offset and status == 200 else 0
+            self._check_status(response, url)
+            return self._read(response, sink, skip, timeout)
+
+    def post(self, url, body, content_type="application/octet-stream", sink=None, timeout=HTTP_TIMEOUT):
+        """POST de body (bytes-like, enviado em fatias de memoryview); a resposta é lida como em get()."""
+        if content_type not in CONTENT_TYPES:
+            raise ValueError(f"Content-Type não suportado pelo modem: '{content_type}'. Use: {', '.join(CONTENT_TYPES)}.")
+        body = memoryview(body).cast('B')
+        with self._lock:
+            self._prepare(url)
+            self._config("requestheader", 0)
+            self._config("contenttype", CONTENT_TYPES[content_type])
+            future = self._expect("QHTTPPOST")
+            input_time = self._input_timeout(len(body))
+            command = AT_COMMANDS["HTTP_POST"]["command"].format(len(body), input_time, timeout)
+            self._send(command, payload=body, timeout=input_time + 5)
+            err, status, length = self._wait(future, "QHTTPPOST", timeout)
+            _raise_for_err("POST", err)
+            response = HttpResponse(status, length)
+            self._check_status(response, url)
+            return self._read(response, sink, 0, timeout)
+
+    def download(self, url, path, resume=True, retries=DOWNLOAD_RETRIES, timeout=HTTP_TIMEOUT):
+        """
+        Baixa url para path via path + ".part", retomando com Range depois de falhas (e de execuções
+        anteriores, com resume=True). O arquivo final só aparece completo. Status HTTP de erro não é repetido.
+        :return: HttpResponse da última requisição (bytes_received conta só a última tentativa).
+        """
+        part = path + ".part"
+        offset = os.path.getsize(part) if resume and os.path.exists(part) else 0
+        for attempt in range(retries + 1):
+            with open(part, "ab" if offset else "wb") as f:
+                try:
+                    response = self.get(url, sink=f.write, offset=offset, timeout=timeout)
+                    break
+                except ModemHttpError as e:
+                    if e.status == 416 and offset: # Range além do fim: o .part já está completo
+                        response = HttpResponse(416, 0, offset)
+                        break
+                    if e.status is not None and e.status >= 400:
+                        raise # Resposta definitiva do servidor (404, 403...): repetir não muda nada
+                    error = e
+                except TimeoutError as e:
+                    error = e
+                f.flush()
+                offset = max(0, f.tell() - RESUME_SAFETY_MARGIN)
+                f.truncate(offset)
+            if attempt == retries:
+                raise error
+            logger.warning(f"HttpClient: Download de {url} interrompido ({error}); retomando do byte {offset} "
+                           f"(tentativa {attempt + 1}/{retries}).")
+        os.replace(part, path)
+        logger.info(f"HttpClient: {url} salvo em {path} ({os.path.getsize(path)} bytes). {response}")
+        return response
+
+    def download_to_ufs(self, url, filename, timeout=HTTP_TIMEOUT):
+        """GET com o corpo gravado direto no sistema de arquivos do modem (AT+QHTTPREADFILE="UFS:<arquivo>")."""
+        with self._lock:
+            self._prepare(url)
+            status, length = self._send_get(url, 0, timeout)
+            response = HttpResponse(status, length)
+            self._check_status(response, url)
+            future = self._expect("QHTTPREADFILE")
+            name = filename if filename.upper().startswith("UFS:") else f"UFS:{filename}"
+            started = time.perf_counter()
+            self._send(AT_COMMANDS["HTTP_READ_FILE"]["command"].format(name, timeout), timeout=timeout + 5)
+            (err,) = self._wait(future, "QHTTPREADFILE", timeout)
+            _raise_for_err("QHTTPREADFILE", err)
+            response.elapsed = time.perf_counter() - started
+            response.bytes_received = length or 0
+            self._account(response)
+            return response
+
+    def get_stats(self):
+        return {
+            "transfers": self.transfers,
+            "bytes_received": self.bytes_received,
+            "throughput": self.bytes_received / self.seconds if self.seconds else None, # bytes/s lendo corpos
+            "last": repr(self.last_response) if self.last_response else None,
+        }
+
+    # --- Etapas ---
+
+    def _send(self, command, payload=None, timeout=HTTP_TIMEOUT):
+        response = self.controller.send_at_command(command, expected_response="OK", timeout=timeout, payload=payload,
+                                                   prompt=b"CONNECT")
+        if not response or "OK" not in response:
+            raise ModemHttpError(f"Modem recusou '{command}'. Resposta: {response!r}")
+        return response
+
+    def _input_timeout(self, size):
+        """<input_time> (s) para enviar size bytes: nunca menor que HTTP_INPUT_TIMEOUT."""
+        line_time = 2 * size * 10 / (self.controller.baudrate or 115200)
+        return min(max(HTTP_INPUT_TIMEOUT, math.ceil(line_time) + HTTP_INPUT_MARGIN), HTTP_INPUT_MAX)
+
+    def _config(self, name, value):
+        self._send(AT_COMMANDS["HTTP_CONFIG"]["command"].format(name, value))
+
+    def _prepare(self, url):
+        self._config("contextid", self.context_id)
+        self._config("responseheader", 0)
+        if url.lower().startswith("https://"):
+            self._config("sslctxid", self.ssl_context_id)
+        encoded = url.encode("utf-8")
+        command = AT_COMMANDS["HTTP_SET_URL"]["command"].format(len(encoded), HTTP_INPUT_TIMEOUT)
+        self._send(command, payload=encoded, timeout=HTTP_INPUT_TIMEOUT + 5)
+
+    def _send_get(self, url, offset, timeout):
+        future = self._expect("QHTTPGET")
+        if offset:
+            # Range exige cabeçalho próprio: com requestheader=1 o modem envia a requisição como escrita
+            parts = urlsplit(url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            header = (f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nRange: bytes={offset}-\r\n"
+                      f"Accept: */*\r\nConnection: keep-alive\r\n\r\n").encode("utf-8")
+            self._config("requestheader", 1)
+            command = AT_COMMANDS["HTTP_GET_WITH_HEADER"]["command"].format(timeout, len(header), HTTP_INPUT_TIMEOUT)
+            self._send(command, payload=header, timeout=HTTP_INPUT_TIMEOUT + 5)
+        else:
+            self._config("requestheader", 0)
+            self._send(AT_COMMANDS["HTTP_GET"]["command"].format(timeout))
+        err, status, length = self._wait(future, "QHTTPGET", timeout)
+        _raise_for_err("GET", err)
+        return status, length
+
+    def _read(self, response, sink, skip, timeout):
+        body = None
+        if sink is None:
+            body = bytearray()
+            sink = body.extend
+        # CONNECT\r\n<corpo>\r\nOK\r\n\r\n+QHTTPREAD: <err>: sem Content-Length, o corpo termina no trailer
+        session = DataModeSession(sink=_skipping(sink, skip) if skip else sink, length=response.content_length,
+                                  start=CONNECT_START_RE, terminator=_BODY_TRAILER, chunk_size=self.chunk_size)
+        future = self._expect("QHTTPREAD")
+        started = time.perf_counter()
+        with self.controller.data_mode(session):
+            result = self.controller.send_at_command(AT_COMMANDS["HTTP_READ"]["command"].format(timeout),
+                                                     expected_response="OK", timeout=timeout + 5)
+        response.elapsed = time.perf_counter() - started
+        response.bytes_received = max(0, session.bytes_data - skip)
+        if not result or "OK" not in result or not session.completed:
+            self._results.pop("QHTTPREAD", None)
+            error = ModemHttpError(f"Leitura do corpo interrompida após {response.bytes_received} bytes. Resposta: {result!r}")
+            error.bytes_received = response.bytes_received
+            raise error
+        (err,) = self._wait(future, "QHTTPREAD", HTTP_RESULT_GRACE)
+        _raise_for_err("QHTTPREAD", err)
+        if body is not None:
+            response.body = bytes(body)
+        self._account(response)
+        return response
+
+    def _check_status(self, response, url):
+        if response.status is not None and response.status >= 400:
+            raise ModemHttpError(f"HTTP {response.status} em {url}.", status=response.status)
+
+    def _account(self, response):
+        self.transfers += 1
+        self.bytes_received += response.bytes_received
+        self.seconds += response.elapsed
+        self.last_response = response
+        logger.info(f"HttpClient: {response}")
+
+    # --- URCs ---
+
+    def _expect(self, urc_name):
+        future = Future()
+        self._results[urc_name] = future
+        return future
+
+    def _wait(self, future, urc_name, timeout):
+        """Espera o URC +<urc_name> e devolve seus campos como inteiros (None se ausentes)."""
+        try:
+            payload = future.result(timeout + HTTP_RESULT_GRACE)
+        except FutureTimeoutError:
+            self._results.pop(urc_name, None)
+            raise TimeoutError(f"Sem +{urc_name} em {timeout}s.")
+        return tuple(int(value) if value is not None else None for value in payload)
+
+    def _on_urc(self, urc_name, payload):
+        future = self._results.pop(urc_name, None)
+        if future is not None and not future.done():
+            future.set_result(payload)
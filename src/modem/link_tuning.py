@@ -0,0 +1,297 @@
+# src/modem/link_tuning.py
+import datetime
+import json
+import os
+import random
+import string
+import threading
+import time
+
+from src.modem.at_commands import AT_COMMANDS
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Velocidades testadas, em ordem crescente (AT+IPR); a primeira é a velocidade padrão de fábrica
+BAUD_RATES = (115200, 230400, 460800, 921600)
+# Teste de eco: rodadas e tamanho do padrão aleatório ecoado pelo modem em cada rodada
+ECHO_ROUNDS = 3
+ECHO_PATTERN_LENGTH = 96
+# Comando inexistente com o padrão como parâmetro: com ATE1 o modem ecoa a linha inteira e responde ERROR,
+# sem efeito colateral (letras soltas após "AT" poderiam formar comandos básicos, como ATD)
+_ECHO_TEST_COMMAND = 'AT+QLNKTST="{}"'
+# Espera (s) entre o OK do AT+IPR e a troca de velocidade do lado do host
+SWITCH_SETTLE = 0.1
+# Tempo (s) para o modem responder AT depois de uma troca de velocidade
+SWITCH_RESYNC_TIMEOUT = 3
+# Tentativas de devolver o modem à última velocidade boa a partir de cada velocidade candidata
+FALLBACK_ATTEMPTS = 2
+# Arquivo UFS usado no benchmark de vazão
+BENCHMARK_FILE = "linktest.bin"
+
+# Arquivo de persistência da melhor configuração por porta. MODEM_LINK_FILE="" desativa a persistência.
+DEFAULT_LINK_FILE = os.path.join(os.path.expanduser("~"), ".modem_controller", "link_settings.json")
+
+
+class LinkSettingsStore:
+    """Melhor velocidade/controle de fluxo por porta serial, em JSON (escrita atômica)."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("devices", {})
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"LinkSettingsStore: Falha ao carregar '{self.path}': {e}.")
+            return {}
+
+    def get(self, port):
+        """:return: {"baudrate", "flow_control", "identity", "throughput", "updated"} da porta, ou None."""
+        with self._lock:
+            return self._load().get(port)
+
+    def put(self, port, settings):
+        if not self.path:
+            return
+        with self._lock:
+            devices = self._load()
+            devices[port] = settings
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({"version": 1, "devices": devices}, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"LinkSettingsStore: Falha ao gravar '{self.path}': {e}")
+
+
+def _default_path():
+    path = os.environ.get("MODEM_LINK_FILE")
+    if path is None:
+        return DEFAULT_LINK_FILE
+    return path or None
+
+
+# Configurações compartilhadas por todos os LinkTuner do processo
+default_link_settings = LinkSettingsStore(path=_default_path())
+
+
+def connect(controller, store=default_link_settings, rates=BAUD_RATES):
+    """
+    Conecta o controller tentando a velocidade salva para a porta, depois a configurada e as de rates
+    (o modem pode ter voltado ao padrão ou ficado numa velocidade de um ajuste interrompido).
+    :return: Velocidade em que o modem respondeu, ou None.
+    """
+    saved = store.get(controller.port) if store else None
+    candidates = []
+    for rate in ((saved or {}).get("baudrate"), controller.baudrate, *rates):
+        if rate and rate not in candidates:
+            candidates.append(rate)
+    for rate in candidates:
+        controller.baudrate = rate
+        controller.rtscts = bool(saved and saved.get("flow_control") and rate == saved.get("baudrate"))
+        if controller.connect_modem():
+            logger.info(f"LinkTuning: Conectado em {rate} baud (salvo: {saved and saved.get('baudrate')}).")
+            return rate
+    return None
+
+
+class LinkTuner:
+    """
+    Sobe a velocidade da UART do modem passo a passo (AT+IPR), com RTS/CTS (AT+IFC=2,2) quando pedido.
+    Cada velocidade é validada por um teste de eco (padrões aleatórios ecoados com ATE1, comparados byte a byte);
+    na primeira falha, modem e host voltam à última velocidade boa. A melhor configuração é gravada no modem
+    (AT&W) e no LinkSettingsStore, para a próxima conexão. Com benchmark_bytes, mede a vazão de payload
+    (upload/download UFS) em cada velocidade.
+    Só faz sentido em UARTs físicas: nas portas USB do modem a velocidade é ignorada.
+    Cada troca de configuração segura o slot do scheduler do AT+IPR/AT+IFC até o host acompanhar (e o eco
+    ligado até o ATE0): comandos de outras threads não saem no meio, numa velocidade que o modem não usa mais.
+    Ainda assim, rode o ajuste antes de iniciar pollers.
+    """
+
+    def __init__(self, controller, rates=BAUD_RATES, flow_control=True, benchmark_bytes=0, store=default_link_settings,
+                 on_progress=None):
+        """
+        :param controller: ModemController conectado.
+        :param rates: Velocidades candidatas; só as maiores que a atual são testadas.
+        :param flow_control: Ativa RTS/CTS antes de subir a velocidade.
+        :param benchmark_bytes: Tamanho do arquivo do benchmark de vazão por velocidade (0 = sem benchmark).
+        :param on_progress: Callable(resultado) chamado a cada velocidade testada.
+        """
+        self.controller = controller
+        self.rates = tuple(sorted(rates))
+        self.flow_control = flow_control
+        self.benchmark_bytes = benchmark_bytes
+        self.store = store
+        self.on_progress = on_progress
+        self.results = []
+
+    def tune(self):
+        """
+        :return: {"baudrate", "flow_control", "results"}: configuração final e uma entrada por velocidade
+                 ({"baudrate", "ok", "echo_errors", "upload", "download"}; vazões em bytes/s).
+        :raises RuntimeError: O enlace atual não passa no teste de eco ou o modem não voltou a uma velocidade boa.
+        """
+        best = self.controller.baudrate
+        baseline = self._evaluate(best)
+        if not baseline["ok"]:
+            raise RuntimeError(f"Enlace em {best} baud não passou no teste de eco; ajuste cancelado.")
+        flow = self.flow_control and self._enable_flow_control()
+
+        for rate in (rate for rate in self.rates if rate > best):
+            if not self._switch(rate):
+                result = {"baudrate": rate, "ok": False, "echo_errors": None, "upload": None, "download": None}
+                self._report(result)
+            else:
+                result = self._evaluate(rate)
+            if not result["ok"]:
+                logger.warning(f"LinkTuner: {rate} baud falhou; voltando para {best} baud.")
+                if not self._fall_back(rate, best):
+                    raise RuntimeError(f"Modem não respondeu após voltar para {best} baud.")
+                break
+            best = rate
+
+        self.controller.send_at_command("AT&W", expected_response="OK") # IPR/IFC valem após reiniciar o modem
+        settings = {
+            "baudrate": best,
+            "flow_control": flow,
+            "identity": self.controller.modem_identity,
+            "throughput": {str(r["baudrate"]): {"upload": r["upload"], "download": r["download"]} for r in self.results if r["ok"]},
+            "updated": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        if self.store:
+            self.store.put(self.controller.port, settings)
+        logger.info(f"LinkTuner: Configuração final: {best} baud, RTS/CTS {'ativo' if flow else 'inativo'}.")
+        return {"baudrate": best, "flow_control": flow, "results": self.results}
+
+    # --- Etapas ---
+
+    def _evaluate(self, rate):
+        errors = self.echo_test()
+        result = {"baudrate": rate, "ok": errors == 0, "echo_errors": errors, "upload": None, "download": None}
+        if result["ok"] and self.benchmark_bytes:
+            result["upload"], result["download"] = self.benchmark()
+        self._report(result)
+        return result
+
+    def _report(self, result):
+        self.results.append(result)
+        logger.info(f"LinkTuner: {result}")
+        if self.on_progress:
+            self.on_progress(result)
+
+    def echo_test(self, rounds=ECHO_ROUNDS, length=ECHO_PATTERN_LENGTH):
+        """
+        Envia padrões aleatórios e confere o eco da linha inteira.
+        :return: Rodadas com eco ausente ou divergente (0 = enlace íntegro).
+        """
+        with self.controller.scheduler.slot():
+            echo_was_on = self._echo_enabled()
+            if echo_was_on is None:
+                return rounds
+            if not echo_was_on:
+                self.controller.send_at_command("ATE1", expected_response="OK")
+            errors = 0
+            try:
+                for _ in range(rounds):
+                    pattern = "".join(random.choices(string.ascii_letters + string.digits, k=length))
+                    command = _ECHO_TEST_COMMAND.format(pattern)
+                    response = self.controller.send_at_command(command, expected_response="ERROR", timeout=2)
+                    if not response or command not in response:
+                        errors += 1
+            finally:
+                if not echo_was_on:
+                    self.controller.send_at_command("ATE0", expected_response="OK")
+            return errors
+
+    def _echo_enabled(self):
+        """True/False conforme o eco (ATE) atual; None se o modem não respondeu."""
+        response = self.controller.send_at_command("AT", expected_response="OK", timeout=2)
+        if not response or not response.endswith("OK"):
+            return None
+        return any(line.strip() == "AT" for line in response.splitlines())
+
+    def benchmark(self):
+        """:return: (upload, download) em bytes/s de um arquivo UFS de benchmark_bytes, ou (None, None) se falhar."""
+        data = os.urandom(self.benchmark_bytes)
+        try:
+            upload = self.controller.files.upload(data, BENCHMARK_FILE, retries=0)
+            download = self.controller.files.download(BENCHMARK_FILE, retries=0)
+            if download.data != data:
+                return None, None
+            return upload.throughput, download.throughput
+        except (OSError, TimeoutError) as e:
+            logger.warning(f"LinkTuner: Benchmark falhou: {e}")
+            return None, None
+        finally:
+            try:
+                self.controller.files.delete_file(BENCHMARK_FILE)
+            except OSError:
+                pass
+
+    def _enable_flow_control(self):
+        with self.controller.scheduler.slot():
+            response = self.controller.send_at_command(AT_COMMANDS["SET_FLOW_CONTROL"]["command"].format(2, 2), expected_response="OK")
+            if not response or not response.endswith("OK"):
+                logger.warning(f"LinkTuner: Modem recusou AT+IFC=2,2 ({response!r}); seguindo sem controle de fluxo.")
+                return False
+            self.controller.serial_port.rtscts = self.controller.rtscts = True
+            if self.echo_test() == 0:
+                return True
+            logger.warning("LinkTuner: Eco falhou com RTS/CTS (linhas não ligadas?); seguindo sem controle de fluxo.")
+            self.controller.serial_port.rtscts = self.controller.rtscts = False
+            self.controller.send_at_command(AT_COMMANDS["SET_FLOW_CONTROL"]["command"].format(0, 0), expected_response="OK")
+            return False
+
+    def _set_host_rate(self, rate):
+        self.controller.serial_port.baudrate = rate
+        self.controller.baudrate = rate
+
+    def _switch(self, rate):
+        """Troca a velocidade do modem (o OK sai na velocidade antiga) e depois a do host."""
+        with self.controller.scheduler.slot():
+            response = self.controller.send_at_command(AT_COMMANDS["SET_BAUD_RATE"]["command"].format(rate), expected_response="OK")
+            if not response or not response.endswith("OK"):
+                return False
+            time.sleep(SWITCH_SETTLE)
+            self._set_host_rate(rate)
+            return self.controller.resync(SWITCH_RESYNC_TIMEOUT)
+
+    def _fall_back(self, rate, safe_rate):
+        """
+        Devolve modem e host a safe_rate. O modem pode estar em rate (troca aceita, enlace ruim) ou ainda em
+        safe_rate (troca recusada); se nenhum responder, procura o modem nas demais velocidades.
+        """
+        command = AT_COMMANDS["SET_BAUD_RATE"]["command"].format(safe_rate)
+        others = [candidate for candidate in self.rates if candidate not in (rate, safe_rate)]
+        with self.controller.scheduler.slot():
+            for candidate in [rate, *others]:
+                for _ in range(FALLBACK_ATTEMPTS):
+                    self._set_host_rate(candidate)
+                    self.controller.send_at_command(command, expected_response="OK", timeout=1) # A resposta pode vir corrompida
+                    time.sleep(SWITCH_SETTLE)
+                    self._set_host_rate(safe_rate)
+                    if self.controller.resync(SWITCH_RESYNC_TIMEOUT):
+                        return True
+        return False
+
+
+def format_table(results):
+    """Tabela de texto com o resultado de cada velocidade."""
+    def rate(value):
+        return f"{value / 1024:8.1f}" if value else "       -"
+
+    lines = ["    baud  eco         upload KiB/s  download KiB/s  eficiência"]
+    for result in results:
+        line_rate = result["baudrate"] / 10 # 10 bits por byte na linha
+        best = max(result["upload"] or 0, result["download"] or 0)
+        efficiency = f"{best / line_rate:6.0%}" if best else "     -"
+        status = "ok " if result["ok"] else "FALHA" if result["echo_errors"] is None else f"{result['echo_errors']} erro(s)"
+        lines.append(f"{result['baudrate']:>8}  {status:<11} {rate(result['upload'])}       {rate(result['download'])}        {efficiency}")
+    return "\n".join(lines)
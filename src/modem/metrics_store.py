@@ -0,0 +1,518 @@
+# src/modem/metrics_store.py
+import array
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+# NumPy é opcional: se estiver instalado, consultas e percentis são vetorizados.
+# Sem NumPy, as mesmas operações rodam em Python puro sobre os arrays.
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Colunas de métricas armazenadas por modem (todas em float32, NaN = sem amostra).
+METRIC_COLUMNS = ("rssi", "rsrp", "rsrq", "sinr", "reg_stat", "battery_mv")
+
+# Camadas de armazenamento: amostras brutas e buckets agregados (min/max/média).
+# (nome, duração do bucket em segundos, capacidade padrão)
+DEFAULT_TIERS = (
+    ("raw", 0, 6 * 3600),          # 6 horas a 1 Hz
+    ("minute", 60, 14 * 24 * 60),  # 14 dias em buckets de 1 minuto
+    ("hour", 3600, 2 * 365 * 24),  # 2 anos em buckets de 1 hora
+)
+
+_HEADER_FORMAT = "<8sIIII"  # magic, capacidade, head, size, número de colunas
+_HEADER_SIZE = 64
+_MAGIC = b"MDMTS001"
+# Versão do arquivo com os buckets ainda abertos (<modem>.open.json), gravado em flush/close e lido ao reabrir
+_OPEN_BUCKETS_VERSION = 1
+
+# --- Padrões pré-compilados para extrair valores numéricos das respostas ---
+_CSQ_RE = re.compile(r'\+CSQ:\s*(\d+),(\d+)')
+_QIND_CSQ_RE = re.compile(r'\+QIND:\s*"csq",\s*(\d+),(\d+)')
+_CBC_RE = re.compile(r'\+CBC:\s*(\d+),(\d+),(\d+)')
+_REG_RE = re.compile(r'\+C(?:E|G)?REG:\s*(?:\d+,)?(\d+)(?:,|\s*$)', re.MULTILINE)
+# Formato EC25: +QENG: "servingcell",<state>,"LTE",<is_tdd>,<MCC>,<MNC>,<cellID>,<PCID>,<earfcn>,
+#               <band>,<ul_bw>,<dl_bw>,<TAC>,<RSRP>,<RSRQ>,<RSSI>,<SINR>,...
+_QENG_LTE_RE = re.compile(
+    r'\+QENG:\s*"servingcell",(?:"[^"]*",)?"LTE","(?:FDD|TDD)",'
+    r'\d+,\d+,[\da-fA-F]+,\d+,\d+,\d+,\d+,\d+,[\da-fA-F]+,'
+    r'(?P<rsrp>-?\d+),(?P<rsrq>-?\d+),(?P<rssi>-?\d+),(?P<sinr>-?\d+)'
+)
+
+
+def csq_to_dbm(rssi_val: int) -> float:
+    """Converte o índice RSSI do AT+CSQ (0-31, 99) para dBm. Retorna NaN se desconhecido."""
+    if 0 <= rssi_val <= 31:
+        return float(-113 + rssi_val * 2)
+    return math.nan
+
+
+def extract_metrics_from_response(response: str) -> dict:
+    """
+    Extrai valores numéricos de métricas de uma resposta AT ou URC (CSQ, QIND "csq", QENG, CBC, CREG/CGREG/CEREG).
+    :return: Dicionário {coluna: valor} apenas com as métricas encontradas.
+    """
+    values = {}
+    if not response:
+        return values
+
+    match = _CSQ_RE.search(response)
+    if match:
+        rssi = csq_to_dbm(int(match.group(1)))
+        if not math.isnan(rssi):
+            values["rssi"] = rssi
+
+    match = _QIND_CSQ_RE.search(response)
+    if match:
+        rssi = csq_to_dbm(int(match.group(1)))
+        if not math.isnan(rssi):
+            values["rssi"] = rssi
+
+    match = _QENG_LTE_RE.search(response)
+    if match:
+        values["rsrp"] = float(match.group("rsrp"))
+        values["rsrq"] = float(match.group("rsrq"))
+        values["rssi"] = float(match.group("rssi"))
+        # O SINR do EC25 é reportado em unidades de 1/5 dB - 20 (0-250)
+        values["sinr"] = int(match.group("sinr")) / 5.0 - 20.0
+
+    match = _CBC_RE.search(response)
+    if match:
+        values["battery_mv"] = float(match.group(3))
+
+    match = _REG_RE.search(response)
+    if match:
+        values["reg_stat"] = float(match.group(1))
+
+    return values
+
+
+class _RingColumns:
+    """
+    Ring buffer de colunas de largura fixa.
+    Os dados vivem num único bloco (bytearray em memória ou mmap de arquivo),
+    e cada coluna é uma view tipada (memoryview.cast) sobre esse bloco.
+    """
+
+    def __init__(self, columns, capacity, path=None):
+        """
+        :param columns: Lista de tuplas (nome, typecode) - typecodes 'd', 'f' ou 'I'.
+        :param capacity: Número máximo de linhas.
+        :param path: Se informado, o bloco é mapeado neste arquivo (persistência).
+        """
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.path = path
+        self._mmap = None
+        self._file = None
+
+        item_sizes = [array.array(code).itemsize for _, code in self.columns]
+        total_size = _HEADER_SIZE + sum(size * capacity for size in item_sizes)
+
+        if path:
+            self._buffer = self._open_mapped(path, total_size)
+        else:
+            self._buffer = bytearray(total_size)
+
+        view = memoryview(self._buffer)
+        self.views = {}
+        offset = _HEADER_SIZE
+        for (name, code), size in zip(self.columns, item_sizes):
+            self.views[name] = view[offset:offset + size * capacity].cast(code)
+            offset += size * capacity
+
+        magic, capacity_on_disk, head, size, ncols = struct.unpack_from(_HEADER_FORMAT, self._buffer, 0)
+        if magic == _MAGIC and capacity_on_disk == capacity and ncols == len(self.columns):
+            self.head = head
+            self.size = size
+        else:
+            self.head = 0
+            self.size = 0
+            for name, code in self.columns:
+                if code in ("d", "f"):
+                    self.views[name][:] = array.array(code, [math.nan]) * capacity
+            self._write_header()
+
+    def _open_mapped(self, path, total_size):
+        """Abre (ou cria) o arquivo de persistência e o mapeia em memória."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+b")
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() != total_size:
+            # Tamanho incompatível (capacidade alterada): recria o arquivo
+            self._file.truncate(0)
+            self._file.truncate(total_size)
+        self._mmap = mmap.mmap(self._file.fileno(), total_size)
+        return self._mmap
+
+    def _write_header(self):
+        struct.pack_into(_HEADER_FORMAT, self._buffer, 0, _MAGIC, self.capacity, self.head, self.size, len(self.columns))
+
+    def append(self, row):
+        """Grava uma linha (dicionário coluna -> valor), sobrescrevendo a mais antiga se cheio."""
+        index = self.head
+        for name, _ in self.columns:
+            self.views[name][index] = row[name]
+        self.head = (index + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        self._write_header()
+
+    def ordered(self, name):
+        """
+        Retorna a coluna em ordem cronológica.
+        Com NumPy, retorna um ndarray (views sem cópia quando o ring não deu a volta).
+        """
+        column = self.views[name]
+        start = (self.head - self.size) % self.capacity
+        if np is not None:
+            data = np.frombuffer(column, dtype=column.format)
+            if start + self.size <= self.capacity:
+                return data[start:start + self.size]
+            return np.concatenate((data[start:], data[:self.head]))
+        if start + self.size <= self.capacity:
+            return column[start:start + self.size].tolist()
+        return column[start:].tolist() + column[:self.head].tolist()
+
+    def oldest(self, name):
+        """Retorna o valor mais antigo da coluna, ou None se vazio."""
+        if not self.size:
+            return None
+        return self.views[name][(self.head - self.size) % self.capacity]
+
+    def newest(self, name):
+        """Retorna o valor mais recente da coluna, ou None se vazio."""
+        if not self.size:
+            return None
+        return self.views[name][(self.head - 1) % self.capacity]
+
+    def nbytes(self):
+        return len(self._buffer)
+
+    def flush(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self):
+        # Views precisam ser liberadas antes de fechar o mmap
+        for view in self.views.values():
+            view.release()
+        self.views = {}
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _BucketAccumulator:
+    """Acumula min/max/soma/contagem de um bucket de tempo ainda aberto."""
+
+    def __init__(self, bucket_start):
+        self.bucket_start = bucket_start
+        self.count = 0
+        self.mins = {}
+        self.maxs = {}
+        self.sums = {}
+        self.counts = {}
+
+    def add(self, metric, min_value, max_value, mean_value, weight=1):
+        if math.isnan(mean_value):
+            return
+        self.mins[metric] = min(self.mins.get(metric, min_value), min_value)
+        self.maxs[metric] = max(self.maxs.get(metric, max_value), max_value)
+        self.sums[metric] = self.sums.get(metric, 0.0) + mean_value * weight
+        self.counts[metric] = self.counts.get(metric, 0) + weight
+
+    def to_row(self):
+        row = {"ts": self.bucket_start, "count": self.count}
+        for metric in METRIC_COLUMNS:
+            n = self.counts.get(metric, 0)
+            row[f"{metric}_min"] = self.mins.get(metric, math.nan)
+            row[f"{metric}_max"] = self.maxs.get(metric, math.nan)
+            row[f"{metric}_mean"] = self.sums[metric] / n if n else math.nan
+        return row
+
+    def to_dict(self):
+        return {"bucket_start": self.bucket_start, "count": self.count, "mins": self.mins, "maxs": self.maxs,
+                "sums": self.sums, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, data):
+        accumulator = cls(data["bucket_start"])
+        accumulator.count = data["count"]
+        for name in ("mins", "maxs", "sums", "counts"):
+            setattr(accumulator, name, dict(data[name]))
+        return accumulator
+
+
+class ModemMetricsSeries:
+    """
+    Série temporal de métricas de um único modem.
+    Amostras brutas ficam num ring buffer; buckets por minuto e por hora
+    (min/max/média) são alimentados incrementalmente, então a memória é
+    limitada pela soma das capacidades das camadas. Com persistência, os
+    buckets ainda abertos são gravados em flush/close e retomados ao reabrir.
+    """
+
+    def __init__(self, modem_id, tiers=DEFAULT_TIERS, persist_dir=None):
+        self.modem_id = modem_id
+        self.lock = threading.Lock()
+        self.tiers = []
+
+        safe_id = re.sub(r'[^A-Za-z0-9_.-]', '_', str(modem_id))
+        for name, bucket_seconds, capacity in tiers:
+            if bucket_seconds == 0:
+                columns = [("ts", "d")] + [(metric, "f") for metric in METRIC_COLUMNS]
+            else:
+                columns = [("ts", "d"), ("count", "I")]
+                for metric in METRIC_COLUMNS:
+                    columns += [(f"{metric}_min", "f"), (f"{metric}_max", "f"), (f"{metric}_mean", "f")]
+            path = os.path.join(persist_dir, f"{safe_id}.{name}.ts") if persist_dir else None
+            self.tiers.append({
+                "name": name,
+                "bucket_seconds": bucket_seconds,
+                "ring": _RingColumns(columns, capacity, path),
+                "accumulator": None,
+            })
+        self._open_path = os.path.join(persist_dir, f"{safe_id}.open.json") if persist_dir else None
+        self._load_open_buckets()
+
+    def record(self, ts, values):
+        """Registra uma amostra bruta e a propaga para os buckets agregados."""
+        row = {"ts": ts}
+        for metric in METRIC_COLUMNS:
+            row[metric] = float(values.get(metric, math.nan))
+
+        with self.lock:
+            self.tiers[0]["ring"].append(row)
+            pending = [(metric, row[metric], row[metric], row[metric], 1) for metric in METRIC_COLUMNS]
+            self._roll_up(1, ts, pending, 1)
+
+    def _roll_up(self, tier_index, ts, contributions, sample_count):
+        """Adiciona contribuições ao bucket aberto da camada e fecha buckets vencidos em cascata."""
+        if tier_index >= len(self.tiers):
+            return
+        tier = self.tiers[tier_index]
+        bucket_seconds = tier["bucket_seconds"]
+        bucket_start = ts - (ts % bucket_seconds)
+
+        accumulator = tier["accumulator"]
+        if accumulator is not None and accumulator.bucket_start != bucket_start:
+            closed = accumulator.to_row()
+            tier["ring"].append(closed)
+            next_contributions = [
+                (metric, closed[f"{metric}_min"], closed[f"{metric}_max"], closed[f"{metric}_mean"],
+                 accumulator.counts.get(metric, 0))
+                for metric in METRIC_COLUMNS
+            ]
+            self._roll_up(tier_index + 1, accumulator.bucket_start, next_contributions, closed["count"])
+            accumulator = None
+
+        if accumulator is None:
+            accumulator = _BucketAccumulator(bucket_start)
+            tier["accumulator"] = accumulator
+
+        accumulator.count += sample_count
+        for metric, min_value, max_value, mean_value, weight in contributions:
+            if weight:
+                accumulator.add(metric, min_value, max_value, mean_value, weight)
+
+    def query(self, metric, start=None, end=None):
+        """
+        Retorna (timestamps, valores) da métrica no intervalo [start, end].
+        Usa a camada mais fina disponível para cada trecho do intervalo:
+        dados brutos onde existem, e médias dos buckets para o histórico mais antigo.
+        """
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"Métrica desconhecida: {metric}")
+        start = -math.inf if start is None else start
+        end = math.inf if end is None else end
+
+        parts = []
+        with self.lock:
+            covered_from = math.inf
+            for tier in self.tiers:
+                ring = tier["ring"]
+                if not ring.size:
+                    continue
+                column = metric if tier["bucket_seconds"] == 0 else f"{metric}_mean"
+                tier_end = min(end, covered_from)
+                if tier_end >= start:
+                    # Termina (exclusivo) onde a camada mais fina começa, mesmo quando end cai nessa fronteira
+                    parts.append(self._select(ring.ordered("ts"), ring.ordered(column), start, tier_end, covered_from <= end))
+                covered_from = min(covered_from, ring.oldest("ts"))
+
+        parts.reverse()  # Da camada mais grossa (mais antiga) para a mais fina
+        if np is not None:
+            if not parts:
+                return np.empty(0), np.empty(0, dtype=np.float32)
+            return (np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+        timestamps, values = [], []
+        for part_ts, part_values in parts:
+            timestamps.extend(part_ts)
+            values.extend(part_values)
+        return timestamps, values
+
+    @staticmethod
+    def _select(timestamps, values, start, end, exclusive_end):
+        """Filtra (timestamps, valores) pelo intervalo, descartando amostras NaN."""
+        if np is not None:
+            mask = (timestamps >= start) & ((timestamps < end) if exclusive_end else (timestamps <= end))
+            mask &= ~np.isnan(values)
+            return timestamps[mask], values[mask]
+        selected_ts, selected_values = [], []
+        for ts, value in zip(timestamps, values):
+            in_range = start <= ts < end if exclusive_end else start <= ts <= end
+            if in_range and not math.isnan(value):
+                selected_ts.append(ts)
+                selected_values.append(value)
+        return selected_ts, selected_values
+
+    def percentiles(self, metric, percents=(50, 90, 99), start=None, end=None):
+        """
+        Calcula percentis da métrica no intervalo.
+        Para trechos já agregados, os percentis são aproximados pelas médias dos buckets.
+        """
+        _, values = self.query(metric, start, end)
+        if np is not None:
+            if not len(values):
+                return {p: math.nan for p in percents}
+            result = np.percentile(values.astype(np.float64), percents)
+            return {p: float(v) for p, v in zip(percents, result)}
+        if not values:
+            return {p: math.nan for p in percents}
+        ordered = sorted(values)
+        result = {}
+        for p in percents:
+            rank = (len(ordered) - 1) * p / 100.0
+            low = int(math.floor(rank))
+            high = min(low + 1, len(ordered) - 1)
+            result[p] = ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+        return result
+
+    def memory_usage(self):
+        """Retorna o número de bytes reservados por todas as camadas."""
+        return sum(tier["ring"].nbytes() for tier in self.tiers)
+
+    def _load_open_buckets(self):
+        """Retoma os buckets abertos gravados no último flush/close (ignora os que o ring já fechou)."""
+        if not self._open_path or not os.path.exists(self._open_path):
+            return
+        try:
+            with open(self._open_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != _OPEN_BUCKETS_VERSION:
+                return
+            for tier in self.tiers[1:]:
+                saved = data.get("tiers", {}).get(tier["name"])
+                if saved is None:
+                    continue
+                accumulator = _BucketAccumulator.from_dict(saved)
+                newest = tier["ring"].newest("ts")
+                if newest is None or accumulator.bucket_start > newest:
+                    tier["accumulator"] = accumulator
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("MetricsStore: Falha ao carregar '%s': %s. Buckets abertos descartados.", self._open_path, e)
+
+    def _save_open_buckets(self):
+        """Grava os buckets ainda abertos (escrita atômica), para não perdê-los ao fechar a série."""
+        if not self._open_path:
+            return
+        tiers = {tier["name"]: tier["accumulator"].to_dict() for tier in self.tiers if tier["accumulator"] is not None}
+        try:
+            tmp_path = self._open_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": _OPEN_BUCKETS_VERSION, "tiers": tiers}, f)
+            os.replace(tmp_path, self._open_path)
+        except OSError as e:
+            logger.warning("MetricsStore: Falha ao gravar '%s': %s", self._open_path, e)
+
+    def flush(self):
+        with self.lock:
+            for tier in self.tiers:
+                tier["ring"].flush()
+            self._save_open_buckets()
+
+    def close(self):
+        with self.lock:
+            self._save_open_buckets()
+            for tier in self.tiers:
+                tier["ring"].close()
+
+
+class MetricsStore:
+    """
+    Armazena o histórico de RSSI/RSRP/RSRQ/SINR, registro e bateria por modem.
+    É alimentado pelas respostas de CSQ/QENG/CBC/CREG através de `ingest_response`.
+    """
+
+    def __init__(self, tiers=DEFAULT_TIERS, persist_dir=None):
+        """
+        :param tiers: Camadas (nome, segundos por bucket, capacidade); a primeira deve ser bruta (0).
+        :param persist_dir: Diretório para persistência em arquivos mapeados em memória (opcional).
+        """
+        self.tiers = tiers
+        self.persist_dir = persist_dir
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def series(self, modem_id):
+        """Retorna (criando se necessário) a série do modem informado."""
+        with self._lock:
+            series = self._series.get(modem_id)
+            if series is None:
+                series = ModemMetricsSeries(modem_id, self.tiers, self.persist_dir)
+                self._series[modem_id] = series
+                logger.debug("MetricsStore: Série criada para modem %s (%d bytes).", modem_id, series.memory_usage())
+            return series
+
+    def record(self, modem_id, ts=None, **values):
+        """Registra valores de métricas (ex: rssi=-71, battery_mv=3900) para um modem."""
+        self.series(modem_id).record(time.time() if ts is None else ts, values)
+
+    def ingest_response(self, modem_id, response, ts=None):
+        """
+        Extrai métricas de uma resposta AT e as registra.
+        :return: Dicionário com as métricas registradas (vazio se a resposta não tinha métricas).
+        """
+        values = extract_metrics_from_response(response)
+        if values:
+            self.record(modem_id, ts, **values)
+        return values
+
+    def query(self, modem_id, metric, start=None, end=None):
+        return self.series(modem_id).query(metric, start, end)
+
+    def percentiles(self, modem_id, metric, percents=(50, 90, 99), start=None, end=None):
+        return self.series(modem_id).percentiles(metric, percents, start, end)
+
+    def modem_ids(self):
+        with self._lock:
+            return list(self._series)
+
+    def flush(self):
+        with self._lock:
+            for series in self._series.values():
+                series.flush()
+
+    def close(self):
+        with self._lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
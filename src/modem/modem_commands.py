@@ -115,18 +115,65 @@ def parse_qnwinfo_response(response: str) -> dict:
         "Channel": "N/A"
     }
 
+# --- Padrões pré-compilados do AT+QENG ---
+# Formato EC25: +QENG: "servingcell",<state>,"LTE",<is_tdd>,<MCC>,<MNC>,<cellID>,<PCID>,<earfcn>,
+#               <band>,<ul_bw>,<dl_bw>,<TAC>,<RSRP>,<RSRQ>,<RSSI>,<SINR>,...
+_QENG_SERVING_LTE_RE = re.compile(
+    r'\+QENG:\s*"servingcell","(?P<state>[^"]*)","LTE","(?P<duplex>FDD|TDD)",'
+    r'(?P<mcc>\d+),(?P<mnc>\d+),(?P<cell_id>[\da-fA-F]+),(?P<pci>\d+),(?P<earfcn>\d+),(?P<band>\d+),'
+    r'(?P<ul_bw>\d+),(?P<dl_bw>\d+),(?P<tac>[\da-fA-F]+),(?P<rsrp>-?\d+),(?P<rsrq>-?\d+),(?P<rssi>-?\d+),(?P<sinr>-?\d+)'
+)
+# Formato sem <state> nem TAC: ...,"LTE","FDD",MCC,MNC,cellID,PCI,band,EARFCN,bw,ul_bw,dl_bw,RSSI,RSRP,RSRQ,SNR,TX,TA,DRX
+_QENG_SERVING_LTE_LEGACY_RE = re.compile(
+    r'\+QENG:\s*"servingcell",(?:"[^"]*",)?"LTE","(FDD|TDD)",(\d+),(\d+),([\da-fA-F]+),(\d+),(\d+),(\d+),(\d+),(\d+),(\d+),'
+    r'(-?\d+),(-?\d+),(-?\d+),(-?\d+),(-?\d+),(-?\d+),(.+)'
+)
+_QENG_SERVING_GSM_RE = re.compile(
+    r'\+QENG:\s*"servingcell",(?:"[^"]*",)?"(GPRS|EDGE|GSM)",(\d+),(\d+),([\da-fA-F]+),(\d+),(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)'
+)
+_QENG_SERVING_SEARCH_RE = re.compile(r'\+QENG:\s*"servingcell","SEARCH"')
+# Formato EC25: +QENG: "neighbourcell intra|inter","LTE",<earfcn>,<PCID>,<RSRQ>,<RSRP>,<RSSI>,<SINR>,...
+_QENG_NEIGHBOUR_LTE_SCOPED_RE = re.compile(
+    r'\+QENG:\s*"neighbourcell (?P<scope>intra|inter)","LTE",(?P<earfcn>\d+),(?P<pci>\d+),'
+    r'(?P<rsrq>-?\d+),(?P<rsrp>-?\d+),(?P<rssi>-?\d+),(?P<sinr>-?\d+)'
+)
+_QENG_NEIGHBOUR_LTE_RE = re.compile(r'\+QENG:\s*"neighbourcell","LTE",(\d+),(\d+),(\d+),(\d+),(\d+),(\d+),(-?\d+),(-?\d+),(-?\d+)')
+_QENG_NEIGHBOUR_GSM_RE = re.compile(r'\+QENG:\s*"neighbourcell","GSM",(\d+),(\d+),([\da-fA-F]+),(\d+),(\d+),(\d+),(\d+),(\d+)')
+
 def parse_qeng_response(response: str) -> dict:
     """
     Parses the AT+QENG="servingcell" response for detailed serving cell info.
     This parser is more complex due to varying formats.
+    Example (EC25): +QENG: "servingcell","NOCONN","LTE","FDD",724,06,1A2B3C4,123,1650,3,5,5,1A2B,-95,-10,-65,15,20
     Example (LTE): +QENG: "servingcell","LTE","FDD",222,88,3004001,137,3,1650,20,3,3,-101,-14,-72,13,5,12,-
     """
     info = {}
     # Clean the response to ensure it's a single line for easier regex matching
     response = response.replace('\r', '').replace('\n', '')
 
+    match = _QENG_SERVING_LTE_RE.search(response)
+    if match:
+        info["Cell Type"] = "Serving Cell"
+        info["Network Type"] = "LTE"
+        info["State"] = match.group("state")
+        info["Duplex Mode"] = match.group("duplex")
+        info["MCC"] = match.group("mcc")
+        info["MNC"] = match.group("mnc")
+        info["Cell ID"] = match.group("cell_id")
+        info["Physical Cell ID"] = match.group("pci")
+        info["EARFCN"] = match.group("earfcn")
+        info["Band"] = match.group("band")
+        info["UL Bandwidth"] = match.group("ul_bw")
+        info["DL Bandwidth"] = match.group("dl_bw")
+        info["TAC"] = match.group("tac")
+        info["RSRP"] = match.group("rsrp")
+        info["RSRQ"] = match.group("rsrq")
+        info["RSSI"] = match.group("rssi")
+        info["SNR"] = match.group("sinr")
+        return info
+
     # Regex for LTE serving cell
-    match_lte = re.search(r'\+QENG:\s*"servingcell","LTE","(FDD|TDD)",(\d+),(\d+),([\da-fA-F]+),(\d+),(\d+),(\d+),(\d+),(\d+),(\d+),(-?\d+),(-?\d+),(-?\d+),(-?\d+),(-?\d+),(-?\d+),(.+)', response)
+    match_lte = _QENG_SERVING_LTE_LEGACY_RE.search(response)
     if match_lte:
         info["Cell Type"] = "Serving Cell"
         info["Network Type"] = "LTE"
@@ -151,7 +198,7 @@ def parse_qeng_response(response: str) -> dict:
 
     # Add parsers for other network types (GSM, WCDMA) if needed
     # Example for GSM: +QENG: "servingcell","GPRS","GSM",222,88,1234,123,34,56,78,90,123,456
-    match_gsm = re.search(r'\+QENG:\s*"servingcell","(GPRS|EDGE|GSM)",(\d+),(\d+),([\da-fA-F]+),(\d+),(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)', response)
+    match_gsm = _QENG_SERVING_GSM_RE.search(response)
     if match_gsm:
         info["Cell Type"] = "Serving Cell"
         info["Network Type"] = match_gsm.group(1)
@@ -167,6 +214,10 @@ def parse_qeng_response(response: str) -> dict:
         info["Timing Advance"] = match_gsm.group(11)
         return info
 
+    if _QENG_SERVING_SEARCH_RE.search(response):
+        # Sem célula servidora (procurando rede): estado esperado, ex: logo após trocar bandas
+        return {"Cell Type": "Serving Cell", "State": "SEARCH"}
+
     logger.warning(f"No QENG parser matched for response: {response}")
     return {"Serving Cell Info": "N/A"}
 
@@ -174,18 +225,33 @@ def parse_qeng_response(response: str) -> dict:
 def parse_qeng_neighbor_response(response: str) -> dict:
     """
     Parses AT+QENG="neighbourcell" response.
+    Example (EC25): +QENG: "neighbourcell intra","LTE",1650,123,-12,-98,-70,10,30,5,62,6,46
     Example (LTE): +QENG: "neighbourcell","LTE",222,88,137,3,1650,20,-105,-15,-78
     """
     neighbor_cells = []
-    # Split response by lines and process each line that starts with +QENG: "neighbourcell"
+    # Split response by lines and process each line that starts with +QENG: "neighbourcell
     lines = response.strip().split('\n')
     for line in lines:
-        if line.startswith('+QENG: "neighbourcell"'):
+        if line.startswith('+QENG: "neighbourcell'):
             # Clean the line to ensure it's a single line for easier regex matching
             line = line.replace('\r', '')
 
+            match = _QENG_NEIGHBOUR_LTE_SCOPED_RE.match(line)
+            if match:
+                neighbor_cells.append({
+                    "Network Type": "LTE",
+                    "Scope": match.group("scope"),
+                    "EARFCN": match.group("earfcn"),
+                    "Physical Cell ID": match.group("pci"),
+                    "RSRP": match.group("rsrp"),
+                    "RSRQ": match.group("rsrq"),
+                    "RSSI": match.group("rssi"),
+                    "SNR": match.group("sinr"),
+                })
+                continue
+
             # Regex for LTE neighbor cell
-            match_lte = re.search(r'\+QENG:\s*"neighbourcell","LTE",(\d+),(\d+),(\d+),(\d+),(\d+),(\d+),(-?\d+),(-?\d+),(-?\d+)', line)
+            match_lte = _QENG_NEIGHBOUR_LTE_RE.search(line)
             if match_lte:
                 neighbor_cells.append({
                     "Network Type": "LTE",
@@ -203,7 +269,7 @@ def parse_qeng_neighbor_response(response: str) -> dict:
 
             # Add parsers for other network types (GSM, WCDMA) if needed
             # Example for GSM: +QENG: "neighbourcell","GSM",222,88,1234,123,34,56,78,90,123,456
-            match_gsm = re.search(r'\+QENG:\s*"neighbourcell","GSM",(\d+),(\d+),([\da-fA-F]+),(\d+),(\d+),(\d+),(\d+),(\d+)', line)
+            match_gsm = _QENG_NEIGHBOUR_GSM_RE.search(line)
             if match_gsm:
                 neighbor_cells.append({
                     "Network Type": "GSM",
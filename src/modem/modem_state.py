@@ -0,0 +1,237 @@
+# src/modem/modem_state.py
+import re
+import threading
+import time
+
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Chaves de estado mantidas pelo ModemState
+STATE_KEYS = ("creg", "cgreg", "cereg", "signal", "sim_pin", "sim_inserted", "qind")
+
+# Padrões de linha para respostas de consulta (+CREG: <n>,<stat>...) e URCs (+CREG: <stat>...).
+# O <n> só aparece nas respostas de consulta; nos URCs a linha começa direto pelo <stat>.
+_REG_LINE_RE = re.compile(
+    r'\+(?P<domain>CREG|CGREG|CEREG):\s*(?:(?P<n>\d),)?(?P<stat>\d+)'
+    r'(?:,"(?P<lac>[0-9A-Fa-f]*)","(?P<ci>[0-9A-Fa-f]*)"(?:,(?P<act>\d*))?)?'
+)
+_CSQ_LINE_RE = re.compile(r'\+CSQ:\s*(?P<rssi>\d+),(?P<ber>\d+)')
+_CPIN_LINE_RE = re.compile(r'\+CPIN:\s*"?(?P<status>[^"\r\n]+?)"?\s*$', re.MULTILINE)
+_QSIMSTAT_LINE_RE = re.compile(r'\+QSIMSTAT:\s*(?P<enable_stat>\d),(?P<inserted_stat>\d)')
+_QIND_LINE_RE = re.compile(r'\+QIND:\s*"(?P<indication>[^"]*)"(?:,\s*(?P<value>.*))?')
+
+
+def _registration_value(groups):
+    """Normaliza os grupos de um +CREG/+CGREG/+CEREG em um dicionário de estado."""
+    return {
+        "n": int(groups["n"]) if groups.get("n") else None,
+        "stat": int(groups["stat"]),
+        "lac": groups.get("lac") or groups.get("tac") or None,
+        "ci": groups.get("ci") or None,
+        "act": groups.get("act") or None,
+    }
+
+
+class ModemState:
+    """
+    Snapshot thread-safe do estado do modem (registro, sinal, SIM e indicações +QIND).
+    É atualizado pelo ModemController a cada URC e a cada resposta de comando,
+    mantém um contador de versão e notifica assinantes sobre mudanças.
+    """
+
+    def __init__(self, notify=None):
+        """
+        :param notify: Função opcional notify(callback, *args) usada para entregar
+                       notificações aos assinantes. Por padrão, chama o callback diretamente.
+        """
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._values = {}
+        self._updated_at = {}
+        self._pushed_keys = set() # Chaves mantidas por URCs (dispensam polling)
+        self._subscribers = {}
+        self._next_token = 1
+        self.version = 0
+        self.notify = notify
+
+    # --- Leitura ---
+
+    def get(self, key, max_age=None, default=None):
+        """
+        Retorna o valor de uma chave se ele estiver "fresco".
+        :param max_age: Idade máxima em segundos; None aceita qualquer idade.
+                        Chaves mantidas por URCs são sempre consideradas frescas.
+        """
+        with self._lock:
+            if key not in self._values:
+                return default
+            if max_age is not None and key not in self._pushed_keys:
+                if time.monotonic() - self._updated_at[key] > max_age:
+                    return default
+            return self._values[key]
+
+    def age(self, key):
+        """Retorna há quantos segundos a chave foi atualizada (None se nunca)."""
+        with self._lock:
+            updated_at = self._updated_at.get(key)
+            return None if updated_at is None else time.monotonic() - updated_at
+
+    def snapshot(self):
+        """Retorna uma cópia de todo o estado, incluindo a versão."""
+        with self._lock:
+            values = {key: (dict(value) if isinstance(value, dict) else value) for key, value in self._values.items()}
+            return {"version": self.version, "values": values}
+
+    def wait_for_change(self, since_version, timeout=None):
+        """
+        Bloqueia até a versão passar de since_version ou o timeout expirar.
+        :return: A versão atual.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version > since_version, timeout)
+            return self.version
+
+    # --- Escrita ---
+
+    def mark_pushed(self, keys, pushed=True):
+        """Marca (ou desmarca) chaves como mantidas por URCs."""
+        with self._lock:
+            if pushed:
+                self._pushed_keys.update(keys)
+            else:
+                self._pushed_keys.difference_update(keys)
+
+    def update(self, key, value, source="response"):
+        """
+        Atualiza uma chave. Só incrementa a versão e notifica se o valor mudou.
+        :return: True se houve mudança.
+        """
+        with self._changed:
+            self._updated_at[key] = time.monotonic()
+            if self._values.get(key) == value:
+                return False
+            self._values[key] = value
+            self.version += 1
+            version = self.version
+            callbacks = [cb for cb, keys in self._subscribers.values() if keys is None or key in keys]
+            self._changed.notify_all()
+
+        logger.debug("ModemState: %s = %r (fonte: %s, versão %d)", key, value, source, version)
+        for callback in callbacks:
+            self._deliver(callback, key, value, version)
+        return True
+
+    def _deliver(self, callback, key, value, version):
+        try:
+            if self.notify:
+                self.notify(callback, key, value, version)
+            else:
+                callback(key, value, version)
+        except Exception as e:
+            logger.error(f"ModemState: Erro no assinante {callback}: {e}", exc_info=True)
+
+    def subscribe(self, callback, keys=None):
+        """
+        Registra callback(key, value, version) para mudanças de estado.
+        :param keys: Iterável de chaves de interesse (None = todas).
+        :return: Token para cancelar a assinatura.
+        """
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._subscribers[token] = (callback, frozenset(keys) if keys is not None else None)
+            return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def clear(self):
+        """Descarta todo o estado (ex: após desconexão)."""
+        with self._changed:
+            self._values.clear()
+            self._updated_at.clear()
+            self._pushed_keys.clear()
+            self.version += 1
+            self._changed.notify_all()
+
+    # --- Alimentação a partir de URCs e respostas ---
+
+    def apply_urc(self, urc_name, groups):
+        """
+        Atualiza o estado a partir de um URC já reconhecido pelo ModemController.
+        :param urc_name: Nome do URC (ex: "CREG", "CSQ", "QIND").
+        :param groups: Dicionário de grupos nomeados do match do URC.
+        """
+        if urc_name in ("CREG", "CGREG", "CEREG"):
+            value = _registration_value(groups)
+            if value["n"] is None:
+                # URCs não trazem o <n>: preserva o último modo conhecido
+                previous = self.get(urc_name.lower()) or {}
+                value["n"] = previous.get("n")
+            self.update(urc_name.lower(), value, source="urc")
+        elif urc_name == "CSQ":
+            self.update("signal", {"rssi": int(groups["rssi"]), "ber": int(groups["ber"])}, source="urc")
+        elif urc_name == "CPIN":
+            self.update("sim_pin", groups["status"].strip(), source="urc")
+        elif urc_name == "QSIMSTAT":
+            self.update("sim_inserted", int(groups["inserted_stat"]), source="urc")
+        elif urc_name == "QIND":
+            self._apply_qind(groups.get("indication"), groups.get("value"), source="urc")
+
+    def _apply_qind(self, indication, value, source):
+        if not indication:
+            return
+        value = (value or "").strip()
+        if indication == "csq":
+            # +QIND: "csq",<rssi>,<ber>
+            parts = [p.strip() for p in value.split(',')]
+            if len(parts) >= 2 and parts[0].isdigit() and parts[1].isdigit():
+                self.update("signal", {"rssi": int(parts[0]), "ber": int(parts[1])}, source=source)
+                return
+        qind = dict(self.get("qind") or {})
+        qind[indication] = value.strip('"')
+        self.update("qind", qind, source=source)
+
+    def apply_response(self, response):
+        """Atualiza o estado a partir de qualquer resposta de comando que contenha dados conhecidos."""
+        if not response or "+" not in response:
+            return
+        for match in _REG_LINE_RE.finditer(response):
+            groups = match.groupdict()
+            self.update(groups["domain"].lower(), _registration_value(groups))
+        match = _CSQ_LINE_RE.search(response)
+        if match:
+            self.update("signal", {"rssi": int(match.group("rssi")), "ber": int(match.group("ber"))})
+        match = _CPIN_LINE_RE.search(response)
+        if match:
+            self.update("sim_pin", match.group("status").strip())
+        match = _QSIMSTAT_LINE_RE.search(response)
+        if match:
+            self.update("sim_inserted", int(match.group("inserted_stat")))
+        for match in _QIND_LINE_RE.finditer(response):
+            self._apply_qind(match.group("indication"), match.group("value"), source="response")
+
+    # --- Reconstrução de respostas a partir do estado ---
+
+    def registration_line(self, domain="creg", max_age=None):
+        """
+        Reconstrói uma linha no formato da resposta de consulta (+CREG: <n>,<stat>[,...])
+        a partir do estado, para reaproveitar os parsers existentes. Retorna None se não estiver fresco.
+        """
+        value = self.get(domain, max_age)
+        if not value:
+            return None
+        n = value["n"] if value["n"] is not None else (2 if value["lac"] else 1)
+        line = f"+{domain.upper()}: {n},{value['stat']}"
+        if value["lac"] and value["ci"]:
+            line += f',"{value["lac"]}","{value["ci"]}"'
+            if value["act"]:
+                line += f",{value['act']}"
+        return line
+
+    def signal_line(self, max_age=None):
+        """Reconstrói uma linha +CSQ a partir do estado (None se não estiver fresco)."""
+        value = self.get("signal", max_age)
+        return f"+CSQ: {value['rssi']},{value['ber']}" if value else None
@@ -0,0 +1,109 @@
+# src/modem/operator_scan.py
+import threading
+import time
+from concurrent.futures import Future
+
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Timeout mínimo da busca (AT+COPS=? pode levar minutos); com deadlines adaptativos, alongado se a rede for mais lenta
+OPERATOR_SCAN_TIMEOUT = 180
+# Timeout do registro manual (AT+COPS=1,...)
+OPERATOR_REGISTER_TIMEOUT = 180
+# Validade (s) de uma busca em cache
+DEFAULT_SCAN_TTL = 15 * 60
+
+# Chave de cache usada quando a célula servidora é desconhecida
+UNKNOWN_LOCATION = "unknown"
+
+
+def location_key(state):
+    """Chave da célula servidora (LAC/TAC:CI) a partir do ModemState, preferindo LTE, depois GPRS e CS."""
+    for domain in ("cereg", "cgreg", "creg"):
+        value = state.get(domain)
+        if value and value.get("ci"):
+            return f"{value['lac'] or ''}:{value['ci']}".upper()
+    return UNKNOWN_LOCATION
+
+
+class OperatorScanCache:
+    """Resultados de AT+COPS=? por célula servidora, com validade."""
+
+    def __init__(self, ttl=DEFAULT_SCAN_TTL):
+        """
+        :param ttl: Segundos de validade de cada busca.
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {} # chave de célula -> (monotonic da busca, lista de operadoras)
+
+    def get(self, location):
+        """Retorna a lista de operadoras em cache para a célula, ou None se ausente/expirada."""
+        with self._lock:
+            entry = self._entries.get(location)
+            if entry is None:
+                return None
+            scanned_at, operators = entry
+            if time.monotonic() - scanned_at > self.ttl:
+                del self._entries[location]
+                return None
+            return operators
+
+    def put(self, location, operators):
+        with self._lock:
+            self._entries[location] = (time.monotonic(), operators)
+
+    def invalidate(self, location=None):
+        """Descarta a busca de uma célula (ou todas)."""
+        with self._lock:
+            if location is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(location, None)
+
+    def get_stats(self):
+        """Por célula: idade (s) e número de operadoras em cache."""
+        now = time.monotonic()
+        with self._lock:
+            return {loc: {"age": now - scanned_at, "operators": len(ops)} for loc, (scanned_at, ops) in self._entries.items()}
+
+
+class OperatorScanJob:
+    """
+    Uma busca de operadoras em segundo plano (ou já respondida do cache).
+    result() devolve a lista de operadoras de parse_operator_scan_response.
+    """
+
+    def __init__(self, location, handle=None, operators=None):
+        """
+        :param location: Chave da célula em que a busca foi feita.
+        :param handle: CommandHandle do AT+COPS=? em andamento.
+        :param operators: Lista já conhecida (resultado do cache).
+        """
+        self.location = location
+        self.handle = handle
+        self.from_cache = operators is not None
+        self.future = Future()
+        if operators is not None:
+            self.future.set_result(operators)
+
+    def __repr__(self):
+        origin = "cache" if self.from_cache else "modem"
+        return f"<OperatorScanJob {self.location} ({origin}) {'done' if self.done() else 'running'}>"
+
+    def cancel(self):
+        """Aborta a busca no modem (AT+COPS=? é abortável)."""
+        return self.handle.cancel() if self.handle is not None else False
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """
+        Espera a lista de operadoras.
+        :raises CommandCancelled: Se a busca foi cancelada.
+        :raises TimeoutError: Se o modem não respondeu dentro do deadline.
+        :raises RuntimeError: Se o modem respondeu com erro.
+        """
+        return self.future.result(timeout)
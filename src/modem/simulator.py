@@ -0,0 +1,839 @@
+# src/modem/simulator.py
+import array
+import fnmatch
+import heapq
+import itertools
+import math
+import random
+import re
+import threading
+import time
+
+from src.modem.at_commands import lte_band_mask, lte_bands_from_mask
+from src.modem.file_transfer import UfsChecksum
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Rede simulada padrão: banda LTE -> célula em que o modem acampa com a banda habilitada.
+# rsrp/rsrq/sinr são as médias (dBm/dB); attach_time é o tempo (s) até o registro após a troca de banda.
+DEFAULT_NETWORK = {
+    1: {"earfcn": 300, "pci": 101, "tac": "1A2B", "ci": "0A1B2C01", "rsrp": -104, "rsrq": -13, "sinr": 4, "attach_time": 3.0},
+    3: {"earfcn": 1650, "pci": 203, "tac": "1A2B", "ci": "0A1B2C03", "rsrp": -89, "rsrq": -9, "sinr": 15, "attach_time": 2.0},
+    7: {"earfcn": 3050, "pci": 307, "tac": "1A2C", "ci": "0A1B2C07", "rsrp": -97, "rsrq": -11, "sinr": 10, "attach_time": 2.5},
+    28: {"earfcn": 9410, "pci": 428, "tac": "1A2C", "ci": "0A1B2C1C", "rsrp": -83, "rsrq": -14, "sinr": 3, "attach_time": 4.0},
+}
+DEFAULT_PLMN = ("724", "05")
+DEFAULT_IDENTITY = ("Quectel", "EC25", "Revision: EC25EFAR06A06M4G")
+
+# Velocidades aceitas pelo AT+IPR e bits por byte na linha (start + 8 + stop)
+SUPPORTED_BAUD_RATES = (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600, 3000000)
+BITS_PER_BYTE = 10
+# Sem controle de fluxo acima dessa velocidade, um byte a cada OVERRUN_INTERVAL se perde (overrun)
+OVERRUN_INTERVAL = 64
+
+# Voice over USB: PCM de 16 bits mono na porta de voz; tom padrão (Hz) e nível (fração do fundo de escala)
+VOICE_SAMPLE_RATE = 8000
+VOICE_TONE = 1000
+VOICE_LEVEL = 0.25
+# Ganhos de voz (AT+QMIC/AT+QRXGAIN, 0-65535): UNITY_GAIN é ganho 1; o loop de áudio aplica TX x TX digital x RX
+UNITY_GAIN = 8192
+# Ruído somado ao PCM do loop de áudio (desvio padrão, fração do fundo de escala)
+VOICE_NOISE = 0.0005
+
+# Estados de registro (+CREG/+CEREG <stat>)
+NOT_REGISTERED, REGISTERED_HOME, SEARCHING = 0, 1, 2
+
+
+class SimulatedModem:
+    """
+    Modem Quectel simulado para rodar o controller, o daemon e rotinas longas (ex: varredura de bandas)
+    sem hardware. Responde a um subconjunto de comandos AT com o enquadramento real (\\r\\n<linha>\\r\\n),
+    emite URCs de registro e simula troca de célula ao mudar bandas/modo de varredura.
+    Use open_serial como serial_factory do ModemController:
+        modem = SimulatedModem(); ModemController(port="SIM", serial_factory=modem.open_serial)
+    Comandos extras podem ser registrados com add_handler.
+    """
+
+    def __init__(self, network=None, plmn=DEFAULT_PLMN, time_scale=1.0, latency=0.005, noise=1.5, seed=None,
+                 identity=DEFAULT_IDENTITY, baudrate=115200, max_baudrate=921600, reliable_without_flow=230400,
+                 model_line_rate=False):
+        """
+        :param network: Dicionário banda LTE -> célula (ver DEFAULT_NETWORK).
+        :param time_scale: Fator aplicado aos tempos de registro (ex: 0.1 acelera 10x).
+        :param latency: Atraso (s) das respostas de comando.
+        :param noise: Desvio padrão (dB) aplicado às medidas de sinal.
+        :param seed: Semente do ruído (reprodutibilidade).
+        :param baudrate: Velocidade inicial da UART do modem (AT+IPR).
+        :param max_baudrate: Maior velocidade que o enlace (cabo/adaptador) suporta; acima dela há perda de bytes.
+        :param reliable_without_flow: Maior velocidade sem perdas quando RTS/CTS não está ativo nas duas pontas.
+        :param model_line_rate: Entrega os bytes no ritmo da linha (10 bits/byte na velocidade atual), nos dois sentidos.
+        """
+        self.network = network if network is not None else DEFAULT_NETWORK
+        self.plmn = plmn
+        self.time_scale = time_scale
+        self.latency = latency
+        self.noise = noise
+        self.identity = identity
+        self.echo = False
+        self.report_modes = {"CREG": 0, "CGREG": 0, "CEREG": 0} # <n> de cada AT+xREG=<n>
+        self.scan_mode = 0
+        self.band_masks = ["0xf", lte_band_mask(self.network) if self.network else "0x0", "0x0"]
+        self.reg_stat = SEARCHING
+        self.camped_band = None
+        self.commands = [] # Comandos recebidos (para inspeção)
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._output = [] # heap de (instante de entrega, seq, bytes, velocidade da UART na emissão)
+        self._seq = itertools.count()
+        self._line = bytearray()
+        self._attach_due = None
+        self._data_sink = None # (bytes esperados, recebidos, callback) após um prompt '>'
+        self.sockets = {} # connectID -> {"service", "host", "port", "rx"}
+        self.socket_peer = lambda connect_id, data: data # Par remoto dos sockets: eco por padrão
+        self.http_resources = {} # URL -> corpo (bytes) servido pelo HTTP simulado; POST ecoa o corpo enviado
+        self.http_cut_after = None # Corta a próxima leitura do corpo após N bytes (simula queda do enlace)
+        self.http_ignore_range = False # Servidor que ignora o cabeçalho Range: responde 200 com o corpo inteiro
+        self._http = {"url": None, "status": None, "body": b""}
+        self.files = {} # Sistema de arquivos UFS: nome -> bytes
+        self.ufs_cut_after = None # Interrompe o próximo AT+QFUPL/AT+QFDWL após N bytes
+        self.ufs_corrupt_next = False # Troca um byte do próximo AT+QFUPL/AT+QFDWL (erro de linha que o checksum pega)
+        self.flow_control = (0, 0) # AT+IFC
+        self.baudrate = baudrate
+        self.max_baudrate = max_baudrate
+        self.reliable_without_flow = reliable_without_flow
+        self.model_line_rate = model_line_rate
+        self._line_free_at = 0.0 # Instante em que a linha modem -> host termina de transmitir
+        self._overrun_count = 0
+        self._file_handles = {} # handle -> [nome, posição]
+        self.voice_over_usb = (0, 0) # AT+QPCMV: <enable>,<port>
+        self.voice_sample_rate = VOICE_SAMPLE_RATE
+        self.voice_tone = VOICE_TONE # Tom enviado pela porta de voz (None = silêncio)
+        self.voice_level = VOICE_LEVEL
+        self.voice_loopback = False # O PCM escrito pelo host volta pela porta de voz em vez do tom
+        self.voice_received = 0 # Bytes de PCM recebidos do host
+        self.mic_gains = (UNITY_GAIN, UNITY_GAIN) # AT+QMIC: <txgain>,<txdgain>
+        self.rx_gain = UNITY_GAIN # AT+QRXGAIN
+        self.audio_loop = False # AT+QAUDLOOP: o PCM recebido volta com os ganhos aplicados e ruído
+        self.voice_noise = VOICE_NOISE
+        self._voice_loop = bytearray()
+        self._voice_phase = 0
+        self._next_file_handle = itertools.count(1)
+        self._handlers = []
+        self._register_default_handlers()
+        self._reselect()
+
+    # --- Porta serial ---
+
+    def open_serial(self, port=None, baudrate=115200, **kwargs):
+        """serial_factory compatível com serial.Serial(port, baudrate, timeout=...)."""
+        return SimulatedSerial(port, baudrate, modem=self, **kwargs)
+
+    def open_voice_port(self, port=None, **kwargs):
+        """serial_factory da porta de voz (Voice over USB): PCM em tempo real enquanto AT+QPCMV estiver habilitado."""
+        return SimulatedVoicePort(port, modem=self, **kwargs)
+
+    def voice_samples(self, count):
+        """Próximas count amostras do PCM enviado ao host: o PCM recebido (voice_loopback/audio_loop) ou o tom."""
+        with self._lock:
+            if self.voice_loopback or self.audio_loop:
+                size = count * 2
+                data = bytes(self._voice_loop[:size])
+                del self._voice_loop[:size]
+                data += bytes(size - len(data))
+                if not self.audio_loop:
+                    return data
+                samples = array.array('h', data)
+                gain = self.mic_gains[0] * self.mic_gains[1] * self.rx_gain / UNITY_GAIN ** 3
+                noise = self.voice_noise * 32767
+                for i, sample in enumerate(samples):
+                    samples[i] = max(-32768, min(32767, int(sample * gain + self._random.gauss(0, noise))))
+                return samples.tobytes()
+            samples = array.array('h', bytes(count * 2))
+            if self.voice_tone:
+                amplitude = self.voice_level * 32767
+                step = 2 * math.pi * self.voice_tone / self.voice_sample_rate
+                for i in range(count):
+                    samples[i] = int(amplitude * math.sin(step * (self._voice_phase + i)))
+                self._voice_phase = (self._voice_phase + count) % self.voice_sample_rate
+            return samples.tobytes()
+
+    def voice_write(self, data):
+        """PCM escrito pelo host na porta de voz."""
+        with self._lock:
+            self.voice_received += len(data)
+            if self.voice_loopback or self.audio_loop:
+                self._voice_loop += data
+
+    def feed(self, data, baudrate=None, rtscts=False):
+        """
+        Bytes escritos pelo host: cada linha terminada em \\r é um comando; após um prompt '>', payload bruto.
+        :param baudrate: Velocidade da porta do host; diferente da do modem, os bytes chegam corrompidos.
+        """
+        data = bytes(data)
+        with self._lock:
+            if baudrate is not None:
+                data = self._through_link(data, self.baudrate, baudrate, rtscts)
+            offset = 0
+            while offset < len(data):
+                if self._data_sink is not None:
+                    offset = self._feed_payload(data, offset)
+                    continue
+                end = data.find(b"\r", offset)
+                if end < 0:
+                    self._line += data[offset:]
+                    break
+                self._line += data[offset:end]
+                offset = end + 1
+                if data[offset:offset + 1] == b"\n": # \r\n: o \n não faz parte de um payload que venha a seguir
+                    offset += 1
+                line = self._line.decode("utf-8", errors="replace").strip()
+                self._line.clear()
+                start = line.upper().find("AT") # Como no modem, o que vem antes do prefixo AT (ex: lixo da linha) é ignorado
+                line = line[start:] if start > 0 else line
+                if line:
+                    self._execute(line)
+
+    def expect_payload(self, length, on_complete):
+        """Usado por handlers com prompt: os próximos length bytes escritos vão para on_complete(bytes)."""
+        self._data_sink = (length, bytearray(), on_complete)
+
+    def _feed_payload(self, data, offset):
+        length, received, on_complete = self._data_sink
+        take = min(length - len(received), len(data) - offset)
+        received += data[offset:offset + take]
+        if len(received) == length:
+            self._data_sink = None
+            on_complete(bytes(received))
+        return offset + take
+
+    def take_output(self, baudrate=None, rtscts=False):
+        """
+        Bytes já devidos ao host (respostas e URCs cujo instante de entrega passou).
+        :param baudrate: Velocidade da porta do host; bytes emitidos em outra velocidade chegam corrompidos.
+        """
+        with self._lock:
+            self._tick()
+            now = time.monotonic()
+            chunks = []
+            while self._output and self._output[0][0] <= now:
+                _, _, data, sent_baudrate = heapq.heappop(self._output)
+                chunks.append(data if baudrate is None else self._through_link(data, sent_baudrate, baudrate, rtscts))
+            return b"".join(chunks)
+
+    def _through_link(self, data, modem_baudrate, host_baudrate, rtscts):
+        """Aplica os defeitos do enlace: velocidades diferentes corrompem tudo; acima do limite, perde bytes."""
+        if modem_baudrate != host_baudrate:
+            return bytes(0x80 | (b * 7 + 13) & 0x7F for b in data) # Lixo sem \r/\n, como num baud rate errado
+        flow = rtscts and self.flow_control == (2, 2)
+        if modem_baudrate <= self.max_baudrate and (flow or modem_baudrate <= self.reliable_without_flow):
+            return data
+        kept = bytearray()
+        for byte in data:
+            self._overrun_count += 1
+            if self._overrun_count % OVERRUN_INTERVAL:
+                kept.append(byte)
+        return bytes(kept)
+
+    # --- Extensão ---
+
+    def add_handler(self, pattern, handler):
+        """
+        Registra um comando: handler(match) devolve (linhas, resultado) ou None para ERROR.
+        Handlers registrados depois têm precedência.
+        """
+        self._handlers.insert(0, (re.compile(pattern, re.IGNORECASE), handler))
+
+    def emit(self, data, delay=0.0):
+        """Agenda bytes brutos para o host (ex: dados de socket, URCs de outros módulos)."""
+        with self._lock:
+            due = time.monotonic() + delay
+            if self.model_line_rate: # Fila na linha: começa quando o bloco anterior terminar de transmitir
+                due = self._line_free_at = max(due, self._line_free_at) + len(data) * BITS_PER_BYTE / self.baudrate
+            heapq.heappush(self._output, (due, next(self._seq), data, self.baudrate))
+
+    def urc(self, line, delay=0.0):
+        self.emit(f"\r\n{line}\r\n".encode("utf-8"), delay)
+
+    def respond(self, lines=(), result="OK", delay=None):
+        body = "".join(f"\r\n{line}\r\n" for line in lines)
+        self.emit(f"{body}\r\n{result}\r\n".encode("utf-8"), self.latency if delay is None else delay)
+
+    # --- Execução ---
+
+    def _execute(self, command):
+        self.commands.append(command)
+        if self.echo:
+            self.emit(f"{command}\r".encode("utf-8"))
+        for pattern, handler in self._handlers:
+            match = pattern.fullmatch(command)
+            if match:
+                try:
+                    reply = handler(match)
+                except Exception as e:
+                    logger.error(f"SimulatedModem: Erro no handler de '{command}': {e}", exc_info=True)
+                    reply = None
+                if reply is None:
+                    self.respond(result="ERROR")
+                elif reply is not False: # False: o handler já respondeu (ou responde depois)
+                    lines, result = reply
+                    self.respond(lines, result)
+                return
+        self.respond(result="ERROR")
+
+    def _register_default_handlers(self):
+        for pattern, handler in (
+            (r'AT', lambda m: ((), "OK")),
+            (r'ATE([01])', self._on_echo),
+            (r'ATI', lambda m: (self.identity, "OK")),
+            (r'AT\+CPIN\?', lambda m: (("+CPIN: READY",), "OK")),
+            (r'AT\+QSIMSTAT=\d', lambda m: ((), "OK")),
+            (r'AT\+QSIMSTAT\?', lambda m: (("+QSIMSTAT: 1,1",), "OK")),
+            (r'AT\+QINDCFG="(\w+)",(\d)', lambda m: ((), "OK")),
+            (r'AT\+QINDCFG="(\w+)"', lambda m: ((f'+QINDCFG: "{m.group(1)}",1',), "OK")),
+            (r'AT\+CNMI=.*', lambda m: ((), "OK")),
+            (r'AT\+CNMI\?', lambda m: (("+CNMI: 2,1,0,0,0",), "OK")),
+            (r'AT\+(CREG|CGREG|CEREG)=(\d)', self._on_set_report),
+            (r'AT\+(CREG|CGREG|CEREG)\?', self._on_query_registration),
+            (r'AT\+CSQ', self._on_csq),
+            (r'AT\+COPS\?', self._on_cops),
+            (r'AT\+QNWINFO', self._on_qnwinfo),
+            (r'AT\+QCFG="nwscanmode"', lambda m: ((f'+QCFG: "nwscanmode",{self.scan_mode}',), "OK")),
+            (r'AT\+QCFG="nwscanmode",(\d)(?:,(\d))?', self._on_set_scan_mode),
+            (r'AT\+QCFG="band"', lambda m: (('+QCFG: "band",{},{},{}'.format(*self.band_masks),), "OK")),
+            (r'AT\+QCFG="band","?(\w+)"?,"?(\w+)"?,"?(\w+)"?(?:,(\d))?', self._on_set_bands),
+            (r'AT\+QENG="servingcell"', self._on_serving_cell),
+            (r'AT\+QENG="neighbourcell"', self._on_neighbour_cells),
+            (r'AT\+QIOPEN=(\d+),(\d+),"(TCP|UDP)","([^"]+)",(\d+)(?:,\d+)?(?:,\d)?', self._on_qiopen),
+            (r'AT\+QISEND=(\d+),(\d+)', self._on_qisend),
+            (r'AT\+QIRD=(\d+)(?:,(\d+))?', self._on_qird),
+            (r'AT\+QICLOSE=(\d+)(?:,\d+)?', self._on_qiclose),
+            (r'AT\+IFC=(\d),(\d)', self._on_set_flow_control),
+            (r'AT\+IFC\?', lambda m: (("+IFC: {},{}".format(*self.flow_control),), "OK")),
+            (r'AT\+IPR=(\d+)(;&W)?', self._on_set_baudrate),
+            (r'AT\+IPR\?', lambda m: ((f"+IPR: {self.baudrate}",), "OK")),
+            (r'AT&W', lambda m: ((), "OK")),
+            (r'AT\+QPCMV=(\d)(?:,(\d))?', self._on_set_voice_over_usb),
+            (r'AT\+QMIC=(\d+)(?:,(\d+))?', self._on_set_mic_gains),
+            (r'AT\+QMIC\?', lambda m: (("+QMIC: {},{}".format(*self.mic_gains),), "OK")),
+            (r'AT\+QRXGAIN=(\d+)', self._on_set_rx_gain),
+            (r'AT\+QRXGAIN\?', lambda m: ((f"+QRXGAIN: {self.rx_gain}",), "OK")),
+            (r'AT\+QAUDLOOP=([01])', self._on_audio_loop),
+            (r'AT\+QPCMV\?', lambda m: (("+QPCMV: {},{}".format(*self.voice_over_usb),), "OK")),
+            (r'AT\+QFLST(?:="(?:UFS:)?([^"]*)")?', self._on_file_list),
+            (r'AT\+QFDEL="(?:UFS:)?([^"]+)"', self._on_file_delete),
+            (r'AT\+QFUPL="(?:UFS:)?([^"]+)",(\d+)(?:,(\d+))?(?:,(\d))?', self._on_file_upload),
+            (r'AT\+QFDWL="(?:UFS:)?([^"]+)"', self._on_file_download),
+            (r'AT\+QFOPEN="(?:UFS:)?([^"]+)"(?:,(\d))?', self._on_file_open),
+            (r'AT\+QFSEEK=(\d+),(\d+)(?:,0)?', self._on_file_seek),
+            (r'AT\+QFTUCAT=(\d+)', self._on_file_truncate),
+            (r'AT\+QFWRITE=(\d+),(\d+)(?:,(\d+))?', self._on_file_write),
+            (r'AT\+QFREAD=(\d+)(?:,(\d+))?', self._on_file_read),
+            (r'AT\+QFCLOSE=(\d+)', lambda m: ((), "OK") if self._file_handles.pop(int(m.group(1)), None) else None),
+            (r'AT\+QHTTPCFG="(\w+)",(.+)', lambda m: ((), "OK")),
+            (r'AT\+QHTTPURL=(\d+)(?:,(\d+))?', self._on_http_url),
+            (r'AT\+QHTTPGET(?:=(\d+)(?:,(\d+)(?:,(\d+))?)?)?', self._on_http_get),
+            (r'AT\+QHTTPPOST=(\d+)(?:,(\d+)(?:,(\d+))?)?', self._on_http_post),
+            (r'AT\+QHTTPREAD(?:=(\d+))?', self._on_http_read),
+            (r'AT\+QHTTPREADFILE="(?:UFS:)?([^"]+)"(?:,(\d+))?', self._on_http_read_file),
+        ):
+            self.add_handler(pattern, handler)
+
+    def _on_echo(self, match):
+        self.echo = match.group(1) == "1"
+        return (), "OK"
+
+    def _on_set_report(self, match):
+        self.report_modes[match.group(1).upper()] = int(match.group(2))
+        return (), "OK"
+
+    def _registration_line(self, domain, with_n):
+        n = self.report_modes[domain]
+        prefix = f"+{domain}: {n}," if with_n else f"+{domain}: "
+        line = f"{prefix}{self.reg_stat}"
+        cell = self.network.get(self.camped_band)
+        if n >= 2 and cell and self.reg_stat in (REGISTERED_HOME, 5):
+            line += f',"{cell["tac"]}","{cell["ci"]}",7'
+        return line
+
+    def _on_query_registration(self, match):
+        return (self._registration_line(match.group(1).upper(), with_n=True),), "OK"
+
+    def _measure(self, cell):
+        """Medidas instantâneas (rsrp, rsrq, sinr, rssi) da célula, com ruído."""
+        rsrp = round(cell["rsrp"] + self._random.gauss(0, self.noise))
+        rsrq = round(cell["rsrq"] + self._random.gauss(0, self.noise / 3))
+        sinr = round(cell["sinr"] + self._random.gauss(0, self.noise))
+        return rsrp, rsrq, sinr, rsrp + 25
+
+    def _on_csq(self, match):
+        cell = self.network.get(self.camped_band) if self.reg_stat == REGISTERED_HOME else None
+        if cell is None:
+            return ("+CSQ: 99,99",), "OK"
+        rssi = self._measure(cell)[3]
+        return (f"+CSQ: {max(0, min(31, (rssi + 113) // 2))},99",), "OK"
+
+    def _on_cops(self, match):
+        if self.reg_stat != REGISTERED_HOME:
+            return ("+COPS: 0",), "OK"
+        return ('+COPS: 0,0,"SIMULADA",7',), "OK"
+
+    def _on_qnwinfo(self, match):
+        cell = self.network.get(self.camped_band)
+        if self.reg_stat != REGISTERED_HOME or cell is None:
+            return ("+QNWINFO: No Service",), "OK"
+        return (f'+QNWINFO: "FDD LTE","{"".join(self.plmn)}","LTE BAND {self.camped_band}",{cell["earfcn"]}',), "OK"
+
+    def _on_set_scan_mode(self, match):
+        self.scan_mode = int(match.group(1))
+        if match.group(2) != "0":
+            self._reselect()
+        return (), "OK"
+
+    def _on_set_bands(self, match):
+        masks = [value if value.lower().startswith("0x") else f"0x{value}" for value in match.group(1, 2, 3)]
+        try:
+            for mask in masks:
+                int(mask, 16)
+        except ValueError:
+            return None
+        self.band_masks = masks
+        if match.group(4) != "0":
+            self._reselect()
+        return (), "OK"
+
+    def _on_serving_cell(self, match):
+        cell = self.network.get(self.camped_band)
+        if self.reg_stat != REGISTERED_HOME or cell is None:
+            return ('+QENG: "servingcell","SEARCH"',), "OK"
+        rsrp, rsrq, sinr, rssi = self._measure(cell)
+        mcc, mnc = self.plmn
+        return (f'+QENG: "servingcell","NOCONN","LTE","FDD",{mcc},{mnc},{cell["ci"]},{cell["pci"]},{cell["earfcn"]},'
+                f'{self.camped_band},5,5,{cell["tac"]},{rsrp},{rsrq},{rssi},{sinr},-',), "OK"
+
+    def _on_neighbour_cells(self, match):
+        lines = []
+        if self.reg_stat == REGISTERED_HOME:
+            for band in self._allowed_bands():
+                if band == self.camped_band:
+                    continue
+                cell = self.network[band]
+                rsrp, rsrq, sinr, rssi = self._measure(cell)
+                lines.append(f'+QENG: "neighbourcell inter","LTE",{cell["earfcn"]},{cell["pci"]},{rsrq},{rsrp},{rssi},{sinr},0,0,0,0')
+        return lines, "OK"
+
+    # --- Pilha IP (modo buffer) ---
+
+    def _on_qiopen(self, match):
+        connect_id = int(match.group(2))
+        self.respond()
+        if connect_id in self.sockets:
+            self.urc(f"+QIOPEN: {connect_id},563", self.latency * 2) # Socket já em uso
+        elif self.reg_stat != REGISTERED_HOME:
+            self.urc(f"+QIOPEN: {connect_id},566", self.latency * 2) # Sem rede
+        else:
+            self.sockets[connect_id] = {"service": match.group(3), "host": match.group(4), "port": int(match.group(5)),
+                                        "rx": bytearray()}
+            self.urc(f"+QIOPEN: {connect_id},0", self.latency * 2)
+        return False
+
+    def _on_qisend(self, match):
+        connect_id, length = int(match.group(1)), int(match.group(2))
+        if connect_id not in self.sockets or not 0 < length <= 1460:
+            return None
+        self.emit(b"\r\n> ", self.latency)
+        self.expect_payload(length, lambda data: self._socket_sent(connect_id, data))
+        return False
+
+    def _socket_sent(self, connect_id, data):
+        self.respond(result="SEND OK")
+        reply = self.socket_peer(connect_id, data)
+        sock = self.sockets.get(connect_id)
+        if reply and sock is not None:
+            notify = not sock["rx"]
+            sock["rx"] += reply
+            if notify:
+                self.urc(f'+QIURC: "recv",{connect_id}', self.latency * 2)
+
+    def _on_qird(self, match):
+        sock = self.sockets.get(int(match.group(1)))
+        if sock is None:
+            return None
+        count = min(int(match.group(2) or 1500), 1500, len(sock["rx"]))
+        data = bytes(sock["rx"][:count])
+        del sock["rx"][:count]
+        self.emit(b"\r\n+QIRD: %d\r\n" % count + data + b"\r\n\r\nOK\r\n", self.latency)
+        return False
+
+    def _on_qiclose(self, match):
+        self.sockets.pop(int(match.group(1)), None)
+        return (), "OK"
+
+    def close_socket_by_peer(self, connect_id):
+        """Simula o par fechando a conexão (+QIURC: "closed")."""
+        with self._lock:
+            if connect_id in self.sockets:
+                self.urc(f'+QIURC: "closed",{connect_id}')
+
+    # --- HTTP(S) ---
+
+    def _on_http_url(self, match):
+        self.emit(b"\r\nCONNECT\r\n", self.latency)
+        self.expect_payload(int(match.group(1)), self._http_url_received)
+        return False
+
+    def _http_url_received(self, data):
+        self._http["url"] = data.decode("utf-8", errors="replace")
+        self.respond()
+
+    def _on_http_get(self, match):
+        if match.group(2): # Com cabeçalho próprio (requestheader=1)
+            self.emit(b"\r\nCONNECT\r\n", self.latency)
+            self.expect_payload(int(match.group(2)), self._http_get_with_header)
+            return False
+        self.respond()
+        self._http_get(b"")
+        return False
+
+    def _http_get_with_header(self, header):
+        self.respond()
+        self._http_get(header)
+
+    def _http_get(self, header):
+        body = self.http_resources.get(self._http["url"])
+        status = 200
+        if body is None:
+            status, body = 404, b""
+        else:
+            requested = re.search(rb"\r\nRange: bytes=(\d+)-", header)
+            if requested and not self.http_ignore_range:
+                start = int(requested.group(1))
+                status, body = (206, body[start:]) if start < len(body) else (416, b"")
+        self._http.update(status=status, body=body)
+        self.urc(f"+QHTTPGET: 0,{status},{len(body)}", self.latency * 2)
+
+    def _on_http_post(self, match):
+        self.emit(b"\r\nCONNECT\r\n", self.latency)
+        self.expect_payload(int(match.group(1)), self._http_posted)
+        return False
+
+    def _http_posted(self, data):
+        self.respond()
+        self._http.update(status=200, body=data)
+        self.urc(f"+QHTTPPOST: 0,200,{len(data)}", self.latency * 2)
+
+    def _on_http_read(self, match):
+        if self._http["status"] is None:
+            return None
+        body = self._http["body"]
+        if self.http_cut_after is not None: # Entrega só o começo e não encerra o comando
+            body, self.http_cut_after = body[:self.http_cut_after], None
+            self.emit(b"\r\nCONNECT\r\n" + body, self.latency)
+            return False
+        self.emit(b"\r\nCONNECT\r\n" + body + b"\r\nOK\r\n\r\n+QHTTPREAD: 0\r\n", self.latency)
+        return False
+
+    def _on_http_read_file(self, match):
+        if self._http["status"] is None:
+            return None
+        self.files[match.group(1)] = self._http["body"]
+        self.respond()
+        self.urc("+QHTTPREADFILE: 0", self.latency * 2)
+        return False
+
+    # --- Sistema de arquivos (UFS) ---
+
+    def _on_set_flow_control(self, match):
+        self.flow_control = (int(match.group(1)), int(match.group(2)))
+        return (), "OK"
+
+    def _on_set_voice_over_usb(self, match):
+        enable, port = int(match.group(1)), int(match.group(2) or 0)
+        if enable not in (0, 1) or port not in (0, 1):
+            return None
+        self.voice_over_usb = (enable, port if enable else self.voice_over_usb[1])
+        self._voice_loop.clear()
+        return (), "OK"
+
+    def _on_set_mic_gains(self, match):
+        txgain = int(match.group(1))
+        txdgain = int(match.group(2)) if match.group(2) is not None else self.mic_gains[1]
+        if txgain > 65535 or txdgain > 65535:
+            return None
+        self.mic_gains = (txgain, txdgain)
+        return (), "OK"
+
+    def _on_set_rx_gain(self, match):
+        if int(match.group(1)) > 65535:
+            return None
+        self.rx_gain = int(match.group(1))
+        return (), "OK"
+
+    def _on_audio_loop(self, match):
+        self.audio_loop = match.group(1) == "1"
+        self._voice_loop.clear()
+        return (), "OK"
+
+    def _on_set_baudrate(self, match):
+        rate = int(match.group(1))
+        if rate not in SUPPORTED_BAUD_RATES:
+            return None
+        self.respond() # O OK ainda sai na velocidade antiga
+        self.baudrate = rate
+        return False
+
+    def _on_file_list(self, match):
+        pattern = match.group(1) or "*"
+        return [f'+QFLST: "UFS:{name}",{len(data)}' for name, data in sorted(self.files.items())
+                if fnmatch.fnmatchcase(name, pattern)], "OK"
+
+    def _on_file_delete(self, match):
+        name = match.group(1)
+        if name == "*":
+            self.files.clear()
+        elif self.files.pop(name, None) is None:
+            return (), "+CME ERROR: 405" # Arquivo não encontrado
+        return (), "OK"
+
+    def _on_file_upload(self, match):
+        name, size = match.group(1), int(match.group(2))
+        self.emit(b"\r\nCONNECT\r\n", self.latency)
+        self.expect_payload(size, lambda data: self._file_uploaded(name, data))
+        return False
+
+    def _corrupt(self, data):
+        if not self.ufs_corrupt_next or not data:
+            return data
+        self.ufs_corrupt_next = False
+        middle = len(data) // 2
+        return data[:middle] + bytes([data[middle] ^ 0x01]) + data[middle + 1:]
+
+    def _file_uploaded(self, name, data):
+        data = self._corrupt(data) # Chegou corrompido: o modem grava e informa o checksum do que recebeu
+        if self.ufs_cut_after is not None: # Queda no meio: grava só o começo
+            self.files[name], self.ufs_cut_after = data[:self.ufs_cut_after], None
+            self.respond(result="+CME ERROR: 409")
+            return
+        self.files[name] = data
+        self.respond([f"+QFUPL: {len(data)},{UfsChecksum(data).hexdigest()}"])
+
+    def _on_file_download(self, match):
+        data = self.files.get(match.group(1))
+        if data is None:
+            return (), "+CME ERROR: 405"
+        if self.ufs_cut_after is not None: # Entrega só o começo e não encerra o comando
+            data, self.ufs_cut_after = data[:self.ufs_cut_after], None
+            self.emit(b"\r\nCONNECT\r\n" + data, self.latency)
+            return False
+        trailer = f"\r\n+QFDWL: {len(data)},{UfsChecksum(data).hexdigest()}\r\n\r\nOK\r\n".encode()
+        self.emit(b"\r\nCONNECT\r\n" + self._corrupt(data) + trailer, self.latency)
+        return False
+
+    def _on_file_open(self, match):
+        name, mode = match.group(1), int(match.group(2) or 0)
+        if mode == 2 and name not in self.files:
+            return (), "+CME ERROR: 405"
+        if mode == 1 or name not in self.files:
+            self.files[name] = b""
+        handle = next(self._next_file_handle)
+        self._file_handles[handle] = [name, 0]
+        return (f"+QFOPEN: {handle}",), "OK"
+
+    def _on_file_seek(self, match):
+        entry = self._file_handles.get(int(match.group(1)))
+        if entry is None:
+            return None
+        entry[1] = int(match.group(2))
+        return (), "OK"
+
+    def _on_file_truncate(self, match):
+        entry = self._file_handles.get(int(match.group(1)))
+        if entry is None:
+            return None
+        self.files[entry[0]] = self.files[entry[0]][:entry[1]]
+        return (), "OK"
+
+    def _on_file_write(self, match):
+        entry = self._file_handles.get(int(match.group(1)))
+        if entry is None:
+            return None
+        self.emit(b"\r\nCONNECT\r\n", self.latency)
+        self.expect_payload(int(match.group(2)), lambda data: self._file_written(entry, data))
+        return False
+
+    def _file_written(self, entry, data):
+        name, position = entry
+        content = self.files[name]
+        self.files[name] = content[:position] + data + content[position + len(data):]
+        entry[1] = position + len(data)
+        self.respond([f"+QFWRITE: {len(data)},{len(self.files[name])}"])
+
+    def _on_file_read(self, match):
+        entry = self._file_handles.get(int(match.group(1)))
+        if entry is None:
+            return None
+        name, position = entry
+        data = self.files[name][position:position + int(match.group(2) or len(self.files[name]))]
+        entry[1] = position + len(data)
+        self.emit(b"\r\nCONNECT %d\r\n" % len(data) + data + b"\r\nOK\r\n", self.latency)
+        return False
+
+    # --- Rede ---
+
+    def _allowed_bands(self):
+        if self.scan_mode not in (0, 3): # Só LTE é simulado
+            return []
+        enabled = set(lte_bands_from_mask(self.band_masks[1]))
+        return [band for band in self.network if band in enabled]
+
+    def _reselect(self):
+        """Troca de configuração: perde o registro e acampa na célula habilitada mais forte após o attach_time."""
+        previous = self.reg_stat
+        self.reg_stat = SEARCHING
+        self.camped_band = None
+        bands = self._allowed_bands()
+        if bands:
+            self.camped_band = max(bands, key=lambda band: self.network[band]["rsrp"])
+            self._attach_due = time.monotonic() + self.network[self.camped_band]["attach_time"] * self.time_scale
+        else:
+            self._attach_due = None
+        if previous != SEARCHING:
+            self._emit_registration_urcs()
+        logger.debug(f"SimulatedModem: Reseleção; bandas habilitadas {bands}, acampando na banda {self.camped_band}.")
+
+    def _tick(self):
+        if self._attach_due is not None and time.monotonic() >= self._attach_due:
+            self._attach_due = None
+            self.reg_stat = REGISTERED_HOME
+            self._emit_registration_urcs()
+
+    def _emit_registration_urcs(self):
+        for domain in ("CREG", "CEREG"):
+            if self.report_modes[domain]:
+                self.urc(self._registration_line(domain, with_n=False))
+
+
+class SimulatedSerial:
+    """Subconjunto da API de serial.Serial usado pelo projeto, ligado a um SimulatedModem."""
+
+    def __init__(self, port=None, baudrate=115200, modem=None, timeout=None, write_timeout=None, **kwargs):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.rtscts = kwargs.get("rtscts", False)
+        self.modem = modem if modem is not None else SimulatedModem()
+        self.is_open = True
+        self._buffer = bytearray()
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    def _pull(self):
+        self._buffer += self.modem.take_output(self.baudrate, self.rtscts)
+
+    @property
+    def in_waiting(self):
+        self._pull()
+        return len(self._buffer)
+
+    def read(self, size=1):
+        deadline = time.monotonic() + (self.timeout or 0)
+        while True:
+            self._pull()
+            if len(self._buffer) >= size or time.monotonic() >= deadline:
+                break
+            time.sleep(0.001)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def readline(self):
+        deadline = time.monotonic() + (self.timeout or 0)
+        while True:
+            self._pull()
+            end = self._buffer.find(b"\n")
+            if end >= 0 or time.monotonic() >= deadline:
+                break
+            time.sleep(0.001)
+        size = end + 1 if end >= 0 else len(self._buffer)
+        return self.read(size) if size else b""
+
+    def write(self, data):
+        self.modem.feed(data, self.baudrate, self.rtscts)
+        if self.modem.model_line_rate:
+            time.sleep(len(data) * BITS_PER_BYTE / self.baudrate)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self._pull()
+        self._buffer.clear()
+
+    flushInput = reset_input_buffer
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class SimulatedVoicePort:
+    """Porta de voz simulada: entrega PCM no ritmo da taxa de amostragem enquanto o Voice over USB estiver habilitado."""
+
+    def __init__(self, port=None, modem=None, timeout=None, write_timeout=None, **kwargs):
+        self.port = port
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.modem = modem if modem is not None else SimulatedModem()
+        self.is_open = True
+        self._buffer = bytearray()
+        self._started_at = time.monotonic()
+        self._produced = 0 # Amostras já geradas desde a abertura
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    def _pull(self):
+        due = int((time.monotonic() - self._started_at) * self.modem.voice_sample_rate) - self._produced
+        if due <= 0:
+            return
+        self._produced += due
+        if self.modem.voice_over_usb[0]:
+            self._buffer += self.modem.voice_samples(due)
+
+    @property
+    def in_waiting(self):
+        self._pull()
+        return len(self._buffer)
+
+    def read(self, size=1):
+        deadline = time.monotonic() + (self.timeout or 0)
+        while self.is_open:
+            self._pull()
+            if len(self._buffer) >= size or time.monotonic() >= deadline:
+                break
+            time.sleep(0.002)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def write(self, data):
+        if self.modem.voice_over_usb[0]:
+            self.modem.voice_write(bytes(data))
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self._pull()
+        self._buffer.clear()
+
+    def close(self):
+        self.is_open = False
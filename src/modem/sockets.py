@@ -0,0 +1,334 @@
+# src/modem/sockets.py
+import io
+import re
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from src.modem.at_commands import AT_COMMANDS
+from src.modem.data_mode import DataModeSession
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Tipos de serviço aceitos pelo AT+QIOPEN (clientes)
+SERVICE_TYPES = {"TCP": "TCP", "UDP": "UDP"}
+# connectIDs disponíveis no modem (0..11)
+MAX_CONNECT_IDS = 12
+# Máximos por comando: AT+QISEND aceita até 1460 bytes, AT+QIRD devolve até 1500
+QISEND_MAX = 1460
+QIRD_MAX = 1500
+# Timeouts (s): o +QIOPEN pode levar até 150 s segundo o manual; QICLOSE usa 10 s por padrão
+QIOPEN_TIMEOUT = 150
+QISEND_TIMEOUT = 10
+QIRD_TIMEOUT = 10
+QICLOSE_TIMEOUT = 10
+# SEND FAIL = buffer de envio do modem cheio: novas tentativas com espera crescente
+SEND_FAIL_RETRIES = 5
+SEND_FAIL_BACKOFF = 0.2
+# Sem +QIURC "recv" (perdido ou atrasado), recv() consulta o modem a cada intervalo
+RECV_POLL_INTERVAL = 5.0
+# Bytes mantidos no buffer local antes de parar de ler do modem
+RX_BUFFER_LIMIT = 64 * 1024
+
+_QIRD_HEADER_RE = re.compile(rb'\+QIRD:\s*(?P<length>\d+)\r\n')
+
+
+class ModemSocketError(OSError):
+    """Falha de um socket do modem (abertura, envio, leitura ou conexão fechada pelo modem)."""
+
+
+class ModemSocket:
+    """
+    Um socket TCP/UDP na pilha IP do modem (modo buffer do AT+QIOPEN).
+    Envio por AT+QISEND em fatias de memoryview de até QISEND_MAX bytes; leitura por AT+QIRD em blocos de
+    QIRD_MAX, disparada pelo URC +QIURC: "recv". Interface parecida com socket.socket; makefile() dá um objeto arquivo.
+    """
+
+    def __init__(self, manager, connect_id, protocol, host, port):
+        self.manager = manager
+        self.controller = manager.controller
+        self.connect_id = connect_id
+        self.protocol = protocol
+        self.remote = (host, port)
+        self.timeout = None # Padrão de recv() (None = bloqueia)
+        self.closed = False
+        self.peer_closed = False
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.send_seconds = 0.0
+        self.recv_seconds = 0.0
+        self.opened_at = time.monotonic()
+        self._rx = bytearray()
+        self._rx_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._data_pending = threading.Event()
+        self._data_pending.set() # Dados podem ter chegado antes da inscrição; a primeira leitura consulta o modem
+
+    def __repr__(self):
+        state = "fechado" if self.closed else ("fechado pelo par" if self.peer_closed else "aberto")
+        return f"<ModemSocket {self.connect_id} {self.protocol} {self.remote[0]}:{self.remote[1]} {state}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Envio ---
+
+    def send(self, data):
+        """Envia até QISEND_MAX bytes de data (um AT+QISEND). :return: Bytes enviados."""
+        view = memoryview(data).cast('B')[:QISEND_MAX]
+        self._send_chunk(view)
+        return len(view)
+
+    def sendall(self, data):
+        """Envia todo o data em fatias de memoryview (sem copiar o buffer do chamador)."""
+        view = memoryview(data).cast('B')
+        for offset in range(0, len(view), QISEND_MAX):
+            self._send_chunk(view[offset:offset + QISEND_MAX])
+
+    def _send_chunk(self, chunk):
+        self._check_open()
+        command = AT_COMMANDS["SEND_SOCKET"]["command"].format(self.connect_id, len(chunk))
+        started = time.perf_counter()
+        for attempt in range(SEND_FAIL_RETRIES + 1):
+            response = self.controller.send_at_command(command, expected_response="SEND OK", timeout=QISEND_TIMEOUT, payload=chunk)
+            if response and "SEND OK" in response:
+                self.bytes_sent += len(chunk)
+                self.send_seconds += time.perf_counter() - started
+                return
+            if not response or "SEND FAIL" not in response:
+                raise ModemSocketError(f"Socket {self.connect_id}: envio de {len(chunk)} bytes falhou. Resposta: {response!r}")
+            time.sleep(SEND_FAIL_BACKOFF * (attempt + 1)) # Buffer de envio do modem cheio
+        raise ModemSocketError(f"Socket {self.connect_id}: buffer de envio do modem continua cheio (SEND FAIL).")
+
+    # --- Recepção ---
+
+    def recv(self, bufsize, timeout=None):
+        """
+        Recebe até bufsize bytes. Retorna b"" quando o par fechou a conexão e não há mais dados.
+        :param timeout: Espera máxima em s (padrão: self.timeout; None bloqueia).
+        :raises TimeoutError: Se nada chegar dentro do timeout.
+        """
+        with self._read_lock:
+            self._fill(self.timeout if timeout is None else timeout)
+            with self._rx_lock:
+                data = bytes(self._rx[:bufsize])
+                del self._rx[:bufsize]
+        return data
+
+    def recv_into(self, buffer, nbytes=0, timeout=None):
+        """Como recv(), mas copia direto para buffer (bytearray/memoryview). :return: Bytes recebidos."""
+        view = memoryview(buffer).cast('B')
+        nbytes = nbytes or len(view)
+        with self._read_lock:
+            self._fill(self.timeout if timeout is None else timeout)
+            with self._rx_lock:
+                count = min(nbytes, len(self._rx))
+                with memoryview(self._rx) as rx_view:
+                    view[:count] = rx_view[:count]
+                del self._rx[:count]
+        return count
+
+    def _fill(self, timeout):
+        """Garante dados no buffer local (ou fim da conexão), lendo do modem quando há +QIURC "recv" pendente."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._rx:
+            self._check_open(allow_peer_closed=True)
+            if self._data_pending.is_set():
+                self._data_pending.clear()
+                self._read_from_modem()
+                continue
+            if self.peer_closed:
+                return
+            wait = RECV_POLL_INTERVAL if deadline is None else min(RECV_POLL_INTERVAL, deadline - time.monotonic())
+            if wait <= 0:
+                raise TimeoutError(f"Socket {self.connect_id}: nenhum dado em {timeout}s.")
+            if not self._data_pending.wait(wait):
+                self._data_pending.set() # Rede de segurança contra URCs perdidos: consulta o modem mesmo assim
+
+    def _read_from_modem(self):
+        """Lê do modem em blocos de QIRD_MAX até esvaziá-lo (ou encher o buffer local)."""
+        command = AT_COMMANDS["READ_SOCKET"]["command"].format(self.connect_id, QIRD_MAX)
+        started = time.perf_counter()
+        with self.controller.scheduler.slot():
+            while len(self._rx) < RX_BUFFER_LIMIT:
+                chunk = bytearray()
+                # +QIRD: <n>\r\n<n bytes>\r\n\r\nOK: o cabeçalho fica na resposta, os dados vão para chunk
+                session = DataModeSession(sink=chunk.extend, start=_QIRD_HEADER_RE, keep_start=True)
+                with self.controller.data_mode(session):
+                    response = self.controller.send_at_command(command, expected_response="+QIRD", timeout=QIRD_TIMEOUT)
+                if not response or "+QIRD" not in response or not session.completed:
+                    raise ModemSocketError(f"Socket {self.connect_id}: leitura falhou. Resposta: {response!r}")
+                if chunk:
+                    with self._rx_lock:
+                        self._rx += chunk
+                    self.bytes_received += len(chunk)
+                if session.length < QIRD_MAX: # Modem esvaziado
+                    break
+            else:
+                self._data_pending.set() # Buffer local cheio: o restante fica para a próxima leitura
+        self.recv_seconds += time.perf_counter() - started
+
+    # --- Ciclo de vida ---
+
+    def _check_open(self, allow_peer_closed=False):
+        if self.closed:
+            raise ModemSocketError(f"Socket {self.connect_id} fechado.")
+        if self.peer_closed and not allow_peer_closed:
+            raise ModemSocketError(f"Socket {self.connect_id}: conexão fechada pelo par ou pela rede.")
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def close(self):
+        """Fecha a conexão no modem (AT+QICLOSE). Idempotente."""
+        if self.closed:
+            return
+        self.closed = True
+        self._data_pending.set() # Acorda quem espera em recv()
+        command = AT_COMMANDS["CLOSE_SOCKET"]["command"].format(self.connect_id, QICLOSE_TIMEOUT)
+        response = self.controller.send_at_command(command, expected_response="OK", timeout=QICLOSE_TIMEOUT + 2)
+        if not response or "OK" not in response:
+            logger.warning(f"ModemSocket: AT+QICLOSE do socket {self.connect_id} falhou. Resposta: {response!r}")
+        self.manager._forget(self)
+        logger.info(f"ModemSocket: Socket {self.connect_id} fechado. {self.get_stats()}")
+
+    def makefile(self, mode="rb", buffering=io.DEFAULT_BUFFER_SIZE):
+        """Objeto arquivo binário ("rb", "wb" ou "rwb") sobre o socket, como socket.makefile."""
+        raw = ModemSocketIO(self, mode)
+        if "r" in mode and "w" in mode:
+            return io.BufferedRWPair(raw, raw, buffering)
+        if "w" in mode:
+            return io.BufferedWriter(raw, buffering)
+        return io.BufferedReader(raw, buffering)
+
+    def get_stats(self):
+        return {
+            "connect_id": self.connect_id,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "send_throughput": self.bytes_sent / self.send_seconds if self.send_seconds else None, # bytes/s em AT+QISEND
+            "recv_throughput": self.bytes_received / self.recv_seconds if self.recv_seconds else None, # bytes/s em AT+QIRD
+            "age": time.monotonic() - self.opened_at,
+        }
+
+
+class ModemSocketIO(io.RawIOBase):
+    """Adaptador io.RawIOBase de um ModemSocket (usado por ModemSocket.makefile)."""
+
+    def __init__(self, sock, mode="rb"):
+        super().__init__()
+        self._sock = sock
+        self._mode = mode
+
+    def readable(self):
+        return "r" in self._mode
+
+    def writable(self):
+        return "w" in self._mode
+
+    def readinto(self, buffer):
+        return self._sock.recv_into(buffer)
+
+    def write(self, data):
+        return self._sock.send(data)
+
+
+class ModemSocketManager:
+    """
+    Abre e acompanha os sockets do modem: reserva connectIDs, espera o +QIOPEN e roteia
+    os URCs +QIURC ("recv", "closed", "pdpdeact") para cada ModemSocket.
+    """
+
+    def __init__(self, controller, context_id=1):
+        """
+        :param controller: ModemController.
+        :param context_id: Contexto PDP (AT+QIACT) usado pelos sockets.
+        """
+        self.controller = controller
+        self.context_id = context_id
+        self._lock = threading.Lock()
+        self._sockets = {} # connectID -> ModemSocket
+        self._opening = {} # connectID -> Future com o <err> do +QIOPEN
+        controller.urc_dispatcher.subscribe(self._on_urc, urc_names=("QIURC", "QIOPEN"), name="sockets")
+
+    def open(self, host, port, protocol="TCP", connect_id=None, timeout=QIOPEN_TIMEOUT):
+        """
+        Abre uma conexão (AT+QIOPEN) e espera o resultado assíncrono (+QIOPEN: <id>,<err>).
+        :param connect_id: connectID (padrão: o primeiro livre).
+        :return: ModemSocket conectado.
+        :raises ModemSocketError: Se o modem recusar ou informar erro na conexão.
+        :raises TimeoutError: Se o +QIOPEN não chegar dentro do timeout.
+        """
+        service = SERVICE_TYPES.get(protocol.upper())
+        if service is None:
+            raise ValueError(f"Protocolo inválido: '{protocol}'. Use {', '.join(SERVICE_TYPES)}.")
+        future = Future()
+        with self._lock:
+            if connect_id is None:
+                connect_id = next((i for i in range(MAX_CONNECT_IDS) if i not in self._sockets and i not in self._opening), None)
+                if connect_id is None:
+                    raise ModemSocketError(f"Todos os {MAX_CONNECT_IDS} connectIDs do modem estão em uso.")
+            elif connect_id in self._sockets or connect_id in self._opening:
+                raise ModemSocketError(f"connectID {connect_id} já está em uso.")
+            self._opening[connect_id] = future
+        try:
+            command = AT_COMMANDS["OPEN_SOCKET"]["command"].format(self.context_id, connect_id, service, host, port)
+            response = self.controller.send_at_command(command, expected_response="OK")
+            if not response or "OK" not in response:
+                raise ModemSocketError(f"Modem recusou '{command}'. Resposta: {response!r}")
+            try:
+                err = future.result(timeout)
+            except FutureTimeoutError:
+                self._close_id(connect_id)
+                raise TimeoutError(f"Sem +QIOPEN para o socket {connect_id} em {timeout}s.")
+            if err != 0:
+                raise ModemSocketError(f"Conexão {service} com {host}:{port} falhou (+QIOPEN: {connect_id},{err}).")
+            sock = ModemSocket(self, connect_id, service, host, port)
+            with self._lock:
+                self._sockets[connect_id] = sock
+            logger.info(f"ModemSocketManager: {sock} aberto.")
+            return sock
+        finally:
+            with self._lock:
+                self._opening.pop(connect_id, None)
+
+    def sockets(self):
+        with self._lock:
+            return list(self._sockets.values())
+
+    def get_stats(self):
+        return {sock.connect_id: sock.get_stats() for sock in self.sockets()}
+
+    def _close_id(self, connect_id):
+        command = AT_COMMANDS["CLOSE_SOCKET"]["command"].format(connect_id, QICLOSE_TIMEOUT)
+        self.controller.send_at_command(command, expected_response="OK", timeout=QICLOSE_TIMEOUT + 2)
+
+    def _forget(self, sock):
+        with self._lock:
+            if self._sockets.get(sock.connect_id) is sock:
+                del self._sockets[sock.connect_id]
+
+    def _on_urc(self, urc_name, payload):
+        if urc_name == "QIOPEN":
+            connect_id, err = int(payload[0]), int(payload[1])
+            with self._lock:
+                future = self._opening.get(connect_id)
+            if future is not None and not future.done():
+                future.set_result(err)
+            return
+        event, connect_id = payload[0], payload[1]
+        if event == "pdpdeact": # Contexto PDP caiu: todas as conexões se foram
+            logger.warning(f"ModemSocketManager: Contexto PDP {connect_id} desativado pela rede.")
+            targets = self.sockets()
+        else:
+            with self._lock:
+                sock = self._sockets.get(int(connect_id)) if connect_id is not None else None
+            targets = [sock] if sock is not None else []
+        for sock in targets:
+            if event in ("closed", "pdpdeact"):
+                sock.peer_closed = True
+            sock._data_pending.set() # "recv": há dados no modem; "closed": acorda recv() para ler o restante
@@ -0,0 +1,257 @@
+# src/modem/urc_dispatcher.py
+import queue
+import threading
+import time
+
+from src.logger.logger import setup_logger
+from src.utils.tracing import tracer
+
+logger = setup_logger(__name__)
+
+# Item que sinaliza o encerramento de uma thread de entrega
+_STOP = object()
+
+
+class _Subscriber:
+    """Assinante isolado: fila própria, thread própria e contadores próprios."""
+
+    def __init__(self, name, callback, urc_names, queue_size):
+        self.name = name
+        self.callback = callback
+        self.urc_names = urc_names # None = todos os URCs; frozenset() = só entregas diretas (submit)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    def wants(self, urc_name):
+        return self.urc_names is None or urc_name in self.urc_names
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+            "avg_latency": self.total_latency / self.delivered if self.delivered else 0.0,
+        }
+
+
+class UrcDispatcher:
+    """
+    Entrega URCs fora da thread de leitura serial.
+    A thread de leitura só faz um put_nowait numa fila limitada; uma thread de distribuição
+    repassa cada URC para a fila de cada assinante, e cada assinante roda na sua própria thread.
+    Um assinante lento (ex: um popup bloqueante) só atrasa a si mesmo; quando uma fila enche,
+    o item é descartado e contabilizado. Mede a latência entre a leitura e o início do handler.
+    """
+
+    def __init__(self, queue_size=512, subscriber_queue_size=128):
+        """
+        :param queue_size: Capacidade da fila central alimentada pela thread de leitura.
+        :param subscriber_queue_size: Capacidade da fila de cada assinante.
+        """
+        self.subscriber_queue_size = subscriber_queue_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._subscribers = {} # token -> _Subscriber
+        self._direct = {} # callback -> _Subscriber usado por submit()
+        self._next_token = 1
+        self._fanout_thread = None
+        self._running = False
+        self.dispatched = 0
+        self.overflow = 0
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Inicia as threads de distribuição e dos assinantes já registrados. Idempotente."""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._fanout_thread = threading.Thread(target=self._fanout_loop, name="UrcDispatcher", daemon=True)
+            self._fanout_thread.start()
+            for subscriber in list(self._subscribers.values()) + list(self._direct.values()):
+                self._start_subscriber(subscriber)
+        logger.debug("UrcDispatcher: Iniciado.")
+
+    def stop(self, timeout=1.0):
+        """
+        Para as threads de entrega. As assinaturas são mantidas e voltam a receber após start().
+        Itens ainda enfileirados são descartados.
+        """
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            subscribers = list(self._subscribers.values()) + list(self._direct.values())
+        self._put_stop(self._queue)
+        if self._fanout_thread:
+            self._fanout_thread.join(timeout)
+            self._fanout_thread = None
+        for subscriber in subscribers:
+            self._put_stop(subscriber.queue)
+        for subscriber in subscribers:
+            if subscriber.thread:
+                subscriber.thread.join(timeout)
+                if subscriber.thread.is_alive():
+                    logger.warning(f"UrcDispatcher: Assinante '{subscriber.name}' não terminou a tempo.")
+                subscriber.thread = None
+        self._drain(self._queue)
+        for subscriber in subscribers:
+            self._drain(subscriber.queue)
+        logger.debug("UrcDispatcher: Parado.")
+
+    # --- Assinaturas ---
+
+    def subscribe(self, callback, urc_names=None, name=None):
+        """
+        Registra callback(urc_name, payload).
+        :param urc_names: Iterável de nomes de URC de interesse (None = todos).
+        :param name: Nome usado nas estatísticas e nos logs.
+        :return: Token para cancelar a assinatura.
+        """
+        urc_names = frozenset(urc_names) if urc_names is not None else None
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            subscriber = _Subscriber(name or f"subscriber-{token}", callback, urc_names, self.subscriber_queue_size)
+            self._subscribers[token] = subscriber
+            if self._running:
+                self._start_subscriber(subscriber)
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            subscriber = self._subscribers.pop(token, None)
+        if subscriber:
+            self._put_stop(subscriber.queue)
+
+    # --- Produtores ---
+
+    def dispatch(self, urc_name, payload, flow_id=None):
+        """
+        Enfileira um URC para os assinantes. Nunca bloqueia: chamado pela thread de leitura serial.
+        :param flow_id: Id de fluxo do tracing (src/utils/tracing.py) iniciado na recepção do URC.
+        :return: False se a fila central estava cheia e o URC foi descartado.
+        """
+        return self._enqueue((time.perf_counter(), None, (urc_name, payload), flow_id))
+
+    def submit(self, callback, *args):
+        """
+        Agenda callback(*args) na thread isolada desse callback, sem bloquear quem chama.
+        Compatível com o parâmetro notify do ModemState.
+        """
+        return self._enqueue((time.perf_counter(), callback, args, None))
+
+    def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.overflow += 1
+            if self.overflow == 1 or self.overflow % 100 == 0:
+                logger.warning(f"UrcDispatcher: Fila central cheia; {self.overflow} item(ns) descartado(s) até agora.")
+            return False
+
+    # --- Threads ---
+
+    def _fanout_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            enqueued_at, callback, args, flow_id = item
+            with tracer.span("urc_dispatch", "urc", urc=args[0] if callback is None else None):
+                tracer.flow("t", flow_id, "urc")
+                if callback is None:
+                    with self._lock:
+                        targets = [s for s in self._subscribers.values() if s.wants(args[0])]
+                else:
+                    targets = [self._direct_subscriber(callback)]
+                self.dispatched += 1
+                for subscriber in targets:
+                    try:
+                        subscriber.queue.put_nowait((enqueued_at, args, flow_id))
+                    except queue.Full:
+                        subscriber.dropped += 1
+                        if subscriber.dropped == 1 or subscriber.dropped % 100 == 0:
+                            logger.warning(f"UrcDispatcher: Fila do assinante '{subscriber.name}' cheia; {subscriber.dropped} item(ns) descartado(s).")
+
+    def _direct_subscriber(self, callback):
+        with self._lock:
+            subscriber = self._direct.get(callback)
+            if subscriber is None:
+                name = getattr(callback, "__qualname__", repr(callback))
+                subscriber = _Subscriber(name, callback, frozenset(), self.subscriber_queue_size)
+                self._direct[callback] = subscriber
+                if self._running:
+                    self._start_subscriber(subscriber)
+            return subscriber
+
+    def _start_subscriber(self, subscriber):
+        subscriber.thread = threading.Thread(
+            target=self._subscriber_loop, args=(subscriber,), name=f"UrcSubscriber-{subscriber.name}", daemon=True
+        )
+        subscriber.thread.start()
+
+    def _subscriber_loop(self, subscriber):
+        while True:
+            item = subscriber.queue.get()
+            if item is _STOP:
+                break
+            enqueued_at, args, flow_id = item
+            latency = time.perf_counter() - enqueued_at
+            subscriber.delivered += 1
+            subscriber.last_latency = latency
+            subscriber.total_latency += latency
+            if latency > subscriber.max_latency:
+                subscriber.max_latency = latency
+            with tracer.span("urc_handler", "urc", subscriber=subscriber.name, latency_ms=latency * 1000):
+                tracer.flow("f", flow_id, "urc")
+                try:
+                    subscriber.callback(*args)
+                except Exception as e:
+                    subscriber.errors += 1
+                    logger.error(f"UrcDispatcher: Erro no assinante '{subscriber.name}': {e}", exc_info=True)
+
+    @staticmethod
+    def _put_stop(target_queue):
+        # A fila pode estar cheia: descarta o item mais antigo para garantir a entrega do sinal de parada
+        while True:
+            try:
+                target_queue.put_nowait(_STOP)
+                return
+            except queue.Full:
+                try:
+                    target_queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    @staticmethod
+    def _drain(target_queue):
+        while True:
+            try:
+                target_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    # --- Estatísticas ---
+
+    def get_stats(self):
+        """Retorna profundidade da fila central, descartes e, por assinante, entregas, erros e latências (s)."""
+        with self._lock:
+            subscribers = list(self._subscribers.values()) + list(self._direct.values())
+        return {
+            "queue_depth": self._queue.qsize(),
+            "dispatched": self.dispatched,
+            "overflow": self.overflow,
+            "subscribers": {s.name: s.stats() for s in subscribers},
+        }
@@ -0,0 +1,101 @@
+# src/modem/urc_profiles.py
+import re
+
+# --- Assinaturas de URC ---
+# Cada entrada descreve como habilitar um tipo de URC, como verificar que ficou ativo
+# e quais chaves do ModemState passam a ser mantidas por push (dispensando polling).
+#   command:    comando que habilita o URC
+#   verify:     consulta usada para confirmar a configuração
+#   expect:     regex que a resposta da consulta deve conter
+#   seed:       comando opcional para popular o estado inicial (o URC só chega na próxima mudança)
+#   state_keys: chaves do ModemState mantidas por este URC
+URC_SUBSCRIPTIONS = {
+    "creg": {
+        "command": "AT+CREG=2",
+        "verify": "AT+CREG?",
+        "expect": r'\+CREG:\s*2,',
+        "state_keys": ("creg",),
+    },
+    "cgreg": {
+        "command": "AT+CGREG=2",
+        "verify": "AT+CGREG?",
+        "expect": r'\+CGREG:\s*2,',
+        "state_keys": ("cgreg",),
+    },
+    "cereg": {
+        "command": "AT+CEREG=2",
+        "verify": "AT+CEREG?",
+        "expect": r'\+CEREG:\s*2,',
+        "state_keys": ("cereg",),
+    },
+    "csq": {
+        "command": 'AT+QINDCFG="csq",1',
+        "verify": 'AT+QINDCFG="csq"',
+        "expect": r'\+QINDCFG:\s*"csq",1',
+        "seed": "AT+CSQ",
+        "state_keys": ("signal",),
+    },
+    "qsimstat": {
+        "command": "AT+QSIMSTAT=1",
+        "verify": "AT+QSIMSTAT?",
+        "expect": r'\+QSIMSTAT:\s*1,',
+        "state_keys": ("sim_inserted",),
+    },
+    "cpin": {
+        # +CPIN é sempre reportado pelo modem; apenas popula o estado inicial
+        "command": None,
+        "verify": "AT+CPIN?",
+        "expect": r'\+CPIN:',
+        "state_keys": ("sim_pin",),
+    },
+    "sms": {
+        "command": "AT+CNMI=2,1,0,0,0",
+        "verify": "AT+CNMI?",
+        "expect": r'\+CNMI:\s*2,1',
+        "state_keys": (),
+    },
+    "qind_all": {
+        "command": 'AT+QINDCFG="all",1',
+        "verify": 'AT+QINDCFG="all"',
+        "expect": r'\+QINDCFG:\s*"all",1',
+        "state_keys": ("qind",),
+    },
+}
+
+# --- Perfis prontos, do mínimo à telemetria completa ---
+URC_PROFILES = {
+    "none": (),
+    "minimal": ("creg", "qsimstat", "cpin"),
+    "standard": ("creg", "cereg", "csq", "qsimstat", "cpin", "sms"),
+    "full_telemetry": ("creg", "cgreg", "cereg", "csq", "qsimstat", "cpin", "sms", "qind_all"),
+}
+
+DEFAULT_URC_PROFILE = "minimal"
+
+
+def resolve_urc_profile(profile):
+    """
+    Converte um perfil (nome ou lista de assinaturas) na lista de entradas de URC_SUBSCRIPTIONS.
+    :return: Lista de tuplas (nome, especificação).
+    :raises ValueError: Se o perfil ou alguma assinatura não existir.
+    """
+    if profile is None:
+        return []
+    if isinstance(profile, str):
+        if profile not in URC_PROFILES:
+            raise ValueError(f"Perfil de URC desconhecido: '{profile}'. Disponíveis: {', '.join(URC_PROFILES)}")
+        names = URC_PROFILES[profile]
+    else:
+        names = tuple(profile)
+
+    resolved = []
+    for name in names:
+        if name not in URC_SUBSCRIPTIONS:
+            raise ValueError(f"Assinatura de URC desconhecida: '{name}'.")
+        resolved.append((name, URC_SUBSCRIPTIONS[name]))
+    return resolved
+
+
+def verify_subscription(spec, response):
+    """Retorna True se a resposta da consulta de verificação confirma a assinatura."""
+    return bool(response) and re.search(spec["expect"], response) is not None
@@ -0,0 +1,464 @@
+# src/modem/voice_pcm.py
+import threading
+import time
+import wave
+
+from src.logger.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Formato do Voice over USB (AT+QPCMV): PCM linear de 16 bits little-endian, mono, em quadros de 20 ms
+SAMPLE_RATES = (8000, 16000)
+SAMPLE_WIDTH = 2
+FRAME_MS = 20
+# Capacidade dos ring buffers (quadros) e quadros acumulados antes de começar a reproduzir (buffer de jitter)
+RING_FRAMES = 50
+PREFILL_FRAMES = 3
+# Atraso da reprodução (em quadros) a partir do qual o relógio é reiniciado em vez de tentar recuperar
+MAX_LATE_FRAMES = 5
+# Porta de saída do PCM no AT+QPCMV=1,<port>
+VOICE_PORTS = {"usb": 0, "uart": 1}
+# Peso de cada nova amostra na estimativa de jitter (como no RFC 3550)
+JITTER_GAIN = 1 / 16
+
+
+class VoicePcmError(OSError):
+    """Falha ao habilitar o Voice over USB ou ao abrir a porta de voz."""
+
+
+class PcmRingBuffer:
+    """
+    Fila circular de quadros PCM de tamanho fixo para exatamente um produtor e um consumidor.
+    Sem lock: só o produtor avança _written e só o consumidor avança _read (atribuições de int são atômicas
+    no CPython). A memória é alocada uma vez e os quadros são copiados para dentro e para fora dela.
+    """
+
+    def __init__(self, frame_bytes, capacity=RING_FRAMES):
+        self.frame_bytes = frame_bytes
+        self.capacity = capacity
+        self._storage = memoryview(bytearray(frame_bytes * capacity))
+        self._written = 0 # Quadros já escritos (só o produtor altera)
+        self._read = 0 # Quadros já lidos (só o consumidor altera)
+
+    def __len__(self):
+        return self._written - self._read
+
+    @property
+    def free(self):
+        return self.capacity - len(self)
+
+    def _slot(self, index):
+        offset = (index % self.capacity) * self.frame_bytes
+        return self._storage[offset:offset + self.frame_bytes]
+
+    def push(self, frame):
+        """Produtor: copia um quadro completo. :return: False se a fila estiver cheia (quadro descartado)."""
+        if len(frame) != self.frame_bytes:
+            raise ValueError(f"Quadro de {len(frame)} bytes; esperado {self.frame_bytes}.")
+        if self._written - self._read >= self.capacity:
+            return False
+        self._slot(self._written)[:] = frame
+        self._written += 1
+        return True
+
+    def pop_into(self, target):
+        """Consumidor: copia o quadro mais antigo para target. :return: False se a fila estiver vazia."""
+        if self._written == self._read:
+            return False
+        target[:self.frame_bytes] = self._slot(self._read)
+        self._read += 1
+        return True
+
+    def pop(self):
+        """Consumidor: o quadro mais antigo (bytes), ou None se a fila estiver vazia."""
+        if self._written == self._read:
+            return None
+        frame = bytes(self._slot(self._read))
+        self._read += 1
+        return frame
+
+    def clear(self):
+        """Consumidor: descarta os quadros pendentes."""
+        self._read = self._written
+
+
+class PcmStream:
+    """
+    Fluxo PCM bidirecional na porta de voz do modem (Voice over USB).
+    Uma thread lê a captura (uplink do modem: voz do outro lado) em quadros de FRAME_MS, entregando-os a on_capture
+    ou ao ring de captura (frames()/read_frame()). Outra thread escreve a reprodução no ritmo do relógio de
+    amostragem, a partir de on_playback ou do ring de reprodução (write()/play()), depois de acumular PREFILL_FRAMES
+    quadros. Jitter de chegada e de escrita, descartes e underruns aparecem em get_stats().
+    """
+
+    def __init__(self, manager, voice_port, sample_rate=8000, serial_factory=None, on_capture=None, on_playback=None,
+                 ring_frames=RING_FRAMES, prefill_frames=PREFILL_FRAMES):
+        """
+        :param voice_port: Porta serial de voz (ex: /dev/ttyUSB1, a porta USB NMEA).
+        :param on_capture: Callable(memoryview) chamado na thread de captura com cada quadro (válido só durante a chamada).
+        :param on_playback: Callable(frame_bytes) -> bytes ou None, chamado a cada quadro reproduzido; None = silêncio.
+        :param ring_frames: Capacidade (quadros) de cada ring buffer.
+        :param prefill_frames: Quadros acumulados antes de iniciar (ou retomar, após um underrun) a reprodução.
+        """
+        if sample_rate not in SAMPLE_RATES:
+            raise ValueError(f"Taxa de amostragem inválida: {sample_rate}. Use {', '.join(map(str, SAMPLE_RATES))}.")
+        self.manager = manager
+        self.voice_port = voice_port
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * FRAME_MS // 1000
+        self.frame_bytes = self.frame_samples * SAMPLE_WIDTH
+        self.frame_period = FRAME_MS / 1000
+        self.serial_factory = serial_factory
+        self.on_capture = on_capture
+        self.on_playback = on_playback
+        self.prefill_frames = min(prefill_frames, ring_frames)
+        self.capture = PcmRingBuffer(self.frame_bytes, ring_frames)
+        self.playback = PcmRingBuffer(self.frame_bytes, ring_frames)
+        self.port = None
+        self.closed = False
+        self._stop = threading.Event()
+        self._captured = threading.Event() # Sinaliza quadro novo no ring de captura
+        self._played = threading.Event() # Sinaliza espaço novo no ring de reprodução
+        self._pending = bytearray() # Quadro incompleto recebido por write()
+        self._end_of_stream = False # flush(): ring vazio deixa de ser underrun
+        self._threads = []
+        # Estatísticas
+        self.frames_captured = 0
+        self.capture_dropped = 0 # Ring de captura cheio (consumidor lento)
+        self.capture_jitter = 0.0 # s, variação do intervalo entre quadros capturados
+        self.frames_played = 0
+        self.playback_dropped = 0 # Ring de reprodução cheio em write(block=False)
+        self.underruns = 0 # Ring de reprodução vazio durante a reprodução
+        self.late_resets = 0 # Relógio de reprodução reiniciado por atraso > MAX_LATE_FRAMES
+        self.playback_jitter = 0.0 # s, atraso médio de cada escrita em relação ao instante previsto
+        self.max_late = 0.0
+
+    def __repr__(self):
+        return f"<PcmStream {self.voice_port} {self.sample_rate} Hz {'fechado' if self.closed else 'aberto'}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return self.frames()
+
+    def start(self):
+        """Abre a porta de voz e inicia as threads de captura e reprodução."""
+        try:
+            self.port = self.serial_factory(self.voice_port, timeout=self.frame_period, write_timeout=1)
+        except Exception as e: # serial.SerialException e erros de SO
+            raise VoicePcmError(f"Falha ao abrir a porta de voz {self.voice_port}: {e}") from e
+        for name, target in (("Capture", self._capture_loop), ("Playback", self._playback_loop)):
+            thread = threading.Thread(target=target, name=f"Pcm{name}-{self.voice_port}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"PcmStream: {self.voice_port} aberto ({self.sample_rate} Hz, quadros de {self.frame_bytes} bytes).")
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._stop.set()
+        self._captured.set()
+        self._played.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(2)
+        if self.port is not None:
+            try:
+                self.port.close()
+            except Exception as e:
+                logger.warning(f"PcmStream: Erro ao fechar {self.voice_port}: {e}")
+        self.manager._release(self)
+        logger.info(f"PcmStream: {self.voice_port} fechado. {self.get_stats()}")
+
+    # --- Captura ---
+
+    def _capture_loop(self):
+        frame = memoryview(bytearray(self.frame_bytes))
+        filled = 0
+        last_arrival = None
+        while not self._stop.is_set():
+            try:
+                data = self.port.read(self.frame_bytes - filled)
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.error(f"PcmStream: Erro lendo {self.voice_port}: {e}")
+                break
+            if not data:
+                continue
+            frame[filled:filled + len(data)] = data
+            filled += len(data)
+            if filled < self.frame_bytes:
+                continue
+            filled = 0
+            now = time.perf_counter()
+            if last_arrival is not None:
+                deviation = abs(now - last_arrival - self.frame_period)
+                self.capture_jitter += (deviation - self.capture_jitter) * JITTER_GAIN
+            last_arrival = now
+            self.frames_captured += 1
+            if self.on_capture is not None:
+                try:
+                    self.on_capture(frame)
+                except Exception as e:
+                    logger.error(f"PcmStream: Erro no callback de captura: {e}")
+            elif self.capture.push(frame):
+                self._captured.set()
+            else:
+                self.capture_dropped += 1
+
+    def read_frame(self, timeout=None):
+        """Próximo quadro capturado (bytes), ou None se nada chegar em timeout segundos ou o fluxo fechar."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._captured.clear()
+            frame = self.capture.pop()
+            if frame is not None or self.closed:
+                return frame
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            self._captured.wait(remaining)
+
+    def frames(self, timeout=None):
+        """Itera os quadros capturados até o fluxo fechar (ou nenhum quadro chegar em timeout segundos)."""
+        while True:
+            frame = self.read_frame(timeout)
+            if frame is None:
+                return
+            yield frame
+
+    # --- Reprodução ---
+
+    def write(self, data, block=True, timeout=None):
+        """
+        Enfileira PCM para reprodução (qualquer tamanho; o resto de um quadro incompleto espera o próximo write).
+        :param block: Espera espaço no ring cheio; com False, os quadros que não couberem são descartados.
+        :return: Bytes aceitos.
+        """
+        self._end_of_stream = False
+        self._pending += data
+        accepted = len(data)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        offset = 0
+        with memoryview(self._pending) as pending:
+            while len(pending) - offset >= self.frame_bytes and not self.closed:
+                self._played.clear()
+                if self.playback.push(pending[offset:offset + self.frame_bytes]):
+                    offset += self.frame_bytes
+                    continue
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if block and (remaining is None or remaining > 0):
+                    self._played.wait(remaining)
+                    continue
+                dropped = (len(pending) - offset) // self.frame_bytes
+                self.playback_dropped += dropped
+                accepted -= dropped * self.frame_bytes
+                offset += dropped * self.frame_bytes
+        del self._pending[:offset]
+        return accepted
+
+    def flush(self):
+        """Completa o último quadro com silêncio; depois dele, o ring vazio é fim da fala, não underrun."""
+        if self._pending:
+            self.write(bytes(self.frame_bytes - len(self._pending)))
+        self._end_of_stream = True
+
+    def drain(self, timeout=None):
+        """Espera o ring de reprodução esvaziar. :return: True se esvaziou."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self.playback) and not self.closed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._played.clear()
+            self._played.wait(min(self.frame_period, remaining) if remaining is not None else self.frame_period)
+        return not len(self.playback)
+
+    def play(self, source, wait=True):
+        """Reproduz uma fonte de PCM (ex: WavSource ou iterável de bytes), no ritmo do fluxo."""
+        for chunk in source:
+            if self.closed:
+                break
+            self.write(chunk)
+        self.flush()
+        if wait:
+            self.drain()
+
+    def _next_playback_frame(self, frame):
+        if self.on_playback is not None:
+            data = self.on_playback(self.frame_bytes)
+            if not data:
+                return False
+            frame[:len(data)] = data
+            if len(data) < self.frame_bytes:
+                frame[len(data):] = bytes(self.frame_bytes - len(data))
+            return True
+        if self.playback.pop_into(frame):
+            self._played.set()
+            return True
+        return False
+
+    def _playback_loop(self):
+        frame = memoryview(bytearray(self.frame_bytes))
+        next_due = None # Instante previsto do próximo quadro; None = parado, esperando o buffer de jitter
+        while not self._stop.is_set():
+            if next_due is None:
+                if self.on_playback is None and len(self.playback) < self.prefill_frames and not self._end_of_stream:
+                    self._stop.wait(self.frame_period / 2)
+                    continue
+                if self.on_playback is None and not len(self.playback):
+                    self._stop.wait(self.frame_period / 2)
+                    continue
+                next_due = time.perf_counter()
+            if not self._next_playback_frame(frame):
+                if self.on_playback is not None: # Nada a reproduzir agora: o modem completa com silêncio
+                    self._stop.wait(self.frame_period)
+                elif not self._end_of_stream:
+                    self.underruns += 1
+                    logger.debug(f"PcmStream: Underrun na reprodução de {self.voice_port}.")
+                next_due = None
+                continue
+            late = time.perf_counter() - next_due
+            try:
+                self.port.write(frame)
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.error(f"PcmStream: Erro escrevendo em {self.voice_port}: {e}")
+                break
+            self.frames_played += 1
+            self.playback_jitter += (abs(late) - self.playback_jitter) * JITTER_GAIN
+            self.max_late = max(self.max_late, late)
+            next_due += self.frame_period
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            elif -delay > MAX_LATE_FRAMES * self.frame_period:
+                self.late_resets += 1
+                next_due = time.perf_counter()
+
+    # --- Estatísticas ---
+
+    def get_stats(self):
+        return {
+            "sample_rate": self.sample_rate,
+            "frame_bytes": self.frame_bytes,
+            "frames_captured": self.frames_captured,
+            "capture_dropped": self.capture_dropped,
+            "capture_jitter_ms": round(self.capture_jitter * 1000, 2),
+            "capture_queued": len(self.capture),
+            "frames_played": self.frames_played,
+            "playback_dropped": self.playback_dropped,
+            "underruns": self.underruns,
+            "late_resets": self.late_resets,
+            "playback_jitter_ms": round(self.playback_jitter * 1000, 2),
+            "max_late_ms": round(self.max_late * 1000, 2),
+            "playback_queued": len(self.playback),
+        }
+
+
+class VoiceOverUsb:
+    """
+    Abre fluxos PCM na porta de voz: habilita o Voice over USB (AT+QPCMV=1,<porta>) antes do primeiro fluxo
+    e desabilita (AT+QPCMV=0) quando o último fecha.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self._lock = threading.Lock()
+        self._streams = []
+
+    def open(self, voice_port, sample_rate=8000, output="usb", serial_factory=None, **options):
+        """
+        :param voice_port: Porta serial por onde o modem troca o PCM (USB NMEA ou a UART, conforme output).
+        :param output: "usb" ou "uart" (VOICE_PORTS).
+        :param serial_factory: Construtor da porta (padrão: o do controller).
+        :param options: on_capture, on_playback, ring_frames, prefill_frames (ver PcmStream).
+        :return: PcmStream já iniciado.
+        :raises VoicePcmError: Se o modem recusar o AT+QPCMV ou a porta não abrir.
+        """
+        if output not in VOICE_PORTS:
+            raise ValueError(f"Saída inválida: '{output}'. Use {', '.join(VOICE_PORTS)}.")
+        stream = PcmStream(self, voice_port, sample_rate, serial_factory or self.controller.serial_factory, **options)
+        with self._lock:
+            first = not self._streams
+            self._streams.append(stream)
+        if first:
+            success, response = self.controller.enable_voice_over_usb(VOICE_PORTS[output])
+            if not success:
+                self._release(stream, disable=False)
+                raise VoicePcmError(f"Modem recusou AT+QPCMV=1,{VOICE_PORTS[output]}. Resposta: {response!r}")
+        try:
+            stream.start()
+        except VoicePcmError:
+            self._release(stream)
+            raise
+        return stream
+
+    def streams(self):
+        with self._lock:
+            return list(self._streams)
+
+    def _release(self, stream, disable=True):
+        with self._lock:
+            if stream not in self._streams:
+                return
+            self._streams.remove(stream)
+            last = not self._streams
+        if last and disable:
+            self.controller.disable_voice_over_usb()
+
+    def get_stats(self):
+        return {stream.voice_port: stream.get_stats() for stream in self.streams()}
+
+
+class WavSink:
+    """Callback de captura (on_capture) que grava os quadros num WAV mono de 16 bits."""
+
+    def __init__(self, path, sample_rate=8000):
+        self.path = path
+        self._wav = wave.open(path, 'wb')
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(SAMPLE_WIDTH)
+        self._wav.setframerate(sample_rate)
+
+    def __call__(self, frame):
+        self._wav.writeframesraw(frame)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._wav.close() # Atualiza o cabeçalho com o tamanho final
+
+
+class WavSource:
+    """Itera um WAV mono de 16 bits em quadros de FRAME_MS (o último completado com silêncio), para PcmStream.play()."""
+
+    def __init__(self, path, sample_rate=None):
+        """:param sample_rate: Se informado, o arquivo precisa ter essa taxa (não há reamostragem)."""
+        self.path = path
+        with wave.open(path, 'rb') as wav:
+            if wav.getnchannels() != 1 or wav.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError(f"'{path}': use WAV mono de 16 bits (tem {wav.getnchannels()} canal(is), "
+                                 f"{wav.getsampwidth() * 8} bits).")
+            self.sample_rate = wav.getframerate()
+        if sample_rate is not None and self.sample_rate != sample_rate:
+            raise ValueError(f"'{path}' tem {self.sample_rate} Hz; o fluxo usa {sample_rate} Hz.")
+        self.frame_samples = self.sample_rate * FRAME_MS // 1000
+
+    def __iter__(self):
+        frame_bytes = self.frame_samples * SAMPLE_WIDTH
+        with wave.open(self.path, 'rb') as wav:
+            while True:
+                data = wav.readframes(self.frame_samples)
+                if not data:
+                    return
+                yield data if len(data) == frame_bytes else data + bytes(frame_bytes - len(data))
@@ -1,6 +1,10 @@
 # src/utils/threading_utils.py
+import queue
 import threading
-import PySimpleGUI as sg
+import time
+from concurrent.futures import Future
+
+from src.utils.tracing import tracer
 
 def _execute_command(func, *args, **kwargs):
     """Executa uma função (comando do modem) e imprime qualquer exceção."""
@@ -18,12 +22,148 @@ def _execute_command_print_result(func, *args, **kwargs):
     except Exception as e:
         print(f"Erro na execução do comando e impressão de resultado em thread: {e}")
 
+class BoundedExecutor:
+    """
+    Pool fixo de threads de trabalho com fila limitada.
+    Quando a fila está cheia, submit() bloqueia (backpressure) ou falha com queue.Full,
+    em vez de criar mais threads. Cada tarefa devolve um concurrent.futures.Future.
+    """
+
+    def __init__(self, max_workers=4, max_queue=32, name="Worker"):
+        """
+        :param max_workers: Número máximo de threads de trabalho (criadas sob demanda).
+        :param max_queue: Número máximo de tarefas aguardando uma thread livre.
+        :param name: Prefixo do nome das threads.
+        """
+        self.max_workers = max_workers
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._workers = []
+        # Uma permissão por thread livre: cada submit() reserva uma, ou cria outra thread se não houver
+        self._idle = threading.Semaphore(0)
+        self._shutdown = False
+
+        # Estatísticas expostas via get_stats()
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._active = 0
+        self._last_wait = 0.0
+        self._max_wait = 0.0
+        self._total_wait = 0.0
+
+    def submit(self, func, *args, block=True, timeout=None, **kwargs):
+        """
+        Agenda func(*args, **kwargs).
+        :param block: Se False, não espera por espaço na fila cheia.
+        :param timeout: Espera máxima (s) por espaço na fila quando block=True.
+        :return: concurrent.futures.Future com o resultado.
+        :raises queue.Full: Se a fila continuar cheia (block=False ou timeout esgotado).
+        :raises RuntimeError: Se o executor já foi encerrado.
+        """
+        if self._shutdown:
+            raise RuntimeError(f"{self.name}: executor encerrado.")
+        future = Future()
+        try:
+            self._queue.put((future, func, args, kwargs, time.perf_counter()), block=block, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise
+        with self._lock:
+            self._submitted += 1
+            if not self._idle.acquire(blocking=False) and len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._worker_loop, name=f"{self.name}-{len(self._workers) + 1}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+        return future
+
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, func, args, kwargs, submitted_at = item
+            wait = time.perf_counter() - submitted_at
+            with self._lock:
+                self._active += 1
+                self._last_wait = wait
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            tracer.complete("queue_wait", submitted_at, submitted_at + wait, "executor", func=getattr(func, "__name__", repr(func)))
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+            self._idle.release()
+
+    def shutdown(self, wait=True):
+        """Recusa novas tarefas; as já enfileiradas ainda são executadas."""
+        with self._lock:
+            self._shutdown = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._queue.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def get_stats(self):
+        """Retorna tamanho da fila, threads, contadores e tempos de espera na fila (s)."""
+        with self._lock:
+            started = self._completed + self._active
+            return {
+                "queue_length": self._queue.qsize(),
+                "workers": len(self._workers),
+                "active": self._active,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "last_wait": self._last_wait,
+                "max_wait": self._max_wait,
+                "avg_wait": self._total_wait / started if started else 0.0,
+            }
+
+
+# Executor compartilhado pelas ações da GUI (comandos, conexão, sumário)
+default_executor = BoundedExecutor(max_workers=4, max_queue=32, name="ModemWorker")
+
 def run_in_thread(func, *args, **kwargs):
-    """Cria e inicia uma nova thread para executar uma função."""
-    threading.Thread(target=func, args=args, kwargs=kwargs, daemon=True).start()
+    """
+    Executa uma função no executor compartilhado (sem criar uma thread por chamada).
+    Nunca bloqueia quem chama: se a fila estiver cheia, a tarefa é recusada.
+    :return: Future da tarefa, ou None se ela foi recusada.
+    """
+    try:
+        return default_executor.submit(func, *args, block=False, **kwargs)
+    except queue.Full:
+        print(f"Muitas operações pendentes ({default_executor.get_stats()['queue_length']} na fila). Aguarde e tente novamente.")
+        return None
+
+# Barramento de atualizações da GUI (GuiUpdateBus) registrado pela aplicação, se houver
+_gui_update_bus = None
+
+def set_gui_update_bus(bus):
+    """Registra (ou remove, com None) o barramento que agrupa as atualizações da GUI."""
+    global _gui_update_bus
+    _gui_update_bus = bus
 
 # Helper para enviar eventos de volta à thread principal da GUI
 def gui_update_event(window, event_key, value):
-    """Envia um evento para a janela PySimpleGUI da thread principal."""
+    """
+    Envia um evento para a janela PySimpleGUI da thread principal.
+    Se houver um GuiUpdateBus registrado para a janela, a atualização é agrupada
+    e entregue em lote; caso contrário, vira um evento individual.
+    """
     if window:
-        window.write_event_value(event_key, value)
+        with tracer.span("gui_update_event", "gui", key=event_key):
+            bus = _gui_update_bus
+            if bus is not None and bus.window is window:
+                bus.post(event_key, value)
+            else:
+                window.write_event_value(event_key, value)
@@ -0,0 +1,137 @@
+# src/utils/tracing.py
+import atexit
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Contexto vazio reutilizado quando o tracing está desligado (custo de um if + with)
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def _now_us():
+    return time.perf_counter() * 1e6
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_cat", "_args", "_start")
+
+    def __init__(self, tracer, name, cat, args):
+        self._tracer = tracer
+        self._name = name
+        self._cat = cat
+        self._args = args
+
+    def __enter__(self):
+        self._start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._args["error"] = f"{exc_type.__name__}: {exc}"
+        self._tracer._add({
+            "name": self._name, "cat": self._cat, "ph": "X",
+            "ts": self._start, "dur": _now_us() - self._start, "args": self._args,
+        })
+        return False
+
+
+class Tracer:
+    """
+    Coletor de spans em memória, exportado no formato Chrome trace-event JSON
+    (abre no chrome://tracing ou no Perfetto). Desligado, cada span custa um if.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self._events = deque()
+        self._thread_names = {}
+        self._lock = threading.Lock()
+        self._flow_ids = itertools.count(1)
+        self._pid = os.getpid()
+
+    def start(self, path=None, max_events=500000):
+        """
+        Liga a coleta. Os eventos mais antigos são descartados além de max_events.
+        :param path: Arquivo JSON gravado por stop() (None = só em memória, use save()).
+        """
+        with self._lock:
+            self._events = deque(maxlen=max_events)
+            self._thread_names = {}
+            self.path = path
+            self.enabled = True
+
+    def stop(self):
+        """Desliga a coleta e grava o arquivo configurado em start(), se houver."""
+        self.enabled = False
+        if self.path:
+            self.save(self.path)
+
+    def save(self, path):
+        """Grava os eventos coletados em path (Chrome trace-event JSON)."""
+        with self._lock:
+            events = list(self._events)
+            metadata = [
+                {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self._thread_names.items()
+            ]
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+
+    def _add(self, event):
+        thread = threading.current_thread()
+        tid = thread.ident
+        event["pid"] = self._pid
+        event["tid"] = tid
+        if tid not in self._thread_names:
+            with self._lock:
+                self._thread_names[tid] = thread.name
+        self._events.append(event)
+
+    # --- API de instrumentação ---
+
+    def span(self, name, cat="app", **args):
+        """Context manager que registra a duração do bloco como um evento completo ("X")."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def complete(self, name, start, end, cat="app", **args):
+        """Registra um intervalo já medido; start/end em segundos de time.perf_counter()."""
+        if self.enabled:
+            self._add({"name": name, "cat": cat, "ph": "X", "ts": start * 1e6, "dur": (end - start) * 1e6, "args": args})
+
+    def instant(self, name, cat="app", **args):
+        """Registra um evento instantâneo ("i") na thread atual."""
+        if self.enabled:
+            self._add({"name": name, "cat": cat, "ph": "i", "s": "t", "ts": _now_us(), "args": args})
+
+    def new_flow_id(self):
+        """Novo id para ligar eventos entre threads com flow(); None se o tracing estiver desligado."""
+        return next(self._flow_ids) if self.enabled else None
+
+    def flow(self, phase, flow_id, name, cat="app"):
+        """
+        Registra um passo de fluxo entre threads.
+        :param phase: "s" (início), "t" (passo intermediário) ou "f" (fim).
+        """
+        if self.enabled and flow_id is not None:
+            event = {"name": name, "cat": cat, "ph": phase, "id": flow_id, "ts": _now_us()}
+            if phase == "f":
+                event["bp"] = "e" # Liga ao span que envolve o ponto final
+            self._add(event)
+
+
+# Tracer do processo. Ligado automaticamente se MODEM_TRACE_FILE estiver definido;
+# o arquivo é gravado ao sair.
+tracer = Tracer()
+
+if os.environ.get("MODEM_TRACE_FILE"):
+    tracer.start(os.environ["MODEM_TRACE_FILE"])
+    atexit.register(tracer.stop)
@@ -0,0 +1,43 @@
+# tests/conftest.py
+import os
+import tempfile
+
+import pytest
+
+# Testes isolados do ambiente: sem persistência de deadlines/enlace e log só em arquivo temporário
+os.environ["MODEM_TIMEOUTS_FILE"] = ""
+os.environ["MODEM_LINK_FILE"] = ""
+
+from src.logger.logger import configure_logging  # noqa: E402
+
+configure_logging(log_file=os.path.join(tempfile.mkdtemp(prefix="modem-tests-"), "tests.log"), console=False)
+
+from src.modem.controller import ModemController  # noqa: E402
+from src.modem.simulator import SimulatedModem  # noqa: E402
+
+
+@pytest.fixture
+def modem():
+    return SimulatedModem(time_scale=0.01, seed=1)
+
+
+@pytest.fixture
+def make_controller(modem):
+    """Cria controllers conectados ao modem simulado (desconectados ao fim do teste)."""
+    controllers = []
+
+    def make(**kwargs):
+        kwargs.setdefault("urc_profile", None)
+        controller = ModemController(port="SIM", serial_factory=modem.open_serial, **kwargs)
+        assert controller.connect_modem()
+        controllers.append(controller)
+        return controller
+
+    yield make
+    for controller in controllers:
+        controller.disconnect_modem()
+
+
+@pytest.fixture
+def controller(make_controller):
+    return make_controller()
@@ -0,0 +1,63 @@
+# tests/test_audio_meter.py
+import pytest
+
+from src.modem import audio_meter as audio_meter_module
+from src.modem.audio_meter import AudioMeter, GainCalibrator
+
+np = audio_meter_module.np
+pytestmark = pytest.mark.skipif(np is None, reason="NumPy não instalado")
+
+SAMPLE_RATE = 8000
+BLOCK = 160 # 20 ms
+
+
+def _tone(amplitude, hz=1000, samples=BLOCK):
+    t = np.arange(samples) / SAMPLE_RATE
+    return np.clip(amplitude * 32767 * np.sin(2 * np.pi * hz * t), -32768, 32767).astype('<i2').tobytes()
+
+
+def test_full_scale_sine_is_minus_3_dbfs():
+    levels = AudioMeter(SAMPLE_RATE).measure(_tone(1.0))
+    assert levels["rms_dbfs"] == pytest.approx(-3.01, abs=0.05)
+    assert levels["peak_dbfs"] == pytest.approx(0.0, abs=0.01)
+    silence = AudioMeter(SAMPLE_RATE).measure(bytes(BLOCK * 2))
+    assert silence["rms_dbfs"] == silence["noise_floor_dbfs"] == audio_meter_module.SILENCE_DBFS
+
+
+def test_clipped_block_reports_clipping_ratio():
+    levels = AudioMeter(SAMPLE_RATE).measure(_tone(4.0)) # Seno saturado: quase quadrado
+    assert levels["clipping"] > 0.5
+    assert levels["rms_dbfs"] > -3.0
+    half = AudioMeter(SAMPLE_RATE).measure(_tone(0.5))
+    assert half["clipping"] == 0 and half["rms_dbfs"] == pytest.approx(-9.03, abs=0.05)
+
+
+def _open_stream(modem, controller):
+    return controller.voice.open("VOICE", serial_factory=modem.open_voice_port)
+
+
+def _calibrator(controller, stream, **kwargs):
+    return GainCalibrator(controller, stream, settle_frames=5, measure_frames=10, **kwargs)
+
+
+def test_calibration_reaches_target_on_simulator(modem, controller):
+    modem.voice_noise = 0.0005
+    with _open_stream(modem, controller) as stream:
+        result = _calibrator(controller, stream).run()
+    assert result["within_tolerance"]
+    assert result["level_dbfs"] == pytest.approx(audio_meter_module.TARGET_LEVEL_DBFS,
+                                                 abs=audio_meter_module.TARGET_TOLERANCE_DB)
+    # Tom a -24 dBFS com RX unitário: +6 dB pedem o dobro do ganho de TX
+    assert modem.mic_gains[0] == result["txgain"] == 16384 and modem.rx_gain == result["rxgain"] == 8192
+    assert not modem.audio_loop
+
+
+def test_original_gains_restored_on_failure(modem, controller):
+    modem.mic_gains = (6000, 7000)
+    modem.rx_gain = 9000
+    modem.add_handler(r'AT\+QMIC=8192,\d+', lambda match: None) # Modem recusa um dos degraus
+    with _open_stream(modem, controller) as stream:
+        with pytest.raises(RuntimeError, match="8192"):
+            _calibrator(controller, stream).run()
+    assert modem.mic_gains == (6000, 7000) and modem.rx_gain == 9000
+    assert not modem.audio_loop
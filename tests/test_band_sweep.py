@@ -0,0 +1,37 @@
+# tests/test_band_sweep.py
+import pytest
+
+from src.modem import band_sweep as band_sweep_module
+from src.modem.at_commands import lte_band_mask
+from src.modem.band_sweep import APPLY_RESTORE, BandSweep, parse_candidates
+
+
+@pytest.fixture(autouse=True)
+def fast_registration_poll(monkeypatch):
+    # Sem URCs de registro (AT+CEREG=0), a espera só acorda pelo intervalo de confirmação
+    monkeypatch.setattr(band_sweep_module, "REGISTRATION_POLL_INTERVAL", 0.05)
+
+
+def _sweep(controller, **kwargs):
+    return BandSweep(controller, parse_candidates("1,3,7,28"), settle_timeout=2, sample_window=0.3,
+                     sample_interval=0.1, **kwargs)
+
+
+def test_best_candidate_is_applied(modem, controller):
+    sweep = _sweep(controller)
+    results = sweep.run()
+    assert [r["label"] for r in results][0] == "B3" # RSRP bom e o melhor SINR da rede simulada
+    assert all(r["registered"] and r["band"] == int(r["label"][1:]) for r in results)
+    assert sweep.applied == "B3"
+    assert modem.band_masks[1] == lte_band_mask((3,)) and modem.scan_mode == 3
+    assert controller.get_band_masks()[1] == lte_band_mask((3,))
+
+
+def test_restore_puts_original_masks_back(modem, controller):
+    original = list(modem.band_masks)
+    events = []
+    sweep = _sweep(controller, apply=APPLY_RESTORE, on_progress=lambda s, event, detail: events.append((event, detail)))
+    results = sweep.run()
+    assert len(results) == 4 and sweep.applied == "original"
+    assert modem.band_masks == original and modem.scan_mode == 0
+    assert events[-1] == ("applied", "original")
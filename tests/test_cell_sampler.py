@@ -0,0 +1,48 @@
+# tests/test_cell_sampler.py
+from src.modem.cell_sampler import CellDatabase
+
+
+def _serving(cell_id, earfcn, pci, rsrp, mnc="11"):
+    return {"Network Type": "LTE", "MCC": "724", "MNC": mnc, "TAC": "1A2B", "Cell ID": cell_id,
+            "EARFCN": str(earfcn), "Physical Cell ID": str(pci), "RSRP": str(rsrp)}
+
+
+def _neighbours(*cells):
+    return {"Neighbor Cells": [{"Network Type": "LTE", "EARFCN": str(earfcn), "Physical Cell ID": str(pci), "RSRP": str(rsrp)}
+                               for earfcn, pci, rsrp in cells]}
+
+
+def test_neighbour_merges_into_known_serving_cell():
+    db = CellDatabase()
+    db.observe(_serving("0A1B2C3", 1300, 100, -85), None, ts=1)
+    db.observe(_serving("0B00001", 3050, 7, -95), _neighbours((1300, 100, -80), (6300, 42, -110)), ts=2)
+    assert len(db) == 3 # Servidora antiga somada à vizinha no mesmo canal, não duplicada
+    (old,) = db.cells_on_channel(1300, 100)
+    assert old["cell_id"] == "0A1B2C3" and old["samples"] == 2 and old["best_rsrp"] == -80 and not old["serving"]
+    assert db.bands() == {3: 1, 7: 1, 20: 1}
+    assert [cell["cell_id"] for cell in db.strongest_neighbours()] == ["0A1B2C3", None]
+
+
+def test_neighbour_seen_first_is_absorbed_by_serving():
+    db = CellDatabase()
+    db.observe(_serving("0B00001", 3050, 7, -95), _neighbours((1300, 100, -70)), ts=1)
+    db.observe(_serving("0A1B2C3", 1300, 100, -85), None, ts=5)
+    (cell,) = db.cells_on_channel(1300, 100)
+    assert cell["cell_id"] == "0A1B2C3" and cell["serving"]
+    assert (cell["first_seen"], cell["samples"], cell["best_rsrp"]) == (1, 2, -70)
+    assert db.bands() == {3: 1, 7: 1}
+
+
+def test_other_plmn_or_channel_is_not_merged():
+    db = CellDatabase()
+    db.observe(_serving("0A1B2C3", 1300, 100, -85, mnc="05"), None, ts=1)
+    db.observe(_serving("0B00001", 3050, 7, -95), _neighbours((1300, 100, -80), (1300, 101, -90)), ts=2)
+    assert len(db) == 4
+    assert sorted(cell["mnc"] for cell in db.cells_on_channel(1300, 100)) == [5, 11]
+
+
+def test_serving_cell_listed_as_neighbour_stays_serving():
+    db = CellDatabase()
+    db.observe(_serving("0A1B2C3", 1300, 100, -85), _neighbours((1300, 100, -86)), ts=1)
+    assert len(db) == 1
+    assert db.serving()["serving"] and db.serving()["samples"] == 2
@@ -0,0 +1,94 @@
+# tests/test_command_handle.py
+import time
+
+import pytest
+
+from src.modem.command_handle import CANCELLED, RUNNING, CommandCancelled
+
+
+def _slow_handler(modem, pattern, lines, delay):
+    """Registra um comando que responde lines + OK depois de delay segundos (None: nunca responde)."""
+    def handler(match):
+        if delay is not None:
+            modem.respond(lines, delay=delay)
+        return False
+    modem.add_handler(pattern, handler)
+
+
+def _wait_state(handle, state, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while handle.state != state:
+        assert time.monotonic() < deadline, f"{handle} não chegou a {state}"
+        time.sleep(0.005)
+
+
+def test_cancel_slow_command_next_gets_own_reply(modem, controller):
+    _slow_handler(modem, r'AT\+QSLOW', ["+QSLOW: antigo"], 0.6)
+    handle = controller.submit_at_command("AT+QSLOW", timeout=3)
+    _wait_state(handle, RUNNING)
+    started = time.monotonic()
+    assert handle.cancel()
+    with pytest.raises(CommandCancelled):
+        handle.result(timeout=2)
+    assert handle.state == CANCELLED
+    assert time.monotonic() - started < 0.5 # Libera o canal sem esperar a resposta
+
+    # O modem responde em ordem: primeiro o OK atrasado do comando cancelado, depois a sonda
+    _slow_handler(modem, r'AT\+CSQ', ["+CSQ: 20,99"], 0.8)
+    _slow_handler(modem, r'AT\+CGMR', ["REV-NOVA"], 0.01)
+    response = controller.send_at_command("AT+CGMR")
+    assert response is not None
+    assert "REV-NOVA" in response and "QSLOW" not in response
+    assert modem.commands[-2:] == ["AT+CSQ", "AT+CGMR"] # Sonda de sincronização antes do comando
+
+
+def test_cancel_before_send(modem, controller):
+    with controller.scheduler.slot(): # Outra transação segura a serial
+        handle = controller.submit_at_command("AT+CSQ")
+        assert handle.cancel()
+    with pytest.raises(CommandCancelled):
+        handle.result(timeout=2)
+    assert handle.state == CANCELLED
+    assert "AT+CSQ" not in modem.commands # Nunca chegou a ser escrito
+    assert handle.cancel() is False # Já terminou
+    assert controller.send_at_command("AT") == "OK"
+
+
+def test_late_reply_while_idle_is_dropped(modem, controller):
+    _slow_handler(modem, r'AT\+QSLOW', ["+QSLOW: antigo"], 0.3)
+    handle = controller.submit_at_command("AT+QSLOW", timeout=3)
+    _wait_state(handle, RUNNING)
+    handle.cancel()
+    with pytest.raises(CommandCancelled):
+        handle.result(timeout=2)
+    time.sleep(0.5) # O OK atrasado chega sem nenhum comando em andamento
+    response = controller.send_at_command("AT+CSQ")
+    assert response is not None and "+CSQ:" in response and "QSLOW" not in response
+    assert controller._sync_pending is None and controller._sync_marker is None
+
+
+def test_lost_reply_does_not_swallow_next_commands(modem, controller):
+    _slow_handler(modem, r'AT\+QSLOW', (), None) # O modem perdeu o comando: nenhum OK atrasado virá
+    handle = controller.submit_at_command("AT+QSLOW", timeout=30)
+    _wait_state(handle, RUNNING)
+    handle.cancel()
+    with pytest.raises(CommandCancelled):
+        handle.result(timeout=2)
+    started = time.monotonic()
+    for _ in range(3): # Ainda dentro do deadline original do comando abandonado
+        response = controller.send_at_command("AT+CSQ")
+        assert response is not None and "+CSQ:" in response
+    assert time.monotonic() - started < 1
+    assert sum(command == "AT+CSQ" for command in modem.commands) == 4 # Uma sonda, só depois do abandono
+
+
+def test_probe_differs_from_abandoned_command(modem, controller):
+    _slow_handler(modem, r'AT\+CSQ', ["+CSQ: 5,99"], 0.6)
+    handle = controller.submit_at_command("AT+CSQ", timeout=3)
+    _wait_state(handle, RUNNING)
+    handle.cancel()
+    with pytest.raises(CommandCancelled):
+        handle.result(timeout=2)
+    _slow_handler(modem, r'AT\+IPR\?', ["+IPR: 115200"], 0.8) # Em ordem, depois do +CSQ atrasado
+    assert controller.send_at_command("AT") == "OK"
+    assert "AT+IPR?" in modem.commands
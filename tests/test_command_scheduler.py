@@ -0,0 +1,121 @@
+# tests/test_command_scheduler.py
+import threading
+import time
+
+import pytest
+
+from src.modem.command_scheduler import CommandScheduler
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.002)
+
+
+def _request(scheduler, priority, order, hold=0.0):
+    """Thread que pede o slot na classe priority e anota a ordem em que o recebeu."""
+    def run():
+        with scheduler.slot(priority):
+            order.append(priority)
+            time.sleep(hold)
+    thread = threading.Thread(target=run)
+    thread.start()
+    _wait_until(lambda: scheduler.get_stats()[priority]["waiting"] >= 1)
+    return thread
+
+
+def test_nested_slot_is_reentrant():
+    scheduler = CommandScheduler()
+    order = []
+    with scheduler.slot("background"):
+        with scheduler.slot(): # Como _read_from_modem -> data_mode -> send_at_command
+            with scheduler.slot():
+                other = _request(scheduler, "interactive", order)
+        assert order == [] # Saída do nível interno não libera o slot
+        time.sleep(0.05)
+        assert order == []
+    other.join(2)
+    assert order == ["interactive"]
+    assert scheduler.get_stats()["background"]["granted"] == 1 # Reentradas não contam como novos slots
+
+
+def test_release_by_other_thread_fails():
+    scheduler = CommandScheduler()
+    scheduler.acquire()
+    errors = []
+    thread = threading.Thread(target=lambda: errors.append(pytest.raises(RuntimeError, scheduler.release)))
+    thread.start()
+    thread.join(2)
+    assert errors
+    scheduler.release()
+
+
+def test_nested_slot_in_controller(controller):
+    order = []
+    with controller.scheduler.slot():
+        assert controller.send_at_command("AT") == "OK" # send_at_command pede o slot de novo
+        other = _request(controller.scheduler, "interactive", order)
+        assert controller.send_at_command("AT+CSQ") is not None
+        assert order == []
+    other.join(2)
+    assert order == ["interactive"]
+
+
+def test_priority_order_without_aging():
+    scheduler = CommandScheduler(aging_interval=0)
+    order = []
+    with scheduler.slot():
+        threads = [_request(scheduler, priority, order) for priority in ("background", "normal", "interactive")]
+    for thread in threads:
+        thread.join(2)
+    assert order == ["interactive", "normal", "background"]
+
+
+def test_aging_lets_background_pass_normal():
+    scheduler = CommandScheduler(aging_interval=0.05)
+    order = []
+    with scheduler.slot():
+        background = _request(scheduler, "background", order)
+        time.sleep(0.12) # Duas classes envelhecidas: já disputa como interactive
+        normal = _request(scheduler, "normal", order)
+    for thread in (background, normal):
+        thread.join(2)
+    assert order == ["background", "normal"]
+
+
+def test_aging_never_passes_interactive():
+    scheduler = CommandScheduler(aging_interval=0.05)
+    order = []
+    with scheduler.slot():
+        background = _request(scheduler, "background", order)
+        time.sleep(0.2)
+        interactive = _request(scheduler, "interactive", order)
+    for thread in (background, interactive):
+        thread.join(2)
+    assert order == ["interactive", "background"]
+
+
+def test_background_not_starved_under_load():
+    scheduler = CommandScheduler(aging_interval=0.05)
+    stop = threading.Event()
+
+    def load():
+        while not stop.is_set():
+            with scheduler.slot("normal"):
+                time.sleep(0.005)
+
+    workers = [threading.Thread(target=load) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    try:
+        started = time.monotonic()
+        with scheduler.slot("background"):
+            waited = time.monotonic() - started
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(2)
+    assert waited < 0.5 # Sem envelhecimento, a carga normal contínua seguraria o pedido indefinidamente
+    assert scheduler.get_stats()["background"]["granted"] == 1
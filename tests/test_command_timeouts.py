@@ -0,0 +1,105 @@
+# tests/test_command_timeouts.py
+import time
+
+from src.modem import command_timeouts as command_timeouts_module
+from src.modem.command_timeouts import CommandTimeouts
+
+
+def _pdp_handler(modem, delays):
+    """AT+CGACT=<estado>,<cid> responde OK depois de delays[estado] segundos."""
+    def handler(match):
+        modem.respond(delay=delays[match.group(1)])
+        return False
+    modem.add_handler(r'AT\+CGACT=([01]),(\d+)', handler)
+
+
+def _learn(controller, command, count=21):
+    for _ in range(count):
+        assert controller.send_at_command(command) == "OK"
+
+
+def test_buckets_include_arguments():
+    timeouts = CommandTimeouts(min_samples=2)
+    for _ in range(3):
+        timeouts.observe("m", "AT+CGACT=1,1", 0.01, "OK")
+    assert timeouts.deadline("m", "AT+CGACT=1,1", 150) == timeouts.min_timeout
+    assert timeouts.deadline("m", "AT+CGACT=0,1", 150) == 150 # Sem amostras próprias
+    stats = timeouts.get_stats("m")["m"]
+    assert stats["AT+CGACT=1,1"]["samples"] == 3 and stats["AT+CGACT=0,1"]["samples"] == 0
+
+
+def test_bucket_limit_falls_back_to_fixed_timeout(monkeypatch):
+    monkeypatch.setattr(command_timeouts_module, "MAX_COMMAND_BUCKETS", 2)
+    timeouts = CommandTimeouts(min_samples=1)
+    for command in ("AT+A=1", "AT+A=2", "AT+A=3"):
+        timeouts.observe("m", command, 0.01, "OK")
+    assert timeouts.deadline("m", "AT+A=3", 7) == 7
+    assert len(timeouts.get_stats("m")["m"]) == 2
+
+
+def test_default_path(controller, monkeypatch):
+    assert controller.command_timeouts is None # Fora da GUI, só com command_timeouts=...
+    monkeypatch.delenv("MODEM_TIMEOUTS_FILE")
+    assert command_timeouts_module._default_path() == command_timeouts_module.DEFAULT_TIMEOUTS_FILE
+    monkeypatch.setenv("MODEM_TIMEOUTS_FILE", "")
+    assert command_timeouts_module._default_path() is None
+
+
+def test_explicit_timeout_only_lengthened():
+    timeouts = CommandTimeouts(min_samples=2)
+    for _ in range(3):
+        timeouts.observe("m", "AT+COPS=?", 100, "OK")
+    assert timeouts.deadline("m", "AT+COPS=?", 180, explicit=True) == 300 # p99 × 3 acima do pedido
+    assert timeouts.deadline("m", "AT+COPS=?", 500, explicit=True) == 500
+    timeouts.observe("m", "AT+CSQ", 0.01, "OK")
+    timeouts.observe("m", "AT+CSQ", 0.01, "OK")
+    assert timeouts.deadline("m", "AT+CSQ", 5, explicit=True) == 5
+    assert timeouts.deadline("m", "AT+CSQ", 5) == timeouts.min_timeout
+
+
+def test_explicit_timeout_grows_after_timeout_without_samples():
+    timeouts = CommandTimeouts()
+    assert timeouts.deadline("m", "AT+COPS=?", 180, explicit=True) == 180
+    timeouts.observe("m", "AT+COPS=?", 180, None) # Rede mais lenta que o pedido
+    assert timeouts.deadline("m", "AT+COPS=?", 180, explicit=True) == 300
+    assert timeouts.deadline("m", "AT+COPS=?", 180) == 180 # Timeout padrão: segue o fixo
+
+
+def test_explicit_timeout_is_never_shortened(modem, make_controller):
+    _pdp_handler(modem, {"1": 0.005, "0": 0.005})
+    controller = make_controller(command_timeouts=CommandTimeouts())
+    _learn(controller, "AT+CGACT=1,1")
+    modem_id = controller.modem_identity or controller.port
+    assert controller.command_timeouts.get_stats(modem_id)[modem_id]["AT+CGACT=1,1"]["adaptive_deadline"] == 1.0
+
+    _pdp_handler(modem, {"1": 1.5, "0": 0.005}) # Ativação lenta legítima
+    started = time.monotonic()
+    assert controller.send_at_command("AT+CGACT=1,1", timeout=150) == "OK"
+    assert time.monotonic() - started >= 1.5
+
+
+def test_learned_deadline_extends_explicit_timeout(modem, make_controller):
+    _pdp_handler(modem, {"1": 0.1, "0": 0.005})
+    controller = make_controller(command_timeouts=CommandTimeouts())
+    _learn(controller, "AT+CGACT=1,1")
+
+    _pdp_handler(modem, {"1": 0.6, "0": 0.005}) # Dentro do deadline aprendido (1 s), fora do pedido
+    assert controller.send_at_command("AT+CGACT=1,1", timeout=0.3) == "OK"
+
+
+def test_adaptive_timeout_discards_late_reply(modem, make_controller):
+    _pdp_handler(modem, {"1": 0.005, "0": 0.005})
+    controller = make_controller(command_timeouts=CommandTimeouts())
+    _learn(controller, "AT+CGACT=1,1")
+
+    _pdp_handler(modem, {"1": 1.5, "0": 0.005})
+    started = time.monotonic()
+    assert controller.send_at_command("AT+CGACT=1,1") is None # Timeout padrão: deadline aprendido (1 s)
+    assert time.monotonic() - started < 1.4
+    # O próximo comando sai antes do OK atrasado; o modem responde em ordem (ativação, depois o CSQ)
+    def csq(match):
+        modem.respond(["+CSQ: 17,99"], delay=0.8)
+        return False
+    modem.add_handler(r'AT\+CSQ', csq)
+    response = controller.send_at_command("AT+CSQ")
+    assert response is not None and "+CSQ: 17,99" in response
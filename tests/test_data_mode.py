@@ -0,0 +1,150 @@
+# tests/test_data_mode.py
+import re
+import threading
+
+import pytest
+
+from src.modem import data_mode as data_mode_module
+from src.modem.data_mode import CONNECT_START_RE, DataModeSession
+
+# Dados com trechos que parecem texto AT (resultado final, abertura e início do terminador)
+PAYLOAD = b"\x00\xff\r\nOK\r\rCONNECT 5\r\n\r\nOK\x1a"
+OK = b"\r\nOK\r\n"
+
+
+def _feed(session, chunks):
+    """Alimenta a sessão como a thread de leitura: :return: (dados entregues, texto devolvido)."""
+    received = bytearray()
+    session.sink = received.extend
+    text = b"".join(session(chunk) for chunk in chunks)
+    return bytes(received), text
+
+
+def _cuts(stream):
+    """O fluxo inteiro, byte a byte e cortado em dois em cada posição."""
+    yield [stream]
+    yield [stream[i:i + 1] for i in range(len(stream))]
+    for i in range(1, len(stream)):
+        yield [stream[:i], stream[i:]]
+
+
+def _assert_accounting(session):
+    assert session.bytes_seen == session.bytes_data + session.bytes_text + session.bytes_framing + session.bytes_pending
+
+
+def test_length_from_connect_every_cut():
+    opening = b"CONNECT %d\r\n" % len(PAYLOAD)
+    stream = b"\r\n" + opening + PAYLOAD + OK
+    for chunks in _cuts(stream):
+        session = DataModeSession(start=CONNECT_START_RE)
+        data, text = _feed(session, chunks)
+        assert (data, text) == (PAYLOAD, b"\r\n" + OK), chunks
+        assert session.completed and session.length == len(PAYLOAD)
+        assert session.bytes_framing == len(opening) and session.bytes_pending == 0
+        _assert_accounting(session)
+
+
+def test_terminator_split_across_chunks():
+    stream = b"\r\nCONNECT\r\n" + PAYLOAD + OK + b"\r\n+QIURC: \"recv\",0\r\n"
+    for chunks in _cuts(stream):
+        session = DataModeSession(start=CONNECT_START_RE, terminator=OK)
+        data, text = _feed(session, chunks)
+        assert data == PAYLOAD, chunks
+        assert text == b"\r\n" + OK + b"\r\n+QIURC: \"recv\",0\r\n"
+        assert session.completed and session.bytes_pending == 0
+        _assert_accounting(session)
+
+
+def test_terminator_split_in_three():
+    stream = PAYLOAD + OK
+    for i in range(1, len(stream)):
+        for j in range(i + 1, len(stream)):
+            session = DataModeSession(terminator=OK)
+            data, text = _feed(session, [stream[:i], stream[i:j], stream[j:]])
+            assert (data, text) == (PAYLOAD, OK), (i, j)
+            _assert_accounting(session)
+
+
+def test_pending_while_start_and_terminator_are_incomplete():
+    session = DataModeSession(start=CONNECT_START_RE, terminator=OK)
+    assert session(b"\r\nCONNE") == b""
+    assert session.bytes_pending == 7 and not session.started
+    _assert_accounting(session)
+    session(b"CT\r\nabc\r\nO")
+    assert session.started and session.bytes_pending == len(OK) - 1 # Pode ser o início do terminador
+    _assert_accounting(session)
+
+
+def test_keep_start_returns_opening_as_text():
+    start = re.compile(rb"\+QIRD: (?P<length>\d+)\r\n")
+    stream = b"\r\n+QIRD: 4\r\nabcd" + OK
+    for chunks in _cuts(stream):
+        session = DataModeSession(start=start, keep_start=True)
+        data, text = _feed(session, chunks)
+        assert (data, text) == (b"abcd", b"\r\n+QIRD: 4\r\n" + OK), chunks
+        assert session.bytes_framing == 0
+        _assert_accounting(session)
+
+
+@pytest.mark.parametrize("result", [b"ERROR", b"+CME ERROR: 50", b"NO CARRIER"])
+def test_error_before_start(result):
+    stream = b"\r\n" + result + b"\r\n"
+    for chunks in _cuts(stream):
+        session = DataModeSession(start=CONNECT_START_RE, length=10)
+        data, text = _feed(session, chunks)
+        assert (data, text) == (b"", stream), chunks
+        assert session.error and session.finished and not session.completed
+        _assert_accounting(session)
+    assert session(b"\r\nOK\r\n") == b"\r\nOK\r\n" # Terminada: o resto volta ao texto AT
+
+
+def test_buffer_full_drops_after_timeout(monkeypatch):
+    monkeypatch.setattr(data_mode_module, "OVERFLOW_TIMEOUT", 0.05)
+    session = DataModeSession(length=20, buffer_size=8)
+    assert session(bytes(range(20)) + OK) == OK
+    assert session.bytes_data == 20 and session.bytes_dropped == 12
+    assert session.read() == bytes(range(8))
+    assert session.read() == b"" # Terminada e vazia
+
+
+def test_buffer_full_waits_for_consumer():
+    session = DataModeSession(length=64 * 1024, buffer_size=1024)
+    received = bytearray()
+
+    def consume():
+        chunk = bytearray(300)
+        while True:
+            count = session.readinto(chunk, timeout=2)
+            if not count:
+                return
+            received.extend(chunk[:count])
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    payload = bytes(i % 251 for i in range(64 * 1024))
+    for offset in range(0, len(payload), 4000):
+        session(payload[offset:offset + 4000])
+    consumer.join(5)
+    assert bytes(received) == payload and session.bytes_dropped == 0
+
+
+def test_close_without_boundary_resyncs(modem, controller):
+    def handler(match):
+        modem.emit(b"\r\nCONNECT\r\npartial-data-without-end")
+        return False
+    modem.add_handler(r'AT\+QREADX', handler)
+
+    with controller.data_mode(start=CONNECT_START_RE, terminator=OK) as session:
+        assert controller.send_at_command("AT+QREADX", timeout=0.3) is None
+    assert session.finished and not session.completed and not session.error
+    assert session.bytes_data > 0
+    assert controller.send_at_command("AT") == "OK"
+
+
+def test_resync_discards_partial_text(controller):
+    with controller.response_lock:
+        controller.response_buffer = "+QIURC: \"recv" # Linha partida por dados binários
+    assert controller.resync(timeout=2)
+    assert controller.response_buffer == ""
+    response = controller.send_at_command("AT+CSQ")
+    assert response is not None and response.startswith("+CSQ:")
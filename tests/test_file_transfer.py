@@ -0,0 +1,149 @@
+# tests/test_file_transfer.py
+import os
+import random
+
+import pytest
+
+from src.modem import file_transfer as file_transfer_module
+from src.modem.file_transfer import RESUME_SAFETY_MARGIN, UfsChecksum
+
+
+def _naive_checksum(data):
+    """Referência: XOR palavra a palavra (big-endian), byte final ímpar completado com zero."""
+    if len(data) % 2:
+        data += b"\x00"
+    value = 0
+    for i in range(0, len(data), 2):
+        value ^= (data[i] << 8) | data[i + 1]
+    return value
+
+
+@pytest.fixture
+def files(controller, monkeypatch):
+    monkeypatch.setattr(file_transfer_module, "INPUT_TIMEOUT", 0) # _resync não espera o modem desistir
+    monkeypatch.setattr(file_transfer_module, "TRANSFER_TIMEOUT_MARGIN", 0.5) # Download cortado vence logo
+    controller.files.block_size = 512
+    return controller.files
+
+
+def test_checksum_matches_naive_reference():
+    rng = random.Random(7)
+    for size in list(range(0, 40)) + [1023, 1024, 4097]:
+        data = rng.randbytes(size)
+        assert UfsChecksum(data).digest() == _naive_checksum(data), size
+        checksum = UfsChecksum() # Incremental, em blocos de tamanhos ímpares e pares
+        offset = 0
+        while offset < size:
+            step = rng.randint(1, 9)
+            checksum.update(memoryview(data)[offset:offset + step])
+            offset += step
+        assert checksum.digest() == _naive_checksum(data), size
+
+
+def test_upload_and_download(modem, files, tmp_path):
+    data = os.urandom(3000)
+    result = files.upload(data, "audio.wav")
+    assert modem.files["audio.wav"] == data and result.checksum == _naive_checksum(data) and result.resumes == 0
+    destination = str(tmp_path / "audio.wav")
+    result = files.download("audio.wav", destination)
+    assert open(destination, "rb").read() == data and result.resumes == 0
+    assert not os.path.exists(destination + ".part")
+
+
+def test_upload_resume_drops_safety_margin(modem, files, monkeypatch):
+    data = os.urandom(3000)
+    uploaded = modem._file_uploaded
+
+    def cut_with_junk(name, received):
+        uploaded(name, received)
+        modem.files[name] += b"AT\r\n" * 8 # Comandos AT gravados como dados antes do modem perceber a queda
+    monkeypatch.setattr(modem, "_file_uploaded", cut_with_junk)
+    modem.ufs_cut_after = 1000
+
+    result = files.upload(data, "script.txt")
+    assert result.resumes == 1
+    assert "AT+QFSEEK=1,%d,0" % (1000 + 32 - RESUME_SAFETY_MARGIN) in modem.commands
+    assert modem.files["script.txt"] == data
+
+
+def test_download_resumes_in_blocks(modem, files, tmp_path):
+    data = os.urandom(3000)
+    modem.files["cert.pem"] = data
+    modem.ufs_cut_after = 1000
+    destination = str(tmp_path / "cert.pem")
+    result = files.download("cert.pem", destination)
+    assert open(destination, "rb").read() == data
+    assert result.resumes == 1 and result.bytes_transferred == len(data)
+
+
+def test_download_resumes_leftover_part(modem, files, tmp_path):
+    data = os.urandom(3000)
+    modem.files["cert.pem"] = data
+    destination = str(tmp_path / "cert.pem")
+    with open(destination + ".part", "wb") as f:
+        f.write(data[:1200])
+    result = files.download("cert.pem", destination)
+    assert open(destination, "rb").read() == data
+    assert result.resumes == 1 and result.bytes_transferred == len(data) - 1200
+
+
+def test_download_restarts_when_part_is_larger(modem, files, tmp_path):
+    data = os.urandom(3000)
+    modem.files["cert.pem"] = data
+    destination = str(tmp_path / "cert.pem")
+    with open(destination + ".part", "wb") as f:
+        f.write(os.urandom(4000)) # Sobra de outra versão do arquivo
+    result = files.download("cert.pem", destination)
+    assert open(destination, "rb").read() == data
+    assert result.resumes == 0 and result.checksum == _naive_checksum(data)
+
+
+def test_upload_checksum_mismatch_restarts(modem, files):
+    data = os.urandom(3000)
+    modem.ufs_corrupt_next = True
+    result = files.upload(data, "audio.wav")
+    assert modem.files["audio.wav"] == data
+    assert result.resumes == 0 and result.checksum == _naive_checksum(data)
+    assert 'AT+QFDEL="audio.wav"' in modem.commands # Arquivo corrompido apagado antes de reenviar
+    assert sum(c.startswith("AT+QFUPL") for c in modem.commands) == 2
+
+
+def test_download_checksum_mismatch_restarts(modem, files, tmp_path):
+    data = os.urandom(3000)
+    modem.files["cert.pem"] = data
+    modem.ufs_corrupt_next = True
+    destination = str(tmp_path / "cert.pem")
+    result = files.download("cert.pem", destination)
+    assert open(destination, "rb").read() == data
+    assert result.resumes == 0 and result.checksum == _naive_checksum(data)
+    assert sum(c.startswith("AT+QFDWL") for c in modem.commands) == 2
+
+
+def test_resumed_upload_with_bad_prefix_is_resent(modem, files, monkeypatch):
+    data = os.urandom(3000)
+    uploaded = modem._file_uploaded
+
+    def cut_and_corrupt(name, received):
+        uploaded(name, received)
+        monkeypatch.setattr(modem, "_file_uploaded", uploaded) # Só o primeiro envio
+        stored = modem.files[name]
+        modem.files[name] = stored[:10] + bytes([stored[10] ^ 0xFF]) + stored[11:] # Fora da margem de segurança
+    monkeypatch.setattr(modem, "_file_uploaded", cut_and_corrupt)
+    modem.ufs_cut_after = 1000
+
+    result = files.upload(data, "script.txt")
+    assert modem.files["script.txt"] == data
+    assert result.checksum == _naive_checksum(data)
+    assert sum(c.startswith("AT+QFUPL") for c in modem.commands) == 2 # Retomada reprovada na conferência
+
+
+@pytest.mark.parametrize("part_size", [1200, 3000])
+def test_download_with_stale_part_restarts(modem, files, tmp_path, part_size):
+    data = os.urandom(3000)
+    modem.files["cert.pem"] = data
+    destination = str(tmp_path / "cert.pem")
+    with open(destination + ".part", "wb") as f:
+        f.write(os.urandom(part_size)) # Mesmo tamanho ou menor, conteúdo de outra versão
+    result = files.download("cert.pem", destination)
+    assert open(destination, "rb").read() == data
+    assert result.checksum == _naive_checksum(data)
@@ -0,0 +1,85 @@
+# tests/test_http_client.py
+import os
+import re
+
+import pytest
+
+from src.modem import http_client as http_client_module
+from src.modem.command_timeouts import CommandTimeouts
+from src.modem.http_client import ModemHttpError
+
+URL = "http://example.com/upload"
+
+
+def _post_input_times(modem):
+    return [int(m.group(2)) for m in (re.match(r'AT\+QHTTPPOST=(\d+),(\d+),\d+', c) for c in modem.commands) if m]
+
+
+def test_post_is_volume_bound():
+    timeouts = CommandTimeouts(min_samples=1)
+    for _ in range(25):
+        timeouts.observe("m", "AT+QHTTPPOST=10,30,60", 0.01, "OK")
+    assert timeouts.deadline("m", "AT+QHTTPPOST=10,30,60", 35) == 35
+
+
+def test_post_input_time_scales_with_body(controller):
+    assert controller.http._input_timeout(10) == 30
+    # 1 MB a 115200 baud: ~182 s de linha (dobrados) + margem
+    assert controller.http._input_timeout(1024 * 1024) == 193
+    assert controller.http._input_timeout(10 ** 9) == 65535
+
+
+def test_large_post_after_small_ones(modem, make_controller):
+    controller = make_controller(command_timeouts=CommandTimeouts())
+    for _ in range(22):
+        assert controller.http.post(URL, b"x" * 16).body == b"x" * 16
+    body = os.urandom(20 * 1024)
+    modem.model_line_rate = True # 20 KB a 115200 baud: ~1,8 s, acima do deadline aprendido dos POSTs pequenos
+    assert controller.http.post(URL, body).body == body
+    assert _post_input_times(modem)[-1] == 30
+
+
+def _get_commands(modem):
+    return [c for c in modem.commands if c.startswith("AT+QHTTPGET")]
+
+
+def test_get_streams_body_to_sink(modem, controller):
+    body = os.urandom(10000)
+    modem.http_resources[URL] = body
+    chunks = []
+    response = controller.http.get(URL, sink=lambda view: chunks.append(bytes(view)))
+    assert b"".join(chunks) == body and response.body is None
+    assert max(len(chunk) for chunk in chunks) <= controller.http.chunk_size
+    assert response.status == 200 and response.bytes_received == len(body)
+
+
+def test_download_resumes_with_range(modem, controller, tmp_path):
+    body = os.urandom(12000)
+    modem.http_resources[URL] = body
+    modem.http_cut_after = 5000 # Primeira leitura cai no meio
+    path = str(tmp_path / "file.bin")
+    response = controller.http.download(URL, path, timeout=1)
+    with open(path, "rb") as f:
+        assert f.read() == body
+    assert response.status == 206 and response.offset == 5000 - http_client_module.RESUME_SAFETY_MARGIN
+    assert len(_get_commands(modem)) == 2 and not os.path.exists(path + ".part")
+
+
+def test_download_when_server_ignores_range(modem, controller, tmp_path):
+    body = os.urandom(12000)
+    modem.http_resources[URL] = body
+    modem.http_ignore_range = True
+    path = str(tmp_path / "file.bin")
+    with open(path + ".part", "wb") as f: # Execução anterior interrompida
+        f.write(body[:4000])
+    response = controller.http.download(URL, path)
+    with open(path, "rb") as f:
+        assert f.read() == body # Os 4000 bytes repetidos foram descartados (_skipping)
+    assert response.status == 200 and response.bytes_received == len(body) - 4000
+
+
+def test_download_http_error_is_not_retried(modem, controller, tmp_path):
+    with pytest.raises(ModemHttpError) as raised:
+        controller.http.download("http://example.com/missing", str(tmp_path / "missing.bin"))
+    assert raised.value.status == 404
+    assert len(_get_commands(modem)) == 1
@@ -0,0 +1,73 @@
+# tests/test_link_tuning.py
+import threading
+
+import pytest
+
+from src.modem.controller import ModemController
+from src.modem.link_tuning import LinkSettingsStore, LinkTuner, connect
+from src.modem.simulator import SimulatedModem
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LinkSettingsStore(path=str(tmp_path / "link_settings.json"))
+
+
+def test_tune_steps_up_with_flow_control(modem, controller, store):
+    result = LinkTuner(controller, store=store).tune()
+    assert result["baudrate"] == 921600 and result["flow_control"]
+    assert [r["baudrate"] for r in result["results"] if r["ok"]] == [115200, 230400, 460800, 921600]
+    assert modem.baudrate == controller.serial_port.baudrate == 921600
+    assert modem.flow_control == (2, 2)
+    assert store.get("SIM")["baudrate"] == 921600
+    assert controller.send_at_command("AT") == "OK"
+
+
+def test_tune_falls_back_to_last_good_rate(modem, controller, store):
+    # Sem RTS/CTS, o enlace perde bytes acima de 230400
+    result = LinkTuner(controller, flow_control=False, store=store).tune()
+    assert result["baudrate"] == 230400 and not result["flow_control"]
+    failed = [r for r in result["results"] if not r["ok"]]
+    assert [r["baudrate"] for r in failed] == [460800] # Para na primeira falha
+    assert modem.baudrate == controller.serial_port.baudrate == 230400
+    assert store.get("SIM")["baudrate"] == 230400
+    assert controller.send_at_command("AT") == "OK"
+
+
+def test_commands_from_other_threads_survive_switches(modem, controller, store):
+    stop = threading.Event()
+    failures = []
+
+    def poller():
+        while not stop.is_set():
+            response = controller.send_at_command("AT+CSQ")
+            if response is None or "+CSQ:" not in response:
+                failures.append(response)
+
+    thread = threading.Thread(target=poller)
+    thread.start()
+    try:
+        result = LinkTuner(controller, store=store).tune()
+    finally:
+        stop.set()
+        thread.join(5)
+    assert result["baudrate"] == 921600
+    assert not failures # Nenhum comando saiu entre o AT+IPR e a troca do host
+
+
+def test_connect_tries_saved_then_other_rates(store):
+    modem = SimulatedModem(time_scale=0.01, seed=1, baudrate=230400) # Modem ainda na velocidade salva
+    store.put("SIM", {"baudrate": 230400, "flow_control": False})
+    controller = ModemController(port="SIM", serial_factory=modem.open_serial, urc_profile=None)
+    try:
+        assert connect(controller, store=store) == 230400
+    finally:
+        controller.disconnect_modem()
+
+    modem = SimulatedModem(time_scale=0.01, seed=1) # Modem reiniciado na velocidade de fábrica
+    controller = ModemController(port="SIM", serial_factory=modem.open_serial, urc_profile=None)
+    try:
+        assert connect(controller, store=store) == 115200
+        assert controller.send_at_command("AT") == "OK"
+    finally:
+        controller.disconnect_modem()
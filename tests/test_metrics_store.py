@@ -0,0 +1,113 @@
+# tests/test_metrics_store.py
+import math
+
+import pytest
+
+from src.modem import metrics_store as metrics_store_module
+from src.modem.metrics_store import MetricsStore
+
+# Camadas pequenas: 5 min brutos (amostras a cada 10 s), 10 buckets de minuto e 5 de hora
+TIERS = (("raw", 0, 30), ("minute", 60, 10), ("hour", 3600, 5))
+STEP = 10
+DURATION = 7200
+
+
+def _value(ts):
+    return float(ts % 97 - 100)
+
+
+def _filled_store():
+    store = MetricsStore(tiers=TIERS)
+    for ts in range(0, DURATION, STEP):
+        values = {"rssi": _value(ts)}
+        if ts % 30 == 0: # SINR só em parte das amostras: o resto fica NaN
+            values["sinr"] = ts % 13
+        store.record("m", ts=ts, **values)
+    return store
+
+
+def _mean(start, end):
+    values = [_value(ts) for ts in range(start, end, STEP)]
+    return sum(values) / len(values)
+
+
+def _as_lists(result):
+    timestamps, values = result
+    return [float(ts) for ts in timestamps], [float(value) for value in values]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if metrics_store_module.np is None:
+            pytest.skip("NumPy não instalado")
+    else:
+        monkeypatch.setattr(metrics_store_module, "np", None)
+    return request.param
+
+
+def test_query_across_tiers(backend):
+    timestamps, values = _as_lists(_filled_store().query("m", "rssi"))
+    # hora 0 fechada | minutos no ring (6540..7080) até o bruto mais antigo (6900) | 30 amostras brutas
+    minutes = list(range(6540, 6900, 60))
+    raw = list(range(6900, DURATION, STEP))
+    assert timestamps == [0.0] + [float(ts) for ts in minutes + raw]
+    assert values[0] == pytest.approx(_mean(0, 3600), abs=1e-3)
+    assert values[1:1 + len(minutes)] == pytest.approx([_mean(ts, ts + 60) for ts in minutes], abs=1e-3)
+    assert values[1 + len(minutes):] == [_value(ts) for ts in raw]
+
+
+def test_query_window_on_tier_boundaries(backend):
+    timestamps, _ = _as_lists(_filled_store().query("m", "rssi", start=6500, end=6950))
+    # Sem a hora (termina antes do início); minutos até o bruto mais antigo, exclusivo; brutos até end, inclusivo
+    assert timestamps == [float(ts) for ts in list(range(6540, 6900, 60)) + list(range(6900, 6960, STEP))]
+    timestamps, _ = _as_lists(_filled_store().query("m", "rssi", start=6900, end=6900))
+    assert timestamps == [6900.0] # Bruto mais antigo: não duplicado pelo bucket de minuto
+
+
+def test_nan_samples_are_dropped(backend):
+    timestamps, values = _as_lists(_filled_store().query("m", "sinr", start=6900))
+    assert timestamps == [float(ts) for ts in range(6900, DURATION, 30)]
+    assert not any(math.isnan(value) for value in values)
+
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    if metrics_store_module.np is None:
+        pytest.skip("NumPy não instalado")
+    percents = (0, 5, 50, 90, 99, 100)
+    windows = [(None, None), (6500, 6950), (6900, DURATION), (0, 100)]
+    vectorized = [(_as_lists(_filled_store().query("m", metric, *window)),
+                   _filled_store().percentiles("m", metric, percents, *window))
+                  for metric in ("rssi", "sinr") for window in windows]
+    monkeypatch.setattr(metrics_store_module, "np", None)
+    pure = [(_as_lists(_filled_store().query("m", metric, *window)),
+             _filled_store().percentiles("m", metric, percents, *window))
+            for metric in ("rssi", "sinr") for window in windows]
+    for (np_series, np_percentiles), (py_series, py_percentiles) in zip(vectorized, pure):
+        assert np_series == py_series
+        assert py_percentiles == pytest.approx(np_percentiles, abs=1e-6)
+
+
+def test_percentiles_empty_window(backend):
+    result = _filled_store().percentiles("m", "rssi", (50, 99), start=10 ** 9)
+    assert all(math.isnan(value) for value in result.values())
+
+
+def test_open_buckets_survive_close_and_reopen(tmp_path):
+    def record(store, start, end):
+        for ts in range(start, end, STEP):
+            store.record("m", ts=ts, rssi=_value(ts), sinr=ts % 13 if ts % 30 == 0 else math.nan)
+
+    reference = MetricsStore(tiers=TIERS)
+    record(reference, 0, DURATION + 60)
+
+    store = MetricsStore(tiers=TIERS, persist_dir=str(tmp_path))
+    record(store, 0, 3650) # Fecha no meio de um minuto e de uma hora
+    store.close()
+    store = MetricsStore(tiers=TIERS, persist_dir=str(tmp_path))
+    record(store, 3650, DURATION + 60)
+    try:
+        for metric in ("rssi", "sinr"):
+            assert _as_lists(store.query("m", metric)) == _as_lists(reference.query("m", metric))
+    finally:
+        store.close()
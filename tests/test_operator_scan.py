@@ -0,0 +1,83 @@
+# tests/test_operator_scan.py
+import time
+
+import pytest
+
+from src.modem.command_handle import RUNNING, CommandCancelled
+from src.modem.operator_scan import UNKNOWN_LOCATION
+
+COPS_SCAN = '+COPS: (2,"SIMULADA","SIM","72405",7),(1,"OUTRA","OUT","72411",7),,(0-4),(0-2)'
+
+
+def _cops_scan(modem, delay=0.05):
+    """Registra o AT+COPS=? (ausente no simulador), respondendo depois de delay segundos."""
+    def handler(match):
+        modem.respond([COPS_SCAN], delay=delay)
+        return False
+    modem.add_handler(r'AT\+COPS=\?', handler)
+
+
+def _scans(modem):
+    return modem.commands.count("AT+COPS=?")
+
+
+def _wait_state(handle, state, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while handle.state != state:
+        assert time.monotonic() < deadline, f"{handle} não chegou a {state}"
+        time.sleep(0.005)
+
+
+def test_cached_scan_is_reused_per_cell(modem, controller):
+    _cops_scan(modem)
+    job = controller.start_operator_scan()
+    operators = job.result(2)
+    assert [op["numeric"] for op in operators] == ["72405", "72411"] and not job.from_cache
+    assert job.location == UNKNOWN_LOCATION
+
+    cached = controller.start_operator_scan()
+    assert cached.from_cache and cached.result(0) == operators
+    assert _scans(modem) == 1 # Sem ocupar a serial de novo
+
+    # Outra célula servidora: a busca anterior não vale
+    controller.state.update("cereg", {"stat": 1, "lac": "1A2B", "ci": "0A1B2C03"})
+    moved = controller.start_operator_scan()
+    assert not moved.from_cache and moved.location == "1A2B:0A1B2C03"
+    moved.result(2)
+    assert controller.start_operator_scan(force=True).result(2) == operators
+    assert _scans(modem) == 3
+
+
+def test_expired_scan_goes_back_to_modem(modem, controller):
+    _cops_scan(modem)
+    controller.operator_cache.ttl = 0.1
+    controller.start_operator_scan().result(2)
+    assert controller.start_operator_scan().from_cache
+    time.sleep(0.2)
+    job = controller.start_operator_scan()
+    assert not job.from_cache
+    job.result(2)
+    assert _scans(modem) == 2
+
+
+def test_concurrent_requests_share_one_scan(modem, controller):
+    _cops_scan(modem, delay=0.3)
+    first = controller.start_operator_scan()
+    assert controller.start_operator_scan() is first
+    first.result(2)
+    assert _scans(modem) == 1
+
+
+def test_cancelled_scan_is_not_cached(modem, controller):
+    _cops_scan(modem, delay=0.6)
+    job = controller.start_operator_scan()
+    _wait_state(job.handle, RUNNING)
+    assert job.cancel()
+    with pytest.raises(CommandCancelled):
+        job.result(2)
+    assert controller.operator_cache.get(UNKNOWN_LOCATION) is None
+
+    _cops_scan(modem)
+    retry = controller.start_operator_scan()
+    assert retry is not job and not retry.from_cache
+    assert len(retry.result(3)) == 2
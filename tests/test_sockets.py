@@ -0,0 +1,153 @@
+# tests/test_sockets.py
+import os
+import threading
+import time
+
+import pytest
+
+from src.modem import sockets as sockets_module
+from src.modem.simulator import REGISTERED_HOME
+from src.modem.sockets import ModemSocketError
+
+HOST, PORT = "example.com", 7
+
+
+@pytest.fixture
+def sockets(modem, controller):
+    deadline = time.monotonic() + 2
+    while modem.reg_stat != REGISTERED_HOME:
+        assert time.monotonic() < deadline, "modem simulado não registrou"
+        time.sleep(0.01)
+    manager = controller.sockets
+    yield manager
+    for sock in manager.sockets():
+        sock.close()
+
+
+def _drop_recv_urcs(modem, monkeypatch):
+    """O modem "perde" os +QIURC: "recv": só a consulta periódica encontra os dados."""
+    urc = modem.urc
+    monkeypatch.setattr(modem, "urc", lambda line, delay=0.0: None if '"recv"' in line else urc(line, delay))
+
+
+def _qird_count(modem):
+    return sum(command.startswith("AT+QIRD") for command in modem.commands)
+
+
+def _recv_exactly(sock, size, timeout=2):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data), timeout=timeout)
+        assert chunk, "conexão fechada antes do fim"
+        data += chunk
+    return bytes(data)
+
+
+def test_recv_driven_by_urc(modem, sockets, monkeypatch):
+    monkeypatch.setattr(sockets_module, "RECV_POLL_INTERVAL", 30.0)
+    with sockets.open(HOST, PORT) as sock:
+        payload = os.urandom(4000) # Mais de um AT+QISEND e de um AT+QIRD
+        sock.sendall(payload)
+        started = time.monotonic()
+        assert _recv_exactly(sock, len(payload)) == payload
+        assert time.monotonic() - started < 2 # Sem esperar a consulta periódica
+        assert sock.bytes_sent == sock.bytes_received == len(payload)
+
+
+def test_recv_polls_when_urc_is_lost(modem, sockets, monkeypatch):
+    monkeypatch.setattr(sockets_module, "RECV_POLL_INTERVAL", 0.2)
+    with sockets.open(HOST, PORT) as sock:
+        with pytest.raises(TimeoutError): # Consome a leitura inicial (nada no modem ainda)
+            sock.recv(10, timeout=0.1)
+        _drop_recv_urcs(modem, monkeypatch)
+        sock.sendall(b"sem urc")
+        reads = _qird_count(modem)
+        started = time.monotonic()
+        assert sock.recv(10, timeout=2) == b"sem urc"
+        assert time.monotonic() - started >= 0.1 # Encontrado pela consulta, não por um URC
+        assert _qird_count(modem) > reads
+
+
+def test_send_fail_backs_off_then_succeeds(modem, sockets, monkeypatch):
+    monkeypatch.setattr(sockets_module, "SEND_FAIL_BACKOFF", 0.05)
+    failures = [2]
+
+    def qisend(match):
+        if failures[0]:
+            failures[0] -= 1
+            modem.emit(b"\r\n> ", modem.latency)
+            modem.expect_payload(int(match.group(2)), lambda data: modem.respond(result="SEND FAIL"))
+            return False
+        return modem._on_qisend(match)
+    modem.add_handler(r'AT\+QISEND=(\d+),(\d+)', qisend)
+
+    with sockets.open(HOST, PORT) as sock:
+        started = time.monotonic()
+        sock.sendall(b"ping")
+        assert time.monotonic() - started >= 0.05 * (1 + 2) # Esperas crescentes: 1x, 2x o backoff
+        assert sum(c.startswith("AT+QISEND") for c in modem.commands) == 3
+        assert sock.bytes_sent == 4
+        assert sock.recv(4, timeout=2) == b"ping"
+
+
+def test_send_fail_gives_up(modem, sockets, monkeypatch):
+    monkeypatch.setattr(sockets_module, "SEND_FAIL_BACKOFF", 0.01)
+
+    def qisend(match):
+        modem.emit(b"\r\n> ", modem.latency)
+        modem.expect_payload(int(match.group(2)), lambda data: modem.respond(result="SEND FAIL"))
+        return False
+    modem.add_handler(r'AT\+QISEND=(\d+),(\d+)', qisend)
+
+    with sockets.open(HOST, PORT) as sock:
+        with pytest.raises(ModemSocketError):
+            sock.send(b"ping")
+        assert sum(c.startswith("AT+QISEND") for c in modem.commands) == sockets_module.SEND_FAIL_RETRIES + 1
+        assert sock.bytes_sent == 0
+
+
+def test_peer_closed_drains_then_eof(modem, sockets):
+    sock = sockets.open(HOST, PORT)
+    sock.sendall(b"ultimos dados")
+    time.sleep(0.1) # Eco já no buffer do modem
+    modem.close_socket_by_peer(sock.connect_id)
+    assert _recv_exactly(sock, 13) == b"ultimos dados"
+    assert sock.recv(10, timeout=1) == b"" # Fim da conexão, sem TimeoutError
+    assert sock.peer_closed
+    with pytest.raises(ModemSocketError):
+        sock.send(b"x")
+    sock.close()
+    assert sock not in sockets.sockets()
+
+
+def test_pdpdeact_closes_every_socket(modem, sockets):
+    first, second = sockets.open(HOST, PORT), sockets.open(HOST, PORT + 1)
+    modem.urc('+QIURC: "pdpdeact",1')
+    for sock in (first, second):
+            assert sock.recv(10, timeout=1) == b""
+
+
+def test_concurrent_connect_ids(modem, sockets):
+    modem.socket_peer = lambda connect_id, data: b"%d:" % connect_id + data
+    opened, errors = [], []
+
+    def worker(index):
+        try:
+            sock = sockets.open(HOST, PORT + index)
+            opened.append(sock)
+            sock.sendall(b"cliente %d" % index)
+            expected = b"%d:cliente %d" % (sock.connect_id, index)
+            assert _recv_exactly(sock, len(expected)) == expected
+        except Exception as e: # Repassado ao teste
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not errors
+    assert sorted(sock.connect_id for sock in opened) == [0, 1, 2, 3]
+    with pytest.raises(ModemSocketError):
+        sockets.open(HOST, PORT, connect_id=opened[0].connect_id)
+    assert len(sockets.get_stats()) == 4
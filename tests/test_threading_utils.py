@@ -0,0 +1,41 @@
+# tests/test_threading_utils.py
+import queue
+import threading
+
+import pytest
+
+from src.utils.threading_utils import BoundedExecutor
+
+
+def test_burst_on_idle_worker_spawns_another():
+    executor = BoundedExecutor(max_workers=4, max_queue=8)
+    executor.submit(lambda: None).result(2) # Uma thread já criada e livre
+    barrier = threading.Barrier(2, timeout=2)
+    # Duas tarefas que só terminam juntas: a segunda não pode esperar pela thread livre
+    futures = [executor.submit(barrier.wait) for _ in range(2)]
+    for future in futures:
+        future.result(3)
+    assert executor.get_stats()["workers"] == 2
+    executor.shutdown()
+
+
+def test_idle_workers_are_reused():
+    executor = BoundedExecutor(max_workers=4, max_queue=8)
+    for _ in range(10):
+        executor.submit(lambda: None).result(2)
+    assert executor.get_stats()["workers"] == 1
+    executor.shutdown()
+
+
+def test_worker_limit_and_full_queue():
+    executor = BoundedExecutor(max_workers=2, max_queue=1)
+    release = threading.Event()
+    running = [executor.submit(release.wait, 2) for _ in range(2)]
+    queued = executor.submit(lambda: "ok")
+    with pytest.raises(queue.Full):
+        executor.submit(lambda: None, block=False)
+    release.set()
+    assert queued.result(2) == "ok" and all(future.result(2) for future in running)
+    executor.shutdown() # Espera as threads: contadores fechados
+    stats = executor.get_stats()
+    assert stats["workers"] == 2 and stats["rejected"] == 1 and stats["completed"] == 3
@@ -0,0 +1,49 @@
+# tests/test_urc_monitor.py
+import threading
+
+from src.gui.urc_monitor import URC_POPUP_EVENT_PREFIX, UrcMonitor
+
+
+class _FakeWindow:
+    """Janela mínima: guarda os eventos escritos por outras threads (write_event_value)."""
+
+    def __init__(self):
+        self.events = []
+
+    def write_event_value(self, key, value):
+        self.events.append((key, value))
+
+
+def _process(urc_name, payload):
+    window = _FakeWindow()
+    monitor = UrcMonitor(window, threading.Lock())
+    worker = threading.Thread(target=monitor.process_urc_data_from_controller, args=(urc_name, payload))
+    worker.start() # Como no UrcDispatcher: fora da thread principal
+    worker.join(2)
+    return window.events
+
+
+def test_popup_goes_through_event_loop():
+    events = _process("CMTI", ("SM", "3"))
+    key, (kind, message, kwargs) = next(event for event in events if event[0].startswith(URC_POPUP_EVENT_PREFIX))
+    assert key == f"{URC_POPUP_EVENT_PREFIX}CMTI-" and kind == "timed" and kwargs["title"] == "NOVO SMS"
+    assert any(key == '-URC_LOG_OUTPUT_APPEND-' and "Índice 3" in value for key, value in events)
+
+
+def test_state_changes_are_logged_without_popup():
+    for urc_name, payload in (("CREG", ("2", "1", "1A2B", "01C3D4E5", "7")), ("CSQ", ("20", "99"))):
+        events = _process(urc_name, payload)
+        assert [key for key, _ in events] == ['-URC_LOG_OUTPUT_APPEND-']
+
+
+def test_socket_and_http_urcs_are_described():
+    cases = {
+        ("QIURC", ("closed", "1", None)): "Socket 1: conexão fechada",
+        ("QIOPEN", ("0", "566")): "Socket 0: falha ao abrir (erro 566)",
+        ("QHTTPGET", ("0", "200", "1024")): "HTTP GET: status 200, 1024 bytes",
+        ("QHTTPPOST", ("714", None, None)): "HTTP POST: erro de DNS (714)",
+        ("QHTTPREADFILE", ("0",)): "leitura do corpo para o arquivo concluída",
+    }
+    for (urc_name, payload), expected in cases.items():
+        (key, value), = _process(urc_name, payload)
+        assert expected in value and "Desconhecido" not in value
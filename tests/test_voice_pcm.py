@@ -0,0 +1,89 @@
+# tests/test_voice_pcm.py
+import time
+import wave
+
+import pytest
+
+from src.modem.voice_pcm import FRAME_MS, PcmRingBuffer, PcmStream, WavSink, WavSource
+
+FRAME_BYTES = 8000 * FRAME_MS // 1000 * 2 # 8 kHz, 16 bits
+
+
+def _frame(value):
+    return bytes([value]) * FRAME_BYTES
+
+
+def test_ring_buffer_full_empty_and_wraparound():
+    ring = PcmRingBuffer(FRAME_BYTES, capacity=3)
+    assert ring.pop() is None and len(ring) == 0
+    assert all(ring.push(_frame(i)) for i in range(3))
+    assert not ring.push(_frame(9)) and ring.free == 0 # Cheia: quadro descartado
+    assert ring.pop() == _frame(0)
+    # Os próximos quadros dão a volta no armazenamento sem sobrescrever os pendentes
+    for i in range(3, 10):
+        assert ring.push(_frame(i))
+        target = bytearray(FRAME_BYTES)
+        assert ring.pop_into(target) and bytes(target) == _frame(i - 2)
+    assert [ring.pop(), ring.pop(), ring.pop()] == [_frame(8), _frame(9), None]
+    with pytest.raises(ValueError):
+        ring.push(bytes(FRAME_BYTES - 1))
+
+
+def test_write_without_block_counts_dropped_frames():
+    stream = PcmStream(None, "VOICE", ring_frames=4) # Sem start(): só o ring de reprodução
+    assert stream.write(bytes(FRAME_BYTES * 6 + 10), block=False) == FRAME_BYTES * 4 + 10
+    assert stream.playback_dropped == 2 and len(stream.playback) == 4 # O resto (10 bytes) espera o próximo write
+    assert [stream.playback.pop() for _ in range(4)] == [bytes(FRAME_BYTES)] * 4
+
+
+def test_playback_is_paced_without_underruns(modem, controller):
+    modem.voice_loopback = True
+    frames = 25
+    with controller.voice.open("VOICE", serial_factory=modem.open_voice_port) as stream:
+        started = time.monotonic()
+        stream.play(_frame(i) for i in range(frames))
+        elapsed = time.monotonic() - started
+    stats = stream.get_stats()
+    assert stats["frames_played"] == frames and stats["underruns"] == 0 and stats["late_resets"] == 0
+    assert modem.voice_received == frames * FRAME_BYTES
+    # No ritmo do relógio de amostragem: o último quadro sai (frames - 1) períodos depois do primeiro
+    assert (frames - 1) * FRAME_MS / 1000 <= elapsed < frames * FRAME_MS / 1000 + 0.5
+    assert modem.voice_over_usb[0] == 0 # AT+QPCMV=0 ao fechar o último fluxo
+
+
+def test_underrun_is_counted_until_flush(modem, controller):
+    with controller.voice.open("VOICE", serial_factory=modem.open_voice_port, prefill_frames=2) as stream:
+        stream.write(_frame(1) * 3)
+        assert stream.drain(1)
+        time.sleep(0.1) # Ring vazio sem flush(): o produtor atrasou
+        assert stream.underruns == 1
+        stream.write(_frame(2) * 3)
+        stream.flush() # Fim da fala: ring vazio não é underrun
+        assert stream.drain(1)
+        time.sleep(0.1)
+    assert stream.underruns == 1 and stream.frames_played == 6
+
+
+def test_capture_frames_and_dropped_counter(modem, controller):
+    with controller.voice.open("VOICE", serial_factory=modem.open_voice_port, ring_frames=2) as stream:
+        frame = stream.read_frame(1)
+        assert len(frame) == FRAME_BYTES and any(frame) # Tom do simulador
+        time.sleep(0.2) # ~10 quadros sem consumidor num ring de 2
+    stats = stream.get_stats()
+    assert stats["capture_dropped"] >= 5
+    assert stats["frames_captured"] >= stats["capture_dropped"] + stats["capture_queued"] + 1
+
+
+def test_wav_round_trip(tmp_path):
+    path = str(tmp_path / "voz.wav")
+    frames = [_frame(i) for i in range(4)]
+    with WavSink(path) as sink:
+        for frame in frames:
+            sink(memoryview(frame))
+        sink(memoryview(_frame(7)[:100])) # Quadro incompleto no fim
+    with wave.open(path, 'rb') as wav:
+        assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, 8000)
+    source = WavSource(path, sample_rate=8000)
+    assert list(source) == frames + [_frame(7)[:100] + bytes(FRAME_BYTES - 100)]
+    with pytest.raises(ValueError):
+        WavSource(path, sample_rate=16000)